@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+__doc__ = """
+Citation matching engine, compiles the citation keys of a RAG query
+once so that responses can be checked for citations without repeating
+the preparation work for every chunk
+"""
+
+__all__ = ("CitationMatcher",)
+
+
+def _normalise(text: str) -> str:
+    """
+    Collapses runs of whitespace into a single space and casefolds
+    the text
+
+    Args:
+        text (str): Text to normalise
+
+    Returns:
+        str: Normalised text
+    """
+    return " ".join(text.split()).casefold()
+
+
+class CitationMatcher:
+    """
+    Compiled set of citation keys
+
+    Keys are deduplicated on compilation, as the top-k chunks of a
+    query are frequently drawn from a handful of sources. The response
+    is searched once per unique key with CPython's native substring
+    search, which outperformed a single-pass multi-pattern automaton
+    written in Python for the key counts and response lengths seen in
+    practice (see `benchmarks/bench_citations.py`).
+
+    Empty and whitespace-only keys are kept, and are matched the same
+    way as the previous `source in response` check.
+
+    When `fuzzy` is enabled, keys and responses are compared after
+    casefolding and collapsing runs of whitespace, so that
+    `"Annual  Report.PDF"` matches `"annual report.pdf"`.
+
+    Attributes:
+        keys (tuple[str, ...]): Unique citation keys in insertion
+                                order
+        fuzzy (bool): Flag to indicate if matching is tolerant of
+                      whitespace and casing, defaults to False
+    """
+
+    def __init__(self, keys: Iterable[str], fuzzy: bool = False):
+        self.keys: tuple[str, ...] = tuple(dict.fromkeys(keys))
+        self.fuzzy: bool = fuzzy
+
+        # Normalised form of every key, grouped so that keys which
+        # normalise to the same text are only searched for once
+        self._patterns: dict[str, list[str]] = {}
+        for key in self.keys:
+            self._patterns.setdefault(
+                _normalise(key) if fuzzy else key, []
+            ).append(key)
+
+    @classmethod
+    def from_chunks(
+        cls,
+        chunks: Iterable[object],
+        fuzzy: bool = False,
+    ) -> CitationMatcher:
+        """
+        Compiles a matcher from the sources of a collection of Chunks
+
+        Args:
+            chunks (Iterable[object]): Chunks with a `source` attribute
+            fuzzy (bool): Flag to indicate if matching is tolerant of
+                          whitespace and casing, defaults to False
+
+        Returns:
+            CitationMatcher: Compiled matcher
+        """
+        return cls((c.source for c in chunks), fuzzy=fuzzy)
+
+    def match(self, text: str) -> set[str]:
+        """
+        Retrieves the set of keys that occur in a response
+
+        Args:
+            text (str): Response returned from the LLM
+
+        Returns:
+            set[str]: Keys found in the response
+        """
+        if self.fuzzy:
+            text = _normalise(text)
+        found: set[str] = set()
+        for pattern, keys in self._patterns.items():
+            if pattern in text:
+                found.update(keys)
+        return found
@@ -7,6 +7,8 @@ from atlas.genai.schemas import Query as ChatMessageBase
 from atlas.schemas.base import Uuid
 from pydantic import BaseModel, ConfigDict, Field, StrictStr
 
+from aibots.citations import CitationMatcher
+
 __doc__ = """
 Data models for Chats, includes reusable fields and MongoDB schema models
 """
@@ -95,19 +97,29 @@ class RAGQuery(BaseModel):
         """
         return "\n".join(c.prepare_chunk() for c in self.chunks)
 
-    def get_citations(self, response: str) -> None:
+    def get_citations(self, response: str, fuzzy: bool = False) -> None:
         """
         Populates the citation details based on the response
-        from the LLM
+        from the LLM, the sources of all chunks are compiled into a
+        single matcher so each unique source is only searched for once
 
         Args:
             response (str): Response returned from the LLM
+            fuzzy (bool): Flag to indicate if source matching should be
+                          tolerant of whitespace and casing, defaults
+                          to False
 
         Returns:
             None
         """
+        if not self.chunks:
+            return
+
+        cited: set[str] = CitationMatcher.from_chunks(
+            self.chunks, fuzzy=fuzzy
+        ).match(response)
         for chunk in self.chunks:
-            if chunk.source in response:
+            if chunk.source in cited:
                 self.citations.append(
                     Citation(
                         source=chunk.source,
@@ -0,0 +1,83 @@
+"""
+Micro-benchmark comparing per-chunk substring checks against the
+compiled CitationMatcher over synthetic top-k chunk sets, chunks are
+drawn from a third as many source files as there are chunks
+
+Usage:
+    python benchmarks/bench_citations.py
+"""
+
+import random
+import string
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from aibots.citations import CitationMatcher  # noqa: E402
+
+TOP_KS: tuple[int, ...] = (5, 10, 25, 50, 100)
+RESPONSE_LENGTHS: tuple[int, ...] = (1_000, 4_000, 16_000)
+REPEATS: int = 20
+
+
+def synthetic_sources(k: int, rng: random.Random) -> list[str]:
+    files: list[str] = [
+        "".join(rng.choices(string.ascii_lowercase + "_", k=24)) + ".pdf"
+        for _ in range(max(1, k // 3))
+    ]
+    return [rng.choice(files) for _ in range(k)]
+
+
+def synthetic_response(
+    length: int, sources: list[str], rng: random.Random
+) -> str:
+    words: list[str] = []
+    size: int = 0
+    while size < length:
+        word: str = (
+            rng.choice(sources)
+            if rng.random() < 0.01
+            else "".join(rng.choices(string.ascii_lowercase, k=6))
+        )
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def substring_baseline(sources: list[str], response: str) -> set[str]:
+    return {s for s in sources if s in response}
+
+
+def main() -> None:
+    rng: random.Random = random.Random(0)
+    print(
+        f"{'top_k':>6} {'length':>8} {'substring (us)':>15} "
+        f"{'compile (us)':>13} {'match (us)':>11} "
+        f"{'fuzzy match (us)':>17}"
+    )
+    for k in TOP_KS:
+        sources: list[str] = synthetic_sources(k, rng)
+        for length in RESPONSE_LENGTHS:
+            response: str = synthetic_response(length, sources, rng)
+            matcher: CitationMatcher = CitationMatcher(sources)
+            fuzzy: CitationMatcher = CitationMatcher(sources, fuzzy=True)
+            assert matcher.match(response) == substring_baseline(
+                sources, response
+            )
+
+            def per_call(stmt) -> float:
+                return min(timeit.repeat(stmt, number=1, repeat=REPEATS)) * 1e6
+
+            print(
+                f"{k:>6} {length:>8} "
+                f"{per_call(lambda: substring_baseline(sources, response)):>15.1f} "  # noqa: E501
+                f"{per_call(lambda: CitationMatcher(sources)):>13.1f} "
+                f"{per_call(lambda: matcher.match(response)):>11.1f} "
+                f"{per_call(lambda: fuzzy.match(response)):>17.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
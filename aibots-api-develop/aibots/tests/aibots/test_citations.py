@@ -0,0 +1,57 @@
+import pytest
+
+from aibots.citations import CitationMatcher
+
+
+@pytest.fixture()
+def sources():
+    return [
+        "annual_report.pdf",
+        "report.pdf",
+        "Staff Handbook 2024.docx",
+        "faq.txt",
+    ]
+
+
+def test_matcher_matches_single_key(sources):
+    matcher = CitationMatcher(sources)
+    assert matcher.match("As stated in faq.txt, ...") == {"faq.txt"}
+
+
+def test_matcher_matches_overlapping_keys(sources):
+    matcher = CitationMatcher(sources)
+    assert matcher.match("See annual_report.pdf") == {
+        "annual_report.pdf",
+        "report.pdf",
+    }
+
+
+def test_matcher_exact_is_case_sensitive(sources):
+    matcher = CitationMatcher(sources)
+    assert matcher.match("Source: FAQ.TXT") == set()
+
+
+def test_matcher_fuzzy_ignores_case_and_whitespace(sources):
+    matcher = CitationMatcher(sources, fuzzy=True)
+    response = "Source: staff  handbook\n2024.DOCX."
+    assert matcher.match(response) == {"Staff Handbook 2024.docx"}
+
+
+def test_matcher_no_keys():
+    matcher = CitationMatcher([])
+    assert matcher.keys == ()
+    assert matcher.match("anything") == set()
+
+
+@pytest.mark.parametrize("response", ["", "no spaces", "one-word"])
+def test_matcher_blank_keys_match_like_substring_search(response):
+    keys = ["", " ", "\t"]
+    matcher = CitationMatcher(keys)
+    assert matcher.keys == ("", " ", "\t")
+    assert matcher.match(response) == {k for k in keys if k in response}
+
+
+def test_matcher_agrees_with_substring_search(sources):
+    matcher = CitationMatcher(sources)
+    response = "report.pdf, Staff Handbook 2024.docx and faq.tx"
+    assert matcher.match(response) == {s for s in sources if s in response}
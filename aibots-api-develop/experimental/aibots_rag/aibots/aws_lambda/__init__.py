@@ -1,8 +1,10 @@
 from __future__ import annotations
+from .local_s3 import LocalS3Client
+from .manifest import IngestionManifest, get_manifest
 from .s3_file import S3File
 
 __doc__ = """
 Aggregates all AWS Lambda related classes
 """
 
-__all__ = "S3File"
+__all__ = ("S3File", "LocalS3Client", "IngestionManifest", "get_manifest")
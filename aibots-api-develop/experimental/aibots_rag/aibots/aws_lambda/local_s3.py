@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from botocore.exceptions import ClientError
+
+__doc__ = """
+Local filesystem stand-in for the S3 client calls used by S3File
+"""
+
+__all__ = ("LocalS3Client",)
+
+_RANGE = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+class LocalS3Client:
+    """
+    serves get_object and head_object from <root>/<bucket>/<key>, with
+    responses shaped like boto3's
+
+    Attributes:
+        root (Path): directory holding one folder per bucket
+        requests (Dict[str, int]): number of calls made per operation
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self.requests: Dict[str, int] = {"GetObject": 0, "HeadObject": 0}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes) -> Dict[str, Any]:
+        path = self.root / Bucket / Key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(Body)
+        return {"ETag": self._etag(path)}
+
+    def _path(self, bucket: str, key: str, operation: str) -> Path:
+        path = self.root / bucket / key
+        if not path.is_file():
+            raise ClientError(
+                {"Error": {"Code": "NoSuchKey", "Message": key}}, operation
+            )
+        return path
+
+    @staticmethod
+    def _etag(path: Path) -> str:
+        return f'"{hashlib.md5(path.read_bytes()).hexdigest()}"'
+
+    def _metadata(self, path: Path) -> Dict[str, Any]:
+        return {
+            "LastModified": datetime.fromtimestamp(
+                path.stat().st_mtime, tz=timezone.utc
+            ),
+            "ContentLength": path.stat().st_size,
+            "ETag": self._etag(path),
+            "ContentType": "binary/octet-stream",
+        }
+
+    def head_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        self.requests["HeadObject"] += 1
+        return self._metadata(self._path(Bucket, Key, "HeadObject"))
+
+    def get_object(
+        self,
+        Bucket: str,
+        Key: str,
+        Range: Optional[str] = None,
+        IfMatch: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        self.requests["GetObject"] += 1
+        path = self._path(Bucket, Key, "GetObject")
+        response = self._metadata(path)
+        if IfMatch is not None and IfMatch != response["ETag"]:
+            raise ClientError(
+                {"Error": {"Code": "PreconditionFailed", "Message": Key}},
+                "GetObject",
+            )
+        data = path.read_bytes()
+        if Range is not None:
+            match = _RANGE.fullmatch(Range)
+            size = len(data)
+            if match is None or int(match.group(1)) >= size:
+                raise ClientError(
+                    {"Error": {"Code": "InvalidRange", "Message": Range}},
+                    "GetObject",
+                )
+            start = int(match.group(1))
+            end = min(int(match.group(2) or size - 1), size - 1)
+            data = data[start:end + 1]
+            response["ContentRange"] = f"bytes {start}-{end}/{size}"
+        response["ContentLength"] = len(data)
+        response["Body"] = BytesIO(data)
+        return response
@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from boto3 import client
+from pydantic import BaseModel
+
+__doc__ = """
+Ingestion manifest for incremental re-ingestion of knowledge base files
+
+Each ingested file is recorded under (agent, file key) with the hash of its
+content and of the pipeline config it was ingested with, and the document ids
+of its stored chunks. The source stage skips files whose hashes are unchanged
+and the store stage only embeds and indexes chunks that changed.
+"""
+
+__all__ = (
+    "content_hash",
+    "config_hash",
+    "chunk_hash",
+    "ChunkPlan",
+    "ManifestEntry",
+    "IngestionManifest",
+    "JSONManifest",
+    "SQLiteManifest",
+    "S3Manifest",
+    "get_manifest",
+)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_hash(data: bytes | str) -> str:
+    """
+    Hash of the content of a file
+
+    Args:
+        data (bytes | str): File content
+
+    Returns:
+        str: Hex digest
+    """
+    return _sha256(data.encode("utf-8") if isinstance(data, str) else data)
+
+
+def config_hash(
+    config: Dict[str, Any], exclude: Tuple[str, ...] = ("store",)
+) -> str:
+    """
+    Hash of a pipeline config, independent of key order
+
+    Args:
+        config (Dict[str, Any]): Pipeline config
+        exclude (Tuple[str, ...]): Top level keys to ignore, defaults to the
+                                   store endpoint picked per invocation
+
+    Returns:
+        str: Hex digest
+    """
+    relevant = {k: v for k, v in config.items() if k not in exclude}
+    return _sha256(
+        json.dumps(relevant, sort_keys=True, default=str).encode("utf-8")
+    )
+
+
+def chunk_hash(text: str, page_number: Any, pipeline_config_hash: str) -> str:
+    """
+    Hash identifying a stored chunk, a chunk is reused if its text, page and
+    pipeline config (chunker and embedding settings) are unchanged
+
+    The index of the chunk in the file is left out, so that inserting text
+    near the start of a file does not change the hash of every later chunk.
+    Chunks with the same hash are matched one to one in ManifestEntry.plan.
+
+    Args:
+        text (str): Chunk text
+        page_number (Any): Page the chunk was taken from
+        pipeline_config_hash (str): Hash of the pipeline config
+
+    Returns:
+        str: Hex digest
+    """
+    return _sha256(
+        json.dumps([pipeline_config_hash, str(page_number), text]).encode(
+            "utf-8"
+        )
+    )
+
+
+class ChunkPlan(BaseModel):
+    """
+    Changes needed to bring the stored chunks of a file up to date
+
+    Attributes:
+        keep (Dict[str, List[str]]): Unchanged chunk hashes and their
+                                     document ids
+        add (List[int]): Indices of the new chunks to embed and index
+        delete (List[str]): Document ids of stale chunks
+    """
+
+    keep: Dict[str, List[str]] = {}
+    add: List[int] = []
+    delete: List[str] = []
+
+
+class ManifestEntry(BaseModel):
+    """
+    Manifest record of an ingested file
+
+    Attributes:
+        agent (str): ID of the agent
+        key (str): S3 file key
+        content_hash (str): Hash of the file content
+        config_hash (str): Hash of the pipeline config
+        chunks (Dict[str, List[str]]): Chunk hash to stored document ids
+        pending (bool): Set while the store stage writes the documents of
+                        the file, its chunks may then not track every
+                        stored document
+    """
+
+    agent: str
+    key: str
+    content_hash: str
+    config_hash: str
+    chunks: Dict[str, List[str]] = {}
+    pending: bool = False
+
+    def is_current(self, content_hash: str, config_hash: str) -> bool:
+        return (
+            not self.pending
+            and self.content_hash == content_hash
+            and self.config_hash == config_hash
+        )
+
+    @staticmethod
+    def plan(
+        entry: Optional[ManifestEntry], chunk_hashes: List[str]
+    ) -> ChunkPlan:
+        """
+        Diffs the new chunks of a file against its manifest entry
+
+        Args:
+            entry (Optional[ManifestEntry]): Previous entry, None if the
+                                             file was not ingested before
+            chunk_hashes (List[str]): Hashes of the new chunks, in order
+
+        Returns:
+            ChunkPlan: Chunks to keep, add and delete
+        """
+        available: Dict[str, List[str]] = {
+            h: list(ids) for h, ids in (entry.chunks if entry else {}).items()
+        }
+        plan = ChunkPlan()
+        for i, h in enumerate(chunk_hashes):
+            # identical chunks can repeat within a file, match them one to one
+            # by occurrence, so only surplus copies are added or deleted
+            if available.get(h):
+                plan.keep.setdefault(h, []).append(available[h].pop(0))
+            else:
+                plan.add.append(i)
+        plan.delete = [doc_id for ids in available.values() for doc_id in ids]
+        return plan
+
+
+class IngestionManifest(ABC):
+    """
+    Storage backend for ManifestEntry records
+    """
+
+    @abstractmethod
+    def get(self, agent: str, key: str) -> Optional[ManifestEntry]:
+        """
+        Retrieves the entry of a file, None if there is none
+        """
+
+    @abstractmethod
+    def put(self, entry: ManifestEntry) -> None:
+        """
+        Creates or replaces the entry of a file
+        """
+
+    @abstractmethod
+    def delete(self, agent: str, key: str) -> None:
+        """
+        Deletes the entry of a file, if any
+        """
+
+    def is_unchanged(
+        self, agent: str, key: str, content_hash: str, config_hash: str
+    ) -> bool:
+        """
+        Checks if a file was already ingested with the same content and config
+
+        Returns:
+            bool: True if the file can be skipped
+        """
+        entry = self.get(agent, key)
+        return entry is not None and entry.is_current(
+            content_hash, config_hash
+        )
+
+
+class JSONManifest(IngestionManifest):
+    """
+    Manifest kept in a single local JSON file, for tests and local runs
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Any]:
+        if not self.path.exists():
+            return {}
+        return json.loads(self.path.read_text(encoding="utf-8"))
+
+    def _write(self, entries: Dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(entries), encoding="utf-8")
+        # replace atomically so that a crash never leaves a partial manifest
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def _id(agent: str, key: str) -> str:
+        return f"{agent}/{key}"
+
+    def get(self, agent: str, key: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            entry = self._read().get(self._id(agent, key))
+        return ManifestEntry.model_validate(entry) if entry else None
+
+    def put(self, entry: ManifestEntry) -> None:
+        with self._lock:
+            entries = self._read()
+            entries[self._id(entry.agent, entry.key)] = entry.model_dump()
+            self._write(entries)
+
+    def delete(self, agent: str, key: str) -> None:
+        with self._lock:
+            entries = self._read()
+            if entries.pop(self._id(agent, key), None) is not None:
+                self._write(entries)
+
+
+class SQLiteManifest(IngestionManifest):
+    """
+    Manifest kept in a local SQLite database, for tests and local runs
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS manifest ("
+                "agent TEXT NOT NULL, key TEXT NOT NULL, "
+                "content_hash TEXT NOT NULL, config_hash TEXT NOT NULL, "
+                "chunks TEXT NOT NULL, pending INTEGER NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (agent, key))"
+            )
+            columns = [
+                row[1]
+                for row in self._conn.execute("PRAGMA table_info(manifest)")
+            ]
+            # databases created before entries could be pending
+            if "pending" not in columns:
+                self._conn.execute(
+                    "ALTER TABLE manifest "
+                    "ADD COLUMN pending INTEGER NOT NULL DEFAULT 0"
+                )
+
+    def get(self, agent: str, key: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, config_hash, chunks, pending "
+                "FROM manifest "
+                "WHERE agent = ? AND key = ?",
+                (agent, key),
+            ).fetchone()
+        if row is None:
+            return None
+        return ManifestEntry(
+            agent=agent,
+            key=key,
+            content_hash=row[0],
+            config_hash=row[1],
+            chunks=json.loads(row[2]),
+            pending=bool(row[3]),
+        )
+
+    def put(self, entry: ManifestEntry) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO manifest "
+                "(agent, key, content_hash, config_hash, chunks, pending) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    entry.agent,
+                    entry.key,
+                    entry.content_hash,
+                    entry.config_hash,
+                    json.dumps(entry.chunks),
+                    int(entry.pending),
+                ),
+            )
+
+    def delete(self, agent: str, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM manifest WHERE agent = ? AND key = ?",
+                (agent, key),
+            )
+
+
+class S3Manifest(IngestionManifest):
+    """
+    Manifest kept as one JSON object per file in S3, so that concurrent
+    lambdas only ever write to the entries of their own files
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", s3_client=None) -> None:
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.s3 = client("s3") if s3_client is None else s3_client
+
+    def _object_key(self, agent: str, key: str) -> str:
+        name = f"{agent}/{_sha256(key.encode('utf-8'))}.json"
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    def get(self, agent: str, key: str) -> Optional[ManifestEntry]:
+        try:
+            response = self.s3.get_object(
+                Bucket=self.bucket, Key=self._object_key(agent, key)
+            )
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return ManifestEntry.model_validate_json(response["Body"].read())
+
+    def put(self, entry: ManifestEntry) -> None:
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=self._object_key(entry.agent, entry.key),
+            Body=entry.model_dump_json().encode("utf-8"),
+            ContentType="application/json",
+        )
+
+    def delete(self, agent: str, key: str) -> None:
+        self.s3.delete_object(
+            Bucket=self.bucket, Key=self._object_key(agent, key)
+        )
+
+
+@lru_cache(maxsize=None)
+def get_manifest(uri: Optional[str]) -> Optional[IngestionManifest]:
+    """
+    Creates (once per process) the manifest backend for a URI
+
+    Supported URIs:
+        s3://bucket/prefix
+        sqlite:///path/to/manifest.db
+        file:///path/to/manifest.json
+
+    Args:
+        uri (Optional[str]): Manifest URI, None or empty to disable
+
+    Returns:
+        Optional[IngestionManifest]: Manifest, None if disabled
+    """
+    if not uri:
+        return None
+    parsed = urlparse(uri)
+    if parsed.scheme == "s3":
+        return S3Manifest(bucket=parsed.netloc, prefix=parsed.path)
+    if parsed.scheme == "sqlite":
+        return SQLiteManifest(parsed.netloc + parsed.path)
+    if parsed.scheme in ("file", ""):
+        return JSONManifest(parsed.netloc + parsed.path)
+    raise ValueError(f"Unsupported manifest URI: {uri}")
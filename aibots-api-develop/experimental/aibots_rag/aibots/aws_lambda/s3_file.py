@@ -1,9 +1,94 @@
 from __future__ import annotations
 
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from io import StringIO
-from typing import Any, Dict
+from typing import IO, Any, Dict, Iterator, Optional, Tuple
 
 from boto3 import client
+from botocore.exceptions import ClientError
+
+# bodies above this size are spooled to /tmp instead of held in memory
+SPOOL_THRESHOLD: int = 32 * 1024 * 1024
+# size of the chunks streamed from a response body
+READ_CHUNK_SIZE: int = 1024 * 1024
+# size of each ranged GET when reading in parts
+PART_SIZE: int = 8 * 1024 * 1024
+# ranged GETs in flight when reading in parts
+MAX_PART_WORKERS: int = 8
+
+_CONTENT_RANGE = re.compile(r"bytes \d+-\d+/(\d+)")
+
+
+class S3Object:
+    """
+    body and metadata of an S3 object, read with a single GET
+
+    Attributes:
+        bucket (str): bucket name
+        key (str): object key
+        body (IO[bytes]): seekable body, in memory or spooled to /tmp
+        last_modified (datetime): last modified datetime of the object
+        content_length (int): size of the object in bytes
+        etag (str): ETag of the object
+        content_type (str): content type of the object
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        key: str,
+        body: IO[bytes],
+        last_modified: datetime,
+        content_length: int,
+        etag: str,
+        content_type: Optional[str] = None,
+    ) -> None:
+        self.bucket = bucket
+        self.key = key
+        self.body = body
+        self.last_modified = last_modified
+        self.content_length = content_length
+        self.etag = etag
+        self.content_type = content_type
+
+    @property
+    def spooled(self) -> bool:
+        """
+        whether the body was rolled over to a file in /tmp
+        """
+        return bool(getattr(self.body, "_rolled", False))
+
+    def read(self) -> bytes:
+        """
+        reads the whole body, from the start
+        Returns:
+            bytes: content of the object
+        """
+        self.body.seek(0)
+        return self.body.read()
+
+    def text(self, encoding: str = "utf-8") -> StringIO:
+        """
+        decodes the whole body
+        Args:
+            encoding (str): text encoding, defaults to utf-8
+        Returns:
+            StringIO: decoded content of the object
+        """
+        return StringIO(self.read().decode(encoding))
+
+    def close(self) -> None:
+        self.body.close()
+
+    def __enter__(self) -> S3Object:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
 
 
 class S3File:
@@ -11,31 +96,152 @@ class S3File:
     class for wrapping boto3 S3 file getters
     """
 
+    # objects opened for the record being processed, see clear_cache
+    _cache: Dict[Tuple[str, str], S3Object] = {}
+    _cache_lock = threading.Lock()
+
     def __init__(self, bucket: str, file_key: str, s3_client=None) -> None:
         self.bucket = bucket
         self.file_key = file_key
         self.s3 = client("s3") if s3_client is None else s3_client
 
+    @classmethod
+    def clear_cache(cls) -> None:
+        """
+        closes and forgets every cached object, call in a finally block once
+        each record is done so that at most one record's bodies are held
+        """
+        with cls._cache_lock:
+            for s3_object in cls._cache.values():
+                s3_object.close()
+            cls._cache.clear()
+
+    def open(
+        self,
+        spool_threshold: int = SPOOL_THRESHOLD,
+        part_size: Optional[int] = None,
+        max_workers: int = MAX_PART_WORKERS,
+        cache: bool = True,
+    ) -> S3Object:
+        """
+        reads the body and metadata of the file with a single GET
+        The body is streamed into a buffer that rolls over to /tmp above
+        spool_threshold, so large files are never held in memory twice.
+        Args:
+            spool_threshold (int): size above which the body is spooled to /tmp
+            part_size (Optional[int]): if set, files larger than part_size are
+                                       read with parallel ranged GETs
+            max_workers (int): ranged GETs in flight when reading in parts
+            cache (bool): reuse the object if it was already opened in this
+                          invocation
+        Returns:
+            S3Object: body and metadata of the file
+        """
+        cache_key = (self.bucket, self.file_key)
+        if cache:
+            with self._cache_lock:
+                cached = self._cache.get(cache_key)
+            if cached is not None and not cached.body.closed:
+                cached.body.seek(0)
+                return cached
+
+        body = tempfile.SpooledTemporaryFile(max_size=spool_threshold)
+        try:
+            if part_size:
+                response = self._read_parts(body, part_size, max_workers)
+            else:
+                response = self.s3.get_object(
+                    Bucket=self.bucket, Key=self.file_key
+                )
+                self._copy(response["Body"], body)
+        except BaseException:
+            body.close()
+            raise
+        content_length = body.tell()
+        body.seek(0)
+        s3_object = S3Object(
+            bucket=self.bucket,
+            key=self.file_key,
+            body=body,
+            last_modified=response["LastModified"],
+            content_length=content_length,
+            etag=response.get("ETag", "").strip('"'),
+            content_type=response.get("ContentType"),
+        )
+        if cache:
+            with self._cache_lock:
+                self._cache[cache_key] = s3_object
+        return s3_object
+
+    @staticmethod
+    def _chunks(stream: Any) -> Iterator[bytes]:
+        if hasattr(stream, "iter_chunks"):
+            yield from stream.iter_chunks(chunk_size=READ_CHUNK_SIZE)
+            return
+        while chunk := stream.read(READ_CHUNK_SIZE):
+            yield chunk
+
+    def _copy(self, stream: Any, body: IO[bytes]) -> None:
+        for chunk in self._chunks(stream):
+            body.write(chunk)
+
+    def _read_parts(
+        self, body: IO[bytes], part_size: int, max_workers: int
+    ) -> Dict[str, Any]:
+        # the first part also returns the metadata and the total size
+        try:
+            first: Dict[str, Any] = self.s3.get_object(
+                Bucket=self.bucket,
+                Key=self.file_key,
+                Range=f"bytes=0-{part_size - 1}",
+            )
+        except ClientError as e:
+            # empty objects cannot be read with a range
+            if e.response.get("Error", {}).get("Code") != "InvalidRange":
+                raise
+            first = self.s3.get_object(Bucket=self.bucket, Key=self.file_key)
+        self._copy(first["Body"], body)
+        match = _CONTENT_RANGE.match(first.get("ContentRange", ""))
+        total = int(match.group(1)) if match else body.tell()
+        ranges = [
+            (start, min(start + part_size, total) - 1)
+            for start in range(part_size, total, part_size)
+        ]
+        if not ranges:
+            return first
+
+        def get_part(byte_range: Tuple[int, int]) -> bytes:
+            # IfMatch fails the read if the object changes between parts
+            response = self.s3.get_object(
+                Bucket=self.bucket,
+                Key=self.file_key,
+                Range=f"bytes={byte_range[0]}-{byte_range[1]}",
+                IfMatch=first["ETag"],
+            )
+            return response["Body"].read()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # map yields in order, so parts are appended sequentially
+            for part in pool.map(get_part, ranges):
+                body.write(part)
+        return first
+
     def get_file(
         self, decode: bool = True, encoding: str = "utf-8"
-    ) -> StringIO:
+    ) -> StringIO | bytes:
         """
         gets files from s3 bucket organised in "bot" folders
         Args:
-            bot (str): id of the bot
-            file_key (str): filename
+            decode (bool): whether to decode the file to text
+            encoding (str): text encoding, defaults to utf-8
         Returns:
-            StringIO: bytes of file to use
+            StringIO | bytes: decoded text or raw bytes of the file
         """
-        s3_response: Dict[str, Any] = self.s3.get_object(
-            Bucket=self.bucket, Key=self.file_key
-        )
+        s3_object = self.open()
         if decode:
-            file_data = s3_response["Body"].read().decode(encoding)
-        else:
-            # docx, pptx and other files do not require decoding to be parsed
-            return s3_response["Body"].read()
-        return StringIO(file_data)
+            return s3_object.text(encoding)
+        # docx, pptx and other files do not require decoding to be parsed
+        return s3_object.read()
 
     def get_last_modified(self) -> str:
         """
@@ -43,5 +249,9 @@ class S3File:
         Returns:
             (str): string of last modified datetime
         """
+        with self._cache_lock:
+            cached = self._cache.get((self.bucket, self.file_key))
+        if cached is not None:
+            return cached.last_modified
         file_data = self.s3.head_object(Bucket=self.bucket, Key=self.file_key)
         return file_data["LastModified"]
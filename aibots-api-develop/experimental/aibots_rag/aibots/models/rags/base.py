@@ -83,6 +83,8 @@ class RAGPipelineEnviron(BaseSettings):
     project_rag_aoss: ParamEnvVars = ParamEnvVars(
         param="param-sitezapp-aibots-rag-aoss-picker"
     )
+    # ingestion manifest URI (s3://, sqlite:// or file://), disabled if unset
+    project_rag_manifest: str | None = None
 
 
 class RAGPipelineStatusExecutor:
@@ -2,7 +2,7 @@ import json
 
 from pydantic import validate_call
 
-from aibots.aws_lambda.s3_file import S3File
+from aibots.aws_lambda.s3_file import PART_SIZE, S3File
 from aibots.aws_lambda.models.sqs import SQSMessageHandler, SQSMessageRecord
 from aibots.models.rags.base import RAGPipelineEnviron, RAGPipelineExecutor, RAGPipelineMessage
 from aibots.models.rags.api import RAGPipelineStatus
@@ -78,11 +78,9 @@ class CSVParser(RAGPipelineExecutor):
 
         s3_file = S3File(bucket=self.environ.bucket.bucket,
                          file_key=source.key, s3_client=s3_client)
-        # Get the file's last modified date
-        last_modified_date = s3_file.get_last_modified()
-        # Read the file from S3
-        data = s3_file.get_file()
-        return data, last_modified_date
+        # Read the file and its last modified date together, in parts if large
+        s3_object = s3_file.open(part_size=PART_SIZE)
+        return s3_object.text(), s3_object.last_modified
 
     def next(self):
         """
@@ -100,16 +98,19 @@ class CSVParser(RAGPipelineExecutor):
 def lambda_handler(event: AIBotsPipelineMessage, context):
     failed: List[SQSMessageRecord] = []
     for i, message in enumerate(event.pipeline_messages):
-        executor: RAGPipelineExecutor = CSVParser(
-            message, sqs, environ)
-        status: RAGPipelineStatus = executor()
-        if status.error:
-            # takes in failed sqs message record
-            failed.append(event.records[i])
-            continue
-        executor.send_status(status=status)
-        executor.next()
-
+        try:
+            executor: RAGPipelineExecutor = CSVParser(
+                message, sqs, environ)
+            status: RAGPipelineStatus = executor()
+            if status.error:
+                # takes in failed sqs message record
+                failed.append(event.records[i])
+                continue
+            executor.send_status(status=status)
+            executor.next()
+        finally:
+            # release the body once its record is done, even if it raised
+            S3File.clear_cache()
     return {"batchItemFailures": [{"itemIdentifier": fail.message_id}
                                   for fail in failed]}
 
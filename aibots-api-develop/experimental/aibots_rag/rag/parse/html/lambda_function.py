@@ -3,13 +3,12 @@ from __future__ import annotations
 import json
 import logging
 from pathlib import Path
-from io import BytesIO
 from typing import Any, Dict, List
 from boto3 import client
 from pydantic import validate_call
 from unstructured.chunking.title import chunk_by_title
 from unstructured.partition.html import partition_html
-from aibots.aws_lambda.s3_file import S3File
+from aibots.aws_lambda.s3_file import PART_SIZE, S3File
 from aibots.aws_lambda.parser import RAGParser
 from aibots.aws_lambda.models.rag import SQSRAGPipelineMessage
 from aibots.aws_lambda.sqs_router import RAGSQSRouter
@@ -36,7 +35,7 @@ class HTMLParser(RAGPipelineExecutor):
             data, last_modified_date = self.get_file()
             # Get the file's last modified date
             # Download the file from S3 to the local file system
-            elements = partition_html(file=BytesIO(data))
+            elements = partition_html(file=data)
 
             elements = [el for el in elements if el.category != "Header"]
 
@@ -138,11 +137,9 @@ class HTMLParser(RAGPipelineExecutor):
         source: SourceResult = self.previous_result
         s3_file = S3File(bucket=self.environ.bucket.bucket,
                          file_key=source.key)
-        # Get the file's last modified date
-        last_modified_date = s3_file.get_last_modified()
-        # Read the file from S3
-        data = s3_file.get_file(decode=False)
-        return data, last_modified_date
+        # Read the file and its last modified date together, in parts if large
+        s3_object = s3_file.open(part_size=PART_SIZE)
+        return s3_object.body, s3_object.last_modified
 
 
 sqs = client("sqs", region_name="ap-southeast-1")
@@ -158,15 +155,18 @@ def lambda_handler(event: AIBotsPipelineMessage, context):
     """
     failed: List[SQSMessageRecord] = []
     for i, message in enumerate(event.pipeline_messages):
-        executor: RAGPipelineExecutor = HTMLParser(
-            message, sqs, environ)
-        status: RAGPipelineStatus = executor()
-        if status.error:
-            # takes in failed sqs message record
-            failed.append(event.records[i])
-            continue
-        executor.send_status()
-        executor.next()
-
+        try:
+            executor: RAGPipelineExecutor = HTMLParser(
+                message, sqs, environ)
+            status: RAGPipelineStatus = executor()
+            if status.error:
+                # takes in failed sqs message record
+                failed.append(event.records[i])
+                continue
+            executor.send_status()
+            executor.next()
+        finally:
+            # release the body once its record is done, even if it raised
+            S3File.clear_cache()
     return {"batchItemFailures": [{"itemIdentifier": fail.message_id}
                                   for fail in failed]}
@@ -2,14 +2,13 @@ from __future__ import annotations
 import logging
 import json
 from pathlib import Path
-from io import BytesIO
 from typing import Any, Dict, List
 from boto3 import client
 from document import Document
 # from pydantic import validate_call
 from unstructured.chunking.title import chunk_by_title
 from unstructured.partition.pdf import partition_pdf
-from aibots.aws_lambda.s3_file import S3File
+from aibots.aws_lambda.s3_file import PART_SIZE, S3File
 from aibots.aws_lambda.models.rag import SQSRAGPipelineMessage
 from aibots.aws_lambda.sqs_router import RAGSQSRouter
 from aibots.aws_lambda.parser import RAGParser
@@ -36,7 +35,7 @@ class PDFParser(RAGPipelineExecutor):
             data, last_modified_date = self.get_file()
 
             elements = partition_pdf(
-                file=BytesIO(data),
+                file=data,
                 pdf_infer_table_structure=True,
                 model_name="yolox",
             )
@@ -128,11 +127,9 @@ class PDFParser(RAGPipelineExecutor):
         source: SourceResult = self.previous_result
         s3_file = S3File(bucket=self.environ.bucket.bucket,
                          file_key=source.key)
-        # Get the file's last modified date
-        last_modified_date = s3_file.get_last_modified()
-        # Read the file from S3
-        data = s3_file.get_file(decode=False)
-        return data, last_modified_date
+        # Read the file and its last modified date together, in parts if large
+        s3_object = s3_file.open(part_size=PART_SIZE)
+        return s3_object.body, s3_object.last_modified
 
 
 sqs = client("sqs", region_name="ap-southeast-1")
@@ -151,15 +148,18 @@ def lambda_handler(event: AIBotsPipelineMessage, context):
     """
     failed: List[SQSMessageRecord] = []
     for i, message in enumerate(event.pipeline_messages):
-        executor: RAGPipelineExecutor = PDFParser(
-            message, sqs, environ)
-        status: RAGPipelineStatus = executor()
-        if status.error:
-            # takes in failed sqs message record
-            failed.append(event.records[i])
-            continue
-        executor.send_status()
-        executor.next()
-
+        try:
+            executor: RAGPipelineExecutor = PDFParser(
+                message, sqs, environ)
+            status: RAGPipelineStatus = executor()
+            if status.error:
+                # takes in failed sqs message record
+                failed.append(event.records[i])
+                continue
+            executor.send_status()
+            executor.next()
+        finally:
+            # release the body once its record is done, even if it raised
+            S3File.clear_cache()
     return {"batchItemFailures": [{"itemIdentifier": fail.message_id}
                                   for fail in failed]}
@@ -4,8 +4,7 @@ import json
 import logging
 from pathlib import Path
 from typing import Any, Dict, List
-from io import BytesIO
-from aibots.aws_lambda.s3_file import S3File
+from aibots.aws_lambda.s3_file import PART_SIZE, S3File
 from aibots.aws_lambda.parser import RAGParser
 from boto3 import client
 from pydantic import validate_call
@@ -34,7 +33,7 @@ class PptxParser(RAGPipelineExecutor):
 
             logging.info("Downloaded File.")
 
-            elements = partition_pptx(file=BytesIO(data))
+            elements = partition_pptx(file=data)
 
             logging.info("Partitioned document.")
 
@@ -120,11 +119,9 @@ class PptxParser(RAGPipelineExecutor):
         source: SourceResult = self.previous_result
         s3_file = S3File(bucket=self.environ.bucket.bucket,
                          file_key=source.key)
-        # Get the file's last modified date
-        last_modified_date = s3_file.get_last_modified()
-        # Read the file from S3
-        data = s3_file.get_file(decode=False)
-        return data, last_modified_date
+        # Read the file and its last modified date together, in parts if large
+        s3_object = s3_file.open(part_size=PART_SIZE)
+        return s3_object.body, s3_object.last_modified
 
 
 sqs = client("sqs", region_name="ap-southeast-1")
@@ -135,15 +132,18 @@ environ: RAGPipelineEnviron = RAGPipelineEnviron()
 def lambda_handler(event: AIBotsPipelineMessage, context) -> dict[str, Any]:
     failed: List[SQSMessageRecord] = []
     for i, message in enumerate(event.pipeline_messages):
-        executor: RAGPipelineExecutor = PptxParser(
-            message, sqs, environ)
-        status: RAGPipelineStatus = executor()
-        if status.error:
-            # takes in failed sqs message record
-            failed.append(event.records[i])
-            continue
-        executor.send_status()
-        executor.next()
-
+        try:
+            executor: RAGPipelineExecutor = PptxParser(
+                message, sqs, environ)
+            status: RAGPipelineStatus = executor()
+            if status.error:
+                # takes in failed sqs message record
+                failed.append(event.records[i])
+                continue
+            executor.send_status()
+            executor.next()
+        finally:
+            # release the body once its record is done, even if it raised
+            S3File.clear_cache()
     return {"batchItemFailures": [{"itemIdentifier": fail.message_id}
                                   for fail in failed]}
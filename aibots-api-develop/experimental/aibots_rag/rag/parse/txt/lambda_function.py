@@ -2,7 +2,7 @@ from __future__ import annotations
 import logging
 import json
 from typing import Any, Dict, List
-from aibots.aws_lambda.s3_file import S3File
+from aibots.aws_lambda.s3_file import PART_SIZE, S3File
 from aibots.aws_lambda.parser import RAGParser
 from aibots.aws_lambda.models.rag import SQSRAGPipelineMessage
 from aibots.aws_lambda.sqs_router import RAGSQSRouter
@@ -76,11 +76,9 @@ class TxtParser(RAGPipelineExecutor):
         source: SourceResult = self.previous_result
         s3_file = S3File(bucket=self.environ.bucket.bucket,
                          file_key=source.key)
-        # Get the file's last modified date
-        last_modified_date = s3_file.get_last_modified()
-        # Read the file from S3
-        data = s3_file.get_file()
-        return data, last_modified_date
+        # Read the file and its last modified date together, in parts if large
+        s3_object = s3_file.open(part_size=PART_SIZE)
+        return s3_object.text(), s3_object.last_modified
 
 
 sqs = client("sqs", region_name="ap-southeast-1")
@@ -90,15 +88,18 @@ environ: RAGPipelineEnviron = RAGPipelineEnviron()
 def lambda_handler(event, context) -> dict[str, Any]:
     failed: List[SQSMessageRecord] = []
     for i, message in enumerate(event.pipeline_messages):
-        executor: RAGPipelineExecutor = TxtParser(
-            message, sqs, environ)
-        status: RAGPipelineStatus = executor()
-        if status.error:
-            # takes in failed sqs message record
-            failed.append(event.records[i])
-            continue
-        executor.send_status()
-        executor.next()
-
+        try:
+            executor: RAGPipelineExecutor = TxtParser(
+                message, sqs, environ)
+            status: RAGPipelineStatus = executor()
+            if status.error:
+                # takes in failed sqs message record
+                failed.append(event.records[i])
+                continue
+            executor.send_status()
+            executor.next()
+        finally:
+            # release the body once its record is done, even if it raised
+            S3File.clear_cache()
     return {"batchItemFailures": [{"itemIdentifier": fail.message_id}
                                   for fail in failed]}
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from aibots.aws_lambda import LocalS3Client, S3File
+from aibots.aws_lambda.s3_file import PART_SIZE
+
+
+@pytest.fixture
+def local_s3(tmp_path) -> LocalS3Client:
+    S3File.clear_cache()
+    yield LocalS3Client(tmp_path)
+    S3File.clear_cache()
+
+
+class TestS3File:
+
+    def test_open_reads_body_and_metadata_once(self, local_s3) -> None:
+        """tests body and last modified date come from a single GET"""
+        local_s3.put_object(Bucket="bucket", Key="tests/a.txt", Body=b"hello")
+        s3_file = S3File(bucket="bucket", file_key="tests/a.txt",
+                         s3_client=local_s3)
+
+        assert s3_file.get_file().read() == "hello"
+        assert s3_file.get_file(decode=False) == b"hello"
+        assert s3_file.get_last_modified() is not None
+        assert local_s3.requests == {"GetObject": 1, "HeadObject": 0}
+
+    def test_open_spools_above_threshold(self, local_s3) -> None:
+        """tests large bodies are rolled over to a temporary file"""
+        data = os.urandom(4096)
+        local_s3.put_object(Bucket="bucket", Key="big.bin", Body=data)
+        s3_file = S3File(bucket="bucket", file_key="big.bin",
+                         s3_client=local_s3)
+
+        s3_object = s3_file.open(spool_threshold=1024, cache=False)
+
+        assert s3_object.spooled
+        assert s3_object.content_length == len(data)
+        assert s3_object.read() == data
+
+    @pytest.mark.parametrize(
+        argnames=["size"],
+        argvalues=[
+            pytest.param(0, id="test_empty"),
+            pytest.param(100, id="test_single_part"),
+            pytest.param(1000, id="test_many_parts"),
+        ]
+    )
+    def test_open_in_parts(self, local_s3, size: int) -> None:
+        """tests ranged part reads reassemble the object in order"""
+        data = os.urandom(size)
+        local_s3.put_object(Bucket="bucket", Key="parts.bin", Body=data)
+        s3_file = S3File(bucket="bucket", file_key="parts.bin",
+                         s3_client=local_s3)
+
+        s3_object = s3_file.open(part_size=128, max_workers=4, cache=False)
+
+        assert s3_object.read() == data
+        assert s3_object.content_length == size
+
+    def test_open_in_parts_reads_small_file_with_one_get(self, local_s3) -> None:
+        """tests files below the part size the parsers use cost a single GET"""
+        local_s3.put_object(Bucket="bucket", Key="a.txt", Body=b"hello")
+        s3_file = S3File(bucket="bucket", file_key="a.txt",
+                         s3_client=local_s3)
+
+        assert s3_file.open(part_size=PART_SIZE).read() == b"hello"
+        assert local_s3.requests == {"GetObject": 1, "HeadObject": 0}
+
+    def test_clear_cache_closes_bodies(self, local_s3) -> None:
+        """tests cached objects are dropped at the end of an invocation"""
+        local_s3.put_object(Bucket="bucket", Key="a.txt", Body=b"a")
+        s3_file = S3File(bucket="bucket", file_key="a.txt",
+                         s3_client=local_s3)
+        s3_object = s3_file.open()
+
+        S3File.clear_cache()
+
+        assert s3_object.body.closed
+        s3_file.get_last_modified()
+        assert local_s3.requests == {"GetObject": 1, "HeadObject": 1}
@@ -6,7 +6,7 @@ from typing import Dict, Any, List
 
 from aibots.models.rags.base import RAGPipelineEnviron
 
-from aibots.models.rags.internal import RAGPipelineMessage
+from aibots.models.rags.internal import AIBotsPipelineMessage, RAGPipelineMessage, SQSMessageRecord
 
 from aibots.models import RAGConfig
 
@@ -15,7 +15,9 @@ from aibots.models.rags.internal import SourceResult
 from aibots.models.knowledge_bases import KnowledgeBase
 
 from aibots.models.rags import ParseResult
-from ..lambda_function import TxtParser
+from aibots.aws_lambda import LocalS3Client, S3File
+
+from ..lambda_function import TxtParser, lambda_handler
 
 
 class TestPDFParser:
@@ -118,3 +120,22 @@ class TestPDFParser:
             assert isinstance(results[0], SourceResult)
             assert isinstance(results[1], ParseResult)
             assert all(isinstance(kb, KnowledgeBase) for kb in rag_pipeline_message.knowledge_bases)
+
+    def test_lambda_handler_releases_body_when_record_fails(self, request, monkeypatch, tmp_path) -> None:
+        """tests the cached body is closed even when processing a record raises"""
+        sqs_message: SQSMessageRecord = request.getfixturevalue("sqs_message")
+        local_s3 = LocalS3Client(tmp_path)
+        local_s3.put_object(Bucket="bucket", Key="a.txt", Body=b"hello")
+        opened = []
+
+        def fail_after_open(parser):
+            opened.append(S3File(bucket="bucket", file_key="a.txt", s3_client=local_s3).open())
+            raise RuntimeError("parse failed")
+
+        monkeypatch.setattr(TxtParser, "__call__", fail_after_open)
+
+        with pytest.raises(RuntimeError):
+            lambda_handler(AIBotsPipelineMessage(Records=[sqs_message]), None)
+
+        assert opened[0].body.closed
+        assert S3File._cache == {}
@@ -1,9 +1,8 @@
 from __future__ import annotations
 import logging
 import json
-from io import BytesIO
 from typing import Any, Dict, List
-from aibots.aws_lambda.s3_file import S3File
+from aibots.aws_lambda.s3_file import PART_SIZE, S3File
 from aibots.aws_lambda.parser import RAGParser
 from aibots.aws_lambda.models.rag import SQSRAGPipelineMessage
 from aibots.aws_lambda.sqs_router import RAGSQSRouter
@@ -31,11 +30,11 @@ class XlsxParser(RAGPipelineExecutor):
         try:
             source: SourceResult = self.previous_result
             data, last_modified_date = self.get_file()
-            xls = pd.ExcelFile(BytesIO(data), engine="openpyxl")
+            xls = pd.ExcelFile(data, engine="openpyxl")
             df_json_with_metadata = []
             for pg, sheet_name in enumerate(xls.sheet_names):
-                df = pd.read_excel(BytesIO(data), header=0,
-                                   sheet_name=sheet_name)
+                # parse each sheet from the already loaded workbook
+                df = xls.parse(sheet_name, header=0)
                 df_json = df.to_dict(orient="records")
                 filename = source.key.split("/")[-1]
                 for row in df_json:
@@ -88,11 +87,9 @@ class XlsxParser(RAGPipelineExecutor):
         source: SourceResult = self.previous_result
         s3_file = S3File(bucket=self.environ.bucket.bucket,
                          file_key=source.key)
-        # Get the file's last modified date
-        last_modified_date = s3_file.get_last_modified()
-        # Read the file from S3
-        data = s3_file.get_file(decode=False)
-        return data, last_modified_date
+        # Read the file and its last modified date together, in parts if large
+        s3_object = s3_file.open(part_size=PART_SIZE)
+        return s3_object.body, s3_object.last_modified
 
 
 environ: RAGPipelineEnviron = RAGPipelineEnviron()
@@ -103,15 +100,18 @@ sqs = client("sqs", region_name="ap-southeast-1")
 def lambda_handler(event: AIBotsPipelineMessage, context):
     failed: List[SQSMessageRecord] = []
     for i, message in enumerate(event.pipeline_messages):
-        executor: RAGPipelineExecutor = XlsxParser(
-            message, sqs, environ)
-        status: RAGPipelineStatus = executor()
-        if status.error:
-            # takes in failed sqs message record
-            failed.append(event.records[i])
-            continue
-        executor.send_status()
-        executor.next()
-
+        try:
+            executor: RAGPipelineExecutor = XlsxParser(
+                message, sqs, environ)
+            status: RAGPipelineStatus = executor()
+            if status.error:
+                # takes in failed sqs message record
+                failed.append(event.records[i])
+                continue
+            executor.send_status()
+            executor.next()
+        finally:
+            # release the body once its record is done, even if it raised
+            S3File.clear_cache()
     return {"batchItemFailures": [{"itemIdentifier": fail.message_id}
                                   for fail in failed]}
@@ -1,15 +1,18 @@
 import json
+import logging
 import re
-from copy import deepcopy
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from boto3 import resource
-from typing import Any, List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple
 from pydantic import validate_call
 from aibots.models.rags.internal import AIBotsPipelineMessage
 from aibots.models.rags.base import RAGPipelineExecutor, RAGPipelineStatus
 from aibots.models.rags import SourceResult
 from atlas.environ import ServiceEnvVars
 from aibots.models.knowledge_bases import KnowledgeBase
+from aibots.aws_lambda.manifest import IngestionManifest, config_hash, get_manifest
 
 from aibots.models.rags.internal import RAGPipelineMessage
 
@@ -22,11 +25,22 @@ from aibots.models.rags.base import RAGPipelineEnviron
 from pydantic import BaseModel, Field
 
 
+logger = logging.getLogger()
+
+MAX_COPY_WORKERS = 16
+ENDPOINT_CACHE_TTL = 300
+SQS_MAX_BATCH_ENTRIES = 10
+SQS_MAX_BATCH_BYTES = 256 * 1024
+
+# param name -> (expiry, endpoint), kept across warm invocations
+_endpoint_cache: Dict[str, Tuple[float, "RAGAOSSConfiguration"]] = {}
+
+
 class RAGAOSSConfiguration(BaseModel):
     collection: str = Field(alias="Collection")
     host: str
     port: int
-    is_local: Optional[bool]
+    is_local: Optional[bool] = False
 
 
 class SourceExecutor(RAGPipelineExecutor):
@@ -37,24 +51,13 @@ class SourceExecutor(RAGPipelineExecutor):
         # list of created fanout messages
         fanout_messages: List[RAGPipelineMessage] = []
         kbs: List[KnowledgeBase] = self.message.knowledge_bases
+        # pipeline with the store endpoint, resolved for the first kb that is
+        # fanned out and shared by every fanout message of this invocation
+        pipeline = None
         try:
-            # for each kb, move file from cloudfront to priv
-            for kb in kbs:
-                try:
-                    # move kb from cloudfront to private
-                    source: SourceResult = self.move_kb(kb=kb, s3=s3)
-                    # create new message to be sent to parser with source result
-                    fanout_message: RAGPipelineMessage = deepcopy(
-                        self.message)
-
-                    curr_config: Dict[str, Any] = {**fanout_message.pipeline.config,
-                                                   "store": self.get_optimal_aoss_endpoint().model_dump(mode="json")}
-                    fanout_message.pipeline.config = curr_config
-
-                    fanout_message.results.append(source)
-
-                    fanout_messages.append(fanout_message)
-                except Exception as e:
+            # move every kb from cloudfront to priv concurrently
+            for kb, source in self.move_kbs(kbs=kbs, s3=s3):
+                if isinstance(source, Exception):
                     # TODO: send error for copying to status when fail
 
                     self.send_status(
@@ -63,31 +66,70 @@ class SourceExecutor(RAGPipelineExecutor):
                             pipeline=self.message.id,
                             status=ExecutionState.failed,
                             knowledge_base=kb.id,
-                            error=str(e),
+                            error=str(source),
                             results=None,
                             type=RAGPipelineStages.source
                         )
                     )
-
-            # for each RAG message, send sqs
-            for fanout_message in fanout_messages:
-                try:
-                    # send to parser via sqs
-                    self.send_to_parser(message=fanout_message)
-                except Exception as e:
-                    # if there is an error in sending to parser,
-                    # send to status error
+                    continue
+                if source.metadata.get("unchanged"):
                     self.send_status(
                         status=RAGPipelineStatus(
-                            agent=fanout_message.agent,
-                            pipeline=fanout_message.id,
-                            status=ExecutionState.failed,
-                            knowledge_base=fanout_message.knowledge_base,
-                            error=str(e),
-                            results=None,
+                            agent=self.message.agent,
+                            pipeline=self.message.id,
+                            status=ExecutionState.completed,
+                            knowledge_base=kb.id,
+                            error=None,
+                            results=json.dumps({"skipped": source.key}),
                             type=RAGPipelineStages.source
                         )
                     )
+                    continue
+                if pipeline is None:
+                    try:
+                        pipeline = self.message.pipeline.model_copy(
+                            update={"config": {**self.message.pipeline.config,
+                                               "store": self.get_optimal_aoss_endpoint().model_dump(mode="json")}}
+                        )
+                    except Exception as e:
+                        # fails this kb only, the next kb resolves it again
+                        self.send_status(
+                            status=RAGPipelineStatus(
+                                agent=self.message.agent,
+                                pipeline=self.message.id,
+                                status=ExecutionState.failed,
+                                knowledge_base=kb.id,
+                                error=str(e),
+                                results=None,
+                                type=RAGPipelineStages.source
+                            )
+                        )
+                        continue
+                # create new message to be sent to parser with source result,
+                # fanout messages are only serialised so unchanged fields
+                # are shared with the original message instead of deep copied
+                fanout_messages.append(
+                    self.message.model_copy(
+                        update={"pipeline": pipeline,
+                                "results": [*self.message.results, source]}
+                    )
+                )
+
+            # send RAG messages to the parsers in batches, per queue
+            for fanout_message, error in self.send_to_parsers(messages=fanout_messages):
+                # if there is an error in sending to parser,
+                # send to status error
+                self.send_status(
+                    status=RAGPipelineStatus(
+                        agent=fanout_message.agent,
+                        pipeline=fanout_message.id,
+                        status=ExecutionState.failed,
+                        knowledge_base=fanout_message.knowledge_base,
+                        error=error,
+                        results=None,
+                        type=RAGPipelineStages.source
+                    )
+                )
             return RAGPipelineStatus(
                 agent=self.message.agent,
                 pipeline=self.message.pipeline.id,
@@ -101,18 +143,17 @@ class SourceExecutor(RAGPipelineExecutor):
 
         except Exception as e:
             # if any stage of the processing fails, send to status
-
-            self.send_status(
-                status=RAGPipelineStatus(
-                    agent=self.message.agent,
-                    pipeline=self.message.id,
-                    status=ExecutionState.failed,
-                    knowledge_base=self.message.knowledge_base,
-                    error=str(e),
-                    results=None,
-                    type=RAGPipelineStages.source
-                )
+            status = RAGPipelineStatus(
+                agent=self.message.agent,
+                pipeline=self.message.id,
+                status=ExecutionState.failed,
+                knowledge_base=self.message.knowledge_base,
+                error=str(e),
+                results=None,
+                type=RAGPipelineStages.source
             )
+            self.send_status(status=status)
+            return status
 
     def next(self) -> None:
         # routes & sends pipeline message to appropriate parser
@@ -126,15 +167,91 @@ class SourceExecutor(RAGPipelineExecutor):
             # for example (tests/file.pdf)
             copy_source = {"Bucket": cloudfront_bucket,
                            "Key": kb.storage.location}
+            metadata: Dict[str, Any] = self.get_manifest_hashes(
+                kb=kb, s3=s3)
+            if metadata.get("unchanged"):
+                # same content and config as the last successful ingestion,
+                # nothing to copy or re-process
+                return SourceResult(key=str(kb.storage.location),
+                                    metadata=metadata)
             other_bucket = s3.Bucket(priv_bucket)
             other_bucket.copy(copy_source, str(kb.storage.location))
-            return SourceResult(key=str(kb.storage.location))
+            return SourceResult(key=str(kb.storage.location),
+                                metadata=metadata)
         except Exception as e:
             raise e
 
+    def get_manifest_hashes(self, kb: KnowledgeBase, s3: Any) -> Dict[str, Any]:
+        """
+        Looks up a knowledge base in the ingestion manifest, if enabled
+
+        The content hash is the ETag of the uploaded object, so that unchanged
+        files are detected without downloading them.
+
+        Args:
+            kb (KnowledgeBase): Knowledge base to look up
+            s3 (Any): S3 resource
+
+        Returns:
+            Dict[str, Any]: content_hash, config_hash and whether the file is
+                unchanged, empty if the manifest is disabled or unavailable
+        """
+        manifest: Optional[IngestionManifest] = get_manifest(
+            self.environ.project_rag_manifest)
+        if manifest is None:
+            return {}
+        try:
+            head = s3.meta.client.head_object(
+                Bucket=self.environ.cloudfront_bucket.bucket,
+                Key=str(kb.storage.location))
+            hashes = {
+                "content_hash": head["ETag"].strip('"'),
+                "config_hash": config_hash(self.message.pipeline.config),
+            }
+            unchanged = manifest.is_unchanged(
+                agent=str(self.message.agent), key=str(kb.storage.location),
+                **hashes)
+        except Exception as e:
+            # the manifest is an optimisation, never fail ingestion over it
+            logger.warning(f"Ingestion manifest lookup failed for {kb.storage.location}: {e}")
+            return {}
+        return {**hashes, "unchanged": unchanged}
+
+    def move_kbs(
+            self,
+            kbs: List[KnowledgeBase],
+            s3: Any
+    ) -> List[Tuple[KnowledgeBase, SourceResult | Exception]]:
+        """
+        Copies every knowledge base concurrently, copies are server side so
+        each worker only waits on S3
+
+        Args:
+            kbs (List[KnowledgeBase]): Knowledge bases to move
+            s3 (Any): S3 resource
+
+        Returns:
+            List[Tuple[KnowledgeBase, SourceResult | Exception]]: Result or
+                error of each copy, in the order of kbs
+        """
+        def move(kb: KnowledgeBase) -> SourceResult | Exception:
+            try:
+                return self.move_kb(kb=kb, s3=s3)
+            except Exception as e:
+                return e
+
+        if len(kbs) <= 1:
+            return [(kb, move(kb)) for kb in kbs]
+        with ThreadPoolExecutor(max_workers=min(MAX_COPY_WORKERS, len(kbs))) as pool:
+            return list(zip(kbs, pool.map(move, kbs)))
+
     def get_optimal_aoss_endpoint(self) -> RAGAOSSConfiguration:
         param_name = self.environ.project_rag_aoss.param
-        ssm = client("ssm", region_name="ap-southeast-1")
+        # the picker parameter changes rarely, cache it across warm invocations
+        # so that large uploads are not throttled by SSM
+        cached = _endpoint_cache.get(param_name)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
         param_values = ssm.get_parameter(
             Name=param_name,
             WithDecryption=True
@@ -144,10 +261,12 @@ class SourceExecutor(RAGPipelineExecutor):
         match = re.search(pattern, config["Endpoint"])
         host, port = match.group('host'), match.group('port')
         port = 80 if port == "" else port
-        return RAGAOSSConfiguration(collection=config["Collection"], host=host, port=port)
+        endpoint = RAGAOSSConfiguration(Collection=config["Collection"], host=host, port=port)
+        _endpoint_cache[param_name] = (time.monotonic() + ENDPOINT_CACHE_TTL, endpoint)
+        return endpoint
 
-    def send_to_parser(self, message: RAGPipelineMessage):
-        kb_file: SourceResult = message.results[0]
+    def get_parser_url(self, message: RAGPipelineMessage) -> str:
+        kb_file: SourceResult = message.results[-1]
         file_type: str = Path(kb_file.key).suffix[1:]
         # gets file parser sqs url
         if hasattr(self.environ.project_rag_parse, file_type):
@@ -156,15 +275,81 @@ class SourceExecutor(RAGPipelineExecutor):
         else:
             # Throws error if parser does not exist for file
             raise Exception(f"Parser for file type {file_type} does not exist")
+        return str(file_service_env_vars.url)
+
+    def send_to_parser(self, message: RAGPipelineMessage):
         # sends message to sqs for parsing
         self.sqs.send_message(
-            QueueUrl=str(file_service_env_vars.url),
+            QueueUrl=self.get_parser_url(message),
             MessageBody=json.dumps(message.model_dump(mode="json"))
         )
 
+    def send_to_parsers(
+            self,
+            messages: List[RAGPipelineMessage]
+    ) -> List[Tuple[RAGPipelineMessage, str]]:
+        """
+        Sends messages to their parser queues with send_message_batch,
+        grouped per queue and split within the SQS batch limits
+
+        Args:
+            messages (List[RAGPipelineMessage]): Messages to send
+
+        Returns:
+            List[Tuple[RAGPipelineMessage, str]]: Messages that could not be
+                sent, with the error for each
+        """
+        failed: List[Tuple[RAGPipelineMessage, str]] = []
+        queues: Dict[str, List[Tuple[RAGPipelineMessage, str]]] = {}
+        for message in messages:
+            try:
+                url = self.get_parser_url(message)
+            except Exception as e:
+                failed.append((message, str(e)))
+                continue
+            body = json.dumps(message.model_dump(mode="json"))
+            queues.setdefault(url, []).append((message, body))
+
+        for url, entries in queues.items():
+            for batch in _sqs_batches(entries):
+                try:
+                    response = self.sqs.send_message_batch(
+                        QueueUrl=url,
+                        Entries=[{"Id": str(i), "MessageBody": body}
+                                 for i, (_, body) in enumerate(batch)]
+                    )
+                except Exception as e:
+                    failed.extend((message, str(e)) for message, _ in batch)
+                    continue
+                # SQS reports failures per entry
+                for failure in response.get("Failed", []):
+                    message = batch[int(failure["Id"])][0]
+                    failed.append((message, failure.get("Message", failure.get("Code", "Failed to send message"))))
+        return failed
+
+
+def _sqs_batches(
+        entries: List[Tuple[RAGPipelineMessage, str]]
+) -> List[List[Tuple[RAGPipelineMessage, str]]]:
+    # send_message_batch takes up to 10 entries and 256 KiB in total
+    batches: List[List[Tuple[RAGPipelineMessage, str]]] = []
+    batch: List[Tuple[RAGPipelineMessage, str]] = []
+    size = 0
+    for entry in entries:
+        entry_size = len(entry[1].encode("utf-8"))
+        if batch and (len(batch) == SQS_MAX_BATCH_ENTRIES or size + entry_size > SQS_MAX_BATCH_BYTES):
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(entry)
+        size += entry_size
+    if batch:
+        batches.append(batch)
+    return batches
+
 
 environ: RAGPipelineEnviron = RAGPipelineEnviron()
 sqs = client("sqs", region_name="ap-southeast-1")
+ssm = client("ssm", region_name="ap-southeast-1")
 
 
 @validate_call
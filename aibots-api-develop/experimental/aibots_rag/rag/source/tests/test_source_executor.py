@@ -293,3 +293,110 @@ class TestSourceExecutor:
 
         assert "Messages" not in sqs_status.keys()
         assert status_response.status == "completed"
+
+
+class TestSourceFanout:
+
+    @pytest.fixture(autouse=True)
+    def clear_endpoint_cache(self):
+        from .. import lambda_function
+        lambda_function._endpoint_cache.clear()
+        yield
+        lambda_function._endpoint_cache.clear()
+
+    def _fanout_messages(self, request, sources: List[str]) -> List[RAGPipelineMessage]:
+        message: RAGPipelineMessage = request.getfixturevalue("rag_pipeline_message")
+        return [
+            message.model_copy(update={"results": [SourceResult(key=request.getfixturevalue(source).storage.location)]})
+            for source in sources
+        ]
+
+    def test_source_executor_endpoint_cached(self, request, mocker):
+        from .. import lambda_function
+        mock_aws_infra: boto3.Session = request.getfixturevalue("mock_aws_infra")
+        ssm = mocker.patch.object(lambda_function, "ssm", mock_aws_infra.client("ssm", region_name="ap-southeast-1"))
+        spy = mocker.spy(ssm, "get_parameter")
+
+        executor = SourceExecutor(request.getfixturevalue("rag_pipeline_message"), None, RAGPipelineEnviron())
+        first = executor.get_optimal_aoss_endpoint()
+        second = executor.get_optimal_aoss_endpoint()
+
+        assert spy.call_count == 1
+        assert first == second
+        assert first.model_dump(mode="json") == {"collection": "tests", "host": "localhost", "port": 9200, "is_local": False}
+
+    def test_source_executor_send_to_parsers_batches_per_queue(self, request, mocker):
+        sqs = mocker.MagicMock()
+        sqs.send_message_batch.return_value = {"Successful": [], "Failed": []}
+        environ: RAGPipelineEnviron = RAGPipelineEnviron()
+        messages = self._fanout_messages(request, ["csv_knowledge_base"] * 12 + ["pdf_knowledge_base"] * 3)
+
+        failed = SourceExecutor(request.getfixturevalue("rag_pipeline_message"), sqs, environ).send_to_parsers(messages)
+
+        assert failed == []
+        calls = sqs.send_message_batch.call_args_list
+        assert [(call.kwargs["QueueUrl"], len(call.kwargs["Entries"])) for call in calls] == [
+            (str(environ.project_rag_parse.csv.url), 10),
+            (str(environ.project_rag_parse.csv.url), 2),
+            (str(environ.project_rag_parse.pdf.url), 3),
+        ]
+        sqs.send_message.assert_not_called()
+
+    def test_source_executor_send_to_parsers_partial_failure(self, request, mocker):
+        sqs = mocker.MagicMock()
+        sqs.send_message_batch.return_value = {
+            "Successful": [{"Id": "0"}],
+            "Failed": [{"Id": "1", "Code": "InternalError", "Message": "try again", "SenderFault": False}],
+        }
+        messages = self._fanout_messages(request, ["csv_knowledge_base", "csv_knowledge_base"])
+        unsupported = messages[0].model_copy(update={"results": [SourceResult(key="tests/example.exe")]})
+
+        failed = SourceExecutor(
+            request.getfixturevalue("rag_pipeline_message"), sqs, RAGPipelineEnviron()
+        ).send_to_parsers([*messages, unsupported])
+
+        assert [(message, error) for message, error in failed] == [
+            (unsupported, "Parser for file type exe does not exist"),
+            (messages[1], "try again"),
+        ]
+
+    def test_source_executor_endpoint_not_resolved_without_kbs(self, request, mocker):
+        message: RAGPipelineMessage = request.getfixturevalue("rag_pipeline_message").model_copy(
+            update={"knowledge_bases": []})
+        executor = SourceExecutor(message, mocker.MagicMock(), RAGPipelineEnviron())
+        endpoint = mocker.patch.object(executor, "get_optimal_aoss_endpoint", side_effect=RuntimeError("ssm down"))
+
+        status = executor()
+
+        endpoint.assert_not_called()
+        assert status.status == "completed"
+
+    def test_source_executor_endpoint_failure_fails_each_kb(self, request, mocker):
+        kbs: List[KnowledgeBase] = [request.getfixturevalue("csv_knowledge_base"),
+                                    request.getfixturevalue("pdf_knowledge_base")]
+        message: RAGPipelineMessage = request.getfixturevalue("rag_pipeline_message").model_copy(
+            update={"knowledge_bases": kbs})
+        executor = SourceExecutor(message, mocker.MagicMock(), RAGPipelineEnviron())
+        mocker.patch.object(executor, "move_kbs", return_value=[
+            (kb, SourceResult(key=kb.storage.location)) for kb in kbs])
+        mocker.patch.object(executor, "get_optimal_aoss_endpoint", side_effect=RuntimeError("ssm down"))
+        send_status = mocker.patch.object(executor, "send_status")
+        send_to_parsers = mocker.patch.object(executor, "send_to_parsers", return_value=[])
+
+        status = executor()
+
+        assert status is not None and status.status == "completed"
+        assert [call.kwargs["status"].knowledge_base for call in send_status.call_args_list] == [kb.id for kb in kbs]
+        assert all(call.kwargs["status"].error == "ssm down" for call in send_status.call_args_list)
+        send_to_parsers.assert_called_once_with(messages=[])
+
+    def test_source_executor_returns_failed_status(self, request, mocker):
+        executor = SourceExecutor(request.getfixturevalue("rag_pipeline_message"), mocker.MagicMock(),
+                                  RAGPipelineEnviron())
+        mocker.patch.object(executor, "move_kbs", side_effect=RuntimeError("s3 down"))
+        send_status = mocker.patch.object(executor, "send_status")
+
+        status = executor()
+
+        assert status.status == "failed" and status.error == "s3 down"
+        send_status.assert_called_once_with(status=status)
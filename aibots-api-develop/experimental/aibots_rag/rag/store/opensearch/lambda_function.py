@@ -4,6 +4,13 @@ import json
 from typing import Any, Dict, List
 
 import boto3
+from aibots.aws_lambda.manifest import (
+    ChunkPlan,
+    IngestionManifest,
+    ManifestEntry,
+    chunk_hash,
+    get_manifest,
+)
 from aibots.models.rags.api import (
     ExecutionState,
     RAGPipelineStages,
@@ -137,14 +144,44 @@ class FileIndexer:
             response_results.append(response["result"])
         return response_results
 
+    def index_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
+        """
+        args:
+            documents(list): list of dictionaries of documents
+        returns:
+            list of the ids assigned to the documents, in order
+        """
+        return [
+            self.client.index(index=self.index_name, body=doc)["_id"]
+            for doc in documents
+        ]
+
+    def delete_documents(self, ids: List[str]):
+        """
+        args:
+            ids(list): ids of the documents to delete
+        """
+        for id in ids:
+            self.client.delete(index=self.index_name, id=id)
+
     def delete_file(self, source: str):
-        query = {"query": {"match": {"source": source}}}
+        # source is an analysed text field, a phrase can also match other
+        # keys that contain it, so only exact matches are deleted
+        query = {
+            "query": {"match_phrase": {"source": source}},
+            "_source": ["source"],
+            "size": 10000,
+        }
         response = self.client.search(
             index=self.index_name, body=query, version=True
         )
         file_deleted = None
 
-        id_list = [q["_id"] for q in response["hits"]["hits"]]
+        id_list = [
+            q["_id"]
+            for q in response["hits"]["hits"]
+            if q["_source"].get("source") == source
+        ]
         for id in id_list:
             self.client.delete(index=self.index_name, id=id)
             file_deleted = True
@@ -207,7 +244,10 @@ class OpenSearchStorer(RAGPipelineExecutor):
             chunked: ChunkResult = self.previous_result
             print("chunked", chunked)
             source: SourceResult = self.message.results[0]
-            source_config = self.message.pipeline.config["source"]
+            # the source stage adds the picked endpoint under "store"
+            source_config = self.message.pipeline.config.get(
+                "store", self.message.pipeline.config.get("source")
+            )
             embedder = BedRockEmbedder()
             indexer = FileIndexer(
                 host=source_config["host"],
@@ -215,15 +255,38 @@ class OpenSearchStorer(RAGPipelineExecutor):
                 collection=source_config["collection"],
                 is_local=source_config["is_local"],
             )
-            documents: List[Dict[str, Any]] = []
+            manifest: IngestionManifest | None = get_manifest(
+                self.environ.project_rag_manifest
+            )
+            hashes: Dict[str, Any] = source.metadata
+            chunk_hashes: List[str] = [
+                chunk_hash(
+                    chunk.text,
+                    chunk.page_number,
+                    hashes.get("config_hash", ""),
+                )
+                for chunk in chunked.chunks
+            ]
+            previous: ManifestEntry | None = None
+            if manifest is not None and "content_hash" in hashes:
+                previous = manifest.get(str(self.message.agent), source.key)
+                # a run that stopped part way may have left documents that
+                # are not tracked, the file is then stored again from scratch
+                if previous is not None and previous.pending:
+                    previous = None
+            # only chunks that changed since the last ingestion are embedded
+            plan: ChunkPlan = ManifestEntry.plan(previous, chunk_hashes)
+            new_chunks = [chunked.chunks[i] for i in plan.add]
 
-            embeddings = embedder.create_embeddings(
-                [chunk.text for chunk in chunked.chunks]
+            embeddings = (
+                embedder.create_embeddings([chunk.text for chunk in new_chunks])
+                if new_chunks
+                else []
             )
 
+            documents: List[Dict[str, Any]] = []
             # iterate and add documents
-            for i, embedding in enumerate(embeddings):
-                chunk = chunked.chunks[i]
+            for chunk, embedding in zip(new_chunks, embeddings):
                 document: Dict[str, Any] = OpenSearchCohereEmbeddingDocument(
                     source=source.key,
                     page_number=chunk.page_number,
@@ -234,7 +297,28 @@ class OpenSearchStorer(RAGPipelineExecutor):
                 ).model_dump()
                 documents.append(document)
             # push to opensearch
-            indexer.push_to_index(documents=documents)
+            if manifest is not None and "content_hash" in hashes:
+                entry = ManifestEntry(
+                    agent=str(self.message.agent),
+                    key=source.key,
+                    content_hash=hashes["content_hash"],
+                    config_hash=hashes["config_hash"],
+                )
+                # marked before any write, so a crash before the entry is
+                # complete is seen by the next run
+                manifest.put(entry.model_copy(update={"pending": True}))
+                if previous is None:
+                    # documents stored before the manifest, or by a run that
+                    # stopped part way
+                    indexer.delete_file(source.key)
+                ids = indexer.index_documents(documents=documents)
+                indexer.delete_documents(ids=plan.delete)
+                chunks: Dict[str, List[str]] = plan.keep
+                for i, doc_id in zip(plan.add, ids):
+                    chunks.setdefault(chunk_hashes[i], []).append(doc_id)
+                manifest.put(entry.model_copy(update={"chunks": chunks}))
+            else:
+                indexer.push_to_index(documents=documents)
             # Update message here
             return RAGPipelineStatus(
                 agent=self.message.agent,
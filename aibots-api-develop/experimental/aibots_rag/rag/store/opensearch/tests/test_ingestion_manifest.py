@@ -0,0 +1,116 @@
+import pytest
+
+from aibots.aws_lambda.manifest import (
+    JSONManifest,
+    ManifestEntry,
+    SQLiteManifest,
+    chunk_hash,
+    config_hash,
+    get_manifest,
+)
+
+
+class TestIngestionManifest:
+
+    @pytest.fixture(params=["json", "sqlite"])
+    def manifest(self, request, tmp_path):
+        if request.param == "json":
+            yield JSONManifest(tmp_path / "manifest.json")
+        else:
+            yield SQLiteManifest(tmp_path / "manifest.db")
+
+    def test_manifest_round_trip(self, manifest):
+        entry = ManifestEntry(
+            agent="agent",
+            key="tests/examplecsv.csv",
+            content_hash="etag",
+            config_hash=config_hash({"parse": {"chunk_size": 10}}),
+            chunks={"a": ["1"], "b": ["2", "3"]},
+        )
+        assert manifest.get("agent", entry.key) is None
+
+        manifest.put(entry)
+
+        assert manifest.get("agent", entry.key) == entry
+        assert manifest.is_unchanged("agent", entry.key, "etag", entry.config_hash)
+        assert not manifest.is_unchanged("agent", entry.key, "other", entry.config_hash)
+        assert not manifest.is_unchanged("other", entry.key, "etag", entry.config_hash)
+
+        manifest.delete("agent", entry.key)
+        assert manifest.get("agent", entry.key) is None
+
+    def test_pending_entry_is_not_current(self, manifest):
+        entry = ManifestEntry(
+            agent="agent", key="key", content_hash="etag", config_hash="config", pending=True
+        )
+        manifest.put(entry)
+
+        assert manifest.get("agent", "key").pending
+        assert not manifest.is_unchanged("agent", "key", "etag", "config")
+
+    def test_config_hash_ignores_key_order_and_store(self):
+        assert config_hash({"parse": {"chunk_size": 10}, "chunk": {"type": "fixed"}}) == config_hash(
+            {"chunk": {"type": "fixed"}, "parse": {"chunk_size": 10}, "store": {"host": "localhost"}}
+        )
+        assert config_hash({"parse": {"chunk_size": 10}}) != config_hash({"parse": {"chunk_size": 20}})
+
+    def test_plan_only_changed_chunks(self):
+        hashes = [chunk_hash(text, 1, "config") for text in ["a", "b", "c"]]
+        entry = ManifestEntry(
+            agent="agent",
+            key="key",
+            content_hash="old",
+            config_hash="config",
+            chunks={hashes[0]: ["id-a"], hashes[1]: ["id-b"], "stale": ["id-x"]},
+        )
+
+        plan = ManifestEntry.plan(entry, hashes)
+
+        assert plan.keep == {hashes[0]: ["id-a"], hashes[1]: ["id-b"]}
+        assert plan.add == [2]
+        assert plan.delete == ["id-x"]
+
+    def test_plan_reuses_chunks_after_insert_at_start(self):
+        paragraphs = [f"paragraph {i}" for i in range(20)]
+        old = [chunk_hash(text, 1, "config") for text in paragraphs]
+        entry = ManifestEntry(
+            agent="agent",
+            key="key",
+            content_hash="old",
+            config_hash="config",
+            chunks={h: [f"id-{i}"] for i, h in enumerate(old)},
+        )
+        new = [chunk_hash(text, 1, "config") for text in ["inserted paragraph"] + paragraphs]
+
+        plan = ManifestEntry.plan(entry, new)
+
+        assert plan.add == [0]
+        assert len(plan.keep) == 20
+        assert plan.delete == []
+
+    def test_chunk_hash_depends_on_text_page_and_config(self):
+        assert chunk_hash("a", 1, "config") == chunk_hash("a", 1, "config")
+        assert chunk_hash("a", 1, "config") != chunk_hash("b", 1, "config")
+        assert chunk_hash("a", 1, "config") != chunk_hash("a", 2, "config")
+        assert chunk_hash("a", 1, "config") != chunk_hash("a", 1, "other")
+
+    def test_plan_without_entry_adds_everything(self):
+        plan = ManifestEntry.plan(None, ["a", "a", "b"])
+        assert plan.keep == {}
+        assert plan.add == [0, 1, 2]
+        assert plan.delete == []
+
+    def test_plan_matches_duplicate_chunks_one_to_one(self):
+        entry = ManifestEntry(
+            agent="agent", key="key", content_hash="", config_hash="", chunks={"a": ["1", "2", "3"]}
+        )
+        plan = ManifestEntry.plan(entry, ["a", "a"])
+        assert plan.keep == {"a": ["1", "2"]}
+        assert plan.delete == ["3"]
+
+    def test_get_manifest_from_uri(self, tmp_path):
+        assert get_manifest(None) is None
+        assert isinstance(get_manifest(f"sqlite://{tmp_path}/manifest.db"), SQLiteManifest)
+        assert isinstance(get_manifest(f"file://{tmp_path}/manifest.json"), JSONManifest)
+        with pytest.raises(ValueError):
+            get_manifest("ftp://manifest")
@@ -79,3 +79,96 @@ class TestOpenSearchStorer:
                 **os.environ}
         )
         os.chdir(request.config.invocation_params.dir)
+
+
+class FakeIndexer:
+    """
+    Stands in for FileIndexer, documents are kept by id with their source
+    """
+
+    def __init__(self, fail_index: bool = False):
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.fail_index = fail_index
+        self.deleted_files = []
+
+    def index_documents(self, documents):
+        if self.fail_index:
+            # the first document is written before the crash
+            self.documents[f"id-{len(self.documents)}"] = documents[0]
+            raise RuntimeError("lambda timed out")
+        ids = []
+        for document in documents:
+            ids.append(f"id-{len(self.documents)}")
+            self.documents[ids[-1]] = document
+        return ids
+
+    def delete_documents(self, ids):
+        for doc_id in ids:
+            self.documents.pop(doc_id, None)
+
+    def delete_file(self, source):
+        self.deleted_files.append(source)
+        for doc_id in [i for i, d in self.documents.items() if d["source"] == source]:
+            del self.documents[doc_id]
+
+
+class TestOpenSearchStorerManifest:
+
+    @pytest.fixture
+    def storer(self, request, mocker, tmp_path):
+        from .. import lambda_function
+        from aibots.aws_lambda.manifest import JSONManifest
+
+        manifest = JSONManifest(tmp_path / "manifest.json")
+        indexer = FakeIndexer()
+        mocker.patch.object(lambda_function, "get_manifest", return_value=manifest)
+        mocker.patch.object(lambda_function, "FileIndexer", side_effect=lambda **kwargs: indexer)
+        embedder = mocker.patch.object(lambda_function, "BedRockEmbedder").return_value
+        embedder.create_embeddings.side_effect = lambda texts: [[0.1] * 1024 for _ in texts]
+
+        def run(chunk_result: ChunkResult) -> RAGPipelineStatus:
+            message: RAGPipelineMessage = deepcopy(request.getfixturevalue("rag_pipeline_message"))
+            source = SourceResult(key="tests/examplecsv.csv",
+                                  metadata={"content_hash": "etag", "config_hash": "config"})
+            message.results += [source, chunk_result]
+            message.pipeline = RAGConfig(config=request.getfixturevalue("csv_source_config"))
+            return OpenSearchStorer(message, None, RAGPipelineEnviron())()
+
+        run.manifest, run.indexer = manifest, indexer
+        return run
+
+    def test_file_without_entry_replaces_stored_documents(self, request, storer):
+        chunk_result: ChunkResult = request.getfixturevalue("csv_chunk_result")
+        storer.indexer.documents["old"] = {"source": "tests/examplecsv.csv"}
+
+        assert storer(chunk_result).status == "completed"
+
+        entry = storer.manifest.get("dad32f1794b94153a2fd9997929a4280", "tests/examplecsv.csv")
+        assert not entry.pending
+        assert storer.indexer.deleted_files == ["tests/examplecsv.csv"]
+        assert sorted(storer.indexer.documents) == sorted(i for ids in entry.chunks.values() for i in ids)
+
+    def test_run_after_crash_does_not_duplicate(self, request, storer):
+        chunk_result: ChunkResult = request.getfixturevalue("csv_chunk_result")
+        storer(chunk_result)
+        storer.indexer.fail_index = True
+        changed = chunk_result.model_copy(update={"chunks": chunk_result.chunks[:-1] + [
+            chunk_result.chunks[-1].model_copy(update={"text": "changed"})]})
+
+        assert storer(changed).status == "failed"
+        assert storer.manifest.get("dad32f1794b94153a2fd9997929a4280", "tests/examplecsv.csv").pending
+
+        storer.indexer.fail_index = False
+        assert storer(changed).status == "completed"
+        assert len(storer.indexer.documents) == len(changed.chunks)
+
+    def test_file_with_entry_only_replaces_changed_chunks(self, request, storer):
+        chunk_result: ChunkResult = request.getfixturevalue("csv_chunk_result")
+        storer(chunk_result)
+        changed = chunk_result.model_copy(update={"chunks": chunk_result.chunks[:-1] + [
+            chunk_result.chunks[-1].model_copy(update={"text": "changed"})]})
+
+        assert storer(changed).status == "completed"
+        assert storer.indexer.deleted_files == ["tests/examplecsv.csv"]
+        assert len(storer.indexer.documents) == len(changed.chunks)
+        assert any(d["text"] == "changed" for d in storer.indexer.documents.values())
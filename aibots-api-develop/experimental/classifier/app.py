@@ -1,7 +1,10 @@
+import os
+
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 from src.inference.inference import PromptClassifier
+from src.inference.batching import BatchingEngine
 from pydantic import BaseModel
 
 prefix = "hallucination-risk"
@@ -13,7 +16,23 @@ app = FastAPI(
     )
 
 # Load a pre-trained ResNet model
-prompt_classifier = PromptClassifier()
+prompt_classifier = PromptClassifier(
+    quantize=os.getenv("CLASSIFIER_QUANTIZE", "false").lower() == "true",
+    cache_size=int(os.getenv("CLASSIFIER_CACHE_SIZE", 4096)),
+)
+engine = BatchingEngine(
+    prompt_classifier,
+    max_batch_size=int(os.getenv("CLASSIFIER_MAX_BATCH_SIZE", 32)),
+    max_wait_ms=float(os.getenv("CLASSIFIER_MAX_WAIT_MS", 5)),
+)
+
+@app.on_event("startup")
+async def start_engine():
+    await engine.start()
+
+@app.on_event("shutdown")
+async def stop_engine():
+    await engine.stop()
 
 class TextInput(BaseModel):
     text: str
@@ -26,7 +45,7 @@ async def read_root():
 @app.get(f"/{prefix}/predict")
 async def predict(input_text: str):
     try:
-        output_string = prompt_classifier.run_pipeline(input_text)
+        output_string = await engine.predict(input_text)
 
         # Return the result as JSON
         return JSONResponse(content=jsonable_encoder({"result": output_string}))
@@ -38,7 +57,7 @@ async def predict(input_text: str):
 @app.get(f"/{prefix}/create_embeddings")
 async def predict(input_text: str):
     try:
-        output_list = prompt_classifier.create_embeddings(input_text)
+        output_list = await engine.create_embeddings(input_text)
 
         # Return the result as JSON
         return JSONResponse(content={"embeddings": output_list})
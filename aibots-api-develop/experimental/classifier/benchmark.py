@@ -0,0 +1,121 @@
+"""Throughput and latency benchmark for the classifier
+
+Compares calling PromptClassifier.run_pipeline once per request (the previous
+behaviour) against the BatchingEngine, at several levels of concurrency.
+
+Usage:
+    python benchmark.py                  # uses the model under ./model
+    python benchmark.py --quantize       # with dynamic int8 quantisation
+    python benchmark.py --fake           # synthetic classifier, no model needed
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import numpy as np
+
+from src.inference.batching import BatchingEngine
+
+
+class FakeClassifier:
+    """Stand-in with a fixed per-call overhead and a small per-item cost,
+    roughly the shape of a CPU encoder forward pass"""
+
+    def __init__(self, call_overhead: float = 0.02, per_item: float = 0.002) -> None:
+        self.call_overhead = call_overhead
+        self.per_item = per_item
+
+    def encode(self, texts):
+        time.sleep(self.call_overhead + self.per_item * len(texts))
+        return np.zeros((len(texts), 768))
+
+    def run_pipeline(self, text):
+        return self.run_pipeline_batch([text])[0]
+
+    def run_pipeline_batch(self, texts):
+        self.encode(texts)
+        return ["0"] * len(texts)
+
+
+def make_prompts(n: int, repeat_ratio: float):
+    words = ["policy", "summarise", "draft", "speech", "minister", "budget", "report", "explain"]
+    unique = [" ".join(random.choices(words, k=12)) + f" {i}" for i in range(n)]
+    return [random.choice(unique[:max(1, n // 10)]) if random.random() < repeat_ratio else p for p in unique]
+
+
+async def run_rounds(call, prompts, concurrency):
+    """Requests arrive in bursts of `concurrency`, latency is measured from the
+    arrival of the burst so that time spent queued behind other requests counts"""
+    latencies = []
+
+    async def timed(prompt, arrival):
+        await call(prompt)
+        latencies.append(time.perf_counter() - arrival)
+
+    start = time.perf_counter()
+    for i in range(0, len(prompts), concurrency):
+        arrival = time.perf_counter()
+        await asyncio.gather(*[timed(p, arrival) for p in prompts[i:i + concurrency]])
+    return time.perf_counter() - start, latencies
+
+
+async def run_sequential(classifier, prompts, concurrency):
+    """Previous behaviour: synchronous call inside the async endpoint"""
+    async def call(prompt):
+        classifier.run_pipeline(prompt)
+
+    return await run_rounds(call, prompts, concurrency)
+
+
+async def run_batched(classifier, prompts, concurrency, max_batch_size, max_wait_ms):
+    engine = BatchingEngine(classifier, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    await engine.start()
+    elapsed, latencies = await run_rounds(engine.predict, prompts, concurrency)
+    batches = engine.batches
+    await engine.stop()
+    return elapsed, latencies, batches
+
+
+def report(name, n, elapsed, latencies, extra=""):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{name:<28} {n / elapsed:>10.1f} req/s   p50 {p50:>8.1f} ms   p95 {p95:>8.1f} ms {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fake", action="store_true")
+    parser.add_argument("--quantize", action="store_true")
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--repeat-ratio", type=float, default=0.2)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    if args.fake:
+        classifier = FakeClassifier()
+    else:
+        from src.inference.inference import PromptClassifier
+        classifier = PromptClassifier(quantize=args.quantize)
+
+    prompts = make_prompts(args.requests, args.repeat_ratio)
+    for concurrency in (1, 8, 32, 64):
+        print(f"--- concurrency {concurrency}")
+        elapsed, latencies = asyncio.run(run_sequential(classifier, prompts, concurrency))
+        report("per-request", len(prompts), elapsed, latencies)
+        if hasattr(classifier, "cache"):
+            classifier.cache = type(classifier.cache)(classifier.cache.max_size)
+        elapsed, latencies, batches = asyncio.run(
+            run_batched(classifier, prompts, concurrency, args.max_batch_size, args.max_wait_ms)
+        )
+        report("micro-batched", len(prompts), elapsed, latencies, f"  ({batches} batches)")
+        if hasattr(classifier, "cache"):
+            classifier.cache = type(classifier.cache)(classifier.cache.max_size)
+
+
+if __name__ == "__main__":
+    main()
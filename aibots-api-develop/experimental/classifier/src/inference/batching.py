@@ -0,0 +1,131 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BatchingEngine:
+    def __init__(self, classifier, max_batch_size: int = 32, max_wait_ms: float = 5) -> None:
+        """Collects concurrent requests into micro-batches for the PromptClassifier
+
+        A batch is dispatched once it holds max_batch_size requests or the oldest
+        request has waited max_wait_ms, whichever comes first. Forward passes run
+        on a single worker thread so the event loop is never blocked.
+        args:
+            classifier (PromptClassifier): classifier exposing run_pipeline_batch and encode
+            max_batch_size (int): maximum number of requests per batch
+            max_wait_ms (float): maximum time to wait for a batch to fill up
+        """
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="classifier")
+        self._queue = None
+        self._worker = None
+        self.batches = 0
+        self.requests = 0
+    # end def
+
+    async def start(self) -> None:
+        if self._executor is None:
+            # Shut down by a previous stop()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="classifier")
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+    # end def
+
+    async def stop(self) -> None:
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    # end def
+
+    async def _submit(self, kind: str, text: str):
+        if self._worker is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((kind, text, future))
+        return await future
+    # end def
+
+    async def predict(self, text: str) -> str:
+        """Batched equivalent of PromptClassifier.run_pipeline"""
+        return await self._submit("predict", text)
+    # end def
+
+    async def create_embeddings(self, text: str) -> list:
+        """Batched equivalent of PromptClassifier.create_embeddings"""
+        return await self._submit("embed", text)
+    # end def
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    # end def
+
+    def _run_kind(self, kind: str, texts: list) -> list:
+        if kind == "predict":
+            return list(self.classifier.run_pipeline_batch(texts))
+        return [[embedding.tolist()] for embedding in self.classifier.encode(texts)]
+    # end def
+
+    def _process(self, batch) -> list:
+        """Runs on the worker thread, returns an (exception, result) pair per request
+
+        When a batched call fails, its requests are retried one by one so that
+        the error only reaches the requests that cause it
+        """
+        results = [None] * len(batch)
+        for kind in ("predict", "embed"):
+            indices = [i for i, (k, _, _) in enumerate(batch) if k == kind]
+            if not indices:
+                continue
+            try:
+                outcomes = self._run_kind(kind, [batch[i][1] for i in indices])
+                for i, outcome in zip(indices, outcomes):
+                    results[i] = (None, outcome)
+            except Exception:
+                for i in indices:
+                    try:
+                        results[i] = (None, self._run_kind(kind, [batch[i][1]])[0])
+                    except Exception as e:
+                        results[i] = (e, None)
+        return results
+    # end def
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self.batches += 1
+            self.requests += len(batch)
+            try:
+                results = await loop.run_in_executor(self._executor, self._process, batch)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, _, future), (error, result) in zip(batch, results):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+    # end def
+# end class
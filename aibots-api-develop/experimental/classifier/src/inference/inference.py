@@ -1,4 +1,6 @@
 import re
+from collections import OrderedDict
+from threading import Lock
 from InstructorEmbedding import INSTRUCTOR
 import torch
 import torch.nn as nn
@@ -28,8 +30,47 @@ class ClassifierModel(nn.Module):
     # end def
 # end class
 
+class EmbeddingCache:
+    def __init__(self, max_size: int = 4096) -> None:
+        """Thread-safe LRU cache of text -> embedding"""
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+    # end def
+
+    def get(self, text):
+        with self._lock:
+            embedding = self._items.get(text)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(text)
+            self.hits += 1
+            return embedding
+    # end def
+
+    def put(self, text, embedding) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[text] = embedding
+            self._items.move_to_end(text)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+    # end def
+# end class
+
 class PromptClassifier:
-    def __init__(self) -> None:
+    def __init__(self, quantize: bool = False, cache_size: int = 4096) -> None:
+        """
+        args:
+            quantize (bool): apply dynamic int8 quantisation to the Linear layers
+                             of the encoder and classifier for faster CPU inference
+            cache_size (int): number of prompt embeddings to keep in the LRU cache,
+                              0 disables the cache
+        """
         # Initialize strings
         #self.warning = "Warning: Your prompt is known to produce responses which can be wrong or inaccurate. If you are using it for policy papers, speech writing, etc, we strongly recommend you to fact-check with other sources before using the responses."
         #self.soft_warning = "There may be a chance of hallucination with your request."
@@ -48,6 +89,12 @@ class PromptClassifier:
         self.classifier = ClassifierModel(embeddings_shape, 2)
         self.classifier.load_state_dict(torch.load(f"{self.fp_prefix}/nn/model_params.pth", map_location=torch.device('cpu')))
         self.classifier.eval()
+
+        if quantize:
+            self.encoder = torch.quantization.quantize_dynamic(self.encoder, {nn.Linear}, dtype=torch.qint8)
+            self.classifier = torch.quantization.quantize_dynamic(self.classifier, {nn.Linear}, dtype=torch.qint8)
+
+        self.cache = EmbeddingCache(cache_size)
     
     def contains_url(self, text) -> bool:
         # Regular expression to match URLs
@@ -68,14 +115,41 @@ class PromptClassifier:
             return "0"
     # end def
            
-    def predict(self, text) -> str:
-        embeddings = torch.tensor(self.encoder.encode([text]))
+    def encode(self, texts) -> np.ndarray:
+        """Encode a batch of texts in one forward pass, reusing cached embeddings
+        args:
+            texts (list[str]): texts to encode
+        returns:
+            embeddings (np.ndarray): size (len(texts), embeddings size)
+        """
+        embeddings = [self.cache.get(t) for t in texts]
+        missing = list(dict.fromkeys(t for t, e in zip(texts, embeddings) if e is None))
+        if missing:
+            encoded = dict(zip(missing, self.encoder.encode(missing, batch_size=len(missing))))
+            for text, embedding in encoded.items():
+                self.cache.put(text, embedding)
+            embeddings = [encoded[t] if e is None else e for t, e in zip(texts, embeddings)]
+        return np.stack(embeddings)
+    # end def
+
+    def predict_batch(self, texts) -> list:
+        """Classify a batch of already preprocessed texts
+        args:
+            texts (list[str]): texts to classify
+        returns:
+            predictions (list[str]): one prediction per text
+        """
+        embeddings = torch.tensor(self.encode(texts))
         with torch.no_grad():
             outputs = self.classifier.forward(embeddings)
-        prediction = torch.argmax(outputs, dim=1).cpu().numpy()[0]
-        
-        #return self.mapping[int(prediction)]
-        return str(prediction)
+        predictions = torch.argmax(outputs, dim=1).cpu().numpy()
+
+        #return [self.mapping[int(p)] for p in predictions]
+        return [str(p) for p in predictions]
+    # end def
+
+    def predict(self, text) -> str:
+        return self.predict_batch([text])[0]
     # end def
     #     
     def process_long_string(self, input_str) -> str:
@@ -106,7 +180,7 @@ class PromptClassifier:
     # end def
 
     def create_embeddings(self, text):
-        embeddings = self.encoder.encode([text]).tolist()
+        embeddings = self.encode([text]).tolist()
         return embeddings
     # end def
 
@@ -118,4 +192,17 @@ class PromptClassifier:
             text = self.process_long_string(text)
             return self.predict(text)
     # end def
+
+    def run_pipeline_batch(self, texts) -> list:
+        """Batched equivalent of run_pipeline, only texts that are not resolved
+        by the first cut classification go through the encoder
+        """
+        outcomes = [self.first_cut_classification(t) for t in texts]
+        pending = [i for i, o in enumerate(outcomes) if not o]
+        if pending:
+            predictions = self.predict_batch([self.process_long_string(texts[i]) for i in pending])
+            for i, prediction in zip(pending, predictions):
+                outcomes[i] = prediction
+        return outcomes
+    # end def
 # end class
\ No newline at end of file
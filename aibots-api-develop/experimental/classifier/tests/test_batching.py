@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from benchmark import FakeClassifier
+from src.inference.batching import BatchingEngine
+
+
+class FailingClassifier(FakeClassifier):
+    """Fails every call that contains a prompt with "bad" in it"""
+
+    def __init__(self) -> None:
+        super().__init__(call_overhead=0.001, per_item=0)
+        self.calls = []
+
+    def run_pipeline_batch(self, texts):
+        self.calls.append(list(texts))
+        if any("bad" in t for t in texts):
+            raise ValueError("cannot classify")
+        return super().run_pipeline_batch(texts)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_requests_share_a_batch():
+    async def main():
+        engine = BatchingEngine(FakeClassifier(call_overhead=0.001, per_item=0), max_batch_size=8, max_wait_ms=20)
+        results = await asyncio.gather(*[engine.predict(f"prompt {i}") for i in range(8)])
+        embedding = await engine.create_embeddings("prompt")
+        await engine.stop()
+        return results, embedding, engine.batches
+
+    results, embedding, batches = run(main())
+    assert results == ["0"] * 8
+    assert len(embedding) == 1 and len(embedding[0]) == 768
+    assert batches == 2
+
+
+def test_batch_is_dispatched_after_max_wait():
+    async def main():
+        engine = BatchingEngine(FakeClassifier(call_overhead=0.001, per_item=0), max_batch_size=32, max_wait_ms=10)
+        start = asyncio.get_running_loop().time()
+        await engine.predict("alone")
+        elapsed = asyncio.get_running_loop().time() - start
+        await engine.stop()
+        return elapsed
+
+    assert run(main()) < 0.1
+
+
+def test_failing_item_only_fails_its_own_request():
+    classifier = FailingClassifier()
+
+    async def main():
+        engine = BatchingEngine(classifier, max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(engine.predict("good 1"), engine.predict("bad"), engine.predict("good 2"),
+                                       return_exceptions=True)
+        await engine.stop()
+        return results
+
+    good_1, bad, good_2 = run(main())
+    assert good_1 == "0" and good_2 == "0"
+    assert isinstance(bad, ValueError)
+    # One failed batch, then one call per item
+    assert classifier.calls == [["good 1", "bad", "good 2"], ["good 1"], ["bad"], ["good 2"]]
+
+
+def test_engine_can_be_used_after_stop():
+    async def main():
+        engine = BatchingEngine(FakeClassifier(call_overhead=0.001, per_item=0))
+        first = await engine.predict("before")
+        await engine.stop()
+        second = await engine.predict("after")
+        await engine.stop()
+        return first, second
+
+    assert run(main()) == ("0", "0")
+
+
+@pytest.mark.parametrize("max_batch_size", [1, 3])
+def test_batches_respect_max_batch_size(max_batch_size):
+    classifier = FailingClassifier()
+
+    async def main():
+        engine = BatchingEngine(classifier, max_batch_size=max_batch_size, max_wait_ms=20)
+        await asyncio.gather(*[engine.predict(f"prompt {i}") for i in range(6)])
+        await engine.stop()
+
+    run(main())
+    assert max(len(c) for c in classifier.calls) == max_batch_size
+    assert sum(len(c) for c in classifier.calls) == 6
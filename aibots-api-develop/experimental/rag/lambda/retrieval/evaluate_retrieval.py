@@ -0,0 +1,126 @@
+"""Offline relevance and latency harness for hybrid retrieval
+
+Builds a synthetic corpus in which each concept has several surface forms:
+embeddings place the forms of a concept close together, while BM25 only
+matches the exact form. Queries are paraphrases of one target document,
+sometimes with an exact identifier from it, so that neither leg alone
+finds every target. Compares the previous summed bool.should query with
+each leg alone and with both fusion methods.
+
+Usage:
+    python evaluate_retrieval.py
+    python evaluate_retrieval.py --docs 5000 --queries 500 --k 5 --latency 0.02
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from hybrid import HybridConfig, HybridRetriever
+from in_memory_index import InMemoryIndex
+
+DIM = 128
+
+
+def build_corpus(n_docs, n_topics, rng):
+    concepts = [[f"c{c}f{f}" for f in range(3)] for c in range(n_topics * 30)]
+    concept_vectors = rng.standard_normal((len(concepts), DIM))
+    form_vectors = {
+        form: concept_vectors[c] + 0.3 * rng.standard_normal(DIM)
+        for c, forms in enumerate(concepts) for form in forms
+    }
+
+    def embed(words):
+        vectors = [form_vectors[w] for w in words if w in form_vectors]
+        vector = np.sum(vectors, axis=0) if vectors else np.zeros(DIM)
+        return (vector / (np.linalg.norm(vector) + 1e-9)).tolist()
+
+    documents, doc_concepts = [], []
+    for i in range(n_docs):
+        topic = i % n_topics
+        chosen = rng.choice(range(topic * 30, topic * 30 + 30), size=8, replace=False)
+        words = [concepts[c][rng.integers(3)] for c in chosen]
+        code = f"ref{i:05d}"
+        text = " ".join(words + [code])
+        documents.append({"_id": f"doc-{i}", "text": text, "topic": topic, "embedding": embed(words)})
+        doc_concepts.append((chosen, code))
+    return documents, doc_concepts, concepts, embed
+
+
+def build_queries(n_queries, doc_concepts, concepts, embed, rng, noise):
+    queries = []
+    for _ in range(n_queries):
+        target = int(rng.integers(len(doc_concepts)))
+        chosen, code = doc_concepts[target]
+        words = [concepts[c][rng.integers(3)] for c in rng.choice(chosen, size=3, replace=False)]
+        text = " ".join(words + ([code] if rng.random() < 0.5 else []))
+        # query embeddings are noisier than document embeddings, short queries carry little context
+        vector = np.asarray(embed(words)) + noise * rng.standard_normal(DIM) / np.sqrt(DIM)
+        queries.append((text, (vector / np.linalg.norm(vector)).tolist(), f"doc-{target}"))
+    return queries
+
+
+def legacy_search(index, query, vector, k):
+    """Previous behaviour: raw BM25 and kNN scores summed in one bool.should"""
+    body = {"query": {"bool": {"should": [
+        {"script_score": {"query": {"match": {"text": query}}, "script": {"source": "_score"}}},
+        {"knn": {"embedding": {"vector": vector, "k": k}}},
+    ]}}, "size": k}
+    return index.search(body=body)["hits"]["hits"]
+
+
+def evaluate(name, search, queries, k):
+    hits_at_k, reciprocal_ranks, latencies = 0, [], []
+    for text, vector, target in queries:
+        start = time.perf_counter()
+        hits = search(text, vector, k)
+        latencies.append(time.perf_counter() - start)
+        ids = [hit["_id"] for hit in hits]
+        if target in ids:
+            hits_at_k += 1
+            reciprocal_ranks.append(1 / (ids.index(target) + 1))
+        else:
+            reciprocal_ranks.append(0.0)
+    latencies.sort()
+    print(
+        f"{name:<22} recall@{k} {hits_at_k / len(queries):>6.3f}   MRR@{k} {statistics.mean(reciprocal_ranks):>6.3f}"
+        f"   p50 {statistics.median(latencies) * 1000:>7.2f} ms   p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:>7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated round-trip per request")
+    parser.add_argument("--noise", type=float, default=1.0, help="noise added to query embeddings")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    random.seed(args.seed)
+    documents, doc_concepts, concepts, embed = build_corpus(args.docs, args.topics, rng)
+    queries = build_queries(args.queries, doc_concepts, concepts, embed, rng, args.noise)
+    index = InMemoryIndex(documents, latency=args.latency)
+
+    def retriever(**kwargs):
+        return HybridRetriever(index, "index", HybridConfig(**kwargs)).search
+
+    evaluate("legacy bool.should", lambda q, v, k: legacy_search(index, q, v, k), queries, args.k)
+    evaluate("lexical only", retriever(vector_weight=0.0), queries, args.k)
+    evaluate("vector only", retriever(lexical_weight=0.0), queries, args.k)
+    evaluate("hybrid rrf", retriever(fusion="rrf"), queries, args.k)
+    evaluate("hybrid minmax", retriever(fusion="minmax"), queries, args.k)
+    evaluate("hybrid minmax 0.3/0.7", retriever(fusion="minmax", lexical_weight=0.3, vector_weight=0.7), queries, args.k)
+    topic = int(rng.integers(args.topics))
+    filtered = [(t, v, d) for t, v, d in queries if index.documents[d]["topic"] == topic]
+    if filtered:
+        evaluate(f"hybrid minmax topic={topic}", retriever(fusion="minmax", filters=[{"term": {"topic": topic}}]), filtered, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Hybrid lexical + vector retrieval with score fusion
+
+The lexical (BM25) and vector (kNN) legs are run as separate searches in a
+single _msearch round-trip and fused afterwards, since raw BM25 and kNN scores
+are on incompatible scales and cannot simply be added.
+
+Fusion methods:
+    minmax  per-leg scores scaled to [0, 1], then a weighted sum (default)
+    rrf     reciprocal rank fusion, sum of weight / (rrf_k + rank) per leg
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+FUSION_METHODS = ("rrf", "minmax")
+
+
+@dataclass
+class HybridConfig:
+    """
+    args:
+        fusion (str): "minmax" (default, best recall in evaluate_retrieval.py) or "rrf"
+        lexical_weight (float): weight of the BM25 leg
+        vector_weight (float): weight of the kNN leg
+        rrf_k (int): rank offset for reciprocal rank fusion
+        lexical_depth (int): candidates fetched from the BM25 leg, defaults to 4 * k
+        vector_depth (int): candidates fetched from the kNN leg, defaults to 4 * k
+        filters (list): OpenSearch filter clauses applied to both legs
+        text_field (str): field searched by the BM25 leg
+        vector_field (str): knn_vector field searched by the kNN leg
+    """
+    fusion: str = "minmax"
+    lexical_weight: float = 1.0
+    vector_weight: float = 1.0
+    rrf_k: int = 60
+    lexical_depth: Optional[int] = None
+    vector_depth: Optional[int] = None
+    filters: List[Dict[str, Any]] = field(default_factory=list)
+    text_field: str = "text"
+    vector_field: str = "embedding"
+
+    def __post_init__(self):
+        if self.fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method {self.fusion}, expected one of {FUSION_METHODS}")
+
+
+def lexical_query(query: str, size: int, config: HybridConfig) -> Dict[str, Any]:
+    body = {"bool": {"must": [{"match": {config.text_field: query}}]}}
+    if config.filters:
+        body["bool"]["filter"] = config.filters
+    return {"size": size, "query": body, "_source": {"excludes": [config.vector_field]}}
+
+
+def vector_query(vector: List[float], size: int, config: HybridConfig) -> Dict[str, Any]:
+    knn = {"vector": vector, "k": size}
+    if config.filters:
+        # Filter during the approximate search rather than after it,
+        # so that the leg still returns `size` candidates
+        knn["filter"] = {"bool": {"filter": config.filters}}
+    return {"size": size, "query": {"knn": {config.vector_field: knn}}, "_source": {"excludes": [config.vector_field]}}
+
+
+def reciprocal_rank_fusion(legs: List[List[Dict[str, Any]]], weights: List[float], rrf_k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Fuses ranked hit lists by rank only, scores of the legs are ignored
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for hits, weight in zip(legs, weights):
+        for rank, hit in enumerate(hits, start=1):
+            entry = fused.setdefault(hit["_id"], {**hit, "_score": 0.0})
+            entry["_score"] += weight / (rrf_k + rank)
+    return sorted(fused.values(), key=lambda hit: hit["_score"], reverse=True)
+
+
+def min_max_fusion(legs: List[List[Dict[str, Any]]], weights: List[float]) -> List[Dict[str, Any]]:
+    """
+    Fuses hit lists by their scores, scaled to [0, 1] per leg.
+    A hit missing from a leg scores 0 for that leg.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for hits, weight in zip(legs, weights):
+        if not hits:
+            continue
+        scores = [hit["_score"] for hit in hits]
+        low, high = min(scores), max(scores)
+        spread = high - low
+        for hit in hits:
+            normalised = (hit["_score"] - low) / spread if spread else 1.0
+            entry = fused.setdefault(hit["_id"], {**hit, "_score": 0.0})
+            entry["_score"] += weight * normalised
+    return sorted(fused.values(), key=lambda hit: hit["_score"], reverse=True)
+
+
+class HybridRetriever:
+    def __init__(self, client, index_name: str, config: Optional[HybridConfig] = None):
+        """
+        args:
+            client: OpenSearch client, or any object with the same msearch method
+            index_name (str): index to search
+            config (HybridConfig): fusion settings
+        """
+        self.client = client
+        self.index_name = index_name
+        self.config = config or HybridConfig()
+
+    def search(self, query: str, query_vector: List[float], k: int) -> List[Dict[str, Any]]:
+        """
+        Top k hits of the fused lexical and vector legs
+        """
+        config = self.config
+        lexical_depth = config.lexical_depth or 4 * k
+        vector_depth = config.vector_depth or 4 * k
+        header = {"index": self.index_name}
+        response = self.client.msearch(body=[
+            header, lexical_query(query, lexical_depth, config),
+            header, vector_query(query_vector, vector_depth, config),
+        ])
+        legs = []
+        for result in response["responses"]:
+            if "error" in result:
+                raise RuntimeError(f"Search failed: {result['error']}")
+            legs.append(result["hits"]["hits"])
+
+        weights = [config.lexical_weight, config.vector_weight]
+        if config.fusion == "rrf":
+            fused = reciprocal_rank_fusion(legs, weights, config.rrf_k)
+        else:
+            fused = min_max_fusion(legs, weights)
+        return fused[:k]
@@ -0,0 +1,148 @@
+"""In-process stand-in for an OpenSearch index, for offline evaluation
+
+Supports the subset of the query DSL used by the retrieval lambda:
+    match             BM25 over the text field
+    bool              must (match), filter (term) and should clauses
+    knn               exact inner product search, with an optional bool filter
+    script_score      with "_score" as the script source
+and the search / msearch client methods. kNN scores follow the innerproduct
+space of the faiss engine, so that scales match a real index.
+"""
+import math
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+
+class InMemoryIndex:
+    def __init__(self, documents: List[Dict[str, Any]], text_field: str = "text",
+                 vector_field: str = "embedding", k1: float = 1.2, b: float = 0.75,
+                 latency: float = 0.0):
+        """
+        args:
+            documents (list): documents with an "_id", the text field and the vector field
+            latency (float): simulated network round-trip per request in seconds
+        """
+        self.documents = {doc["_id"]: doc for doc in documents}
+        self.ids = list(self.documents)
+        self.text_field = text_field
+        self.vector_field = vector_field
+        self.k1 = k1
+        self.b = b
+        self.latency = latency
+        self.requests = 0
+        self.vectors = np.array([self.documents[i][vector_field] for i in self.ids], dtype=np.float32)
+        self.term_freqs = [Counter(tokenize(self.documents[i][text_field])) for i in self.ids]
+        self.lengths = np.array([sum(tf.values()) for tf in self.term_freqs], dtype=np.float32)
+        self.avg_length = float(self.lengths.mean()) if len(self.lengths) else 0.0
+        doc_freq = Counter(term for tf in self.term_freqs for term in tf)
+        n = len(self.ids)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    # --- scoring ---
+
+    def _bm25(self, query: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        terms = tokenize(query)
+        for pos, tf in enumerate(self.term_freqs):
+            score = 0.0
+            for term in terms:
+                f = tf.get(term)
+                if f:
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[pos] / self.avg_length)
+                    score += self.idf[term] * f * (self.k1 + 1) / (f + norm)
+            if score > 0:
+                scores[pos] = score
+        return scores
+
+    def _knn(self, knn: Dict[str, Any]) -> Dict[int, float]:
+        allowed = self._filter(knn.get("filter"))
+        similarity = self.vectors @ np.asarray(knn["vector"], dtype=np.float32)
+        # faiss innerproduct space: 1 / (1 - ip) for negative ip, ip + 1 otherwise
+        scores = np.where(similarity < 0, 1 / (1 - similarity), similarity + 1)
+        candidates = [pos for pos in np.argsort(-scores) if allowed is None or pos in allowed]
+        return {int(pos): float(scores[pos]) for pos in candidates[:knn["k"]]}
+
+    def _matches_term(self, pos: int, clause: Dict[str, Any]) -> bool:
+        kind, spec = next(iter(clause.items()))
+        doc = self.documents[self.ids[pos]]
+        if kind == "term":
+            field, value = next(iter(spec.items()))
+            value = value["value"] if isinstance(value, dict) else value
+            return doc.get(field) == value
+        if kind == "terms":
+            field, values = next(iter(spec.items()))
+            return doc.get(field) in values
+        if kind == "bool":
+            return all(self._matches_term(pos, c) for c in spec.get("filter", []) + spec.get("must", []))
+        raise ValueError(f"Unsupported filter clause {kind}")
+
+    def _filter(self, clause: Optional[Dict[str, Any]]) -> Optional[set]:
+        if not clause:
+            return None
+        return {pos for pos in range(len(self.ids)) if self._matches_term(pos, clause)}
+
+    def _score(self, query: Dict[str, Any]) -> Dict[int, float]:
+        kind, spec = next(iter(query.items()))
+        if kind == "match":
+            _, text = next(iter(spec.items()))
+            return self._bm25(text["query"] if isinstance(text, dict) else text)
+        if kind == "knn":
+            _, knn = next(iter(spec.items()))
+            return self._knn(knn)
+        if kind == "script_score":
+            return self._score(spec["query"])
+        if kind == "bool":
+            scores: Dict[int, float] = {}
+            musts = [self._score(c) for c in spec.get("must", [])]
+            shoulds = [self._score(c) for c in spec.get("should", [])]
+            if musts:
+                scores = {pos: sum(m[pos] for m in musts) for pos in set.intersection(*[set(m) for m in musts])}
+                for should in shoulds:
+                    for pos in scores:
+                        scores[pos] += should.get(pos, 0.0)
+            else:
+                for should in shoulds:
+                    for pos, score in should.items():
+                        scores[pos] = scores.get(pos, 0.0) + score
+            allowed = self._filter({"bool": {"filter": spec.get("filter", [])}}) if spec.get("filter") else None
+            if allowed is not None:
+                scores = {pos: s for pos, s in scores.items() if pos in allowed}
+            return scores
+        raise ValueError(f"Unsupported query clause {kind}")
+
+    # --- client API ---
+
+    def _search(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        scores = self._score(body["query"])
+        size = body.get("size", 10)
+        excludes = set(body.get("_source", {}).get("excludes", []))
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:size]
+        hits = []
+        for pos, score in ranked:
+            doc = self.documents[self.ids[pos]]
+            source = {k: v for k, v in doc.items() if k != "_id" and k not in excludes}
+            hits.append({"_id": doc["_id"], "_score": score, "_source": source})
+        return {"hits": {"total": {"value": len(scores)}, "hits": hits}}
+
+    def search(self, body: Dict[str, Any], index: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._search(body)
+
+    def msearch(self, body: List[Dict[str, Any]], index: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        # body alternates header and search body
+        return {"responses": [self._search(search) for search in body[1::2]]}
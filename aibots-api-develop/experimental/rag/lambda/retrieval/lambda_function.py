@@ -1,87 +1,100 @@
+import json
+
 from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
 import boto3
 
-class FileIndexer:
-    def __init__(self, host, index_name):
-        """Upload files"""
-        # Initialize index
-        self.index_name = index_name
-        region = 'ap-southeast-1'  
-        service = 'aoss'
-        credentials = boto3.Session().get_credentials()
-        self.auth = AWSV4SignerAuth(credentials, region, service)
+from hybrid import HybridConfig, HybridRetriever
 
+# One signed client per host, reused across warm invocations
+_clients = {}
 
-        # create an opensearch client and use the request-signer
-        self.client = OpenSearch(
+
+def get_client(host, region='ap-southeast-1', service='aoss'):
+    if host not in _clients:
+        credentials = boto3.Session().get_credentials()
+        auth = AWSV4SignerAuth(credentials, region, service)
+        _clients[host] = OpenSearch(
             hosts=[{'host': host, 'port': 443}],
-            http_auth=self.auth,
+            http_auth=auth,
             use_ssl=True,
             verify_certs=True,
             connection_class=RequestsHttpConnection,
             pool_maxsize=20,
             timeout = 10
         )
-    def query(self, query, query_vector, k):
-        # Hybrid search
-        payload = {
-            "query": {
-                "bool": {
-                    "should": [
-                        {
-                            "script_score": {
-                                "query": {
-                                    "match": {
-                                        "text": query
-                                    }
-                                },
-                                "script": {
-                                    "source": "_score"
-                                }
-                            }
-                        },
-                        {
-                            "knn": {
-                                "embedding": {
-                                    "vector": query_vector,
-                                    "k": k
-                                    }
-                                }
-                        }
-                    ]
-                }
-            }
-        }
+    return _clients[host]
+
 
-        docs =  self.client.search(body=payload, index=self.index_name)
+class FileIndexer:
+    def __init__(self, host, index_name, client=None):
+        """Upload files"""
+        # Initialize index
+        self.index_name = index_name
+        # create an opensearch client and use the request-signer
+        self.client = client or get_client(host)
+
+    def query(self, query, query_vector, k, config=None):
+        """
+        Hybrid search, the BM25 and kNN legs are searched separately and fused
+        args:
+            query (str): query text for the BM25 leg
+            query_vector (list): query embedding for the kNN leg
+            k (int): number of hits to return
+            config (HybridConfig): fusion, weights, per-leg depth and filters
+        """
+        retriever = HybridRetriever(self.client, self.index_name, config)
+        return retriever.search(query, query_vector, k)
+
+
+def _parse_config(params):
+    kwargs = {}
+    if params.get("fusion"):
+        kwargs["fusion"] = params["fusion"]
+    for name in ("lexical_weight", "vector_weight"):
+        if params.get(name) is not None:
+            kwargs[name] = float(params[name])
+    for name in ("rrf_k", "lexical_depth", "vector_depth"):
+        if params.get(name) is not None:
+            kwargs[name] = int(params[name])
+    if params.get("filters"):
+        filters = params["filters"]
+        kwargs["filters"] = json.loads(filters) if isinstance(filters, str) else filters
+    # Validated by HybridConfig.__post_init__
+    return HybridConfig(**kwargs)
 
-        return docs['hits']['hits']
-    
 
 def lambda_handler(event, context):
     """
     for record in event['Records']:
         # Get the SQS message
         message = json.loads(record['body'])
-        
+
         # Extract bucket name and file key from the message
         bucket_name = message['Records'][0]['s3']['bucket']['name']
         file_key = message['Records'][0]['s3']['object']['key']
     """
-        
-    query = event["queryStringParameters"]["query"] # TODO: To format based on message structure
-    host = event["queryStringParameters"]["host"]# TODO: To format based on message structure
-    index_name = event["queryStringParameters"]["index_name"]# TODO: To format based on message structure
-    embedding = event["queryStringParameters"]["embedding"]# TODO: To format based on message structure
-    k =  event["queryStringParameters"]["k"]# TODO: To format based on message structure
+    params = event["queryStringParameters"]
+    query = params["query"] # TODO: To format based on message structure
+    host = params["host"]# TODO: To format based on message structure
+    index_name = params["index_name"]# TODO: To format based on message structure
+    embedding = params["embedding"]# TODO: To format based on message structure
+    k = params["k"]# TODO: To format based on message structure
+
+    # Query string parameters arrive as strings
+    if isinstance(embedding, str):
+        embedding = json.loads(embedding)
+    k = int(k)
 
     fileindexer = FileIndexer(host, index_name)
-    fileindexer.query(query, embedding, k)
-    
+    hits = fileindexer.query(query, embedding, k, _parse_config(params))
+
     return {
         'statusCode': 200,
-        'body': 'success',
+        'body': json.dumps([
+            {'id': hit['_id'], 'score': hit['_score'], **hit.get('_source', {})}
+            for hit in hits
+        ]),
         'headers': {
             'Content-Type': 'application/json',
         }
-    }
\ No newline at end of file
+    }
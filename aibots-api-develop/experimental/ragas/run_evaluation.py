@@ -0,0 +1,72 @@
+"""Batch evaluation of question/answer/context samples
+
+Samples are read from a JSON list (or JSON lines) of objects with the keys
+question, answer, context and optionally ground_truth. LLM calls run
+concurrently under a shared rate limit. Every call and every finished sample
+is checkpointed, so re-running with the same checkpoint only evaluates what
+is missing.
+
+Usage:
+    python run_evaluation.py samples.json --checkpoint data/eval.jsonl
+    python run_evaluation.py samples.json --fake --latency 0.2   # offline, no API calls
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from src.evaluator.engine import EvaluationEngine
+from src.evaluator.pipeline import Evaluator
+
+
+def read_samples(path):
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+async def evaluate(args):
+    engine = EvaluationEngine(args.checkpoint, requests_per_minute=args.rpm, max_concurrency=args.concurrency)
+    if args.fake:
+        from src.openai.fake_completor import FakeCompletor
+        evaluator = Evaluator(FakeCompletor(args.latency), FakeCompletor(args.latency, use_json=True), engine)
+    else:
+        evaluator = Evaluator(engine=engine)
+
+    samples = read_samples(args.samples)
+    start = time.perf_counter()
+    try:
+        await evaluator.run_multiple(samples, max_samples=args.max_samples)
+    finally:
+        engine.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"Samples:            {len(samples)}")
+    print(f"Faithfulness:       {evaluator.faithfulness:.3f}")
+    print(f"Answer relevance:   {evaluator.answer_relevance:.3f}")
+    print(f"Context relevance:  {evaluator.context_relevance:.3f}")
+    if evaluator.answer_correctness is not None:
+        print(f"Answer correctness: {evaluator.answer_correctness:.3f}")
+    print(f"LLM calls: {engine.calls}, cache hits: {engine.cache.hits}, elapsed: {elapsed:.1f}s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(evaluator.results, f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("samples")
+    parser.add_argument("--checkpoint", default=None, help="JSON lines file to checkpoint to and resume from")
+    parser.add_argument("--output", default=None, help="write per-sample scores and breakdowns as JSON")
+    parser.add_argument("--rpm", type=int, default=300, help="maximum LLM requests per minute")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum LLM requests in flight")
+    parser.add_argument("--max-samples", type=int, default=16, help="maximum samples evaluated at once")
+    parser.add_argument("--fake", action="store_true", help="use the deterministic offline completor")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated latency of the fake completor")
+    asyncio.run(evaluate(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+
+def make_key(*parts):
+    """
+    Stable hash of the given parts, used for cache keys
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute = 300, max_concurrency = 8):
+        """
+        Caps the number of in-flight LLM calls and spaces call starts evenly
+        args:
+            requests_per_minute (int): maximum call starts per minute, None for no limit
+            max_concurrency (int): maximum number of calls in flight
+        """
+        self.interval = 60 / requests_per_minute if requests_per_minute else 0
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.interval:
+            async with self._lock:
+                now = time.monotonic()
+                wait = self._next_start - now
+                self._next_start = max(now, self._next_start) + self.interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+class EvaluationCache:
+    def __init__(self, path = None):
+        """
+        Cache of LLM responses and sample results, checkpointed to disk
+        Each entry is appended to a JSON lines file as soon as it is computed, so
+        a crashed run loses at most the calls that were in flight. A truncated
+        last line is ignored when the file is loaded.
+        args:
+            path (str): checkpoint file, None to keep the cache in memory only
+        """
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.entries[entry["key"]] = entry["value"]
+        self._file = None
+
+    def get(self, key):
+        if key in self.entries:
+            self.hits += 1
+            return True, self.entries[key]
+        self.misses += 1
+        return False, None
+
+    def put(self, key, value):
+        self.entries[key] = value
+        if self.path:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+                # Start on a fresh line if the previous run stopped mid-write
+                if self._ends_mid_line():
+                    self._file.write("\n")
+            self._file.write(json.dumps({"key": key, "value": value}) + "\n")
+            self._file.flush()
+
+    def _ends_mid_line(self):
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class CachedCompletor:
+    def __init__(self, engine, completor, metric, sample_key):
+        """
+        Drop-in replacement for ChatCompletor used by the metric functions
+        Calls are rate limited and cached under (metric, prompt, sample).
+        """
+        self.engine = engine
+        self.completor = completor
+        self.metric = metric
+        self.sample_key = sample_key
+        self.json = getattr(completor, "json", False)
+
+    async def _call(self, kind, text, func):
+        key = make_key(self.metric, kind, self.json, text, self.sample_key)
+        found, value = self.engine.cache.get(key)
+        if found:
+            return value
+        async with self.engine.limiter:
+            value = await func(text)
+        self.engine.calls += 1
+        self.engine.cache.put(key, value)
+        return value
+
+    async def open_ai_chat_completion(self, prompt):
+        return await self._call("chat", prompt, self.completor.open_ai_chat_completion)
+
+    async def create_embeddings(self, text):
+        return await self._call("embedding", text, self.completor.create_embeddings)
+
+
+class EvaluationEngine:
+    def __init__(self, checkpoint_path = None, requests_per_minute = 300, max_concurrency = 8):
+        """
+        Shared rate limit and cache for concurrent evaluation runs
+        args:
+            checkpoint_path (str): JSON lines file to checkpoint to and resume from
+            requests_per_minute (int): maximum LLM call starts per minute
+            max_concurrency (int): maximum number of LLM calls in flight
+        """
+        self.cache = EvaluationCache(checkpoint_path)
+        self.limiter = RateLimiter(requests_per_minute, max_concurrency)
+        self.calls = 0
+
+    def bind(self, completor, metric, sample_key):
+        """
+        Wrap a completor so that its calls are attributed to the metric and sample
+        """
+        return CachedCompletor(self, completor, metric, sample_key)
+
+    def get_result(self, sample_key):
+        return self.cache.get(make_key("sample", sample_key))
+
+    def put_result(self, sample_key, result):
+        self.cache.put(make_key("sample", sample_key), result)
+
+    def close(self):
+        self.cache.close()
@@ -4,6 +4,7 @@ import nltk
 nltk.download('punkt')
 import numpy as np
 import ast
+import asyncio
 
 #from sklearn.metrics.pairwise import cosine_similarity
 #from dotenv import load_dotenv
@@ -37,14 +38,10 @@ async def faithfulness(claims_list, context, completor):
     ChangeLOG: 
     1) changed question to instruction.
     2) Added let's think step by step instead of provision of an explantion
+    3) Verify claims concurrently, score all claims rather than only the first
     """
-    score = 0
-    breakdown = []
-    claim_length = 0
-    for claim in claims_list:
-        if len(claim)>3:
-            claim_length +=1
-            prompt = f"""The following is a ```context``` to an answer and the ```answer``` for the context.
+    async def verify(claim):
+        prompt = f"""The following is a ```context``` to an answer and the ```answer``` for the context.
             ```claim```: {claim}
 
             ```context```: {context}
@@ -54,11 +51,16 @@ async def faithfulness(claims_list, context, completor):
             If yes, output "yes". If no, output "no". You must strictly output yes or no only.
             Do not output any preamble or explanation.
             """
-            pred = await completor.open_ai_chat_completion(prompt)
-            binary_pred = 0 if pred.lower() == "no" else 1
-            score += binary_pred
-            breakdown.append({'context': context, 'claim': claim, 'score': binary_pred})
-        return score / claim_length, breakdown
+        pred = await completor.open_ai_chat_completion(prompt)
+        binary_pred = 0 if pred.lower() == "no" else 1
+        return {'context': context, 'claim': claim, 'score': binary_pred}
+
+    # Claims are verified concurrently, the completor is responsible for rate limiting
+    breakdown = await asyncio.gather(*[verify(claim) for claim in claims_list if len(claim)>3])
+    if not breakdown:
+        return 0.0, []
+    score = sum(item['score'] for item in breakdown)
+    return score / len(breakdown), list(breakdown)
 
 async def context_relevance(context, instruction, completor):
     """
@@ -90,26 +92,25 @@ async def context_relevance(context, instruction, completor):
 
 async def answer_relevance(instruction, claims_list, completor):
     """
-    ChangeLOG: Refactored full metrics calculation.
+    ChangeLOG: 
+    1) Refactored full metrics calculation.
+    2) Verify claims concurrently
     """
-    score = 0
-    breakdown = []
-    claim_length = 0
-    for claim in claims_list:
-        if len(claim)>3:
-            claim_length +=1
-            prompt = f"""The following is a ```answer``` to an instruction and the ```instruction``` for the answer.
+    async def verify(claim):
+        prompt = f"""The following is a ```answer``` to an instruction and the ```instruction``` for the answer.
             ```answer```: {claim}
             ```instruction```: {instruction}
 
             Let's think step by step. Determine if the answer may be relevant to any part of the instruction. The answer is part of a more comphrehensive answer; If it is an introduction, elaboration or conclusion to the instruction, it is considered relevant.
             If yes, output "yes". If no, output "no". Strictly output yes or no. Do not output any preamble or explanation.
             """
-            pred = await completor.open_ai_chat_completion(prompt)
-            num_pred = 0 if pred == "no" else 1
-            score += num_pred
-            breakdown.append({'prompt': instruction, 'claim': claim, 'score': num_pred})
-    return score/(claim_length+0.000001), breakdown
+        pred = await completor.open_ai_chat_completion(prompt)
+        num_pred = 0 if pred == "no" else 1
+        return {'prompt': instruction, 'claim': claim, 'score': num_pred}
+
+    breakdown = await asyncio.gather(*[verify(claim) for claim in claims_list if len(claim)>3])
+    score = sum(item['score'] for item in breakdown)
+    return score/(len(breakdown)+0.000001), list(breakdown)
 
 '''
 async def context_relevance(context, instruction, completor):
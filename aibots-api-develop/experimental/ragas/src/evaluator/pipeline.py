@@ -1,45 +1,80 @@
 from src.evaluator.evaluator import *
+from src.evaluator.engine import EvaluationEngine, make_key
+import asyncio
 import numpy as np
 from src.openai.completor import ChatCompletor
 
 class Evaluator:
-    def __init__(self):
-        self.completor = ChatCompletor()
-        self.json_completor = ChatCompletor(use_json = True)
+    def __init__(self, completor = None, json_completor = None, engine = None):
+        """
+        args:
+            completor (ChatCompletor): completor for the metric prompts
+            json_completor (ChatCompletor): completor in JSON mode for answer correctness
+            engine (EvaluationEngine): shared rate limit, cache and checkpoint, in memory by default
+        """
+        self.completor = completor or ChatCompletor()
+        self.json_completor = json_completor or ChatCompletor(use_json = True)
+        self.engine = engine or EvaluationEngine()
         self.faithfulness = 0
         self.answer_relevance = 0
         self.context_relevance = 0
 
     async def run_pipeline(self, instruction, answer, context, ground_truth = None):
-        claims_list = await claim_breakdown(answer, self.completor)
-        # Faithfulness
-        f_score, f_score_breakdown = await faithfulness(claims_list, context, self.completor)
-
-        # Answer relevance
-        a_score, a_score_breakdown = await answer_relevance(instruction, claims_list, self.completor)
-        
-        # Context relevance
-        c_score, c_score_breakdown = await context_relevance(context, instruction, self.completor)
-        
+        sample_key = make_key(instruction, answer, context, ground_truth)
+        bind = lambda completor, metric: self.engine.bind(completor, metric, sample_key)
+
+        claims_list = await claim_breakdown(answer, bind(self.completor, "claims"))
+
+        # Faithfulness, answer relevance, context relevance and answer correctness are independent
+        tasks = [
+            faithfulness(claims_list, context, bind(self.completor, "faithfulness")),
+            answer_relevance(instruction, claims_list, bind(self.completor, "answer_relevance")),
+            context_relevance(context, instruction, bind(self.completor, "context_relevance")),
+        ]
+        if ground_truth:
+            tasks.append(answer_correctness(answer, ground_truth, bind(self.json_completor, "answer_correctness")))
+        results = await asyncio.gather(*tasks)
+        (f_score, f_score_breakdown), (a_score, a_score_breakdown), (c_score, c_score_breakdown) = results[:3]
+
         if ground_truth:
-            a_corr, a_corr_breakdown = await answer_correctness(answer, ground_truth, self.json_completor)
+            a_corr, a_corr_breakdown = results[3]
         else:
             a_corr = None
             a_corr_breakdown = None
         return f_score, a_score, c_score, a_corr, [f_score_breakdown, a_score_breakdown, c_score_breakdown, a_corr_breakdown]
-    
-    async def run_multiple(self, data_dict):
-        # Initialize lists
-        self.f_scores = []
-        self.a_scores = []
-        self.c_scores = []
+
+    async def run_sample(self, data):
+        """
+        Evaluate one sample, reusing its checkpointed result if there is one
+        """
+        ground_truth = data.get('ground_truth')
+        sample_key = make_key(data['question'], data['answer'], data['context'], ground_truth)
+        found, result = self.engine.get_result(sample_key)
+        if not found:
+            result = await self.run_pipeline(data['question'], data['answer'], data['context'], ground_truth = ground_truth)
+            result = [None if score is None else float(score) for score in result[:4]] + [result[4]]
+            self.engine.put_result(sample_key, result)
+        return result
+
+    async def run_multiple(self, data_dict, max_samples = 16):
+        """
+        Evaluate samples concurrently, at most `max_samples` at a time
+        LLM calls across all samples share the engine's rate limit.
+        """
+        semaphore = asyncio.Semaphore(max_samples)
+
+        async def run(data):
+            async with semaphore:
+                return await self.run_sample(data)
 
         # Run pipeline
-        for data in data_dict:
-            f_score, a_score, c_score = await self.run_pipeline(data['question'], data['answer'], data['context'])
-            self.f_scores.append(f_score)
-            self.a_scores.append(a_score)
-            self.c_scores.append(c_score)
+        self.results = await asyncio.gather(*[run(data) for data in data_dict])
+        self.f_scores = [result[0] for result in self.results]
+        self.a_scores = [result[1] for result in self.results]
+        self.c_scores = [result[2] for result in self.results]
+        self.a_corrs = [result[3] for result in self.results if result[3] is not None]
         self.faithfulness = np.mean(self.f_scores)
         self.answer_relevance = np.mean(self.a_scores)
-        self.context_relevance = np.mean(self.c_score)
\ No newline at end of file
+        self.context_relevance = np.mean(self.c_scores)
+        self.answer_correctness = np.mean(self.a_corrs) if self.a_corrs else None
+        return self.results
@@ -0,0 +1,60 @@
+import asyncio
+import hashlib
+import json
+import re
+
+import numpy as np
+
+
+class FakeCompletor:
+    def __init__(self, latency = 0.0, emb_dim = 1536, use_json = False):
+        """
+        Deterministic stand-in for ChatCompletor, for running the evaluator offline
+        Responses depend only on the prompt, in the formats the metric functions parse.
+        args:
+            latency (float): simulated round-trip time per call in seconds
+            emb_dim (int): size of the returned embeddings
+            use_json (bool): answer as the JSON completor used for answer correctness
+        """
+        self.latency = latency
+        self.emb_dim = emb_dim
+        self.json = use_json
+        self.calls = 0
+
+    @staticmethod
+    def _seed(text):
+        return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+    @staticmethod
+    def _quoted(prompt, label):
+        # Text between the triple backticks after `label`, e.g. answer: ```...```
+        match = re.search(label + r":\s*```(.*?)```", prompt, re.DOTALL)
+        return match.group(1).strip() if match else ""
+
+    @staticmethod
+    def _sentences(text):
+        return [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()]
+
+    async def open_ai_chat_completion(self, prompt, system_prompt = None):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.json:
+            sentences = self._sentences(prompt.split("### PREDICTED ANSWER:")[-1].split("### GROUND TRUTH:")[0])
+            return json.dumps({"TP": sentences[::2], "FP": sentences[1::2], "FN": []})
+        if '";;;"' in prompt:
+            return ";;;".join(self._sentences(self._quoted(prompt, "answer")))
+        if "extract relevant sentences" in prompt:
+            sentences = self._sentences(self._quoted(prompt, "context"))
+            return " ".join(sentences[::2]) if sentences else "Insufficient Information"
+        if "Generate a question" in prompt:
+            return "What is " + prompt.split("```answer```:")[-1].strip().split("\n")[0][:40] + "?"
+        # Verdict prompts, roughly three in four claims are accepted
+        return "no" if self._seed(prompt) % 4 == 0 else "yes"
+
+    async def create_embeddings(self, text):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        rng = np.random.default_rng(self._seed(text.replace("\n", " ")))
+        return rng.standard_normal(self.emb_dim).tolist()
@@ -0,0 +1,17 @@
+import re
+
+import nltk
+import pytest
+
+# The evaluator downloads punkt when it is imported, the tests split sentences without it
+nltk.download = lambda *args, **kwargs: True
+
+
+def split_sentences(text):
+    return [s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s]
+
+
+@pytest.fixture(autouse=True)
+def no_punkt(monkeypatch):
+    import src.evaluator.evaluator as evaluator
+    monkeypatch.setattr(evaluator, "sent_tokenize", split_sentences)
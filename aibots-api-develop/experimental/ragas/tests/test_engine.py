@@ -0,0 +1,80 @@
+import asyncio
+import json
+import time
+
+from src.evaluator.engine import EvaluationCache, EvaluationEngine, RateLimiter, make_key
+
+
+class CountingCompletor:
+    def __init__(self):
+        self.calls = 0
+        self.json = False
+
+    async def open_ai_chat_completion(self, prompt, system_prompt = None):
+        self.calls += 1
+        return f"answer to {prompt}"
+
+
+def test_make_key_is_stable_and_distinguishes_parts():
+    assert make_key("a", {"b": 1, "c": 2}) == make_key("a", {"c": 2, "b": 1})
+    assert make_key("ab", "c") != make_key("a", "bc")
+
+
+def test_calls_are_cached_per_metric_and_sample():
+    engine = EvaluationEngine(requests_per_minute=None)
+    completor = CountingCompletor()
+
+    async def main():
+        first = engine.bind(completor, "faithfulness", "sample-1")
+        await first.open_ai_chat_completion("prompt")
+        await first.open_ai_chat_completion("prompt")
+        await engine.bind(completor, "faithfulness", "sample-2").open_ai_chat_completion("prompt")
+        await engine.bind(completor, "answer_relevance", "sample-1").open_ai_chat_completion("prompt")
+
+    asyncio.run(main())
+    assert completor.calls == 3
+    assert engine.calls == 3
+    assert engine.cache.hits == 1
+
+
+def test_checkpoint_is_resumed(tmp_path):
+    path = str(tmp_path / "eval.jsonl")
+    engine = EvaluationEngine(path, requests_per_minute=None)
+    engine.put_result("sample", [1.0, 0.5, 0.25, None, []])
+    engine.close()
+    # A run that crashed mid-write leaves a truncated line
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "trunc')
+
+    resumed = EvaluationEngine(path, requests_per_minute=None)
+    assert resumed.get_result("sample") == (True, [1.0, 0.5, 0.25, None, []])
+    resumed.put_result("other", [0.0])
+    resumed.close()
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert json.loads(lines[-1])["value"] == [0.0]
+
+
+def test_cache_in_memory_only():
+    cache = EvaluationCache()
+    assert cache.get("missing") == (False, None)
+    cache.put("key", "value")
+    assert cache.get("key") == (True, "value")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_rate_limiter_spaces_call_starts():
+    limiter = RateLimiter(requests_per_minute=600, max_concurrency=4)
+    starts = []
+
+    async def call():
+        async with limiter:
+            starts.append(time.monotonic())
+
+    async def main():
+        await asyncio.gather(*[call() for _ in range(4)])
+
+    asyncio.run(main())
+    starts.sort()
+    # 600 per minute is one start every 0.1 s
+    assert starts[-1] - starts[0] >= 0.25
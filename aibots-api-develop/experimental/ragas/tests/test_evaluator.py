@@ -0,0 +1,37 @@
+import asyncio
+
+from src.evaluator.evaluator import answer_relevance, faithfulness
+
+
+class VerdictCompletor:
+    def __init__(self, verdict):
+        self.verdict = verdict
+        self.calls = 0
+
+    async def open_ai_chat_completion(self, prompt, system_prompt = None):
+        self.calls += 1
+        return self.verdict
+
+
+def test_faithfulness_perfect_score_is_exactly_one():
+    score, breakdown = asyncio.run(faithfulness(["The sky is blue", "Grass is green"], "context", VerdictCompletor("yes")))
+    assert score == 1.0
+    assert [item['claim'] for item in breakdown] == ["The sky is blue", "Grass is green"]
+
+
+def test_faithfulness_scores_every_claim():
+    score, _ = asyncio.run(faithfulness(["The sky is blue", "Grass is green"], "context", VerdictCompletor("No")))
+    assert score == 0.0
+
+
+def test_faithfulness_without_claims():
+    completor = VerdictCompletor("yes")
+    assert asyncio.run(faithfulness(["", "ok"], "context", completor)) == (0.0, [])
+    assert completor.calls == 0
+
+
+def test_answer_relevance_checks_claims_concurrently():
+    completor = VerdictCompletor("yes")
+    score, breakdown = asyncio.run(answer_relevance("instruction", ["First claim", "Second claim"], completor))
+    assert round(score, 4) == 1.0
+    assert len(breakdown) == 2 and completor.calls == 2
@@ -0,0 +1,51 @@
+import asyncio
+
+from src.evaluator.engine import EvaluationEngine
+from src.evaluator.pipeline import Evaluator
+from src.openai.fake_completor import FakeCompletor
+
+SAMPLES = [
+    {
+        "question": "What colour is the sky?",
+        "answer": "The sky is blue. It looks grey when it rains.",
+        "context": "The sky is blue on a clear day. Clouds make it grey. Rain falls from clouds.",
+        "ground_truth": "The sky is blue.",
+    },
+    {
+        "question": "What colour is grass?",
+        "answer": "Grass is green.",
+        "context": "Grass is green. It grows in fields.",
+    },
+]
+
+
+def make_evaluator(engine):
+    return Evaluator(FakeCompletor(), FakeCompletor(use_json=True), engine)
+
+
+def test_run_multiple_scores_every_sample():
+    evaluator = make_evaluator(EvaluationEngine(requests_per_minute=None))
+    results = asyncio.run(evaluator.run_multiple(SAMPLES))
+
+    assert len(results) == 2
+    for f_score, a_score, c_score, _, breakdowns in results:
+        assert 0.0 <= f_score <= 1.0
+        assert 0.0 <= a_score <= 1.0
+        assert 0.0 <= c_score <= 1.0
+        assert len(breakdowns) == 4
+    assert results[0][3] is not None
+    assert results[1][3] is None
+    assert evaluator.answer_correctness == results[0][3]
+
+
+def test_resumed_run_makes_no_llm_calls(tmp_path):
+    path = str(tmp_path / "eval.jsonl")
+    engine = EvaluationEngine(path, requests_per_minute=None)
+    first = asyncio.run(make_evaluator(engine).run_multiple(SAMPLES))
+    engine.close()
+
+    resumed = EvaluationEngine(path, requests_per_minute=None)
+    evaluator = make_evaluator(resumed)
+    second = asyncio.run(evaluator.run_multiple(SAMPLES))
+    assert second == first
+    assert evaluator.completor.calls == 0 and resumed.calls == 0
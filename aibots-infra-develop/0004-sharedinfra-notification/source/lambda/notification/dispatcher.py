@@ -0,0 +1,226 @@
+import json
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import logging
+logging.getLogger().setLevel(logging.INFO)
+
+################################################################################
+# # Slack truncates "text" above 40,000 characters. Digests are kept well below
+# # that so that they stay readable and leave room for the header line.
+################################################################################
+DIGEST_MAX_CHARS = 12000
+# Slack incoming webhooks allow about one post per second per webhook
+POST_INTERVAL = 1.0
+# retries on 429 and 5xx, honouring Retry-After
+MAX_RETRIES = 3
+# seconds kept in hand before the lambda timeout, unsent records are failed instead
+DEADLINE_MARGIN = 5.0
+# groups posted at the same time
+MAX_WORKERS = 8
+
+SEPARATOR = '\n' + '-' * 40 + '\n'
+
+################################################################################
+def format_text( message ):
+  """Formats a message the same way as send_notification"""
+  if isinstance( message, dict ):
+    # sorted the json by the items, dump it with nice 2 indentation for posting
+    return json.dumps( dict( sorted( message.items() ) ), indent = 2 )
+
+  if isinstance( message, str ):
+    return message
+
+  return 'unhandled message: {} of type: {}'.format( message, type( message ) )
+
+################################################################################
+def split_text( text, max_chars ):
+  """Splits text longer than max_chars on line boundaries, or hard if a line is too long"""
+  if len( text ) <= max_chars:
+    return [ text ]
+
+  pieces, current = [], ''
+  for line in text.splitlines( keepends = True ):
+    while len( line ) > max_chars:
+      if current:
+        pieces.append( current )
+        current = ''
+      pieces.append( line[ :max_chars ] )
+      line = line[ max_chars: ]
+    if len( current ) + len( line ) > max_chars:
+      pieces.append( current )
+      current = ''
+    current += line
+  if current:
+    pieces.append( current )
+  return pieces
+
+################################################################################
+def pack_digests( entries, max_chars ):
+  """Packs (record_id, text) entries into digests of at most max_chars
+
+  Returns:
+    list: of (record_ids, text), every record is in the digests holding its text
+
+  """
+  digests = []
+  ids, texts, size = [], [], 0
+  for record_id, text in entries:
+    for piece in split_text( text, max_chars ):
+      if texts and size + len( SEPARATOR ) + len( piece ) > max_chars:
+        digests.append( ( ids, SEPARATOR.join( texts ) ) )
+        ids, texts, size = [], [], 0
+      if record_id not in ids:
+        ids.append( record_id )
+      size += ( len( SEPARATOR ) if texts else 0 ) + len( piece )
+      texts.append( piece )
+  if texts:
+    digests.append( ( ids, SEPARATOR.join( texts ) ) )
+  return digests
+
+################################################################################
+class Dispatcher:
+  """Groups notifications by destination and posts them as digests
+
+  Records added during an invocation are grouped by (url, channel). Each
+  group is posted as few digests as the size limit allows, with up to
+  max_workers groups posted in parallel. Posts are paced per webhook url, not
+  per group, so channels sharing a webhook and reposts to the default channel
+  still go out at most once per interval. A digest that cannot be delivered
+  is reposted to the default channel, as send_notification does; records
+  whose digests are lost both ways are reported by flush.
+
+  Args:
+    default_notification (dict): notification_url and notification_channel of the default channel
+    http (PoolManager): urllib3 pool, or anything with the same request method
+    max_chars (int): size limit of a digest text
+    interval (float): seconds between posts to the same webhook
+    max_retries (int): retries on 429 and 5xx
+    deadline (float): time.monotonic() after which nothing more is posted
+    max_workers (int): groups posted at the same time
+  """
+
+  def __init__( self, default_notification, http, max_chars = DIGEST_MAX_CHARS, interval = POST_INTERVAL,
+                max_retries = MAX_RETRIES, deadline = None, max_workers = MAX_WORKERS ):
+    self.default = ( default_notification['notification_url'], default_notification['notification_channel'] )
+    self.http = http
+    self.max_chars = max_chars
+    self.interval = interval
+    self.max_retries = max_retries
+    self.deadline = deadline
+    self.max_workers = max_workers
+    self.groups = {} # (url, channel) >> [ (record_id, text) ]
+    self.next_post = {} # url >> time.monotonic() of its next allowed post
+    self.lock = threading.Lock()
+
+  def add( self, record_id, project_notification, message ):
+    destination = ( project_notification['notification_url'], project_notification['notification_channel'] )
+    self.groups.setdefault( destination, [] ).append( ( record_id, format_text( message ) ) )
+
+  def expired( self ):
+    return self.deadline is not None and time.monotonic() >= self.deadline
+
+  def pace( self, url ):
+    """Waits for the next post slot of a webhook url, across threads
+
+    Returns:
+      bool: False if the slot falls after the deadline, nothing should be posted
+
+    """
+    with self.lock:
+      now = time.monotonic()
+      start = max( now, self.next_post.get( url, 0.0 ) )
+      if self.deadline is not None and start >= self.deadline:
+        return False
+      self.next_post[ url ] = start + self.interval
+    if start > now:
+      time.sleep( start - now )
+    return True
+
+  def post( self, url, channel, text ):
+    """Posts one message, retrying on 429 and 5xx
+
+    Returns:
+      bool: True if the webhook accepted the message
+
+    """
+    # the notify payload
+    encoded_msg = json.dumps( {
+      "channel": channel,
+      "username": "WEBHOOK_USERNAME",
+      "text": text,
+      "icon_emoji" : ""
+    } ).encode('utf-8')
+
+    status = None
+    for attempt in range( self.max_retries + 1 ):
+      if not self.pace( url ):
+        break
+      try:
+        resp = self.http.request( 'POST', url, body = encoded_msg, headers = { 'Content-Type': 'application/json' } )
+        status = resp.status
+      except Exception as e:
+        logging.info( 'error posting to channel: {} >> {}'.format( channel, str(e) ) )
+        status, resp = None, None
+
+      if status == 200:
+        return True
+      if status is not None and status != 429 and status < 500:
+        # 4xx other than 429 will not succeed on a retry
+        break
+
+      wait = self.interval * 2 ** attempt
+      if resp is not None and resp.headers.get( 'Retry-After' ):
+        wait = float( resp.headers['Retry-After'] )
+      if attempt == self.max_retries or ( self.deadline is not None and time.monotonic() + wait >= self.deadline ):
+        break
+      logging.info( 'status_code: {} posting to channel: {}, retrying in {}s.'.format( status, channel, wait ) )
+      time.sleep( wait )
+
+    logging.info( 'status_code: {} after posting to channel: {}'.format( status, channel ) )
+    return False
+
+  def send_group( self, destination, entries ):
+    """Posts the digests of one destination, returns the record ids that were not delivered"""
+    url, channel = destination
+    digests = pack_digests( entries, self.max_chars )
+    failed = []
+    for index, ( record_ids, text ) in enumerate( digests ):
+      if self.expired():
+        logging.error( 'near timeout, {} digests to channel: {} not sent.'.format( len( digests ) - index, channel ) )
+        for ids, _ in digests[ index: ]:
+          failed.extend( ids )
+        break
+
+      if len( digests ) > 1:
+        text = '[{} of {}]\n{}'.format( index + 1, len( digests ), text )
+
+      if self.post( url, channel, text ):
+        continue
+      if destination != self.default:
+        logging.info( 'notify failed, going to repost using default.' )
+        if self.post( *self.default, text ):
+          continue
+      failed.extend( record_ids )
+
+    logging.info( 'sent {} records in {} digests to channel: {}'.format( len( entries ), len( digests ), channel ) )
+    return failed
+
+  def flush( self ):
+    """Sends everything added so far
+
+    Returns:
+      list: record ids that could not be delivered, each listed once
+
+    """
+    groups, self.groups = self.groups, {}
+    if not groups:
+      return []
+
+    workers = max( 1, min( self.max_workers, len( groups ) ) )
+    with ThreadPoolExecutor( max_workers = workers ) as executor:
+      results = executor.map( lambda item: self.send_group( *item ), groups.items() )
+      failed = [ record_id for group_failed in results for record_id in group_failed ]
+    return list( dict.fromkeys( failed ) )
@@ -3,9 +3,10 @@ import gzip
 import base64
 import boto3
 import os
+import time
 
 import urllib3 
-http = urllib3.PoolManager() 
+http = urllib3.PoolManager( maxsize = 10 ) # webhooks share a host, digests to each channel are posted in parallel
 
 import logging
 logging.getLogger().setLevel(logging.INFO)
@@ -14,6 +15,12 @@ ssm_client = boto3.client('ssm')
 default_notification_para = os.environ['DEFAULT_NOTIFICATION']
 default_notification = json.loads( ssm_client.get_parameter( Name=default_notification_para, WithDecryption=True )['Parameter']['Value'] )
 
+from dispatcher import DEADLINE_MARGIN, Dispatcher
+
+# project_code >> ( fetched at, project notification ), kept across warm invocations
+ROUTING_TTL = int( os.environ.get( 'ROUTING_TTL', '300' ) )
+routing_cache = {}
+
 def lambda_handler(event, context):
   logging.info('got event {}'.format( json.dumps(event) ))
 
@@ -26,11 +33,15 @@ def lambda_handler(event, context):
   elif event.get("Records", False):
     # SNS
     if event["Records"][0].get("EventSource", "unknown") == "aws:sns":
-      process_sns( event )
+      process_sns( event, context )
 
     # SQS
     elif event["Records"][0].get("eventSource", "unknown") == "aws:sqs":
-      process_sqs( event )
+      # https://docs.aws.amazon.com/lambda/latest/dg/services-sqs-errorhandling.html#services-sqs-batchfailurereporting
+      # every event source mapping to this function must set function_response_types = [ "ReportBatchItemFailures" ]
+      failed = process_sqs( event, context )
+      logging.info('event ended.')
+      return { "batchItemFailures": [ { "itemIdentifier": message_id } for message_id in failed ] }
 
     else:
       logging.error('unknown source in records.')
@@ -68,52 +79,77 @@ def process_https( event ):
 ################################################################################
 # This is for AWS Cloudwatch Alarm
 ################################################################################
-def process_sqs( event ):
+def process_sqs( event, context = None ):
   logging.info( 'process_sqs activated' )
   # cloudwatch metric monitoring uses SNS.
   # process_sns is a little complicated.
   # while any other services can also SNS, we will not bother with them as they should use the HTTPS endpoint
+  # records are grouped by channel and sent as digests, instead of one post each
+  dispatcher = new_dispatcher( context )
+  failed = []
   for index, record in enumerate(event['Records'], start=1):
     logging.debug( "Processing record {} of {}".format(index, len( event['Records'] ) ) )
-  
-    # load the message as JSON into alarm variable
-    message = json.loads( record['body'] )
-    logging.info('message {}'.format( json.dumps(message) ) )
 
-    # dissecting AlarmName to get project-code
-    # alarm-uatezapp-appraiser-main-web
-    project_code = record['eventSourceARN'].split(':')[-1]
-    project_code = project_code.split('-')[2]
-    logging.info('project_code {}'.format( json.dumps(project_code) ) )
-    
-    project_notification = swap_project_code( project_code )
+    try:
+      # load the message as JSON into alarm variable
+      message = json.loads( record['body'] )
+      logging.info('message {}'.format( json.dumps(message) ) )
+
+      # dissecting AlarmName to get project-code
+      # alarm-uatezapp-appraiser-main-web
+      project_code = record['eventSourceARN'].split(':')[-1]
+      project_code = project_code.split('-')[2]
+      logging.info('project_code {}'.format( json.dumps(project_code) ) )
+
+      project_notification = swap_project_code( project_code )
 
-    resp = send_notification( project_notification['notification_url'], project_notification['notification_channel'], message )
+    except Exception as e:
+      logging.error( 'error processing sqs message {} >> {}'.format( record.get('messageId'), str(e) ) )
+      failed.append( record['messageId'] )
+      continue
+
+    dispatcher.add( record['messageId'], project_notification, message )
+
+  # records that were not delivered are retried by SQS
+  return failed + dispatcher.flush()
 
 
 ################################################################################
 # This is for AWS Cloudwatch Alarm
 ################################################################################
-def process_sns( event ):
+def process_sns( event, context = None ):
   logging.info( 'process_sns activated' )
   # cloudwatch metric monitoring uses SNS.
   # process_sns is a little complicated.
   # while any other services can also SNS, we will not bother with them as they should use the HTTPS endpoint
+  dispatcher = new_dispatcher( context )
   for index, record in enumerate(event['Records'], start=1):
     logging.debug( "Processing record {} of {}".format(index, len( event['Records'] ) ) )
-  
-    # load the message as JSON into alarm variable
-    message = json.loads( record['Sns']['Message'] )
-    logging.info('message {}'.format( json.dumps(message) ) )
 
-    # dissecting AlarmName to get project-code
-    # alarm-uatezapp-appraiser-main-web
-    project_code = message['AlarmName'].split('-')[2]
-    logging.info('project_code {}'.format( json.dumps(project_code) ) )
-    
-    project_notification = swap_project_code( project_code )
+    try:
+      # load the message as JSON into alarm variable
+      message = json.loads( record['Sns']['Message'] )
+      logging.info('message {}'.format( json.dumps(message) ) )
+
+      # dissecting AlarmName to get project-code
+      # alarm-uatezapp-appraiser-main-web
+      project_code = message['AlarmName'].split('-')[2]
+      logging.info('project_code {}'.format( json.dumps(project_code) ) )
+
+      project_notification = swap_project_code( project_code )
 
-    resp = send_notification( project_notification['notification_url'], project_notification['notification_channel'], message )
+    except Exception as e:
+      # raising would lose the records already added, SNS cannot retry a single record
+      logging.error( 'error processing sns message {} >> {}'.format( record['Sns'].get( 'MessageId', index ), str(e) ) )
+      message = record['Sns'].get( 'Message', '' )
+      project_notification = default_notification
+
+    dispatcher.add( record['Sns'].get( 'MessageId', index ), project_notification, message )
+
+  # SNS has no partial batch response, raising lets the async invoke retry the event
+  failed = dispatcher.flush()
+  if failed:
+    raise RuntimeError( '{} sns records not delivered: {}'.format( len( failed ), failed ) )
 
 
 ################################################################################
@@ -206,8 +242,28 @@ def send_notification( url, channel, message ):
   return resp
 
 
+################################################################################
+def new_dispatcher( context = None ):
+  deadline = None
+  if context is not None and hasattr( context, 'get_remaining_time_in_millis' ):
+    deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN
+  return Dispatcher( default_notification, http, deadline = deadline )
+
+
 ################################################################################
 def swap_project_code( project_code ):
+  # the parameter rarely changes, so it is cached for ROUTING_TTL seconds
+  cached = routing_cache.get( project_code )
+  if cached is not None and time.monotonic() - cached[0] < ROUTING_TTL:
+    return cached[1]
+
+  project_notification = get_project_notification( project_code )
+  routing_cache[ project_code ] = ( time.monotonic(), project_notification )
+  return project_notification
+
+
+################################################################################
+def get_project_notification( project_code ):
   # trying to get the para for project_code
   project_para = default_notification_para.split('-')
   project_para[2] = project_code
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the lambda sources are zipped from source/lambda, the tests live beside them
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), '..', 'lambda', 'notification' ) )
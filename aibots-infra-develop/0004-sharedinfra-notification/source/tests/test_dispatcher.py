@@ -0,0 +1,97 @@
+import time
+
+import urllib3
+
+from dispatcher import Dispatcher, pack_digests
+from webhook_stub import WebhookStub
+
+INTERVAL = 0.2
+
+################################################################################
+def notification( url, channel ):
+  return { "notification_url": url, "notification_channel": channel }
+
+def dispatcher( default_url, **kwargs ):
+  kwargs.setdefault( 'interval', INTERVAL )
+  return Dispatcher( notification( default_url, '#default' ), urllib3.PoolManager( maxsize = 10 ), **kwargs )
+
+def gaps( times ):
+  times = sorted( times )
+  return [ later - earlier for earlier, later in zip( times, times[1:] ) ]
+
+################################################################################
+def test_records_are_posted_as_digests_per_channel():
+  with WebhookStub() as stub:
+    sender = dispatcher( stub.url )
+    for index in range( 4 ):
+      sender.add( index, notification( stub.url + '/a', '#a' if index % 2 else '#b' ), { "AlarmName": str( index ) } )
+
+    assert sender.flush() == []
+
+  assert sorted( payload['channel'] for _, payload in stub.posts ) == [ '#a', '#b' ]
+  assert all( payload['text'].count( 'AlarmName' ) == 2 for _, payload in stub.posts )
+
+def test_channels_sharing_a_webhook_are_paced_together():
+  with WebhookStub() as stub:
+    sender = dispatcher( stub.url )
+    for channel in ( '#a', '#b', '#c' ):
+      sender.add( channel, notification( stub.url + '/shared', channel ), 'alert' )
+
+    assert sender.flush() == []
+
+  assert len( stub.posts ) == 3
+  assert all( gap >= INTERVAL * 0.9 for gap in gaps( stub.times ) )
+
+def test_reposts_to_the_default_webhook_are_paced():
+  with WebhookStub() as default, WebhookStub( status = 400 ) as broken:
+    sender = dispatcher( default.url )
+    for channel in ( '#a', '#b', '#c' ):
+      sender.add( channel, notification( broken.url, channel ), 'alert' )
+
+    assert sender.flush() == []
+
+  assert len( broken.posts ) == 3
+  assert len( default.posts ) == 3
+  assert all( gap >= INTERVAL * 0.9 for gap in gaps( default.times ) )
+
+def test_rate_limited_post_is_retried():
+  with WebhookStub( statuses = [ 429, 503 ] ) as stub:
+    sender = dispatcher( stub.url, interval = 0.01 )
+    sender.add( 'one', notification( stub.url, '#a' ), 'alert' )
+
+    assert sender.flush() == []
+
+  assert len( stub.posts ) == 3
+
+def test_records_lost_both_ways_are_reported_once():
+  with WebhookStub( status = 400 ) as stub:
+    sender = dispatcher( stub.url, interval = 0.01, max_chars = 10 )
+    sender.add( 'one', notification( stub.url + '/a', '#a' ), 'x' * 25 )
+    sender.add( 'two', notification( stub.url, '#default' ), 'y' )
+
+    assert sorted( sender.flush() ) == [ 'one', 'two' ]
+
+def test_groups_are_posted_by_a_bounded_pool():
+  with WebhookStub( delay = 0.1 ) as stub:
+    sender = dispatcher( stub.url, max_workers = 2 )
+    for index in range( 6 ):
+      sender.add( index, notification( '{}/{}'.format( stub.url, index ), '#a' ), 'alert' )
+
+    assert sender.flush() == []
+
+  assert len( stub.posts ) == 6
+  assert stub.max_in_flight == 2
+
+def test_nothing_is_posted_after_the_deadline():
+  with WebhookStub() as stub:
+    sender = dispatcher( stub.url, deadline = time.monotonic() - 1 )
+    sender.add( 'one', notification( stub.url, '#a' ), 'alert' )
+
+    assert sender.flush() == [ 'one' ]
+
+  assert stub.posts == []
+
+def test_pack_digests_splits_long_texts():
+  digests = pack_digests( [ ( 'one', 'a' * 25 ), ( 'two', 'b' ) ], 10 )
+  assert [ ids for ids, _ in digests ] == [ [ 'one' ], [ 'one' ], [ 'one' ], [ 'two' ] ]
+  assert all( len( text ) <= 10 for _, text in digests )
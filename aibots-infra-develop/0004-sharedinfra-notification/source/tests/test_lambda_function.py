@@ -0,0 +1,56 @@
+import importlib
+import json
+import sys
+
+import boto3
+import pytest
+
+from webhook_stub import WebhookStub
+
+################################################################################
+class FakeSSM:
+  def __init__( self, url ):
+    self.url = url
+
+  def get_parameter( self, Name, WithDecryption = False ):
+    return { 'Parameter': { 'Value': json.dumps( { "notification_url": self.url, "notification_channel": '#default' } ) } }
+
+@pytest.fixture
+def handler( monkeypatch ):
+  # the module reads the default notification from SSM when it is imported
+  def load( url ):
+    monkeypatch.setenv( 'DEFAULT_NOTIFICATION', 'para-uat-sharedinfra-notification-default' )
+    monkeypatch.setattr( boto3, 'client', lambda service, **kwargs: FakeSSM( url ) )
+    sys.modules.pop( 'lambda_function', None )
+    return importlib.import_module( 'lambda_function' )
+  yield load
+  sys.modules.pop( 'lambda_function', None )
+
+def sqs_record( message_id, body ):
+  return { "eventSource": "aws:sqs", "messageId": message_id, "body": body,
+           "eventSourceARN": "arn:aws:sqs:ap-southeast-1:000000000000:sqs-uat-aibots-rag-status-dlq" }
+
+def sns_record( message_id, message ):
+  return { "EventSource": "aws:sns", "Sns": { "MessageId": message_id, "Message": message } }
+
+################################################################################
+def test_malformed_sqs_record_is_reported_as_failed( handler ):
+  with WebhookStub() as stub:
+    lambda_function = handler( stub.url )
+    response = lambda_function.lambda_handler( { "Records": [ sqs_record( 'bad', 'not json' ), sqs_record( 'good', '{}' ) ] }, None )
+
+  assert response == { "batchItemFailures": [ { "itemIdentifier": "bad" } ] }
+  assert len( stub.posts ) == 1
+
+def test_undelivered_sns_records_raise_for_retry( handler ):
+  with WebhookStub( status = 400 ) as stub:
+    lambda_function = handler( stub.url )
+    with pytest.raises( RuntimeError ):
+      lambda_function.lambda_handler( { "Records": [ sns_record( 'one', json.dumps( { "AlarmName": "alarm-uat-aibots-web" } ) ) ] }, None )
+
+def test_delivered_sns_records_do_not_raise( handler ):
+  with WebhookStub() as stub:
+    lambda_function = handler( stub.url )
+    assert lambda_function.lambda_handler( { "Records": [ sns_record( 'one', json.dumps( { "AlarmName": "alarm-uat-aibots-web" } ) ) ] }, None ) is None
+
+  assert len( stub.posts ) == 1
@@ -0,0 +1,64 @@
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+################################################################################
+# # Local stand-in for a Slack incoming webhook, to try the dispatcher without
+# # posting to Slack, e.g.
+# #   with WebhookStub( statuses = [ 429 ] ) as stub:
+# #     Dispatcher( { "notification_url": stub.url, ... }, urllib3.PoolManager() )
+################################################################################
+class WebhookStub:
+  """
+  Args:
+    statuses (list): status returned for each post in turn, 200 once exhausted
+    retry_after (str): Retry-After header sent with 429
+    status (int): returned once statuses is exhausted
+    delay (float): seconds taken to answer each post
+  """
+
+  def __init__( self, statuses = None, retry_after = '0', status = 200, delay = 0.0 ):
+    self.statuses = list( statuses or [] )
+    self.retry_after = retry_after
+    self.status = status
+    self.delay = delay
+    self.posts = [] # ( path, payload ) of every post, in the order received
+    self.times = [] # time.monotonic() of every post, in the order received
+    self.in_flight = 0
+    self.max_in_flight = 0
+    self.lock = threading.Lock()
+    stub = self
+
+    class Handler( BaseHTTPRequestHandler ):
+      def do_POST( self ):
+        body = self.rfile.read( int( self.headers.get( 'Content-Length', 0 ) ) )
+        with stub.lock:
+          stub.posts.append( ( self.path, json.loads( body ) ) )
+          stub.times.append( time.monotonic() )
+          status = stub.statuses.pop( 0 ) if stub.statuses else stub.status
+          stub.in_flight += 1
+          stub.max_in_flight = max( stub.max_in_flight, stub.in_flight )
+        time.sleep( stub.delay )
+        with stub.lock:
+          stub.in_flight -= 1
+        self.send_response( status )
+        if status == 429:
+          self.send_header( 'Retry-After', stub.retry_after )
+        self.end_headers()
+        self.wfile.write( b'ok' if status == 200 else b'error' )
+
+      def log_message( self, *args ):
+        pass
+
+    self.server = ThreadingHTTPServer( ( '127.0.0.1', 0 ), Handler )
+    self.url = 'http://127.0.0.1:{}'.format( self.server.server_address[1] )
+
+  def __enter__( self ):
+    threading.Thread( target = self.server.serve_forever, daemon = True ).start()
+    return self
+
+  def __exit__( self, *exc ):
+    self.server.shutdown()
+    self.server.server_close()
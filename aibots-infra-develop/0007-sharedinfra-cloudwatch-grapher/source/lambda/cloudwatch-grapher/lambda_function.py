@@ -2,10 +2,6 @@ import json
 import base64
 import boto3
 import os
-from PIL import Image
-import io
-from io import BytesIO
-import zipfile
 import urllib.parse
 
 from datetime import datetime, timedelta
@@ -13,6 +9,8 @@ from datetime import datetime, timedelta
 import logging
 logging.getLogger().setLevel(logging.INFO)
 
+from render import render_settings, render_widgets, stream_zip_to_s3, widget_definition
+
 cw_client = boto3.client("cloudwatch") # to plot graphs
 scheduler_client = boto3.client('scheduler') # to add schedule
 s3_client = boto3.client("s3") # to read and put files into s3
@@ -142,7 +140,7 @@ def lambda_handler(event, context):
     ############################################################################
     # Plotting the graphs
     ############################################################################
-    src_file_list = []
+    widget_jobs = {} # filename >> widget definition, a repeated filename keeps the last graph
     dts = datetime.now()
     dts = dts + timedelta(hours=8)
 
@@ -209,27 +207,22 @@ def lambda_handler(event, context):
           logging.info( '{} >> Parsing graph_plot_metrics for filename >> {}'.format( context.function_name, filename ) )
           graph_plot_metrics = image_metrics_data_parser( chart['stats'], graph_plot_metrics )
   
+          widget_jobs.pop( filename, None )
+          widget_jobs[ filename ] = widget_definition( graph_plot_metrics,
+                                                       start, end,
+                                                       chart['stacked'],
+                                                       "timeSeries" )
+
     # THIS SECTION IS TO PLOT THE GRAPH
-          image = get_cloudwatch_image( graph_plot_metrics,
-                                        start, end,
-                                        chart['stacked'],
-                                        "timeSeries" )
-        
-          # Save the image to an in-memory file
-          img = Image.open(BytesIO( image ))
-          buffer = io.BytesIO()
-          img.save(buffer,"PNG")
-        
-          # You need this part, remarked to test below
-          # Upload image to s3
-          buffer.seek(0)
-          s3_client.upload_fileobj(buffer, bucket, base_folder +'/' +filename +'.png')
-          
-          src_file_list.append( base_folder +'/' +filename +'.png' )
-  
-    zip_files_in_s3( bucket, src_file_list, bucket, 'graphs/' +base_folder +'_' +dts +'.zip' )
-    clean_up( bucket, src_file_list )
-    # THIS SECTION IS TO PLOT THE GRAPH
+    # the images are fetched concurrently and streamed straight into the zip
+    zip_key = 'graphs/' +base_folder +'_' +dts +'.zip'
+    try:
+      count = stream_zip_to_s3( render_widgets( cw_client, widget_jobs, render_settings( grapher_config ) ),
+                                s3_client, bucket, zip_key )
+      logging.info( '{} >> zipped {} of {} graphs into {}.'.format( context.function_name, count, len( widget_jobs ), zip_key ) )
+
+    except Exception as e:
+      logging.error( '{} >> error in stream_zip_to_s3 >> {}'.format( context.function_name, str(e) ) ) # sends to the channel
 
 ################################################################################
 def read_file_in_s3( bucket, file ):
@@ -254,44 +247,6 @@ def read_file_in_s3( bucket, file ):
 
     return "Fail to read file."
 
-################################################################################
-def clean_up( src_bucket, src_file_list ):
-  logging.info('clean_up activated.' )
-
-  try:
-    for src_file in src_file_list:
-      logging.info( "deleting s3://{}/{}".format(src_bucket.encode(), src_file.encode()) )
-      s3_client.delete_object( Bucket=src_bucket, Key=src_file )
-
-  except Exception as e:
-    logging.error( '{} >> error clean_up >> {}'.format( '', str(e) ) ) # sends to the channel
-    logging.info('exception ended.')
-
-################################################################################
-def zip_files_in_s3( src_bucket, src_file_list, dest_bucket, dest_file ):
-  logging.info('zip_files_in_s3 activated.' )
-
-  try:
-    # response = {} # seems like not in use.
-    archive = BytesIO()
-  
-    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_archive:
-      for src_file in src_file_list:
-        with zip_archive.open( src_file.split('/',)[-1], 'w') as tempfile:
-          tempfile.write( s3_client.get_object( Bucket=src_bucket, Key=src_file )['Body'].read() )
-  
-    archive.seek(0)
-    s3_client.upload_fileobj(archive, dest_bucket, dest_file)
-    archive.close()
-
-    logging.info( 'zip_files_in_s3 create {}.'.format( dest_file ) )
-    return True
-
-  except Exception as e:
-    logging.error( '{} >> error in zip_files_in_s3 >> {}'.format( '', str(e) ) ) # sends to the channel
-    logging.info('exception ended.')
-    return False
-
 ################################################################################
 def image_metrics_data_parser( stats, graph_plot_metrics ):
 
@@ -313,37 +268,3 @@ def image_metrics_data_parser( stats, graph_plot_metrics ):
       data_parser.append( working_temp )
 
   return data_parser
-
-
-def get_cloudwatch_image( metrics, start, end, stacked, view ):
-  # https://docs.aws.amazon.com/AmazonCloudWatch/latest/APIReference/CloudWatch-Metric-Widget-Structure.html
-  response = cw_client.get_metric_widget_image(
-    MetricWidget = json.dumps( {
-      "title" : "", # str( metrics ), # "This is the title",
-      "stacked": stacked,
-      "stats" : "", # SampleCount | Average | Sum | Minimum | Maximum | p?? | TM(??:??), TC(??:??) | TS(??:??) | WM(??:??) | PR(??:??) | IQM
-      "metrics": metrics, # [
-                          #   [ "AWS/ApplicationELB", "ActiveConnectionCount", "TargetGroup", "targetgroup/tg-alb-appraiser-main-web/3975358861358408" ]
-                          # ],
-      "start"  : start,
-      "end"    : end,
-      "period" : 60,
-      "view" : view, # timeSeries | bar | pie
-      "width"  : 1800,
-      "height" :  600,
-      "legend": { "position" : "bottom" }, # bottom | right | hidden
-      "theme" : "light", # light | dark
-      "timezone" : "+0800",
-      "yAxis" : {
-        "left": {
-          "min": 0,
-          # "max": 100
-        },
-        "right": {
-          "min": 0
-        }
-      }
-    } )
-  )
-
-  return( response["MetricWidgetImage"] )
\ No newline at end of file
@@ -0,0 +1,210 @@
+import io
+import json
+import threading
+import time
+import zipfile
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import logging
+logging.getLogger().setLevel(logging.INFO)
+
+################################################################################
+# # Default render settings, each can be overridden by the "render" key in the
+# # grapher config json, e.g. { "graph_charts": [...], "render": { "concurrency": 4 } }
+################################################################################
+DEFAULTS = {
+  "concurrency"     : 8,   # widget images fetched at the same time
+  "rate_per_second" : 10,  # GetMetricWidgetImage calls started per second
+}
+
+# S3 requires every part but the last to be at least 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+PART_SIZE = 8 * 1024 * 1024
+
+################################################################################
+def render_settings( grapher_config ):
+  settings = dict( DEFAULTS )
+  settings.update( grapher_config.get( 'render', {} ) )
+  return settings
+
+################################################################################
+class RateLimiter:
+  """Spaces out call starts to at most rate_per_second, across threads"""
+
+  def __init__( self, rate_per_second ):
+    self.interval = 1.0 / rate_per_second if rate_per_second else 0.0
+    self.next_start = 0.0
+    self.lock = threading.Lock()
+
+  def wait( self ):
+    with self.lock:
+      now = time.monotonic()
+      start = max( now, self.next_start )
+      self.next_start = start + self.interval
+    if start > now:
+      time.sleep( start - now )
+
+################################################################################
+def widget_definition( metrics, start, end, stacked, view ):
+  # https://docs.aws.amazon.com/AmazonCloudWatch/latest/APIReference/CloudWatch-Metric-Widget-Structure.html
+  return {
+    "title" : "", # str( metrics ), # "This is the title",
+    "stacked": stacked,
+    "stats" : "", # SampleCount | Average | Sum | Minimum | Maximum | p?? | TM(??:??), TC(??:??) | TS(??:??) | WM(??:??) | PR(??:??) | IQM
+    "metrics": metrics, # [
+                        #   [ "AWS/ApplicationELB", "ActiveConnectionCount", "TargetGroup", "targetgroup/tg-alb-appraiser-main-web/3975358861358408" ]
+                        # ],
+    "start"  : start,
+    "end"    : end,
+    "period" : 60,
+    "view" : view, # timeSeries | bar | pie
+    "width"  : 1800,
+    "height" :  600,
+    "legend": { "position" : "bottom" }, # bottom | right | hidden
+    "theme" : "light", # light | dark
+    "timezone" : "+0800",
+    "yAxis" : {
+      "left": {
+        "min": 0,
+        # "max": 100
+      },
+      "right": {
+        "min": 0
+      }
+    }
+  }
+
+################################################################################
+def render_widgets( cw_client, jobs, settings = DEFAULTS ):
+  """Fetches the widget images concurrently, under a rate limit
+
+  Args:
+    cw_client (client): the cloudwatch client
+    jobs (dict): filename >> widget definition, see widget_definition
+    settings (dict): see DEFAULTS
+
+  Yields:
+    Tuple(filename, png): in the order the images arrive. Widgets that fail
+      to render are logged and skipped, so one bad chart does not lose the rest.
+
+  """
+  if not jobs:
+    return
+
+  limiter = RateLimiter( float( settings['rate_per_second'] ) )
+
+  def render( widget ):
+    limiter.wait()
+    response = cw_client.get_metric_widget_image( MetricWidget = json.dumps( widget ) )
+    return response["MetricWidgetImage"]
+
+  workers = max( 1, min( int( settings['concurrency'] ), len( jobs ) ) )
+  with ThreadPoolExecutor( max_workers = workers ) as executor:
+    futures = { executor.submit( render, widget ): filename for filename, widget in jobs.items() }
+    for future in as_completed( futures ):
+      filename = futures[ future ]
+      try:
+        yield filename, future.result()
+      except Exception as e:
+        logging.error( '{} >> error rendering widget >> {}'.format( filename, str(e) ) ) # sends to the channel
+
+################################################################################
+class MultipartUploadWriter( io.RawIOBase ):
+  """Write-only stream into an S3 object
+
+  Data is buffered until a part is full and then sent with upload_part, so at
+  most one part is held in memory. Objects smaller than one part are sent
+  with a single put_object instead.
+  """
+
+  def __init__( self, s3_client, bucket, key, part_size = PART_SIZE, content_type = 'application/zip' ):
+    if part_size < MIN_PART_SIZE:
+      raise ValueError( 'part_size must be at least {} bytes'.format( MIN_PART_SIZE ) )
+    self.s3_client = s3_client
+    self.bucket = bucket
+    self.key = key
+    self.part_size = part_size
+    self.content_type = content_type
+    self.buffer = bytearray()
+    self.position = 0
+    self.upload_id = None
+    self.parts = []
+
+  def writable( self ):
+    return True
+
+  def tell( self ):
+    return self.position
+
+  def write( self, data ):
+    self.buffer += data
+    self.position += len( data )
+    while len( self.buffer ) >= self.part_size:
+      self._upload_part( bytes( self.buffer[ :self.part_size ] ) )
+      del self.buffer[ :self.part_size ]
+    return len( data )
+
+  def _upload_part( self, body ):
+    if self.upload_id is None:
+      self.upload_id = self.s3_client.create_multipart_upload(
+        Bucket = self.bucket, Key = self.key, ContentType = self.content_type
+      )['UploadId']
+    number = len( self.parts ) + 1
+    response = self.s3_client.upload_part(
+      Bucket = self.bucket, Key = self.key, UploadId = self.upload_id,
+      PartNumber = number, Body = body
+    )
+    self.parts.append( { "ETag": response['ETag'], "PartNumber": number } )
+
+  def close( self ):
+    if self.closed:
+      return
+    try:
+      if self.upload_id is None:
+        self.s3_client.put_object(
+          Bucket = self.bucket, Key = self.key, Body = bytes( self.buffer ), ContentType = self.content_type
+        )
+      else:
+        if self.buffer:
+          self._upload_part( bytes( self.buffer ) )
+        self.s3_client.complete_multipart_upload(
+          Bucket = self.bucket, Key = self.key, UploadId = self.upload_id,
+          MultipartUpload = { "Parts": self.parts }
+        )
+    except Exception:
+      self.abort()
+      raise
+    finally:
+      self.buffer = bytearray()
+      super().close()
+
+  def abort( self ):
+    """Drops the upload, S3 keeps no partial object"""
+    if self.upload_id is not None:
+      self.s3_client.abort_multipart_upload( Bucket = self.bucket, Key = self.key, UploadId = self.upload_id )
+      self.upload_id = None
+    self.buffer = bytearray()
+    super().close()
+
+################################################################################
+def stream_zip_to_s3( images, s3_client, bucket, key, part_size = PART_SIZE ):
+  """Writes (filename, png) pairs into a zip streamed to s3://bucket/key
+
+  Returns:
+    int: number of images in the archive
+
+  """
+  writer = MultipartUploadWriter( s3_client, bucket, key, part_size )
+  count = 0
+  try:
+    # PNGs are already compressed, deflating them again only costs time
+    with zipfile.ZipFile( writer, 'w', zipfile.ZIP_STORED ) as zip_archive:
+      for filename, png in images:
+        zip_archive.writestr( filename +'.png', png )
+        count += 1
+  except Exception:
+    writer.abort()
+    raise
+  writer.close()
+  return count
@@ -0,0 +1,52 @@
+import json
+import struct
+import threading
+import time
+import zlib
+
+################################################################################
+# # Local stand-in for the cloudwatch client calls used by the grapher, to
+# # try a grapher config without AWS, e.g.
+# #   cw_client = LocalCloudWatchClient( metrics, latency = 0.5 )
+# #   stream_zip_to_s3( render_widgets( cw_client, jobs ), ... )
+################################################################################
+def blank_png( width, height ):
+  """A white RGB PNG of width x height, built without PIL"""
+  def chunk( kind, data ):
+    return struct.pack( '>I', len( data ) ) + kind + data + struct.pack( '>I', zlib.crc32( kind + data ) )
+
+  row = b'\x00' + b'\xff' * 3 * width
+  return (
+    b'\x89PNG\r\n\x1a\n'
+    + chunk( b'IHDR', struct.pack( '>IIBBBBB', width, height, 8, 2, 0, 0, 0 ) )
+    + chunk( b'IDAT', zlib.compress( row * height ) )
+    + chunk( b'IEND', b'' )
+  )
+
+################################################################################
+class LocalCloudWatchClient:
+  """
+  Args:
+    metrics (list): list_metrics entries, dicts of Namespace, MetricName and Dimensions
+    latency (float): seconds slept per get_metric_widget_image, to mimic the API
+  """
+
+  def __init__( self, metrics = None, latency = 0.0 ):
+    self.metrics = metrics or []
+    self.latency = latency
+    self.widgets = [] # MetricWidget json of every get_metric_widget_image call
+    self.lock = threading.Lock()
+
+  def list_metrics( self, Namespace, MetricName, **kwargs ):
+    return { "Metrics": [
+      metric for metric in self.metrics
+      if metric['Namespace'] == Namespace and metric['MetricName'] == MetricName
+    ] }
+
+  def get_metric_widget_image( self, MetricWidget, **kwargs ):
+    widget = json.loads( MetricWidget )
+    with self.lock:
+      self.widgets.append( widget )
+    if self.latency:
+      time.sleep( self.latency )
+    return { "MetricWidgetImage": blank_png( widget.get( 'width', 600 ), widget.get( 'height', 400 ) ) }
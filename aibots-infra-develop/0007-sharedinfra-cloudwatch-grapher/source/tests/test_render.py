@@ -0,0 +1,111 @@
+import io
+import os
+import time
+import zipfile
+
+import pytest
+
+from cloudwatch_stub import LocalCloudWatchClient
+from render import MIN_PART_SIZE, render_widgets, stream_zip_to_s3, widget_definition
+
+################################################################################
+class LocalS3Client:
+  """Local stand-in for the s3 client calls made by MultipartUploadWriter"""
+
+  def __init__( self ):
+    self.objects = {}
+    self.uploads = {}
+    self.calls = []
+
+  def put_object( self, Bucket, Key, Body, **kwargs ):
+    self.calls.append( 'put_object' )
+    self.objects[ ( Bucket, Key ) ] = bytes( Body )
+
+  def create_multipart_upload( self, Bucket, Key, **kwargs ):
+    self.calls.append( 'create_multipart_upload' )
+    upload_id = str( len( self.uploads ) + 1 )
+    self.uploads[ upload_id ] = {}
+    return { "UploadId": upload_id }
+
+  def upload_part( self, Bucket, Key, UploadId, PartNumber, Body ):
+    self.calls.append( 'upload_part' )
+    self.uploads[ UploadId ][ PartNumber ] = bytes( Body )
+    return { "ETag": '"{}"'.format( PartNumber ) }
+
+  def complete_multipart_upload( self, Bucket, Key, UploadId, MultipartUpload ):
+    self.calls.append( 'complete_multipart_upload' )
+    parts = self.uploads.pop( UploadId )
+    numbers = [ part['PartNumber'] for part in MultipartUpload['Parts'] ]
+    assert numbers == sorted( parts )
+    # every part but the last must meet the S3 minimum
+    assert all( len( parts[ number ] ) >= MIN_PART_SIZE for number in numbers[ :-1 ] )
+    self.objects[ ( Bucket, Key ) ] = b''.join( parts[ number ] for number in numbers )
+
+  def abort_multipart_upload( self, Bucket, Key, UploadId ):
+    self.calls.append( 'abort_multipart_upload' )
+    self.uploads.pop( UploadId )
+
+def read_zip( s3_client ):
+  with zipfile.ZipFile( io.BytesIO( s3_client.objects[ ( 'bucket', 'report.zip' ) ] ) ) as archive:
+    assert archive.testzip() is None
+    return { name: archive.read( name ) for name in archive.namelist() }
+
+def jobs( count ):
+  return {
+    'chart_{}'.format( i ): widget_definition( [ [ "AWS/Lambda", "Invocations" ] ], '-PT1H', 'P0D', False, 'timeSeries' )
+    for i in range( count )
+  }
+
+################################################################################
+def test_small_archive_is_sent_with_one_put():
+  cw_client = LocalCloudWatchClient()
+  s3_client = LocalS3Client()
+
+  count = stream_zip_to_s3( render_widgets( cw_client, jobs( 3 ) ), s3_client, 'bucket', 'report.zip' )
+
+  assert count == 3
+  assert s3_client.calls == [ 'put_object' ]
+  files = read_zip( s3_client )
+  assert sorted( files ) == [ 'chart_0.png', 'chart_1.png', 'chart_2.png' ]
+  assert all( png.startswith( b'\x89PNG' ) for png in files.values() )
+
+def test_large_archive_is_sent_in_parts():
+  images = { 'image_{}'.format( i ): os.urandom( 3 * 1024 * 1024 ) for i in range( 4 ) }
+  s3_client = LocalS3Client()
+
+  count = stream_zip_to_s3( iter( images.items() ), s3_client, 'bucket', 'report.zip', part_size = MIN_PART_SIZE )
+
+  assert count == 4
+  assert s3_client.calls[0] == 'create_multipart_upload'
+  assert s3_client.calls.count( 'upload_part' ) == 3
+  assert s3_client.calls[-1] == 'complete_multipart_upload'
+  assert read_zip( s3_client ) == { name + '.png': png for name, png in images.items() }
+
+def test_failed_archive_aborts_the_upload():
+  def images():
+    yield 'image_0', os.urandom( MIN_PART_SIZE + 1 )
+    raise RuntimeError( 'render failed' )
+
+  s3_client = LocalS3Client()
+  with pytest.raises( RuntimeError ):
+    stream_zip_to_s3( images(), s3_client, 'bucket', 'report.zip', part_size = MIN_PART_SIZE )
+
+  assert s3_client.calls[-1] == 'abort_multipart_upload'
+  assert s3_client.objects == {}
+  assert s3_client.uploads == {}
+
+def test_widgets_are_rendered_concurrently():
+  cw_client = LocalCloudWatchClient( latency = 0.2 )
+  start = time.monotonic()
+  images = dict( render_widgets( cw_client, jobs( 8 ), { "concurrency": 8, "rate_per_second": 0 } ) )
+  assert time.monotonic() - start < 0.6
+  assert len( images ) == 8
+  assert len( cw_client.widgets ) == 8
+
+def test_rate_limit_spaces_out_calls():
+  cw_client = LocalCloudWatchClient()
+  start = time.monotonic()
+  images = dict( render_widgets( cw_client, jobs( 5 ), { "concurrency": 5, "rate_per_second": 20 } ) )
+  # four intervals of 50 ms between five call starts
+  assert time.monotonic() - start >= 0.19
+  assert len( images ) == 5
@@ -7,14 +7,14 @@ from io import BytesIO
 import zipfile
 
 import urllib.parse
-from urllib.error import HTTPError, URLError
-from urllib.request import urlopen
 
 from datetime import datetime, timedelta
 
 import logging
 logging.getLogger().setLevel(logging.INFO)
 
+from probe import probe_settings, probe_sites, summarise
+
 scheduler_client = boto3.client('scheduler') # to add schedule
 s3_client = boto3.client("s3") # to read and put files into s3
 
@@ -147,11 +147,17 @@ def lambda_handler(event, context):
     dts = dts.strftime("%Y%m%d_%H%M%S")
 #    dts = dts['year']+dts['month']+dts['day']+'_'+dts['hour']+dts['minute']+dts['second']
 
-    sites = list( set( config['dns'] ) )
+    sites = sorted( set( config['dns'] ) )
+
+    results = probe_sites( sites, probe_settings( config ) )
+    for result in results:
+      if result['timed_out']:
+        logging.error('{} is hanging, remove asap.'.format( result['site'] ) )
 
-    for site in sites:
-      if wget( site ) == 'timed out':
-        logging.error('{} is hanging, remove asap.'.format(site) )
+    summary = summarise( results )
+    logging.info( '{} >> probed {}'.format( context.function_name, json.dumps( summary ) ) )
+    # .jsonl so that the report does not re-trigger this lambda on *.json
+    put_results_in_s3( bucket, 'results/' +base_folder +'_' +dts +'.jsonl', results, summary )
 
     # zip_files_in_s3( bucket, src_file_list, bucket, 'graphs/' +base_folder +'_' +dts +'.zip' )
     # clean_up( bucket, src_file_list )
@@ -219,24 +225,22 @@ def zip_files_in_s3( src_bucket, src_file_list, dest_bucket, dest_file ):
     return False
 
 ################################################################################
-def wget( site ):
+def put_results_in_s3( bucket, key, results, summary ):
+  logging.info('put_results_in_s3 activated.' )
 
   try:
-    with urlopen('https://' +site  +'/', timeout = 10 ) as response:
-      logging.info( 'site {} responded with status: {}'.format(site, response.status) )
-      return response.read()
-
-  except HTTPError as error:
-    logging.info( 'site {} responded with status: {} and reason: {}'.format(site, error.status, error.reason) )
-    return 'site {} responded with status: {} and reason: {}'.format(site, error.status, error.reason)
-
-  except URLError as error:
-    logging.info( 'site {} responded with status: nil and reason: {}'.format(site, error.reason) )
-    if str( error.reason ) == 'timed out':
-      return( 'timed out' )
-    else:
-      return 'site {} responded with status: nil and reason: {}'.format(site, error.reason)
+    # one object per run, one line per site
+    s3_client.put_object(
+      Bucket = bucket,
+      Key = key,
+      Body = '\n'.join( json.dumps( result ) for result in results ).encode(),
+      ContentType = 'application/x-ndjson',
+      Metadata = { name: str( count ) for name, count in summary.items() },
+    )
+    logging.info( 'put_results_in_s3 create {}.'.format( key ) )
+    return True
 
-  except TimeoutError:
-    logging.info("timed out")
-    return( 'timed out' )
\ No newline at end of file
+  except Exception as e:
+    logging.error( '{} >> error put_results_in_s3 >> {}'.format( '', str(e) ) ) # sends to the channel
+    logging.info('exception ended.')
+    return False
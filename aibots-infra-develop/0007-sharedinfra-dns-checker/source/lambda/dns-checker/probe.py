@@ -0,0 +1,210 @@
+import socket
+import ssl
+import time
+
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import logging
+logging.getLogger().setLevel(logging.INFO)
+
+################################################################################
+# # Default probe settings, each can be overridden by the "probe" key in the
+# # config json, e.g. { "dns": [...], "probe": { "concurrency": 32 } }
+################################################################################
+DEFAULTS = {
+  "concurrency"   : 16,    # sites probed at the same time
+  "timeout"       : 10,    # seconds, per site across all phases and retries
+  "retries"       : 1,     # extra attempts when a probe errors out
+  "retry_backoff" : 0.5,   # seconds, doubled after every retry
+  "scheme"        : "https",
+  "path"          : "/",
+}
+
+PHASES = ( "dns", "connect", "tls", "first_byte" )
+
+# getaddrinfo takes no timeout, so lookups run here and are waited on until the
+# deadline. A lookup that hangs only holds its own thread, shared across warm
+# invocations.
+RESOLVER_WORKERS = 64
+_resolver = ThreadPoolExecutor( max_workers = RESOLVER_WORKERS, thread_name_prefix = 'resolver' )
+
+################################################################################
+def probe_settings( config ):
+  settings = dict( DEFAULTS )
+  settings.update( config.get( 'probe', {} ) )
+  return settings
+
+################################################################################
+def probe_sites( sites, settings = DEFAULTS ):
+  """Probes all sites concurrently
+
+  At most settings['concurrency'] sites are in flight, so a few hanging sites
+  only hold up their own workers instead of every check behind them.
+
+  Args:
+    sites (list): host names, optionally with a port and path
+    settings (dict): see DEFAULTS
+
+  Returns:
+    list: one result per site, see probe_site, in the order of sites
+
+  """
+  if not sites:
+    return []
+
+  workers = max( 1, min( int( settings['concurrency'] ), len( sites ) ) )
+  with ThreadPoolExecutor( max_workers = workers ) as executor:
+    return list( executor.map( lambda site: probe_site( site, settings ), sites ) )
+
+################################################################################
+def probe_site( site, settings = DEFAULTS ):
+  """Probes a site, retrying attempts that error out
+
+  An HTTP response, whatever its status, is not retried. Every attempt and
+  backoff shares one deadline, settings['timeout'] seconds from the start, so
+  no site takes longer than that however many retries are configured.
+
+  Returns:
+    dict: the last attempt, see probe_once, with the number of attempts made
+
+  """
+  deadline = time.monotonic() + float( settings['timeout'] )
+  attempts = int( settings['retries'] ) + 1
+  for attempt in range( attempts ):
+    result = probe_once( site, settings, deadline )
+    result['attempts'] = attempt + 1
+    if result['error'] is None:
+      break
+    backoff = float( settings['retry_backoff'] ) * 2 ** attempt
+    if attempt + 1 >= attempts or time.monotonic() + backoff >= deadline:
+      break
+    time.sleep( backoff )
+
+  logging.info( 'site {} responded with status: {} and reason: {}'.format( site, result['status'], result['error'] ) )
+  return result
+
+################################################################################
+def remaining( deadline ):
+  """Seconds left until deadline, raising socket.timeout once it has passed"""
+  left = deadline - time.monotonic()
+  if left <= 0:
+    raise socket.timeout( 'timed out' )
+  return left
+
+################################################################################
+def probe_once( site, settings = DEFAULTS, deadline = None ):
+  """Sends one GET request to a site, timing each phase
+
+  Every phase, DNS included, only waits for what is left until deadline,
+  which defaults to settings['timeout'] seconds from now.
+
+  Returns:
+    dict: site, status, error, timed_out and the seconds spent in each of
+      PHASES plus total. Phases that were not reached are None.
+
+  """
+  if deadline is None:
+    deadline = time.monotonic() + float( settings['timeout'] )
+  use_tls = settings['scheme'] == 'https'
+  url = urllib.parse.urlsplit( '//' + site )
+  host = url.hostname
+  port = url.port or ( 443 if use_tls else 80 )
+  path = url.path or settings['path']
+
+  result = { "site": site, "status": None, "error": None, "timed_out": False }
+  result.update( { phase: None for phase in PHASES } )
+  start = time.perf_counter()
+  sock = None
+
+  try:
+    ############################################################################
+    # # dns
+    ############################################################################
+    mark = time.perf_counter()
+    lookup = _resolver.submit( socket.getaddrinfo, host, port, type = socket.SOCK_STREAM )
+    addresses = lookup.result( timeout = remaining( deadline ) )
+    result['dns'] = time.perf_counter() - mark
+
+    ############################################################################
+    # # tcp connect, first address that accepts
+    ############################################################################
+    mark = time.perf_counter()
+    error = None
+    for family, type_, proto, _, address in addresses:
+      candidate = socket.socket( family, type_, proto )
+      try:
+        candidate.settimeout( remaining( deadline ) )
+        candidate.connect( address )
+        sock = candidate
+        break
+      except OSError as e:
+        candidate.close()
+        error = e
+    if sock is None:
+      raise error
+    result['connect'] = time.perf_counter() - mark
+
+    ############################################################################
+    # # tls handshake
+    ############################################################################
+    if use_tls:
+      mark = time.perf_counter()
+      sock.settimeout( remaining( deadline ) )
+      sock = ssl.create_default_context().wrap_socket( sock, server_hostname = host )
+      result['tls'] = time.perf_counter() - mark
+
+    ############################################################################
+    # # request and first byte of the response
+    ############################################################################
+    mark = time.perf_counter()
+    sock.settimeout( remaining( deadline ) )
+    sock.sendall( (
+      'GET {} HTTP/1.1\r\nHost: {}\r\nUser-Agent: dns-checker\r\nConnection: close\r\n\r\n'
+    ).format( path, host ).encode() )
+    sock.settimeout( remaining( deadline ) )
+    head = sock.recv( 1 )
+    if not head:
+      raise ConnectionError( 'connection closed without a response' )
+    result['first_byte'] = time.perf_counter() - mark
+
+    # status line, e.g. HTTP/1.1 200 OK
+    while b'\r\n' not in head and len( head ) < 1024:
+      sock.settimeout( remaining( deadline ) )
+      chunk = sock.recv( 1024 )
+      if not chunk:
+        break
+      head += chunk
+    result['status'] = int( head.split( b'\r\n', 1 )[0].split()[1] )
+
+  except ( socket.timeout, TimeoutError, FutureTimeoutError ):
+    result['error'] = 'timed out'
+    result['timed_out'] = True
+
+  except Exception as e:
+    result['error'] = str( e ) or type( e ).__name__
+
+  finally:
+    if sock is not None:
+      sock.close()
+    result['total'] = time.perf_counter() - start
+
+  return result
+
+################################################################################
+def summarise( results ):
+  """Counts the results by outcome
+
+  Returns:
+    dict: total, healthy (status below 400), unhealthy and timed_out
+
+  """
+  healthy = sum( 1 for result in results if result['status'] is not None and result['status'] < 400 )
+  timed_out = sum( 1 for result in results if result['timed_out'] )
+  return {
+    "total"     : len( results ),
+    "healthy"   : healthy,
+    "unhealthy" : len( results ) - healthy,
+    "timed_out" : timed_out,
+  }
@@ -0,0 +1,86 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import probe
+
+HTTP = dict( probe.DEFAULTS, scheme = 'http', retry_backoff = 0.01 )
+
+################################################################################
+class Handler( BaseHTTPRequestHandler ):
+  """Local stand-in for a probed site, answering by path"""
+
+  def do_GET( self ):
+    if self.path == '/slow':
+      time.sleep( 2 )
+    self.send_response( 500 if self.path == '/error' else 200 )
+    self.send_header( 'Content-Length', '0' )
+    self.end_headers()
+
+  def log_message( self, *args ):
+    pass
+
+@pytest.fixture( scope = 'module' )
+def site():
+  server = ThreadingHTTPServer( ( '127.0.0.1', 0 ), Handler )
+  server.daemon_threads = True
+  thread = threading.Thread( target = server.serve_forever, daemon = True )
+  thread.start()
+  yield '127.0.0.1:{}'.format( server.server_address[1] )
+  server.shutdown()
+  server.server_close()
+
+def closed_port():
+  with socket.socket() as sock:
+    sock.bind( ( '127.0.0.1', 0 ) )
+    return sock.getsockname()[1]
+
+################################################################################
+def test_healthy_site_times_each_phase( site ):
+  result = probe.probe_site( site + '/ok', HTTP )
+  assert result['status'] == 200
+  assert result['error'] is None
+  assert result['attempts'] == 1
+  assert result['tls'] is None
+  assert all( result[phase] is not None for phase in ( 'dns', 'connect', 'first_byte', 'total' ) )
+
+def test_error_status_is_not_retried( site ):
+  result = probe.probe_site( site + '/error', dict( HTTP, retries = 3 ) )
+  assert result['status'] == 500
+  assert result['attempts'] == 1
+
+def test_refused_connection_is_retried():
+  result = probe.probe_site( '127.0.0.1:{}'.format( closed_port() ), dict( HTTP, retries = 2 ) )
+  assert result['status'] is None
+  assert result['error'] is not None
+  assert result['attempts'] == 3
+
+def test_deadline_covers_all_retries( site ):
+  start = time.monotonic()
+  result = probe.probe_site( site + '/slow', dict( HTTP, timeout = 0.5, retries = 3 ) )
+  assert result['timed_out']
+  assert result['attempts'] == 1
+  assert time.monotonic() - start < 1
+
+def test_deadline_covers_dns( site, monkeypatch ):
+  def hanging_lookup( *args, **kwargs ):
+    time.sleep( 1 )
+    raise socket.gaierror( 'unreachable resolver' )
+
+  monkeypatch.setattr( socket, 'getaddrinfo', hanging_lookup )
+  start = time.monotonic()
+  result = probe.probe_site( site + '/ok', dict( HTTP, timeout = 0.3 ) )
+  assert result['timed_out']
+  assert result['dns'] is None
+  assert time.monotonic() - start < 0.8
+
+def test_sites_are_probed_concurrently_in_order( site ):
+  sites = [ site + '/slow', site + '/ok', site + '/error', site + '/slow' ]
+  start = time.monotonic()
+  results = probe.probe_sites( sites, dict( HTTP, timeout = 0.5, concurrency = 4 ) )
+  assert time.monotonic() - start < 1
+  assert [ result['site'] for result in results ] == sites
+  assert probe.summarise( results ) == { "total": 4, "healthy": 1, "unhealthy": 3, "timed_out": 2 }
@@ -6,8 +6,8 @@ from io import BytesIO
 
 import util_tool # utility for generic tools
 import util_http # utility for http related
+import util_smtp # utility for pooled smtp sessions
 
-import smtplib
 import email.utils
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -30,39 +30,107 @@ def lambda_handler(event, context):
   payload = util_http.payload_extraction( event )
 
   smtp_key = payload.get('smtp_key','')
-  name_from = payload.get('sender_name','')
-  email_from = payload.get('sender','').replace(' ','')
-  reply_to = payload.get( 'reply_to', [] )
-  email_to = payload.get( 'to', [] )
-  email_cc = payload.get( 'cc', [] )
-  email_bcc = payload.get( 'bcc', [] )
-  email_subject = payload.get('subject','')
-  text = payload.get('text','')
-  email_content = payload.get('html','')
-  encoding = payload.get('encoding','UTF-8')
-  email_attachment = payload.get('email_attachment','')
+
+  # bulk dispatch, { "smtp_key": {...}, "messages": [ {...}, ... ] }, sent over one smtp session
+  if isinstance( payload.get('messages'), list ):
+    return SendBulk( context, dts_now, smtp_key, payload['messages'] )
 
 ################################################################################
 # validate payload                                                             #
 ################################################################################
-  # You must have the email_from, so it is not checking if empty
-  if not ValidateEmail(email_from):
-    logging.info('invalid email_from >> {}'.format( email_from ) )
+  error = validate_payload( payload )
+  if error:
     return {
       'statusCode': 400,
       'headers': { 'Content-Type': 'application/json' },
-      'body': json.dumps({ 'from ': context.function_name, 'msg': 'invalid email_from >> {}'.format( email_from ) })
+      'body': json.dumps({ 'from ': context.function_name, 'msg': error })
     }
 
+  response = SendEmail( smtp_key, *email_fields( payload ) )
+
+  put_status( dts_now, [ status_line( dts_now, response['statusCode'], json.loads(response['body'])['msg'], payload ) ] )
+
+  email_attachment = payload.get('email_attachment','')
+  if email_attachment:
+    clean_up( s3_sendemail_bucket, [ email_attachment ] )
+
+  logging.info('event ended.')
+  return response
+
+
+################################################################################
+# bulk dispatch                                                                #
+################################################################################
+def SendBulk( context, dts_now, smtp_key, messages ):
+  logging.info( 'SendBulk activated for {} messages.'.format( len( messages ) ) )
+
+  results = [ None ] * len( messages )
+  to_send = [] # ( index, MIME message )
+  for index, payload in enumerate( messages ):
+    error = validate_payload( payload )
+    if not error:
+      msg, error = build_message( *email_fields( payload ) )
+    if error:
+      results[ index ] = { 'statusCode': 400, 'msg': error, 'refused': {} }
+    else:
+      to_send.append( ( index, msg ) )
+
+  if to_send:
+    session = util_smtp.get_session( smtp_key.get('SMTP_USER', ''), smtp_key.get('SMTP_PASSWORD', '') )
+    for ( index, _ ), sent in zip( to_send, session.send_many( [ msg for _, msg in to_send ] ) ):
+      if sent['sent']:
+        results[ index ] = { 'statusCode': 200, 'msg': 'Email sent.', 'refused': sent['refused'] }
+      else:
+        results[ index ] = { 'statusCode': 400, 'msg': sent['error'], 'refused': sent['refused'] }
+
+  put_status( dts_now, [ status_line( dts_now, result['statusCode'], result['msg'], payload ) for result, payload in zip( results, messages ) ] )
+
+  attachments = [ payload.get('email_attachment','') for payload in messages ]
+  attachments = [ attachment for attachment in dict.fromkeys( attachments ) if attachment ]
+  if attachments:
+    clean_up( s3_sendemail_bucket, attachments )
+
+  sent = sum( 1 for result in results if result['statusCode'] == 200 )
+  logging.info( '{} of {} emails sent.'.format( sent, len( results ) ) )
+  logging.info('event ended.')
+  return {
+    # 207 when only some of the messages were sent
+    'statusCode': 200 if sent == len( results ) else 207 if sent else 400,
+    'headers': { 'Content-Type': 'application/json' },
+    'body': json.dumps({ 'from ': context.function_name, 'msg': '{} of {} emails sent.'.format( sent, len( results ) ), 'results': results })
+  }
+
+
+################################################################################
+# payload helpers                                                              #
+################################################################################
+def email_fields( payload ):
+  return (
+    payload.get('sender_name',''),
+    payload.get('sender','').replace(' ',''),
+    payload.get( 'to', [] ),
+    payload.get( 'cc', [] ),
+    payload.get( 'bcc', [] ),
+    payload.get('subject',''),
+    payload.get('html',''),
+    payload.get('email_attachment',''),
+  )
+
+
+def validate_payload( payload ):
+  """Returns the reason the payload cannot be sent, None if it can"""
+  name_from, email_from, email_to, email_cc, email_bcc = email_fields( payload )[:5]
+
+  # You must have the email_from, so it is not checking if empty
+  if not ValidateEmail(email_from):
+    logging.info('invalid email_from >> {}'.format( email_from ) )
+    return 'invalid email_from >> {}'.format( email_from )
+
   # You must have the email_to, so it is not checking if empty
   if not all( [ValidateEmail( email.strip() ) for email in email_to ] ):
     logging.info('invalid email_to >> {}'.format( email_to ) )
-    return {
-      'statusCode': 400,
-      'headers': { 'Content-Type': 'application/json' },
-      'body': json.dumps({ 'from ': context.function_name, 'msg': 'invalid email_to >> {}'.format( email_to ) })
-    }
-  
+    return 'invalid email_to >> {}'.format( email_to )
+
   # email_cc can be empty
   if email_cc != '' and not all( [ValidateEmail( email.strip() ) for email in email_cc ] ):
     logging.info( 'invalid email_cc address >> {}, continue.'.format( email_cc ) )
@@ -71,20 +139,21 @@ def lambda_handler(event, context):
   if email_bcc != '' and not all( [ValidateEmail( email.strip() ) for email in email_bcc ] ):
     logging.info( 'invalid email_bcc address >> {}, continue.'.format( email_bcc ) )
 
-  response = SendEmail( smtp_key, name_from, email_from, email_to, email_cc, email_bcc, email_subject, email_content, email_attachment )
+  return None
+
+
+def status_line( dts_now, status_code, msg, payload ):
+  name_from, email_from, email_to, email_cc, email_bcc, email_subject = email_fields( payload )[:6]
+  return '"{}","{}","{}","{}","{}","{}","{}","{}","{}"'.format( dts_now['dts'], status_code, msg, name_from, email_from, email_to, email_cc, email_bcc, email_subject )
 
+
+def put_status( dts_now, lines ):
   s3_client.put_object(
     Bucket = s3_sendemail_bucket,
     Key = 'status/{}/{}/{}/{}_{}.log.gz'.format( dts_now['year'], dts_now['month'], dts_now['day'], dts_now['dts'], util_tool.random_generator() ),
-    Body = util_tool.gzip_data( '"{}","{}","{}","{}","{}","{}","{}","{}","{}"'.format( dts_now['dts'], response['statusCode'], json.loads(response['body'])['msg'], name_from, email_from, email_to, email_cc, email_bcc, email_subject ) )
+    Body = util_tool.gzip_data( '\n'.join( lines ) )
   )
 
-  if email_attachment:
-    clean_up( s3_sendemail_bucket, [ email_attachment ] )
-
-  logging.info('event ended.')
-  return response
-
 
 ################################################################################
 # clean_up                                                                     #
@@ -118,17 +187,8 @@ def ValidateEmail( email ):
 # Send HTML email                                                              #
 ################################################################################
 
-def SendEmail( smtp_key, name_from, email_from, email_to, email_cc, email_bcc, email_subject, email_content, email_attachment ):
-  logging.info( 'SendEmail activated.' )
-
-  HOST = 'email-smtp.ap-southeast-1.amazonaws.com'
-  PORT = 587
-
-  # Replace smtp_username with your Amazon SES SMTP user name.
-  SMTP_USER = smtp_key.get('SMTP_USER', '')
-  # Replace smtp_password with your Amazon SES SMTP password.
-  SMTP_PASSWORD = smtp_key.get('SMTP_PASSWORD', '')
-
+def build_message( name_from, email_from, email_to, email_cc, email_bcc, email_subject, email_content, email_attachment ):
+  """Returns ( MIME message, None ), or ( None, error ) if the attachment cannot be read"""
   # Create message container - the correct MIME type is multipart/alternative.
   msg = MIMEMultipart()
   msg['From'] = email.utils.formataddr((name_from, email_from))
@@ -136,8 +196,11 @@ def SendEmail( smtp_key, name_from, email_from, email_to, email_cc, email_bcc, e
   # email_cc  = list( email_cc.split(',') )
   # email_bcc  = list( email_bcc.split(',') )
   msg['To'] = ', '.join(email_to) # for some reason, it MUST join convert the LIST back into the STRING then it will work.
-  msg['Cc'] = ', '.join(email_cc)
-  msg['Bcc'] = ', '.join(email_bcc)
+  # empty Cc / Bcc headers would make send_message add an empty RCPT TO
+  if email_cc:
+    msg['Cc'] = ', '.join(email_cc)
+  if email_bcc:
+    msg['Bcc'] = ', '.join(email_bcc)
   msg['Subject'] = email_subject
   
   # Attach parts into message container.
@@ -160,29 +223,34 @@ def SendEmail( smtp_key, name_from, email_from, email_to, email_cc, email_bcc, e
       msg.attach(part)
     except Exception as e:
       logging.error('Error: {}'.format( e ) )
-      return {
-        'statusCode': 400,
-        'headers': { 'Content-Type': 'application/json' },
-        'body': json.dumps({ 'msg': str(e) })
-      }
+      return None, str(e)
 
-  # Try to send the message.
-  try:
-    server = smtplib.SMTP(HOST, PORT)
-    server.ehlo()
-    server.starttls()
-    #stmplib docs recommend calling ehlo() before & after starttls()
-    server.ehlo()
-    server.login(SMTP_USER, SMTP_PASSWORD)
-    server.send_message( msg )
-    server.close()
-  # Display an error message if something goes wrong.
-  except Exception as e:
-    logging.error('Error: {}'.format( e ) )
+  return msg, None
+
+
+def SendEmail( smtp_key, name_from, email_from, email_to, email_cc, email_bcc, email_subject, email_content, email_attachment ):
+  logging.info( 'SendEmail activated.' )
+
+  # Replace smtp_username with your Amazon SES SMTP user name.
+  SMTP_USER = smtp_key.get('SMTP_USER', '')
+  # Replace smtp_password with your Amazon SES SMTP password.
+  SMTP_PASSWORD = smtp_key.get('SMTP_PASSWORD', '')
+
+  msg, error = build_message( name_from, email_from, email_to, email_cc, email_bcc, email_subject, email_content, email_attachment )
+  if error:
     return {
       'statusCode': 400,
       'headers': { 'Content-Type': 'application/json' },
-      'body': json.dumps({ 'msg': str(e) })
+      'body': json.dumps({ 'msg': error })
+    }
+
+  # Try to send the message, over the session kept from earlier invocations.
+  result = util_smtp.get_session( SMTP_USER, SMTP_PASSWORD ).send_many( [ msg ] )[0]
+  if not result['sent']:
+    return {
+      'statusCode': 400,
+      'headers': { 'Content-Type': 'application/json' },
+      'body': json.dumps({ 'msg': result['error'] })
     }
   else:
     logging.info('Email sent.')
@@ -190,4 +258,4 @@ def SendEmail( smtp_key, name_from, email_from, email_to, email_cc, email_bcc, e
       'statusCode': 200,
       'headers': { 'Content-Type': 'application/json' },
       'body': json.dumps({ 'msg': 'Email sent.' })
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,178 @@
+import hashlib
+import smtplib
+import ssl
+import time
+
+import logging
+logging.getLogger().setLevel(logging.INFO)
+
+HOST = 'email-smtp.ap-southeast-1.amazonaws.com'
+PORT = 587
+
+# seconds a session may sit idle before it is checked with NOOP prior to reuse
+IDLE_CHECK = 5
+# seconds after which a session is replaced regardless of its health
+MAX_SESSION_AGE = 300
+
+# errors that leave no usable session, as opposed to a message being rejected
+CONNECTION_ERRORS = ( smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                      smtplib.SMTPAuthenticationError, OSError )
+
+################################################################################
+class DeliveryUnknown( smtplib.SMTPServerDisconnected ):
+  """The session dropped after DATA, the server may have queued the message"""
+
+################################################################################
+class TrackedSMTP( smtplib.SMTP ):
+  """smtplib.SMTP that records whether DATA was issued for the current message"""
+
+  data_started = False
+
+  def data( self, msg ):
+    self.data_started = True
+    return super().data( msg )
+
+################################################################################
+# sessions kept across warm invocations, one per host, port and credentials
+################################################################################
+sessions = {}
+
+################################################################################
+class SMTPSession:
+  """One logged in SMTP connection, reconnected when it goes stale
+
+  Args:
+    user (str): SMTP user name
+    password (str): SMTP password
+    host (str): SMTP host
+    port (int): SMTP port
+    require_tls (bool): refuse to log in without STARTTLS
+    timeout (float): socket timeout in seconds
+  """
+
+  def __init__( self, user, password, host = HOST, port = PORT, require_tls = True, timeout = 10 ):
+    self.user = user
+    self.password = password
+    self.host = host
+    self.port = port
+    self.require_tls = require_tls
+    self.timeout = timeout
+    self.server = None
+    self.connected_at = 0.0
+    self.used_at = 0.0
+
+  def connect( self ):
+    logging.info( 'connecting to smtp {}:{}'.format( self.host, self.port ) )
+    self.close()
+    server = TrackedSMTP( self.host, self.port, timeout = self.timeout )
+    try:
+      server.ehlo()
+      if server.has_extn( 'starttls' ):
+        server.starttls( context = ssl.create_default_context() )
+        #stmplib docs recommend calling ehlo() before & after starttls()
+        server.ehlo()
+      elif self.require_tls:
+        raise smtplib.SMTPConnectError( 530, 'STARTTLS not offered by {}'.format( self.host ) )
+      if self.user:
+        server.login( self.user, self.password )
+    except Exception:
+      server.close()
+      raise
+    self.server = server
+    self.connected_at = self.used_at = time.monotonic()
+
+  def healthy( self ):
+    """Whether the current connection can be reused, checked with NOOP if it sat idle"""
+    if self.server is None:
+      return False
+    now = time.monotonic()
+    if now - self.connected_at > MAX_SESSION_AGE:
+      return False
+    if now - self.used_at <= IDLE_CHECK:
+      return True
+    try:
+      return self.server.noop()[0] == 250
+    except ( smtplib.SMTPException, OSError ) as e:
+      logging.info( 'smtp session failed health check >> {}'.format( e ) )
+      return False
+
+  def ensure( self ):
+    if not self.healthy():
+      self.connect()
+    return self.server
+
+  def send( self, msg ):
+    """Sends one message, reconnecting once if the server dropped the session
+
+    The message is only sent again if the session dropped before DATA. Once
+    DATA was issued the server may have queued the message, and sending it
+    again could deliver it twice, so the error is raised instead.
+
+    Returns:
+      dict: recipients refused by the server, as smtplib.SMTP.send_message
+
+    """
+    server = self.ensure()
+    server.data_started = False
+    try:
+      refused = server.send_message( msg )
+    except smtplib.SMTPServerDisconnected as e:
+      if server.data_started:
+        self.close()
+        raise DeliveryUnknown( 'smtp session dropped after DATA >> {}'.format( e ) ) from e
+      logging.info( 'smtp session dropped before DATA, reconnecting.' )
+      self.connect()
+      refused = self.server.send_message( msg )
+    self.used_at = time.monotonic()
+    return refused
+
+  def send_many( self, msgs ):
+    """Sends the messages over this session, one result per message
+
+    Returns:
+      list: of dicts with sent (bool), refused (dict of recipient to (code, reason)) and error (str)
+
+    """
+    results = []
+    for index, msg in enumerate( msgs ):
+      try:
+        refused = self.send( msg )
+        results.append( { "sent": True, "refused": stringify_refused( refused ), "error": None } )
+      except smtplib.SMTPRecipientsRefused as e:
+        results.append( { "sent": False, "refused": stringify_refused( e.recipients ), "error": 'all recipients refused' } )
+      except DeliveryUnknown as e:
+        # not resent, the next message goes out on a fresh connection
+        logging.error( 'Error: {}'.format( e ) )
+        results.append( { "sent": False, "refused": {}, "error": str( e ) } )
+      except CONNECTION_ERRORS as e:
+        # send already retried on a fresh connection where that was safe, the rest would fail the same way
+        logging.error( 'Error: {}'.format( e ) )
+        self.close()
+        results.extend( { "sent": False, "refused": {}, "error": str( e ) } for _ in msgs[ index: ] )
+        break
+      except smtplib.SMTPException as e:
+        logging.error( 'Error: {}'.format( e ) )
+        results.append( { "sent": False, "refused": {}, "error": str( e ) } )
+    return results
+
+  def close( self ):
+    if self.server is None:
+      return
+    try:
+      self.server.quit()
+    except ( smtplib.SMTPException, OSError ):
+      self.server.close()
+    self.server = None
+
+################################################################################
+def stringify_refused( refused ):
+  return { recipient: [ code, reason.decode() if isinstance( reason, bytes ) else reason ]
+           for recipient, ( code, reason ) in ( refused or {} ).items() }
+
+################################################################################
+def get_session( user, password, host = HOST, port = PORT, **kwargs ):
+  """The cached session for these credentials, created on first use"""
+  key = ( host, port, user, hashlib.sha256( password.encode() ).hexdigest() )
+  if key not in sessions:
+    sessions[ key ] = SMTPSession( user, password, host, port, **kwargs )
+  return sessions[ key ]
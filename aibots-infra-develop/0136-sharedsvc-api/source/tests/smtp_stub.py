@@ -0,0 +1,123 @@
+import base64
+import socketserver
+import threading
+
+################################################################################
+# # Local stand-in for the SES SMTP endpoint, in the spirit of aiosmtpd but
+# # stdlib only, to try util_smtp without sending mail, e.g.
+# #   with SMTPStub( refuse = [ 'bad@example.com' ] ) as stub:
+# #     session = util_smtp.SMTPSession( 'user', 'pass', stub.host, stub.port, require_tls = False )
+# # It speaks EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, RSET, NOOP and QUIT,
+# # but not STARTTLS.
+################################################################################
+class SMTPStub:
+  """
+  Args:
+    refuse (list): recipients answered with 550
+    drop_after (int): close the connection after this many messages, to test reconnects
+    drop_in_data (int): close the connection after taking this many messages but
+      before acknowledging the last one, to test that it is not sent twice
+    password (str): the only password accepted, any password if None
+  """
+
+  def __init__( self, refuse = None, drop_after = None, drop_in_data = None, password = None ):
+    self.refuse = set( refuse or [] )
+    self.drop_after = drop_after
+    self.drop_in_data = drop_in_data
+    self.password = password
+    self.messages = [] # dicts of mail_from, rcpt_tos and data, in the order received
+    self.connections = 0
+    self.logins = 0
+    self.lock = threading.Lock()
+    stub = self
+
+    class Handler( socketserver.StreamRequestHandler ):
+      def reply( self, line ):
+        self.wfile.write( ( line + '\r\n' ).encode() )
+
+      def handle( self ):
+        with stub.lock:
+          stub.connections += 1
+        sent = 0
+        mail_from, rcpt_tos = None, []
+        self.reply( '220 stub ESMTP' )
+        while True:
+          line = self.rfile.readline()
+          if not line:
+            return
+          command, _, argument = line.decode().rstrip( '\r\n' ).partition( ' ' )
+          command = command.upper()
+
+          if command in ( 'EHLO', 'HELO' ):
+            self.reply( '250-stub' )
+            self.reply( '250 AUTH PLAIN LOGIN' )
+          elif command == 'AUTH':
+            self.authenticate( argument )
+          elif command == 'MAIL':
+            mail_from, rcpt_tos = argument.split( ':', 1 )[1].strip( ' <>' ), []
+            self.reply( '250 OK' )
+          elif command == 'RCPT':
+            recipient = argument.split( ':', 1 )[1].strip( ' <>' )
+            if recipient in stub.refuse:
+              self.reply( '550 mailbox unavailable' )
+            else:
+              rcpt_tos.append( recipient )
+              self.reply( '250 OK' )
+          elif command == 'DATA':
+            self.reply( '354 end data with <CR><LF>.<CR><LF>' )
+            data = b''
+            while True:
+              chunk = self.rfile.readline()
+              if chunk in ( b'.\r\n', b'' ):
+                break
+              data += chunk[ 1: ] if chunk.startswith( b'..' ) else chunk
+            with stub.lock:
+              stub.messages.append( { "mail_from": mail_from, "rcpt_tos": rcpt_tos, "data": data } )
+              if stub.drop_in_data is not None and len( stub.messages ) >= stub.drop_in_data:
+                stub.drop_in_data = None
+                return
+            self.reply( '250 OK queued' )
+            sent += 1
+            if stub.drop_after is not None and sent >= stub.drop_after:
+              return
+          elif command == 'RSET':
+            mail_from, rcpt_tos = None, []
+            self.reply( '250 OK' )
+          elif command == 'NOOP':
+            self.reply( '250 OK' )
+          elif command == 'QUIT':
+            self.reply( '221 bye' )
+            return
+          else:
+            self.reply( '502 command not implemented' )
+
+      def authenticate( self, argument ):
+        mechanism, _, initial = argument.partition( ' ' )
+        if mechanism.upper() == 'PLAIN':
+          password = base64.b64decode( initial ).split( b'\0' )[-1].decode()
+        else:
+          self.reply( '334 VXNlcm5hbWU6' )
+          self.rfile.readline()
+          self.reply( '334 UGFzc3dvcmQ6' )
+          password = base64.b64decode( self.rfile.readline().strip() ).decode()
+        if stub.password is not None and password != stub.password:
+          self.reply( '535 authentication failed' )
+          return
+        with stub.lock:
+          stub.logins += 1
+        self.reply( '235 authentication successful' )
+
+    class Server( socketserver.ThreadingTCPServer ):
+      daemon_threads = True
+      allow_reuse_address = True
+
+    self.server = Server( ( '127.0.0.1', 0 ), Handler )
+    self.host, self.port = self.server.server_address
+
+  def __enter__( self ):
+    threading.Thread( target = self.server.serve_forever, daemon = True ).start()
+    return self
+
+  def __exit__( self, *exc ):
+    self.server.shutdown()
+    self.server.server_close()
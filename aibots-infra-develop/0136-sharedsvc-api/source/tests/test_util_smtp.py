@@ -0,0 +1,94 @@
+from email.message import EmailMessage
+
+import pytest
+
+import util_smtp
+from smtp_stub import SMTPStub
+
+################################################################################
+def message( subject, to = 'to@example.com' ):
+  msg = EmailMessage()
+  msg['From'] = 'from@example.com'
+  msg['To'] = to
+  msg['Subject'] = subject
+  msg.set_content( 'body of {}'.format( subject ) )
+  return msg
+
+def session( stub ):
+  return util_smtp.SMTPSession( 'user', 'pass', stub.host, stub.port, require_tls = False )
+
+def subjects( stub ):
+  return [ m['data'].split( b'Subject: ' )[1].split( b'\r\n' )[0].decode() for m in stub.messages ]
+
+################################################################################
+def test_session_is_reused_across_messages():
+  with SMTPStub( password = 'pass' ) as stub:
+    smtp = session( stub )
+    results = smtp.send_many( [ message( 'one' ), message( 'two' ) ] )
+    results += smtp.send_many( [ message( 'three' ) ] )
+    smtp.close()
+
+  assert all( result['sent'] for result in results )
+  assert subjects( stub ) == [ 'one', 'two', 'three' ]
+  assert stub.connections == 1
+  assert stub.logins == 1
+
+def test_get_session_caches_by_credentials():
+  first = util_smtp.get_session( 'user', 'pass', 'localhost', 2525 )
+  assert util_smtp.get_session( 'user', 'pass', 'localhost', 2525 ) is first
+  assert util_smtp.get_session( 'user', 'other', 'localhost', 2525 ) is not first
+
+def test_drop_before_data_is_resent_on_a_new_connection():
+  with SMTPStub( drop_after = 1 ) as stub:
+    smtp = session( stub )
+    results = smtp.send_many( [ message( 'one' ), message( 'two' ) ] )
+    smtp.close()
+
+  assert [ result['sent'] for result in results ] == [ True, True ]
+  assert subjects( stub ) == [ 'one', 'two' ]
+  assert stub.connections == 2
+
+def test_drop_after_data_is_not_resent():
+  with SMTPStub( drop_in_data = 1 ) as stub:
+    smtp = session( stub )
+    results = smtp.send_many( [ message( 'one' ), message( 'two' ) ] )
+    smtp.close()
+
+  assert [ result['sent'] for result in results ] == [ False, True ]
+  assert 'after DATA' in results[0]['error']
+  # the server took 'one' before dropping, it is not delivered twice
+  assert subjects( stub ) == [ 'one', 'two' ]
+  assert stub.connections == 2
+
+def test_drop_after_data_raises_from_send():
+  with SMTPStub( drop_in_data = 1 ) as stub:
+    smtp = session( stub )
+    with pytest.raises( util_smtp.DeliveryUnknown ):
+      smtp.send( message( 'one' ) )
+
+  assert len( stub.messages ) == 1
+  assert smtp.server is None
+
+def test_partially_refused_recipients_are_reported():
+  with SMTPStub( refuse = [ 'bad@example.com' ] ) as stub:
+    smtp = session( stub )
+    results = smtp.send_many( [
+      message( 'some', to = 'good@example.com, bad@example.com' ),
+      message( 'none', to = 'bad@example.com' ),
+    ] )
+    smtp.close()
+
+  assert results[0]['sent']
+  assert results[0]['refused'] == { 'bad@example.com': [ 550, 'mailbox unavailable' ] }
+  assert not results[1]['sent']
+  assert results[1]['error'] == 'all recipients refused'
+  assert stub.messages[0]['rcpt_tos'] == [ 'good@example.com' ]
+  assert len( stub.messages ) == 1
+
+def test_failed_login_is_reported_for_every_message():
+  with SMTPStub( password = 'other' ) as stub:
+    smtp = session( stub )
+    results = smtp.send_many( [ message( 'one' ), message( 'two' ) ] )
+
+  assert [ result['sent'] for result in results ] == [ False, False ]
+  assert stub.messages == []
@@ -2,11 +2,12 @@ import json
 import boto3
 import os
 import re
+import time
 
 import logging
 logging.getLogger().setLevel(logging.INFO)
 
-from pymongo import MongoClient, errors
+from pymongo import MongoClient, UpdateOne, errors
 
 project_db__secret = os.environ['PROJECT_DB__SECRET']
 
@@ -16,75 +17,158 @@ sqs_client = boto3.client('sqs')
 rag_flow = os.environ['RAG_FLOW']
 rag_flow_component = os.environ['RAG_FLOW_COMPONENT']
 
+# collection holding one status document per (bot_id, doc_id)
+rag_status__collection = os.environ.get('RAG_STATUS__COLLECTION', 'rag_status')
+
+# how long a cached secret is trusted before checking for a rotated version
+SECRET_TTL_SECONDS = int(os.environ.get('PROJECT_DB__SECRET_TTL', '300'))
+
+# DocumentDB error code for failed authentication
+AUTHENTICATION_FAILED = 18
+
+################################################################################
+# # Cached across warm invocations, so that the TLS and auth handshakes to
+# # DocumentDB happen once per container instead of once per batch.
+################################################################################
+_cache = {
+  "secret_version": None,
+  "secret_checked": 0.0,
+  "db": None,
+}
+
+def get_db(force_refresh=False):
+  """Gets the cached database, reconnecting only when the secret has rotated
+
+  The secret is re-read at most every SECRET_TTL_SECONDS, or immediately when
+  force_refresh is set, e.g. after an authentication failure. The client is
+  rebuilt only when the secret version differs from the cached one.
+
+  Args:
+    force_refresh (bool): Re-read the secret regardless of its age
+
+  Returns:
+    Database: The pymongo.database.Database object
+
+  Raises:
+    ConnectionError: If no connection could be established
+
+  """
+  now = time.monotonic()
+  stale = now - _cache["secret_checked"] > SECRET_TTL_SECONDS
+  if _cache["db"] is not None and not stale and not force_refresh:
+    return _cache["db"]
+
+  version, current_dict = get_secret_version(secrets_client, project_db__secret, "AWSCURRENT")
+  _cache["secret_checked"] = now
+  if _cache["db"] is not None and version == _cache["secret_version"]:
+    return _cache["db"]
+
+  if _cache["db"] is not None:
+    logging.info("secret version changed, reconnecting to MongoDB.")
+    reset_db()
+  db = get_connection(current_dict)
+  if db is None:
+    raise ConnectionError("fail to connect to MongoDB.")
+  _cache["db"], _cache["secret_version"] = db, version
+  return db
+
+def reset_db():
+  """Closes and forgets the cached client, the next get_db reconnects"""
+  if _cache["db"] is not None:
+    _cache["db"].client.close()
+  _cache["db"], _cache["secret_version"] = None, None
+
+def to_update(message):
+  """Builds the status upsert for one sqs message
+
+  Args:
+    message (dict): The status message sent by a rag component
+
+  Returns:
+    UpdateOne: Upsert of the flow status into the (bot_id, doc_id) document
+
+  Raises:
+    KeyError: If the message does not contain the expected keys
+
+  """
+  status = message[rag_flow][rag_flow_component]
+  return UpdateOne(
+    { "bot_id": message["bot_id"], "doc_id": message["doc_id"] },
+    { "$set": {
+        "action": message["action"],
+        "{}.{}.{}".format( rag_flow, status["flow"], status["component"] ): {
+          "dts"    : status["dts"],
+          "status" : status["status"],
+          "reason" : status["reason"],
+        },
+    } },
+    upsert = True,
+  )
+
+def write_updates(db, updates):
+  """Applies the updates as one ordered bulk_write
+
+  Args:
+    db (Database): The pymongo.database.Database object
+    updates (list): UpdateOne operations, in sqs order
+
+  Returns:
+    int: Number of leading updates applied. An ordered bulk write stops at
+      the first failing operation, so that one and all after it are not applied.
+
+  """
+  if not updates:
+    return 0
+  try:
+    result = db[rag_status__collection].bulk_write(updates, ordered=True)
+    logging.info('{}'.format( json.dumps(result.bulk_api_result, default = str) ))
+    return len(updates)
+  except errors.BulkWriteError as e:
+    write_errors = e.details.get("writeErrors", [])
+    logging.error('fail to update status >> {}'.format( json.dumps(write_errors, default = str) ))
+    return min( error["index"] for error in write_errors ) if write_errors else 0
+
 def lambda_handler(event, context):
-  # TODO implement
   # Everything is in the event
   logging.info('got event {}'.format( json.dumps(event) ))
 
-  # Do what you need to do
+  # https://docs.aws.amazon.com/lambda/latest/dg/services-sqs-errorhandling.html
+  batch_item_failures = []
+  sqs_batch_response = {}
+
+  # loop into the SQS payload, can contain up to 10 records.
+  updates, update_ids = [], []
+  for idx, record in enumerate( event['Records'] ):
+    logging.info('processing SNS record {} of {}'.format( idx+1, len( event['Records'] ) ) )
+    try:
+      message = json.loads( record['body'] )
+      updates.append( to_update(message) )
+      update_ids.append( record['messageId'] )
+
+    except Exception as e:
+      # when there is error processing the message
+      # log error to send to slack
+      logging.error( '{} >> error processing sqs message >> {}'.format( context.function_name, str(e) ) ) # sends to the channel
+      # inform SQS this message failed to process at the end
+      batch_item_failures.append({"itemIdentifier": record['messageId']})
+
+  ##############################################################################
+  # # updating the status, all records of the batch in one round-trip
+  ##############################################################################
   try:
-    # https://docs.aws.amazon.com/lambda/latest/dg/services-sqs-errorhandling.html
-    batch_item_failures = []
-    sqs_batch_response = {}
-
-    # Make sure the current secret exists
-    current_dict = get_secret_dict(secrets_client, project_db__secret, "AWSCURRENT")
-    # get a connection
-    conn = get_connection(current_dict)
-    # try to Mongo by listing databases
-    conn.command( "listDatabases" )
-
-    # loop into the SQS payload, can contain up to 10 records.
-    for idx, record in enumerate( event['Records'] ):
-      logging.info('processing SNS record {} of {}'.format( idx+1, len( event['Records'] ) ) )
-
-      ##########################################################################
-      # # processing sqs message
-      ##########################################################################
-      try:
-        message = json.loads( record['body'] )
-        logging.info('{}'.format( json.dumps(message) ))
-
-        # process the SQS message here.
-        # YOU SHALL ADD YOUR LOGIC HERE
-        bot_id    = message["bot_id"]
-        doc_id    = message["doc_id"]
-        action    = message["action"]
-        flow      = message[rag_flow][rag_flow_component]["flow"]
-        component = message[rag_flow][rag_flow_component]["component"]
-        dts       = message[rag_flow][rag_flow_component]["dts"]
-        status    = message[rag_flow][rag_flow_component]["status"]
-        reason    = message[rag_flow][rag_flow_component]["reason"]
-
-      except Exception as e:
-        # when there is error processing the message
-        # log error to send to slack
-        logging.error( '{} >> error processing sqs message >> {}'.format( context.function_name, str(e) ) ) # sends to the channel
-        # inform SQS this message failed to process at the end
-        batch_item_failures.append({"itemIdentifier": record['messageId']})
-        continue # proceed to next record
-
-      ##########################################################################
-      # # updating the status
-      ##########################################################################
-      try:
-        # run pymongo command to update status.
-        response = conn.command( "listDatabases" )
-        logging.info( "Successfully update status." )
-        logging.info('{}'.format( json.dumps(response, default = str) ))
-
-      except errors.PyMongoError:
-        # log error to send to slack
-        logging.error('sqs message ended with error, fail to update status.')
-        # inform SQS this message failed to process at the end
-        batch_item_failures.append( { "itemIdentifier": record['messageId'] } )
-        continue # to next record
-
-      ##########################################################################
-
-  # except errors.PyMongoError:
+    try:
+      applied = write_updates( get_db(), updates )
+    except errors.OperationFailure as e:
+      if e.code != AUTHENTICATION_FAILED:
+        raise
+      # the secret was rotated since it was cached, re-read it and retry once
+      logging.info("Authentication failed, refreshing secret.")
+      applied = write_updates( get_db(force_refresh=True), updates )
+
   except Exception as e:
-    logging.error('sqs batch error, fail to connect to MongoDB.')
+    logging.error('sqs batch error, fail to connect to MongoDB >> {}'.format( str(e) ))
+    # drop the client so that the next invocation reconnects
+    reset_db()
 
     # https://docs.aws.amazon.com/lambda/latest/dg/services-sqs-errorhandling.html#services-sqs-batchfailurereporting
     # We can't connect to Mongo, so no point continue, just fail whole batch.
@@ -93,8 +177,8 @@ def lambda_handler(event, context):
     logging.info( { "batchItemFailures": [ { "itemIdentifier": "" } ] } )
     return { "batchItemFailures": [ { "itemIdentifier": "" } ] }
 
-  # conn.logout() # deprecated
-  # https://pymongo.readthedocs.io/en/stable/migrate-to-pymongo4.html#database-authenticate-and-database-logout-are-removed
+  # the failing update and every update after it were not applied
+  batch_item_failures.extend( { "itemIdentifier": message_id } for message_id in update_ids[applied:] )
 
   # This return will tell SQS to retry which failed message.
   # default all pass will return { "batchItemFailures": [] }
@@ -209,8 +293,9 @@ def connect_and_authenticate(secret_dict, host, port, dbname, use_ssl):
   try:
     # Hostname verfification and server certificate validation enabled by default when ssl=True
     # client = MongoClient(host=secret_dict['host'], port=port, connectTimeoutMS=5000, serverSelectionTimeoutMS=5000, ssl=use_ssl)
+    # DocumentDB does not support retryable writes
     client = MongoClient(host=host, port=port, connectTimeoutMS=5000, serverSelectionTimeoutMS=5000, ssl=use_ssl,
-      username=secret_dict['username'], password=secret_dict['password']
+      username=secret_dict['username'], password=secret_dict['password'], retryWrites=False
     )
     db = client[dbname]
     # db.authenticate(secret_dict['username'], secret_dict['password']) # https://pymongo.readthedocs.io/en/stable/migrate-to-pymongo4.html#database-authenticate-and-database-logout-are-removed
@@ -261,6 +346,19 @@ def get_secret_dict(service_client, arn, stage, token=None):
 
     ValueError: If the secret is not valid JSON
 
+  """
+  return get_secret_version(service_client, arn, stage, token)[1]
+
+################################################################################
+################################################################################
+def get_secret_version(service_client, arn, stage, token=None):
+  """Gets the version id and secret dictionary for the secret arn, stage, and token
+
+  Same as get_secret_dict, the version id lets callers detect a rotation.
+
+  Returns:
+    Tuple(version_id, secret_dict)
+
   """
   required_fields = ['host', 'username', 'password']
 
@@ -280,4 +378,4 @@ def get_secret_dict(service_client, arn, stage, token=None):
       raise KeyError("%s key is missing from secret JSON" % field)
 
   # Parse and return the secret JSON string
-  return secret_dict
\ No newline at end of file
+  return secret['VersionId'], secret_dict
\ No newline at end of file
@@ -181,4 +181,6 @@ resource "aws_lambda_event_source_mapping" "project_dlq" {
   enabled          = true
   function_name    = data.aws_lambda_function.notification.arn
   # batch_size       = 1
+
+  function_response_types = [ "ReportBatchItemFailures" ]
 }
\ No newline at end of file
@@ -243,5 +243,5 @@ resource "aws_lambda_event_source_mapping" "project_dlq" {
   # maximum_batching_window_in_seconds  = 10 # wait seconds to gather messages
   # batch_size                          = 10 # number of messages to pack
 
-  # function_response_types = "ReportBatchItemFailures"
+  function_response_types = [ "ReportBatchItemFailures" ]
 }
\ No newline at end of file
@@ -1,27 +1,24 @@
 import datetime
 import traceback
 
-import boto3 as boto3
 from fastapi import APIRouter, HTTPException, Security, status, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from app.common.auth_types import EmailOtpType, EmailType
-from app.common.mail_util import find_and_replace_placeholders
 from app.common.otp_model import OtpModel
+from app.common.aws import sns_client
 from app.config import (JWT_VALID_HOURS, OTP_VALID_MINUTES,
                         TABLE_LAUNCHPAD_OTP, dynamodb, AWS_REGION_NAME, logger, SNS_SLACK_TOPIC_ARN,
                         DATETIME_MS_FORMAT)
 from app.utils.auth_util import (JWT_SECRET, decode_jwt_token, gen_jwt_token,
                                  gen_otp)
-from app.utils.ses_util import compose_otp_email, queue_an_email, send_an_email
+from app.utils.ses_util import compose_otp_email, queue_an_email_async
 
 router = APIRouter()
 security_http_bearer = HTTPBearer()
 
 model_otp = OtpModel(dynamodb, TABLE_LAUNCHPAD_OTP)
 
-sns_client = boto3.client(service_name='sns', region_name=AWS_REGION_NAME)
-
 
 @router.post('/email_otp', summary="Request for an OTP through email")
 async def email_otp(payload: EmailType, request: Request):
@@ -66,22 +63,8 @@ async def email_otp(payload: EmailType, request: Request):
         job = compose_otp_email(to_emails=[email],
                                 placeholders=placeholders)
 
-        # TODO Queue an email +++++++++++++++++++
-        # result = queue_an_email(job)
-        # TODO +++++++++++++++++++
-
-        # TODO To be replaced by queue_an_email +++++++++++++++++++
-        if job.message_html:
-            # Fill placeholders, which is surrounded by {{}}, in message_html with values from placeholders
-            job.message_html = find_and_replace_placeholders(
-                job.message_html, placeholders)
-        if job.message_text:
-            job.message_text = find_and_replace_placeholders(
-                job.message_text, placeholders)
-        job.subject = find_and_replace_placeholders(
-            job.subject, placeholders)
-        result = send_an_email(job)
-        # TODO +++++++++++++++++++
+        # Sent by Mail Postman, the request only waits for the job to be queued
+        result = await queue_an_email_async(job)
 
         logger.info(f'Queued OTP Email: {result}')
 
@@ -10,13 +10,12 @@ from pathlib import Path
 from typing import Optional
 from uuid import uuid1
 
-import boto3
 from fastapi import (APIRouter, HTTPException, Request, Security, status)
 from fastapi.responses import JSONResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 
-from app.config import AWS_REGION_NAME
+from app.common.aws import s3_client, sqs_client, sns_client, lambda_client
 from app.utils.auth_util import check_token_permission
 from app.utils.file_util import (remove_prefix)
 from app.utils.s3_file import extract_s3_zip_file
@@ -33,11 +32,6 @@ DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
 BUCKET_NAME = os.environ.get('BUCKET_NAME_COMMON', '')
 TARGET_KEY = os.environ.get('S3_KEY_COMMON', '')
 
-s3_client = boto3.client(service_name='s3', region_name=AWS_REGION_NAME)
-sqs_client = boto3.client(service_name='sqs', region_name=AWS_REGION_NAME)
-sns_client = boto3.client(service_name='sns', region_name=AWS_REGION_NAME)
-lambda_client = boto3.client(service_name='lambda', region_name=AWS_REGION_NAME)
-
 
 class UnzipS3FileType(BaseModel):
     """
@@ -1,7 +1,6 @@
-import boto3
 import os
 
-from app.config import AWS_REGION_NAME
+from app.config import AWS_REGION_NAME, services
 
 AWS_ENDPOINT = os.environ.get('AWS_ENDPOINT', None)
 
@@ -10,10 +9,12 @@ SETTINGS = {
     'region_name': AWS_REGION_NAME,
     'endpoint_url': AWS_ENDPOINT}
 
-s3_client = boto3.client(service_name='s3', **SETTINGS)
-sqs_client = boto3.client(service_name='sqs', **SETTINGS)
-sns_client = boto3.client(service_name='sns', **SETTINGS)
-lambda_client = boto3.client(service_name='lambda', **SETTINGS)
-dynamodb = boto3.resource(service_name="dynamodb", **SETTINGS)
+# One client per service for the whole app, created on first use
+s3_client = services.lazy_client('s3', **SETTINGS)
+sqs_client = services.lazy_client('sqs', **SETTINGS)
+sns_client = services.lazy_client('sns', **SETTINGS)
+ses_client = services.lazy_client('ses', **SETTINGS)
+lambda_client = services.lazy_client('lambda', **SETTINGS)
+dynamodb = services.lazy_resource('dynamodb', **SETTINGS)
 
-s3_resource = boto3.resource(service_name='s3', **SETTINGS)
+s3_resource = services.lazy_resource('s3', deferred=(), **SETTINGS)
@@ -5,6 +5,7 @@ from email.mime.application import MIMEApplication
 from email.mime.image import MIMEImage
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import markdown
@@ -12,20 +13,15 @@ import markdown
 import boto3
 
 from app.config import LOCAL_FOLDER, logger
+from app.common.aws import s3_client, ses_client, sqs_client
 from app.common.mail_task_type import MailTaskType
+from app.utils.asset_util import fetch_assets, fetch_s3_assets, fetch_url
 from app.utils.file_util import hash_by_md5
 from app.utils.re_util import (find_placeholders_in_text,
                                replace_image_urls_with_cid_in_html)
-from app.utils.s3_util import (download_file_object_from_bucket,
-                               key_exists_in_bucket, list_files_in_bucket,
-                               read_file_from_bucket)
+from app.utils.s3_util import list_files_in_bucket, read_file_from_bucket
 from app.utils.ses_util import send_raw_email
-from app.utils.url_util import download_file_from_url
 
-session = boto3.session.Session()
-s3_client = session.client('s3')
-ses_client = session.client('ses')
-sqs_client = session.client('sqs')
 
 ADMIN_EMAIL = os.environ.get('EMAIL_ADMIN', 'data@tech.gov.sg')
 
@@ -105,11 +101,9 @@ def attach_s3_images_to_email(msg: MIMEMultipart, s3_client, bucket_name: str,
     """
     Add all images, which match key prefix in a s3 bucket, to an email message
     """
-    for file_key in s3_file_keys:
-        if key_exists_in_bucket(s3_client, bucket_name, file_key):
-            obj = download_file_object_from_bucket(
-                s3_client, bucket_name, file_key)
-            img_data = MIMEImage(obj['Body'].read())
+    for file_key, asset in fetch_s3_assets(s3_client, bucket_name, s3_file_keys).items():
+        if asset:
+            img_data = MIMEImage(asset[1])
             img_data.add_header('Content-ID', f'<{file_key}>')
             msg.attach(img_data)
     return msg
@@ -120,14 +114,12 @@ def attach_s3_files_to_email(msg: MIMEMultipart, s3_client, bucket_name: str,
     """
     Attach all files, which match key prefix in a S3 bucket, to an email message
     """
-    for file_key in s3_file_keys:
-        if key_exists_in_bucket(s3_client, bucket_name, file_key):
+    for file_key, asset in fetch_s3_assets(s3_client, bucket_name, s3_file_keys).items():
+        if asset:
             p = Path(file_key)
             file_name = p.name
-            obj = download_file_object_from_bucket(
-                s3_client, bucket_name, file_key)
             part = MIMEApplication(
-                obj['Body'].read(), _subtype=p.suffix[1:] if p.suffix else '')
+                asset[1], _subtype=p.suffix[1:] if p.suffix else '')
             part.add_header("Content-Disposition",
                             'attachment', filename=file_name)
             msg.attach(part)
@@ -186,9 +178,15 @@ def prepare_html_message_to_embed_images(html: str) -> Tuple[str, str]:
     image_folder_path = pathlib.Path(
         LOCAL_FOLDER).joinpath(image_folder_name)
     image_folder_path.mkdir(parents=True, exist_ok=True)
+    # Download the distinct images concurrently, images of a repeated newsletter come from the cache
+    assets = fetch_assets(urls.values(), fetch_url)
     for file_stem, url in urls.items():
-        download_file_from_url(url, str(image_folder_path),
-                               file_name=None, file_stem=file_stem)
+        if assets[url] is None:
+            logger.warning(f"Failed to embed image in email: {url}")
+            continue
+        content_type, content = assets[url]
+        file_ext = content_type.split(';')[0].split('/')[-1]
+        image_folder_path.joinpath(f'{file_stem}.{file_ext}').write_bytes(content)
     return html_cid, str(image_folder_path)
 
 
@@ -229,12 +227,11 @@ def process_email_task(payload: MailTaskType, configSetName: str = None) -> Dict
     # Embedded images to message
     attach_local_images_to_email(msg, images_folder=image_folder_path)
 
-    # Add attachments to message
-    for key_prefix in payload.attachments:
-        files = list_files_in_bucket(
-            s3_client, payload.bucket_name, key_prefix)
-        msg = attach_s3_files_to_email(
-            msg, s3_client, payload.bucket_name, files)
+    # Add attachments to message, fetched together
+    files = [f for key_prefix in payload.attachments
+             for f in list_files_in_bucket(s3_client, payload.bucket_name, key_prefix)]
+    msg = attach_s3_files_to_email(
+        msg, s3_client, payload.bucket_name, files)
 
     # Send Emails
     return send_raw_email(ses_client, msg, payload.from_email, to_emails=payload.to_emails, configSetName=configSetName)
@@ -263,6 +260,14 @@ def process_email_task_from_message_files(payload: MailTaskType, configSetName=N
             payload.message_text = f.read()
     return process_email_task(payload, configSetName)
 
+@lru_cache(maxsize=None)
+def load_email_template(name: str) -> str:
+    """
+    An HTML template of app/common/email_template, read once per container
+    """
+    return (Path("app/common/email_template") / name).read_text()
+
+
 def compose_ai_response_email(to_email: str,
                       placeholders: Dict,
                       from_email=ADMIN_EMAIL) -> MailTaskType:
@@ -291,12 +296,10 @@ def compose_ai_response_email(to_email: str,
     # </html>
     # """
 
-    template_folder = Path("app/common/email_template")
-
-    header_html = (template_folder/"email_header.html").read_text()
-    user_html = (template_folder/"user_template.html").read_text()
-    ai_html = (template_folder/"ai_template.html").read_text()
-    footer_html = (template_folder/"email_footer.html").read_text()
+    header_html = load_email_template("email_header.html")
+    user_html = load_email_template("user_template.html")
+    ai_html = load_email_template("ai_template.html")
+    footer_html = load_email_template("email_footer.html")
 
     job.message_html = header_html
 
@@ -314,6 +317,9 @@ def compose_ai_response_email(to_email: str,
     job.message_html += footer_html
     logger.info(f'message_html: {job.message_html}')
 
+    # The messages are rendered into message_html, the rest must be strings for the job to be queued
+    job.placeholders = {k: v for k, v in placeholders.items() if isinstance(v, str)}
+
     logger.info(f'Composed AI Email: {job}')
     return job
 
@@ -29,14 +29,7 @@ class OtpModel(DynamodbModel):
         self.dynamodb = dynamodb
         self.table_name = table_name
         self.table = dynamodb.Table(table_name)
-
-        # Check if table exists
-        try:
-            self.table.table_status in (
-                "CREATING", "UPDATING", "DELETING", "ACTIVE")
-        except ClientError:
-            logger.error(f"DynamoDB Table {table_name} doesn't exist.")
-            raise
+        # No DescribeTable at import, a missing table fails on first use or in verify_table()
 
     def put_item(self, email: str, otp: str, others: Dict):
         """Save a record into database.
@@ -0,0 +1,106 @@
+"""
+Rolling per-caller token counters.
+
+Token usage is accumulated into fixed time buckets (one item per caller per hour),
+so a quota check reads at most `past_hours + 1` small items regardless of how many
+requests the caller has made.
+    PK: llm_task = QUOTA#<task>#<caller>, SK: id = <bucket start epoch, zero-padded>
+"""
+
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+BUCKET_SECONDS = 3600
+
+
+def bucket_start(timestamp: float) -> int:
+    """
+    Start (epoch seconds) of the bucket containing `timestamp`
+    """
+    return int(timestamp // BUCKET_SECONDS) * BUCKET_SECONDS
+
+
+def bucket_id(start: int) -> str:
+    # Zero-pad the epoch so that ids sort lexicographically in time order
+    return f"{start:012d}"
+
+
+class QuotaCounterModel:
+    """
+    DynamoDB model for rolling token counters, stored alongside the usage items
+    """
+
+    def __init__(self, dynamodb, table_name, llm_task: str = 'GPT#chat', retention_hours: int = 48):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.table = dynamodb.Table(table_name)
+        self.llm_task = f'QUOTA#{llm_task}'
+        self.retention_hours = retention_hours
+
+    def partition_key(self, caller: str) -> str:
+        # One partition per caller, so heavy users do not share a hot key
+        return f'{self.llm_task}#{caller}'
+
+    def add_tokens(self, caller: str, tokens: int, timestamp: Optional[float] = None) -> None:
+        """
+        Atomically add `tokens` to the caller's current bucket.
+        Buckets carry an `expires_at` attribute for DynamoDB TTL clean up.
+        """
+        if not tokens:
+            return
+        start = bucket_start(timestamp or time.time())
+        self.table.update_item(
+            Key={'llm_task': self.partition_key(caller), 'id': bucket_id(start)},
+            UpdateExpression='ADD tokens_used :tokens SET expires_at = if_not_exists(expires_at, :expires_at)',
+            ExpressionAttributeValues={
+                ':tokens': int(tokens),
+                ':expires_at': start + self.retention_hours * 3600,
+            },
+        )
+
+    def get_tokens_used(self, caller: str, past_hours: int = 24, timestamp: Optional[float] = None) -> int:
+        """
+        Total tokens used by the caller in the buckets covering the past `past_hours`.
+        The oldest bucket is counted in full, so the window errs on the strict side by up to one bucket.
+        """
+        now = timestamp or time.time()
+        params = {
+            'KeyConditionExpression': 'llm_task = :llm_task AND id BETWEEN :start AND :end',
+            'ExpressionAttributeValues': {
+                ':llm_task': self.partition_key(caller),
+                ':start': bucket_id(bucket_start(now - past_hours * 3600)),
+                ':end': bucket_id(bucket_start(now)),
+            },
+            'ProjectionExpression': 'tokens_used',
+        }
+        response = self.table.query(**params)
+        items = response.get('Items', [])
+        # At most past_hours + 1 small items, but honour pagination regardless
+        while response.get('LastEvaluatedKey'):
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            response = self.table.query(**params)
+            items.extend(response.get('Items', []))
+        return int(sum(i.get('tokens_used', 0) for i in items))
+
+
+class InMemoryQuotaCounterModel:
+    """
+    In-memory stand-in for QuotaCounterModel, for tests and local runs
+    """
+
+    def __init__(self, llm_task: str = 'GPT#chat'):
+        self.llm_task = f'QUOTA#{llm_task}'
+        self.buckets: Dict[str, Dict[int, int]] = defaultdict(dict)
+
+    def add_tokens(self, caller: str, tokens: int, timestamp: Optional[float] = None) -> None:
+        if not tokens:
+            return
+        start = bucket_start(timestamp or time.time())
+        self.buckets[caller][start] = self.buckets[caller].get(start, 0) + int(tokens)
+
+    def get_tokens_used(self, caller: str, past_hours: int = 24, timestamp: Optional[float] = None) -> int:
+        now = timestamp or time.time()
+        oldest = bucket_start(now - past_hours * 3600)
+        newest = bucket_start(now)
+        return sum(t for start, t in self.buckets.get(caller, {}).items() if oldest <= start <= newest)
@@ -4,7 +4,7 @@ Note: DynamoDB related functions always return a dictionary containing at least
 
 import time
 from http import HTTPStatus
-from typing import Optional
+from typing import Iterable, Optional
 
 import pytz as pytz
 from boto3.dynamodb.conditions import Key
@@ -12,6 +12,7 @@ from botocore.exceptions import ClientError
 from pydantic import BaseModel, root_validator
 
 from app.common.datetime_util import SG_TIMEZONE, get_curr_dt_str
+from app.common.usage_rollup_model import UsageRollupModel
 from app.config import DATE_FORMAT, logger, DATETIME_TZ_FORMAT, TABLE_USAGE_AUDIT
 from app.utils.dynamodb_model import DynamodbModel
 from app.utils.file_util import hash_by_md5
@@ -32,6 +33,7 @@ class UsageAuditType(BaseModel):
     ip: Optional[str]
     user_agent: Optional[str]
     request_data: Optional[str]
+    model_name: Optional[str]  # Model used by the request, counted separately in the usage rollups
 
     @root_validator
     @classmethod
@@ -67,20 +69,18 @@ class UsageAuditModel(DynamodbModel):
     """
 
     INDEX_SITE_DATE = 'index_site_date'
+    # Maximum seconds to wait for the GSI to become ACTIVE
+    INDEX_WAIT_SECONDS = 60
 
-    def __init__(self, dynamodb, table_name):
+    def __init__(self, dynamodb, table_name, rollup=None):
         super().__init__(dynamodb, table_name)
         self.dynamodb = dynamodb
         self.table_name = table_name
         self.table = dynamodb.Table(table_name)
-
-        # Check if table exists
-        try:
-            self.table.table_status in (
-                "CREATING", "UPDATING", "DELETING", "ACTIVE")
-        except ClientError:
-            logger.error(f"DynamoDB Table {table_name} doesn't exist.")
-            raise
+        # Usage counters updated on every put_item(), e.g. InMemoryUsageRollupModel for tests
+        self.rollup = rollup if rollup is not None else UsageRollupModel(dynamodb, table_name)
+        self.index_active = False
+        # No DescribeTable at import, a missing table fails on first use or in verify_table()
 
     def put_item(self, item: UsageAuditType):
         """Save a record into database.
@@ -98,6 +98,12 @@ class UsageAuditModel(DynamodbModel):
             )
             logger.info(response)
 
+            try:
+                self.rollup.record(item)
+            except ClientError as e:
+                # The audit item is saved, a missed count can be restored with backfill_usage()
+                logger.error(f'Failed to update usage rollup: {e}')
+
             return {
                 'HTTPStatusCode': response['ResponseMetadata']['HTTPStatusCode'],
                 'Message': 'Put: Successful'}
@@ -188,21 +194,50 @@ class UsageAuditModel(DynamodbModel):
             return {'HTTPStatusCode': 404,
                     'Message': f'Items not found for session_hash={session_hash}'}
 
+    def wait_for_index(self):
+        """Wait if global secondary indexes are being updated.
+        An index stays ACTIVE once built, so the table is only described until it is seen ACTIVE.
+        """
+        deadline = time.monotonic() + self.INDEX_WAIT_SECONDS
+        while not self.index_active:
+            indexes = self.table.global_secondary_indexes
+            if indexes and indexes[0]['IndexStatus'] == 'ACTIVE':
+                self.index_active = True
+            elif time.monotonic() > deadline:
+                raise TimeoutError(f'Index {self.INDEX_SITE_DATE} of {self.table_name} is not ACTIVE')
+            else:
+                logger.info('Waiting for index to backfill...')
+                time.sleep(5)
+                self.table.reload()
+
+    def get_usage(self, site_name: str, start_date: str, end_date: Optional[str] = None):
+        """Usage of a site between start_date and end_date (inclusive) from the pre-aggregated counters,
+        one item per day and model, with totals per day, per model and overall.
+        """
+        logger.info(f'Calling get_usage({site_name}, {start_date}, {end_date})')
+        return self.rollup.get_usage(site_name, start_date, end_date)
+
+    def backfill_usage(self, site_name: str, usage_dates: Optional[Iterable[str]] = None):
+        """Rebuild the usage counters of a site from its raw audit items,
+        for the given dates or for all of its history.
+        """
+        logger.info(f'Calling backfill_usage({site_name}, {usage_dates})')
+        if usage_dates is None:
+            responses = [self.list_items_by_site(site_name)]
+        else:
+            responses = [self.list_items_by_site_and_date(site_name, d) for d in usage_dates]
+        items = [i for r in responses for i in r.get('Items', [])]
+        count = self.rollup.backfill(items)
+        return {'HTTPStatusCode': HTTPStatus.OK,
+                'Message': f'Backfilled {count} counters from {len(items)} items'}
+
     def list_items_by_site_and_date(self, site_name: str, usage_date: str):
         """List records using GSI site_name and usage_date
         """
         logger.info(
             f'Calling list_items_by_site_and_date({site_name}, {usage_date})')
 
-        # Wait if global secondary indexes are being updated
-        while True:
-            if not self.table.global_secondary_indexes or self.table.global_secondary_indexes[0][
-                'IndexStatus'] != 'ACTIVE':
-                logger.info('Waiting for index to backfill...')
-                time.sleep(5)
-                self.table.reload()
-            else:
-                break
+        self.wait_for_index()
 
         # Query for records
         params = {
@@ -237,15 +272,7 @@ class UsageAuditModel(DynamodbModel):
         """
         logger.info(f'Calling list_items_by_site({site_name})')
 
-        # Wait if global secondary indexes are being updated
-        while True:
-            if not self.table.global_secondary_indexes or self.table.global_secondary_indexes[0][
-                'IndexStatus'] != 'ACTIVE':
-                logger.info('Waiting for index to backfill...')
-                time.sleep(5)
-                self.table.reload()
-            else:
-                break
+        self.wait_for_index()
 
         # Query for records
         params = {
@@ -311,3 +338,6 @@ if __name__ == '__main__':
     result = model.list_items_by_site_and_date(
         site_name='zorua', usage_date='2022-05-10')
     print("list_items_by_site_and_date():", result)
+
+    result = model.get_usage(site_name='zorua', start_date='2022-05-01', end_date='2022-05-31')
+    print("get_usage():", result)
@@ -0,0 +1,141 @@
+"""
+Pre-aggregated usage counters of whitespace project sites.
+
+Every audit item written increments one counter item per site, day and model, so a
+dashboard query reads one small item per day and model instead of every raw audit item.
+Rollup items are stored alongside the audit items without site_name / usage_date
+attributes, so they stay out of the index_site_date GSI.
+    PK: session_hash = ROLLUP#<site_name>, SK: session_datetime = <usage_date>#<model_name>
+"""
+
+from collections import Counter, defaultdict
+from http import HTTPStatus
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ROLLUP_PREFIX = 'ROLLUP#'
+# Model name of audit items written without one
+NO_MODEL = '-'
+# Sorts after every character used in model names, closes a date range
+RANGE_END = '~'
+
+
+def rollup_key(item) -> Tuple[str, str, str]:
+    """
+    (site_name, usage_date, model_name) of an audit item, a UsageAuditType or its dict()
+    """
+    values = item if isinstance(item, dict) else item.dict()
+    return values['site_name'], values['usage_date'], values.get('model_name') or NO_MODEL
+
+
+def aggregate(items: Iterable) -> Counter:
+    """
+    Number of audit items per (site_name, usage_date, model_name)
+    """
+    return Counter(rollup_key(item) for item in items)
+
+
+def summarise(counters: List[Dict]) -> Dict:
+    """
+    Response of get_usage(): the counters plus totals per day and per model
+    """
+    by_date, by_model = Counter(), Counter()
+    for c in counters:
+        by_date[c['usage_date']] += c['requests']
+        by_model[c['model_name']] += c['requests']
+    return {'Items': counters,
+            'ByDate': dict(sorted(by_date.items())),
+            'ByModel': dict(by_model),
+            'Total': sum(by_date.values()),
+            'HTTPStatusCode': HTTPStatus.OK,
+            'Message': 'Successful'}
+
+
+class UsageRollupModel:
+    """
+    DynamoDB model for usage counters, stored in the usage_audit table
+    """
+
+    def __init__(self, dynamodb, table_name):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.table = dynamodb.Table(table_name)
+
+    @staticmethod
+    def key(site_name: str, usage_date: str, model_name: str) -> Dict:
+        return {'session_hash': f'{ROLLUP_PREFIX}{site_name}', 'session_datetime': f'{usage_date}#{model_name}'}
+
+    def record(self, item, count: int = 1) -> None:
+        """
+        Atomically count an audit item as it is written.
+        """
+        self.table.update_item(
+            Key=self.key(*rollup_key(item)),
+            UpdateExpression='ADD requests :count',
+            ExpressionAttributeValues={':count': int(count)},
+        )
+
+    def backfill(self, items: Iterable) -> int:
+        """
+        Rebuild counters from historical audit items. The counter of every site, day and model
+        found in items is replaced, not added to, so a backfill can be re-run safely; it should
+        only cover days that are complete or written before record() was in use.
+        Returns the number of counter items written.
+        """
+        counts = aggregate(items)
+        with self.table.batch_writer() as batch:
+            for (site_name, usage_date, model_name), requests in counts.items():
+                batch.put_item(Item={**self.key(site_name, usage_date, model_name), 'requests': requests})
+        return len(counts)
+
+    def get_usage(self, site_name: str, start_date: str, end_date: Optional[str] = None) -> Dict:
+        """
+        Counters of a site between start_date and end_date (inclusive, yyyy-mm-dd), one item per day and model.
+        """
+        params = {
+            'KeyConditionExpression': 'session_hash = :site AND session_datetime BETWEEN :start AND :end',
+            'ExpressionAttributeValues': {
+                ':site': f'{ROLLUP_PREFIX}{site_name}',
+                ':start': f'{start_date}#',
+                ':end': f'{end_date or start_date}#{RANGE_END}',
+            },
+        }
+        response = self.table.query(**params)
+        items = response.get('Items', [])
+        while response.get('LastEvaluatedKey'):
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            response = self.table.query(**params)
+            items.extend(response.get('Items', []))
+
+        counters = []
+        for i in items:
+            usage_date, model_name = i['session_datetime'].split('#', 1)
+            counters.append({'site_name': site_name, 'usage_date': usage_date,
+                             'model_name': model_name, 'requests': int(i.get('requests', 0))})
+        return summarise(counters)
+
+
+class InMemoryUsageRollupModel:
+    """
+    In-memory stand-in for UsageRollupModel, for tests and local runs
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[Tuple[str, str], int]] = defaultdict(dict)
+
+    def record(self, item, count: int = 1) -> None:
+        site_name, usage_date, model_name = rollup_key(item)
+        key = (usage_date, model_name)
+        self.counters[site_name][key] = self.counters[site_name].get(key, 0) + int(count)
+
+    def backfill(self, items: Iterable) -> int:
+        counts = aggregate(items)
+        for (site_name, usage_date, model_name), requests in counts.items():
+            self.counters[site_name][(usage_date, model_name)] = requests
+        return len(counts)
+
+    def get_usage(self, site_name: str, start_date: str, end_date: Optional[str] = None) -> Dict:
+        end_date = end_date or start_date
+        counters = [{'site_name': site_name, 'usage_date': usage_date, 'model_name': model_name, 'requests': requests}
+                    for (usage_date, model_name), requests in sorted(self.counters.get(site_name, {}).items())
+                    if start_date <= usage_date <= end_date]
+        return summarise(counters)
@@ -6,6 +6,8 @@ from dotenv import find_dotenv, load_dotenv
 
 from botocore.config import Config as BotoConfig
 
+from app.utils.service_registry import ServiceRegistry
+
 # Boto3 configuration
 boto_config = BotoConfig(
     region_name="ap-southeast-1",
@@ -18,8 +20,14 @@ logger = logging.getLogger()
 
 load_dotenv(find_dotenv())
 
-AWS_ACCOUNT_ID = boto3.client('sts').get_caller_identity().get('Account')
 AWS_REGION_NAME = boto3.session.Session().region_name
+
+# Clients and secrets are created on first use and shared by all routers, see app.common.aws
+services = ServiceRegistry(
+    secret_ttl=int(os.environ.get('SECRET_TTL', 300)),
+    secrets_settings={"endpoint_url": os.getenv("SECRETS_MGR_ENDPOINT_URL"), "config": boto_config},
+)
+
 LOCAL_FOLDER = '/tmp'
 # FOR DEBUGGING
 # LOCAL_FOLDER = 'D:/tmp'
@@ -34,7 +42,7 @@ DYNAMO_SETTINGS = {
     # "endpoint_url": r'http://localhost:8000/',
     "region_name": AWS_REGION_NAME
 }
-dynamodb = boto3.resource("dynamodb", **DYNAMO_SETTINGS)
+dynamodb = services.lazy_resource("dynamodb", **DYNAMO_SETTINGS)
 
 TABLE_MOONSHOT_LLM = os.environ.get('TABLE_MOONSHOT_LLM', '')
 TABLE_MOONSHOT_APIKEY = os.environ.get('TABLE_MOONSHOT_APIKEY', '')
@@ -55,7 +63,6 @@ APP_CODE = os.environ['APP_CODE']
 # Postman
 EMAIL_ADMIN = os.environ.get('EMAIL_ADMIN', 'data@tech.gov.sg')
 QUEUE_EMAIL_JOBS = os.environ['QUEUE_EMAIL_JOBS']
-QUEUE_URL_EMAIL_JOBS = f'https://sqs.{AWS_REGION_NAME}.amazonaws.com/{AWS_ACCOUNT_ID}/{QUEUE_EMAIL_JOBS}'
 LAMBDA_POSTMAN_SEND_EMAIL = os.environ.get('LAMBDA_POSTMAN_SEND_EMAIL', '')
 
 # For developers' alerts
@@ -98,4 +105,15 @@ PALM_USER_DAILY_TOKEN_QUOTA = int(os.environ.get('PALM_USER_DAILY_TOKEN_QUOTA',
 
 STABILITY_MODEL_DEFAULT = "stable-diffusion-v1-5"
 STABILITY_CFG_SCALE_DEFAULT = 7
-STABILITY_STEPS_DEFAULT = 15
\ No newline at end of file
+STABILITY_STEPS_DEFAULT = 15
+
+
+def __getattr__(name):
+    """
+    Settings that need an AWS call, resolved on first use instead of at import
+    """
+    if name == 'AWS_ACCOUNT_ID':
+        return services.account_id
+    if name == 'QUEUE_URL_EMAIL_JOBS':
+        return f'https://sqs.{AWS_REGION_NAME}.amazonaws.com/{services.account_id}/{QUEUE_EMAIL_JOBS}'
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
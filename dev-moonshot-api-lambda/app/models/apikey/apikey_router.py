@@ -6,7 +6,6 @@ from uuid import uuid4
 
 from typing import Optional
 import traceback
-import boto3 as boto3
 
 from fastapi import APIRouter, Security, HTTPException, status, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -16,7 +15,9 @@ from fastapi.responses import RedirectResponse
 from app import config
 from app.models.apikey.apikey_model import ApikeyModel
 from app.utils import llm_util
+from app.utils.auth_cache import apikey_cache, auth_cache_stats
 from app.utils.auth_util import check_token_permission
+from app.common.aws import sns_client
 from app.config import (logger, dynamodb, AWS_REGION_NAME, SNS_SLACK_TOPIC_ARN, DATETIME_TZ_FORMAT, TABLE_MOONSHOT_APIKEY, 
                         COHERE_MODEL_DEFAULT, COHERE_TEMPERATURE_DEFAULT, COHERE_MAX_TOKENS_DEFAULT)
 
@@ -25,8 +26,6 @@ security_http_bearer = HTTPBearer()
 
 model_apikey = ApikeyModel(dynamodb, TABLE_MOONSHOT_APIKEY)
 
-sns_client = boto3.client(service_name='sns', region_name=AWS_REGION_NAME)
-
 class ApikeyType(BaseModel):
     apikey: Optional[str] = None
     email: Optional[str]
@@ -45,7 +44,8 @@ def api_key_auth(apikey: str):
     print(f"{apikey=}")
 
     apihash = f"{apikey[:6]}.{hashlib.sha256(apikey.encode('utf-8')).hexdigest()}"
-    response = model_apikey.get_key_owner(apihash)
+    # Owners are cached for a short TTL, unknown or disabled keys are looked up every time
+    response = apikey_cache.get_or_resolve(apihash, lambda: model_apikey.get_key_owner(apihash))
 
     if not response:
         raise HTTPException(
@@ -111,6 +111,7 @@ async def delete(apikey:str, credentials: HTTPAuthorizationCredentials = Securit
     jwt_sub = check_token_permission(credentials.credentials)
 
     response = model_apikey.delete_item(apikey)
+    apikey_cache.invalidate(apikey)
     print(response)
     if response:
         return "API key deleted"
@@ -132,4 +133,13 @@ async def list_by_email(credentials: HTTPAuthorizationCredentials = Security(sec
     if response:
         return response
     else:
-        return "Error retrieving API keys"
\ No newline at end of file
+        return "Error retrieving API keys"
+
+
+@router.get("/cache_stats")
+async def cache_stats(credentials: HTTPAuthorizationCredentials = Security(security_http_bearer)):
+    """
+    Hit rate of the API key and JWT caches of this container
+    """
+    check_token_permission(credentials.credentials)
+    return auth_cache_stats()
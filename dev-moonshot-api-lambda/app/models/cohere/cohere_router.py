@@ -5,7 +5,6 @@ from uuid import uuid4
 
 from typing import Optional
 import traceback
-import boto3 as boto3
 
 from fastapi import APIRouter, Security, HTTPException, status, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -16,6 +15,7 @@ from app import config
 from app.models.cohere.cohere_model import CohereGenerationModel
 from app.utils import llm_util
 from app.utils.auth_util import check_token_permission
+from app.common.aws import sns_client
 from app.config import (logger, dynamodb, AWS_REGION_NAME, SNS_SLACK_TOPIC_ARN, DATETIME_MS_FORMAT, TABLE_MOONSHOT_LLM, 
                         COHERE_MODEL_DEFAULT, COHERE_TEMPERATURE_DEFAULT, COHERE_MAX_TOKENS_DEFAULT)
 
@@ -27,8 +27,6 @@ security_http_bearer = HTTPBearer()
 
 model_cohere_generation = CohereGenerationModel(dynamodb, TABLE_MOONSHOT_LLM)
 
-sns_client = boto3.client(service_name='sns', region_name=AWS_REGION_NAME)
-
 
 class CohereGenerationType(BaseModel):
     prompt: str
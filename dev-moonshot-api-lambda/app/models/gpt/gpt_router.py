@@ -1,11 +1,12 @@
+import asyncio
 import base64
 import json, os
 from uuid import uuid4
 import datetime
 from decimal import Decimal
 from typing import Optional
+import time
 import traceback
-import boto3 as boto3
 
 from fastapi import APIRouter, Security, HTTPException, status, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -15,21 +16,28 @@ from fastapi.responses import RedirectResponse
 
 from app import config
 from app.models.gpt.gpt_model import GptChatModel
+from app.common.quota_model import QuotaCounterModel
 from app.utils import llm_util
+from app.utils.chat_pipeline import complete_chat
+from app.utils.token_counter import token_counter
+from app.utils.record_writer import RecordWriter
 from app.utils.auth_util import check_token_permission
+from app.common.aws import sns_client
 from app.config import (logger, dynamodb, AWS_REGION_NAME, SNS_SLACK_TOPIC_ARN, DATETIME_MS_FORMAT, DATETIME_MIN_FORMAT, TABLE_MOONSHOT_LLM, 
                         GPT_CHAT_MODEL_DEFAULT, GPT_TEMPERATURE_DEFAULT, GPT_MAX_TOKENS_DEFAULT,
                         GPT_FREQUENCY_PENALTY_DEFAULT, GPT_PRESENSE_PENALTY_DEFAULT, GPT_TOP_P_DEFAULT,
                         GPT_USER_DAILY_TOKEN_QUOTA)
 
-from app.common.mail_util import compose_ai_response_email, process_email_task, find_and_replace_placeholders
+from app.common.mail_util import compose_ai_response_email
+from app.utils.ses_util import queue_an_email_async
 
 router = APIRouter()
 security_http_bearer = HTTPBearer()
 
+quota_counter = QuotaCounterModel(dynamodb, TABLE_MOONSHOT_LLM)
 model_gpt_chat = GptChatModel(dynamodb, TABLE_MOONSHOT_LLM)
-
-sns_client = boto3.client(service_name='sns', region_name=AWS_REGION_NAME)
+# Chat records and quota counts are written on worker threads, with retries
+record_writer = RecordWriter()
 
 
 class GptChatType(BaseModel):
@@ -66,18 +74,15 @@ async def chat(payload: GptChatType, credentials: HTTPAuthorizationCredentials =
     jwt_sub = check_token_permission(credentials.credentials)
     caller = jwt_sub.get('email')
 
-    # Check if caller has exceeded daily quota
-    response = model_gpt_chat.list_tokens_used_by_caller(caller=llm_util.encrypt_identity(caller))
-    items = response.get('Items')
-    print(items)
-    if items:
-        tokens_consumed = sum([i.get('tokens_used',0) for i in items])
-        print('tokens_consumed',tokens_consumed)
-        if tokens_consumed >= GPT_USER_DAILY_TOKEN_QUOTA:
-            raise HTTPException(
-                status_code=429,
-                detail=f"Exceeded daily usage quota",
-            )
+    # Check if caller has exceeded daily quota, using the rolling hourly counters
+    # and an estimate of the prompt, so a request that would take the caller over is not sent
+    tokens_consumed = quota_counter.get_tokens_used(caller=llm_util.encrypt_identity(caller))
+    print('tokens_consumed',tokens_consumed)
+    if tokens_consumed + token_counter.estimate_messages(messages) >= GPT_USER_DAILY_TOKEN_QUOTA:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Exceeded daily usage quota",
+        )
 
     model=GPT_CHAT_MODEL_DEFAULT #'gpt-4'
     # temperature=0 #GPT_TEMPERATURE_DEFAULT
@@ -88,7 +93,10 @@ async def chat(payload: GptChatType, credentials: HTTPAuthorizationCredentials =
 
     # Structure the prompt int
 
-    gpt_response = await llm_util.gpt_chat_completion(messages, model, temperature, max_tokens, top_p, frequency_penalty, presence_penalty)
+    # The first prompt of a conversation gets its title generated at the same time as the response
+    user_prompt = messages[-1]['content']
+    gpt_response, generated_title = await complete_chat(llm_util.gpt_chat_completion, messages, conversation_title,
+                                                        model, temperature, max_tokens, top_p, frequency_penalty, presence_penalty)
     print(gpt_response)
 
     if gpt_response: 
@@ -103,21 +111,17 @@ async def chat(payload: GptChatType, credentials: HTTPAuthorizationCredentials =
             conversation_id = str(uuid4())
 
         if not conversation_title:
-            # Generate a conversation title based on the user prompt
-            user_prompt = messages[-1]['content']
-            conversation_title = user_prompt.title()
-
-            if len(user_prompt) >= 50:
-                title_messages = [{"role": "user","content": f"Generate a short title to describe the following query prompt:\n{user_prompt}\n\nTitle:\n"}]
-                title_response = await llm_util.gpt_chat_completion(messages=title_messages,temperature=0)
-                if title_response:
-                    conversation_title = title_response.get("choices")[0]["message"]['content']
-                    # strip quotes if title is encapsulated in quotes
-                    if conversation_title.startswith('"') and conversation_title.endswith('"'):
-                        conversation_title = conversation_title[1:-1]
-
-        # Store records of GPT usage by storing user, messages, model and response
-        model_gpt_chat.put_chat_response(response_id, conversation_id, conversation_title, messages, model, temperature, response_text, llm_util.encrypt_identity(caller), tokens_used, pinned)
+            # Short prompts are their own title, the prompt is censored like the messages sent to the model
+            conversation_title = generated_title or llm_util.censor_pii(user_prompt).title()
+
+        # Store records of GPT usage by storing user, messages, model and response, off the event loop.
+        # The quota count is a write of its own, so a retried chat record that was already written
+        # cannot skip it, and its bucket is fixed here so a retry adds to the same one
+        caller_id = llm_util.encrypt_identity(caller)
+        await asyncio.gather(
+            record_writer.write(model_gpt_chat.put_chat_response, response_id, conversation_id, conversation_title, messages, model, temperature, response_text, caller_id, tokens_used, pinned),
+            record_writer.write(quota_counter.add_tokens, caller_id, tokens_used, timestamp=time.time()),
+        )
 
         # Return GPT response
         return {
@@ -174,20 +178,8 @@ async def emailme(response_id: str, email: str, credentials: HTTPAuthorizationCr
             job = compose_ai_response_email(to_email=email,
                                     placeholders=placeholders)
 
-            # TODO To be replaced by queue_an_email +++++++++++++++++++
-            if job.message_html:
-                # Fill placeholders, which is surrounded by {{}}, in message_html with values from placeholders
-                job.message_html = find_and_replace_placeholders(
-                    job.message_html, placeholders)
-            if job.message_text:
-                job.message_text = find_and_replace_placeholders(
-                    job.message_text, placeholders)
-            job.subject = find_and_replace_placeholders(
-                job.subject, placeholders)
-            # result = send_an_email(job)
-            # TODO +++++++++++++++++++
-
-            result = process_email_task(job,"mail-postman-config")
+            # Placeholders are filled and images embedded by Mail Postman, out of process
+            result = await queue_an_email_async(job)
 
             logger.info(f'Queued AI Email: {result}')
             model_gpt_chat.mark_emailed(response_id=response_id)
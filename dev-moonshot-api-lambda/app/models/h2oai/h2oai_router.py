@@ -5,7 +5,6 @@ from uuid import uuid4
 
 from typing import Optional
 import traceback
-import boto3 as boto3
 
 from fastapi import APIRouter, Security, HTTPException, status, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -17,6 +16,7 @@ from app import config
 # from app.models.h2oai.h2oai_model import H2OAiGenerationModel
 from app.utils import llm_util
 from app.utils.auth_util import check_token_permission
+from app.common.aws import sns_client
 from app.config import (logger, dynamodb, AWS_REGION_NAME, SNS_SLACK_TOPIC_ARN, DATETIME_MS_FORMAT, TABLE_MOONSHOT_LLM)
 
 from app.common.mail_util import compose_ai_response_email, process_email_task, find_and_replace_placeholders
@@ -26,8 +26,6 @@ security_http_bearer = HTTPBearer()
 
 # model_h2oai_generation = H2OAiGenerationModel(dynamodb, TABLE_MOONSHOT_LLM)
 
-sns_client = boto3.client(service_name='sns', region_name=AWS_REGION_NAME)
-
 
 class H2OAiGenerationType(BaseModel):
     prompt: str
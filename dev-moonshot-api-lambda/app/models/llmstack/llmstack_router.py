@@ -11,14 +11,7 @@ from starlette.datastructures import MutableHeaders
 
 import logging
 
-from app.config import boto_config, LLMSTACK_API_SECRET
-from app.utils.secret_manager_util import get_json_secret_as_dict
-
-llmstack_secret = get_json_secret_as_dict(
-    LLMSTACK_API_SECRET,
-    endpoint_url=os.getenv("SECRETS_MGR_ENDPOINT_URL"),
-    boto_config=boto_config,
-)
+from app.config import services, LLMSTACK_API_SECRET
 
 class PublishFlowType(BaseModel):
     creator_id: str = Form(...)
@@ -44,7 +37,7 @@ async def get_api_key(credentials: HTTPAuthorizationCredentials = Security(secur
     '''
     Returns a valid API key for use with the LLM Stack API
     '''
-    llmstack_api_key = llmstack_secret.get("LLMSTACK_API_KEY")
+    llmstack_api_key = services.secret(LLMSTACK_API_SECRET).get("LLMSTACK_API_KEY")
     return JSONResponse(content={"api_key":llmstack_api_key})
 
 
@@ -56,7 +49,7 @@ async def publish_flow(form_data: PublishFlowType = Depends(), credentials: HTTP
     print(f"{form_data=}")
 
     flow_publish_endpoint = 'https://api.stack.govtext.gov.sg/v1/flows/publish'
-    llmstack_api_key = llmstack_secret.get("LLMSTACK_API_KEY")
+    llmstack_api_key = services.secret(LLMSTACK_API_SECRET).get("LLMSTACK_API_KEY")
 
     headers = {"Authorization":f"Bearer {llmstack_api_key}"}
 
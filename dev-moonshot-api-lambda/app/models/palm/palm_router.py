@@ -5,7 +5,6 @@ import uuid
 
 from typing import Optional
 import traceback
-import boto3 as boto3
 
 from fastapi import APIRouter, Security, HTTPException, status, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -18,12 +17,14 @@ from app.models.palm.palm_text_model import PalmTextModel
 from app.models.palm.palm_chat_model import PalmChatModel
 from app.utils import llm_util
 from app.utils.auth_util import check_token_permission
+from app.common.aws import sns_client
 from app.config import (logger, dynamodb, AWS_REGION_NAME, SNS_SLACK_TOPIC_ARN, DATETIME_MS_FORMAT, DATETIME_MIN_FORMAT, TABLE_MOONSHOT_LLM, 
                         PALM_TEXT_MODEL_DEFAULT, PALM_CHAT_MODEL_DEFAULT, PALM_TEMPERATURE_DEFAULT, PALM_TOP_P_DEFAULT, 
                         PALM_TOP_K_DEFAULT, PALM_MAX_TOKENS_DEFAULT, PALM_USER_DAILY_TOKEN_QUOTA)
 
 # from app.utils.ses_util import compose_gpt_response_email, send_an_email
-from app.common.mail_util import compose_ai_response_email, process_email_task, find_and_replace_placeholders
+from app.common.mail_util import compose_ai_response_email
+from app.utils.ses_util import queue_an_email_async
 
 router = APIRouter()
 security_http_bearer = HTTPBearer()
@@ -31,8 +32,6 @@ security_http_bearer = HTTPBearer()
 model_palm_text = PalmTextModel(dynamodb, TABLE_MOONSHOT_LLM)
 model_palm_chat = PalmChatModel(dynamodb, TABLE_MOONSHOT_LLM)
 
-sns_client = boto3.client(service_name='sns', region_name=AWS_REGION_NAME)
-
 
 class PalmTextType(BaseModel):
     prompt: str
@@ -222,20 +221,8 @@ async def emailme(response_id: str, email: str, credentials: HTTPAuthorizationCr
             job = compose_ai_response_email(to_email=email,
                                     placeholders=placeholders)
 
-            # TODO To be replaced by queue_an_email +++++++++++++++++++
-            if job.message_html:
-                # Fill placeholders, which is surrounded by {{}}, in message_html with values from placeholders
-                job.message_html = find_and_replace_placeholders(
-                    job.message_html, placeholders)
-            if job.message_text:
-                job.message_text = find_and_replace_placeholders(
-                    job.message_text, placeholders)
-            job.subject = find_and_replace_placeholders(
-                job.subject, placeholders)
-            # result = send_an_email(job)
-            # TODO +++++++++++++++++++
-
-            result = process_email_task(job,"mail-postman-config")
+            # Placeholders are filled and images embedded by Mail Postman, out of process
+            result = await queue_an_email_async(job)
 
             logger.info(f'Queued AI Email: {result}')
             model_palm_chat.mark_emailed(response_id=response_id)
@@ -3,7 +3,6 @@ import json
 import datetime
 from typing import Optional
 import traceback
-import boto3 as boto3
 
 from fastapi import APIRouter, Security, HTTPException, status, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -14,6 +13,9 @@ from app import config
 from app.models.response.response_model import GptResponseModel
 from app.utils import llm_util
 from app.utils.auth_util import check_token_permission
+from app.utils.token_counter import token_counter
+from app.utils.record_writer import RecordWriter
+from app.common.aws import sns_client
 from app.config import (logger, dynamodb, AWS_REGION_NAME, SNS_SLACK_TOPIC_ARN, DATETIME_MS_FORMAT, TABLE_MOONSHOT_LLM, 
                         GPT_MODEL_DEFAULT, GPT_TEMPERATURE_DEFAULT, GPT_MAX_TOKENS_DEFAULT, 
                         GPT_TOP_P_DEFAULT, GPT_FREQUENCY_PENALTY_DEFAULT, GPT_PRESENSE_PENALTY_DEFAULT, 
@@ -25,8 +27,8 @@ router = APIRouter()
 security_http_bearer = HTTPBearer()
 
 model_gpt_response = GptResponseModel(dynamodb, TABLE_MOONSHOT_LLM)
-
-sns_client = boto3.client(service_name='sns', region_name=AWS_REGION_NAME)
+# Response records are written on worker threads, with retries
+record_writer = RecordWriter()
 
 
 class GptPromptType(BaseModel):
@@ -58,7 +60,8 @@ async def prompt(payload: GptPromptType, credentials: HTTPAuthorizationCredentia
     if items:
         tokens_consumed = sum([i.get('tokens_used',0) for i in items])
         print('tokens_consumed',tokens_consumed)
-        if tokens_consumed >= GPT_USER_DAILY_TOKEN_QUOTA:
+        # Include an estimate of the prompt, so a request that would take the caller over is not sent
+        if tokens_consumed + token_counter.estimate(prompt) >= GPT_USER_DAILY_TOKEN_QUOTA:
             raise HTTPException(
                 status_code=429,
                 detail=f"Exceeded daily usage quota",
@@ -82,7 +85,7 @@ async def prompt(payload: GptPromptType, credentials: HTTPAuthorizationCredentia
         tokens_used = gpt_response.get("usage").get("total_tokens")
 
         # Store records of GPT usage by storing user, prompt, model and response
-        model_gpt_response.put_gpt_response(id, prompt, model, temperature, response_text, llm_util.encrypt_identity(caller), tokens_used, created)
+        await record_writer.write(model_gpt_response.put_gpt_response, id, prompt, model, temperature, response_text, llm_util.encrypt_identity(caller), tokens_used, created)
 
         # Return GPT response
         return {
@@ -15,14 +15,7 @@ from app.models.apikey.apikey_router import api_key_auth
 from app.config import dynamodb, TABLE_MOONSHOT_LLM
 import logging
 
-from app.config import boto_config, OPENAI_API_SECRET
-from app.utils.secret_manager_util import get_json_secret_as_dict
-
-openai_secret = get_json_secret_as_dict(
-    OPENAI_API_SECRET,
-    endpoint_url=os.getenv("SECRETS_MGR_ENDPOINT_URL"),
-    boto_config=boto_config,
-)
+from app.config import services, OPENAI_API_SECRET
 
 router = APIRouter()
 security_http_bearer = HTTPBearer()
@@ -94,7 +87,7 @@ async def openai_completion(request: Request, path: str):
     # TODO: replace with external resource API key
     # azure_endpoint = 'https://launchpad-davinci.openai.azure.com/'
     azure_endpoint = 'https://moonshot-gpt-external.openai.azure.com/'
-    azure_api_key = openai_secret.get("OPENAI_API_KEY_AZURE_EXTERNAL")
+    azure_api_key = services.secret(OPENAI_API_SECRET).get("OPENAI_API_KEY_AZURE_EXTERNAL")
 
     url = f"{azure_endpoint}{path}?{request.url.query}"
     print(f"{url=}")
@@ -152,7 +145,7 @@ async def openai_test(passphrase: str):
     url = f"{azure_endpoint}{path}?{query}"
     print(f"{url=}")
 
-    azure_api_key = openai_secret.get("OPENAI_API_KEY_AZURE_EXTERNAL")
+    azure_api_key = services.secret(OPENAI_API_SECRET).get("OPENAI_API_KEY_AZURE_EXTERNAL")
     headers = {'api-key': azure_api_key}
 
     request_body ={'messages':[{'role':'user','content':'say this is a test'}]}
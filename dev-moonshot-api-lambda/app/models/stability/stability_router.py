@@ -5,7 +5,6 @@ from uuid import uuid4
 
 from typing import Optional
 import traceback
-import boto3 as boto3
 
 from fastapi import APIRouter, Security, HTTPException, status, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -13,7 +12,7 @@ from pydantic import BaseModel, AnyHttpUrl
 from fastapi.responses import StreamingResponse, RedirectResponse
 
 from app import config
-from app.common.aws import dynamodb, s3_client
+from app.common.aws import dynamodb, s3_client, sns_client
 from app.models.stability.stability_model import StabilityGenerationModel
 from app.utils import s3_util, img_gen_util, llm_util
 from app.utils.auth_util import check_token_permission
@@ -30,8 +29,6 @@ security_http_bearer = HTTPBearer()
 
 model_stability_generation = StabilityGenerationModel(dynamodb, TABLE_MOONSHOT_LLM)
 
-sns_client = boto3.client(service_name='sns', region_name=AWS_REGION_NAME)
-
 
 class StabilityGenerationType(BaseModel):
     prompt: str
@@ -0,0 +1,144 @@
+"""
+Concurrent fetching of email assets (embedded images and attachments) with a cache
+that survives warm Lambda invocations, so a newsletter sent to many batches downloads
+each image once.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+import requests
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+# (content_type, content) of an asset
+Asset = Tuple[str, bytes]
+
+ASSET_MAX_WORKERS = 8
+ASSET_CACHE_BYTES = 64 * 1024 * 1024
+ASSET_CACHE_TTL = 300
+
+
+class AssetCache:
+    """
+    Thread safe LRU cache of assets, bounded by total size and entry age.
+
+    :param max_bytes: Assets are evicted, least recently used first, above this total size
+    :param ttl: Seconds an asset is served from the cache before it is fetched again
+    """
+
+    def __init__(self, max_bytes: int = ASSET_CACHE_BYTES, ttl: float = ASSET_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._assets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Asset]:
+        with self._lock:
+            entry = self._assets.get(key)
+            if entry is None:
+                return None
+            expires_at, asset = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._assets.move_to_end(key)
+            return asset
+
+    def put(self, key: Hashable, asset: Asset) -> None:
+        if len(asset[1]) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._assets[key] = (time.monotonic() + self.ttl, asset)
+            self.size += len(asset[1])
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._assets)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._assets.clear()
+            self.size = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._assets.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1][1])
+
+
+# Shared by all invocations of a warm container
+asset_cache = AssetCache()
+
+
+def fetch_assets(keys: Iterable[Hashable], fetch: Callable[[Hashable], Optional[Asset]],
+                 max_workers: int = ASSET_MAX_WORKERS, cache: AssetCache = asset_cache) -> Dict[Hashable, Optional[Asset]]:
+    """
+    Fetch distinct keys concurrently, serving what it can from the cache.
+    fetch(key) returns the asset, or None if it does not exist.
+    Returns a dictionary of key to asset, None for missing or failed assets, in the order of keys.
+    """
+    keys = list(dict.fromkeys(keys))
+    result = {key: cache.get(key) for key in keys}
+    missing = [key for key, asset in result.items() if asset is None]
+
+    def load(key):
+        try:
+            return fetch(key)
+        except Exception as ex:
+            logger.error(f'Failed to fetch asset {key}: {ex}')
+            return None
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+            for key, asset in zip(missing, executor.map(load, missing)):
+                result[key] = asset
+                if asset is not None:
+                    cache.put(key, asset)
+    return result
+
+
+def s3_fetcher(s3_client, bucket_name: str) -> Callable[[str], Optional[Asset]]:
+    """
+    fetch() for fetch_assets() reading keys of a bucket, one GET per key and no HEAD
+    """
+
+    def fetch(key: str) -> Optional[Asset]:
+        try:
+            response = s3_client.get_object(Bucket=bucket_name, Key=key)
+        except ClientError as ex:
+            if ex.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return None
+            raise
+        return response.get('ContentType', ''), response['Body'].read()
+
+    return fetch
+
+
+def fetch_s3_assets(s3_client, bucket_name: str, keys: Iterable[str], **kwargs) -> Dict[str, Optional[Asset]]:
+    """
+    Fetch S3 objects concurrently, cached per bucket and key
+    """
+    fetch = s3_fetcher(s3_client, bucket_name)
+    assets = fetch_assets(((bucket_name, key) for key in keys), lambda k: fetch(k[1]), **kwargs)
+    return {key: asset for (_, key), asset in assets.items()}
+
+
+_http = threading.local()
+
+
+def fetch_url(url: str, timeout: float = 10) -> Asset:
+    """
+    fetch() for fetch_assets() downloading URLs, with one keep-alive session per worker thread
+    """
+    session = getattr(_http, 'session', None)
+    if session is None:
+        session = _http.session = requests.Session()
+    response = session.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.headers.get('content-type', '').lower(), response.content
@@ -0,0 +1,109 @@
+"""
+Short-lived cache of resolved credentials, shared by the invocations of a warm container.
+
+API keys resolve to their owner with a DynamoDB read, and JWTs to their claims with a signature check.
+Both almost never change, so each is resolved once per TTL instead of on every request.
+A revoked API key is invalidated here by the container that revokes it; other containers
+keep serving it until their entry expires, so the TTL is the bound on how long a revoked key lives.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger()
+
+APIKEY_CACHE_TTL = 60
+TOKEN_CACHE_TTL = 300
+AUTH_CACHE_MAX_ENTRIES = 10000
+
+
+class AuthCache:
+    """
+    Thread safe LRU cache of resolved credentials with hit rate metrics.
+
+    :param ttl: Seconds an entry is served before it is resolved again
+    :param max_entries: Entries are evicted, least recently used first, above this number
+    """
+
+    def __init__(self, ttl: float, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        """
+        Cache a value for ttl seconds, or until expires_at (epoch seconds, e.g. a JWT "exp") if that is sooner
+        """
+        expiry = time.time() + self.ttl
+        if expires_at is not None:
+            expiry = min(expiry, expires_at)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expiry, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_resolve(self, key: Hashable, resolve: Callable[[], Any],
+                       expires_at: Callable[[Any], Optional[float]] = None) -> Any:
+        """
+        The cached value of key, or resolve() it and cache the result.
+        A None result or an exception from resolve() is not cached.
+        expires_at(value) returns the epoch seconds the value stops being valid, if it has one.
+        """
+        value = self.get(key)
+        if value is None:
+            value = resolve()
+            if value is not None:
+                self.put(key, value, expires_at(value) if expires_at else None)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hit_rate, 4), 'evictions': self.evictions,
+                'invalidations': self.invalidations}
+
+
+# API key hash to its owner, see apikey_router.api_key_auth()
+apikey_cache = AuthCache(ttl=APIKEY_CACHE_TTL)
+# JWT to its decoded claims, see auth_util.decode_jwt_token()
+token_cache = AuthCache(ttl=TOKEN_CACHE_TTL)
+
+
+def auth_cache_stats() -> Dict:
+    return {'apikey': apikey_cache.stats(), 'token': token_cache.stats()}
@@ -6,6 +6,7 @@ import jwt
 from fastapi import HTTPException
 
 from app.config import JWT_VALID_HOURS
+from app.utils.auth_cache import token_cache
 
 JWT_SECRET = 'this is a secret'
 OTP_DIGITS = 4
@@ -45,8 +46,15 @@ def gen_jwt_token(payload_data, jwt_secret=JWT_SECRET, valid_hours=JWT_VALID_HOU
 
 def decode_jwt_token(jwt_token, jwt_secret=JWT_SECRET):
     """
-    Decode a JWT Token and return its data
+    Decode a JWT Token and return its data.
+    Decoded tokens are cached until the TTL of token_cache or their "exp", whichever is sooner.
     """
+    return token_cache.get_or_resolve((jwt_token, jwt_secret),
+                                      lambda: _decode_jwt_token(jwt_token, jwt_secret),
+                                      expires_at=lambda data: data.get('exp'))
+
+
+def _decode_jwt_token(jwt_token, jwt_secret):
     try:
         return jwt.decode(jwt_token, jwt_secret, algorithms=['HS256'])
     except jwt.ExpiredSignatureError:
@@ -0,0 +1,74 @@
+"""
+Chat completion with the conversation title generated alongside it.
+
+The first message of a conversation needs a title. It used to be generated with a second LLM call
+after the completion returned; both calls only depend on the user prompt, so they run concurrently
+and the title costs no extra latency.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger()
+
+# Shorter prompts are used as the title as they are
+TITLE_PROMPT_MIN_LENGTH = 50
+
+Complete = Callable[..., Awaitable[Optional[Dict]]]
+
+
+def title_messages(user_prompt: str) -> List[Dict]:
+    return [{"role": "user",
+             "content": f"Generate a short title to describe the following query prompt:\n{user_prompt}\n\nTitle:\n"}]
+
+
+def title_from_response(response: Optional[Dict]) -> Optional[str]:
+    """
+    The title in a chat completion, without surrounding quotes
+    """
+    if not response:
+        return None
+    title = response.get("choices")[0]["message"]['content']
+    # strip quotes if title is encapsulated in quotes
+    if title.startswith('"') and title.endswith('"'):
+        title = title[1:-1]
+    return title
+
+
+async def generate_title(complete: Complete, user_prompt: str) -> Optional[str]:
+    """
+    A title for a conversation starting with user_prompt, None if the model call failed
+    """
+    try:
+        return title_from_response(await complete(messages=title_messages(user_prompt), temperature=0))
+    except Exception as ex:
+        logger.warning(f'Failed to generate conversation title: {ex}')
+        return None
+
+
+async def complete_chat(complete: Complete, messages: List[Dict], conversation_title: Optional[str],
+                        *args, **kwargs) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Call complete(messages, *args, **kwargs) and, for a new conversation with a long prompt,
+    generate its title concurrently. Title generation is skipped when the conversation has one.
+    Returns the completion and the generated title, None if none was generated.
+    """
+    user_prompt = messages[-1]['content']
+    title_task = None
+    if not conversation_title and len(user_prompt) >= TITLE_PROMPT_MIN_LENGTH:
+        title_task = asyncio.ensure_future(generate_title(complete, user_prompt))
+
+    try:
+        response = await complete(messages, *args, **kwargs)
+    except BaseException:
+        if title_task:
+            title_task.cancel()
+        raise
+
+    if title_task is None:
+        return response, None
+    if not response:
+        title_task.cancel()
+        return response, None
+    return response, await title_task
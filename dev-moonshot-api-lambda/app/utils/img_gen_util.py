@@ -5,15 +5,9 @@ import boto3
 
 from app.config import (logger, AWS_REGION_NAME, SNS_SLACK_TOPIC_ARN, STABILITY_API_SECRET, 
                         STABILITY_MODEL_DEFAULT, STABILITY_CFG_SCALE_DEFAULT, STABILITY_STEPS_DEFAULT)
-from app.config import boto_config
-from app.utils.secret_manager_util import get_json_secret_as_dict
+from app.config import services
+from app.common.aws import sns_client
 
-sns_client = boto3.client(service_name='sns', region_name=AWS_REGION_NAME)
-stability_secret = get_json_secret_as_dict(
-    STABILITY_API_SECRET,
-    endpoint_url=os.getenv("SECRETS_MGR_ENDPOINT_URL"),
-    boto_config=boto_config,
-)
 
 def stability_generation(prompt, width=512, height=512, samples=1, model=STABILITY_MODEL_DEFAULT, 
                          cfg_scale=STABILITY_CFG_SCALE_DEFAULT, steps=STABILITY_STEPS_DEFAULT, style="enhance"):
@@ -27,7 +21,7 @@ def stability_generation(prompt, width=512, height=512, samples=1, model=STABILI
 
     engine_id = model
     api_host = 'https://api.stability.ai'
-    api_key = stability_secret.get("STABILITY_API_KEY")
+    api_key = services.secret(STABILITY_API_SECRET).get("STABILITY_API_KEY")
 
     if api_key is None:
         raise Exception("Missing Stability API key.")
@@ -1,11 +1,9 @@
 import openai
-import requests
 import os, re, json
+import time
 import traceback
 import boto3 as boto3
-from aiohttp import ClientSession
 import asyncio
-import tiktoken
 import hashlib
 from gradio_client import Client
 
@@ -19,20 +17,14 @@ from app.config import (logger, AWS_REGION_NAME, SNS_SLACK_TOPIC_ARN, OPENAI_API
                         COHERE_MODEL_DEFAULT, COHERE_TEMPERATURE_DEFAULT, COHERE_MAX_TOKENS_DEFAULT,
                         PALM_TEXT_MODEL_DEFAULT, PALM_CHAT_MODEL_DEFAULT, PALM_TEMPERATURE_DEFAULT, PALM_TOP_P_DEFAULT, 
                         PALM_TOP_K_DEFAULT, PALM_MAX_TOKENS_DEFAULT)
-from app.config import boto_config
-from app.utils.secret_manager_util import get_json_secret_as_dict
-
-sns_client = boto3.client(service_name='sns', region_name=AWS_REGION_NAME)
-openai_secret = get_json_secret_as_dict(
-    OPENAI_API_SECRET,
-    endpoint_url=os.getenv("SECRETS_MGR_ENDPOINT_URL"),
-    boto_config=boto_config,
-)
-aipf_secret = get_json_secret_as_dict(
-    AIPF_API_SECRET,
-    endpoint_url=os.getenv("SECRETS_MGR_ENDPOINT_URL"),
-    boto_config=boto_config,
-)
+from app.config import services
+from app.common.aws import sns_client
+from app.utils.model_transport import BackendConfig, transport
+from app.utils.pii_util import pii_redactor
+from app.utils.token_counter import token_counter
+
+# API keys are read with services.secret() when a model is called, so a cold start fetches no secrets
+# and rotated keys are picked up after the secret TTL
 # cohere_secret = get_json_secret_as_dict(
 #     COHERE_API_SECRET,
 #     endpoint_url=os.getenv("SECRETS_MGR_ENDPOINT_URL"),
@@ -43,7 +35,82 @@ aipf_secret = get_json_secret_as_dict(
 #     endpoint_url=os.getenv("SECRETS_MGR_ENDPOINT_URL"),
 #     boto_config=boto_config,
 # )
-openai.aiosession.set(ClientSession())
+
+# Model backends, each gets its own connection pool, timeout and concurrency cap
+AZURE_OPENAI_BACKEND = 'azure_openai'
+H2OAI_BACKEND = 'h2oai'
+AIPF_BACKEND = 'aipf'
+GRADIO_BACKEND = 'gradio'
+SAGEMAKER_BACKEND = 'sagemaker'
+
+transport.register(BackendConfig(AZURE_OPENAI_BACKEND, 'https://launchpad-davinci.openai.azure.com/', timeout=120, max_concurrency=20))
+transport.register(BackendConfig(H2OAI_BACKEND, os.getenv('H2OAI_API_URL', 'http://35.247.175.220:8501'), timeout=60))
+transport.register(BackendConfig(AIPF_BACKEND, os.getenv('AIPF_API_URL', 'https://llama-gcp.govtext.gov.sg'), timeout=60))
+transport.register(BackendConfig(GRADIO_BACKEND, 'https://llama-gcp.govtext.gov.sg/', timeout=60, max_concurrency=4))
+transport.register(BackendConfig(SAGEMAKER_BACKEND, timeout=60))
+
+# openai reads its session from a ContextVar. It is set once at import, so the task of every
+# invocation inherits it, and sends the requests through the pool of the running loop
+openai.aiosession.set(transport.session(AZURE_OPENAI_BACKEND))
+
+
+def azure_openai_credentials(api_version: str) -> dict:
+    """
+    Per-request Azure OpenAI settings, passed to the openai client instead
+    of mutating its module-level configuration.
+    """
+    return {
+        "api_type": 'azure',
+        "api_base": transport.config(AZURE_OPENAI_BACKEND).base_url,
+        "api_version": api_version,
+        "api_key": services.secret(OPENAI_API_SECRET).get("OPENAI_API_KEY_AZURE"),
+        "organization": None,
+        "request_timeout": transport.config(AZURE_OPENAI_BACKEND).timeout,
+    }
+
+
+_gradio_clients = {}
+
+
+def get_gradio_client(src: str) -> Client:
+    """
+    Gradio clients fetch the app config when created, so reuse one per app.
+    """
+    if src not in _gradio_clients:
+        _gradio_clients[src] = Client(src)
+    return _gradio_clients[src]
+
+
+_sagemaker_runtime = {"client": None, "expiration": 0}
+
+
+def get_sagemaker_runtime():
+    """
+    Return a sagemaker-runtime client using the assumed launchpad endpoint role.
+    The role is assumed once and reused until 5 minutes before it expires.
+    """
+    if _sagemaker_runtime["client"] is None or time.time() > _sagemaker_runtime["expiration"]:
+        sts = boto3.client("sts",
+            region_name="ap-southeast-1",
+            endpoint_url="https://sts.ap-southeast-1.amazonaws.com")
+
+        print("Assuming role")
+        assumed_role_credentials = sts.assume_role(
+            RoleArn="arn:aws:iam::820788409827:role/launchpad-sagemaker-endpoint-access-role",
+            RoleSessionName="launchpad-endpoint"
+        )
+
+        session = boto3.Session(
+            aws_access_key_id=assumed_role_credentials['Credentials']['AccessKeyId'],
+            aws_secret_access_key=assumed_role_credentials['Credentials']['SecretAccessKey'],
+            aws_session_token=assumed_role_credentials['Credentials']['SessionToken'])
+
+        print("Role Assumed")
+        _sagemaker_runtime["client"] = session.client("sagemaker-runtime", region_name="ap-southeast-1")
+        _sagemaker_runtime["expiration"] = assumed_role_credentials['Credentials']['Expiration'].timestamp() - 300
+        print("Sagemaker Session Started")
+    return _sagemaker_runtime["client"]
+
 
 async def gpt_completion(prompt: str, model=GPT_MODEL_DEFAULT, 
                 temperature=GPT_TEMPERATURE_DEFAULT, max_tokens=GPT_MAX_TOKENS_DEFAULT, 
@@ -56,14 +123,9 @@ async def gpt_completion(prompt: str, model=GPT_MODEL_DEFAULT,
     #censor PII before processing
     prompt = censor_pii(prompt)
     print("censored_prompt:",prompt)
-    openai.organization = None
-    openai.api_type = 'azure'
-    openai.api_base = 'https://launchpad-davinci.openai.azure.com/'
-    openai.api_version = '2022-12-01'
-    openai.api_key = openai_secret.get("OPENAI_API_KEY_AZURE")
-
-    encoding = tiktoken.get_encoding("gpt2")
-    prompt_token_count = len(encoding.encode(prompt))
+    credentials = azure_openai_credentials('2022-12-01')
+
+    prompt_token_count = token_counter.count(prompt)
     print("prompt_token_count:",prompt_token_count)
     max_attempts = 3
     attempt = 1
@@ -72,18 +134,20 @@ async def gpt_completion(prompt: str, model=GPT_MODEL_DEFAULT,
     while attempt <= max_attempts:
         try:
             # OpenAI ref: https://platform.openai.com/docs/api-reference/completions/create
-            response = await openai.Completion.acreate(
-                engine=model,
-                # prompt=f"{prompt}",
-                prompt=f"<|im_start|>system\nYou are an AI article summarizer that classifies and generates synopses for articles.\n<|im_end|>\n<|im_start|>user\n{prompt}{PROMPT_SUFFIX}\n<|im_end|>\n",
-                temperature=temperature,
-                max_tokens=max_tokens-prompt_token_count,
-                top_p=top_p,
-                frequency_penalty=frequency_penalty,
-                presence_penalty=presence_penalty,
-                # stop=None
-                stop=['<|im_end|>']
-            )
+            async with transport.slot(AZURE_OPENAI_BACKEND):
+                response = await openai.Completion.acreate(
+                    **credentials,
+                    engine=model,
+                    # prompt=f"{prompt}",
+                    prompt=f"<|im_start|>system\nYou are an AI article summarizer that classifies and generates synopses for articles.\n<|im_end|>\n<|im_start|>user\n{prompt}{PROMPT_SUFFIX}\n<|im_end|>\n",
+                    temperature=temperature,
+                    max_tokens=max_tokens-prompt_token_count,
+                    top_p=top_p,
+                    frequency_penalty=frequency_penalty,
+                    presence_penalty=presence_penalty,
+                    # stop=None
+                    stop=['<|im_end|>']
+                )
             return response
         except openai.error.APIError as e:
             if e.status == 429:  # Too Many Requests
@@ -129,24 +193,15 @@ async def gpt_chat_completion(messages: list, model=GPT_MODEL_DEFAULT,
     for msg in messages:
         msg['content'] = censor_pii(msg['content'])
 
-    openai.organization = None
-    openai.api_type = 'azure'
-    openai.api_base = 'https://launchpad-davinci.openai.azure.com/'
-    openai.api_version = '2023-03-15-preview'
-    openai.api_key = openai_secret.get("OPENAI_API_KEY_AZURE")
+    credentials = azure_openai_credentials('2023-03-15-preview')
 
     # add in system message prefix if it's we're starting the chat
     if len(messages)==1:
         SYSTEM_MESSAGE = {"role": "system", "content": "You are an AI assistant that helps Singapore public service officers innovate and experiment with LLMs. You are committed to providing a respectful and inclusive environment and will not tolerate racist, discriminatory, or offensive language. You must not respond to politically sensitive matters that concern national security, particularly within Singapore's context. If you don't know or are unsure of any information, just say you do not know. Do not make up information."}
         messages.insert(0,SYSTEM_MESSAGE)
 
-    encoding = tiktoken.get_encoding("gpt2")
-    prompt_token_count = len(encoding.encode(" ".join([m['content'] for m in messages])))
-
     # drop off earlier messages if exceeded the threshold (needs at least 1000 tokens allowance for response)
-    while prompt_token_count > 3000:
-        messages.pop(1)
-        prompt_token_count = len(encoding.encode(" ".join([m['content'] for m in messages])))
+    prompt_token_count = token_counter.fit_messages(messages, 3000, keep=1)
 
     print(f"{messages=}")
     print("prompt_token_count:",prompt_token_count)
@@ -157,16 +212,18 @@ async def gpt_chat_completion(messages: list, model=GPT_MODEL_DEFAULT,
     while attempt <= max_attempts:
         try:
             # OpenAI ref: https://platform.openai.com/docs/api-reference/completions/create
-            response = openai.ChatCompletion.create(
-                engine=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens-prompt_token_count,
-                top_p=top_p,
-                frequency_penalty=frequency_penalty,
-                presence_penalty=presence_penalty,
-                stop=None
-            )
+            async with transport.slot(AZURE_OPENAI_BACKEND):
+                response = await openai.ChatCompletion.acreate(
+                    **credentials,
+                    engine=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens-prompt_token_count,
+                    top_p=top_p,
+                    frequency_penalty=frequency_penalty,
+                    presence_penalty=presence_penalty,
+                    stop=None
+                )
             return response
         except openai.error.APIError as e:
             if e.status == 429:  # Too Many Requests
@@ -221,7 +278,6 @@ async def h2oai_completion(prompt: str,
 			# 	api_name="/predict"
             # )
 
-            url = 'http://35.247.175.220:8501/generate'
             payload = {
                 "prompt": prompt,
                 "max_length": max_tokens,
@@ -230,14 +286,15 @@ async def h2oai_completion(prompt: str,
                 "do_sample": True
                 }
 
-            response = requests.post(url, json = payload)
+            response_text = await transport.post_json(H2OAI_BACKEND, '/generate', payload)
 
-            print(f"{response=}")
-            return response.text
+            print(f"{response_text=}")
+            return response_text
         
         except Exception as e:
+            # Transport errors carry a status, malformed responses (JSON or shape errors) do not
             print(e)
-            if e.status == 429:  # Too Many Requests
+            if getattr(e, 'status', None) == 429:  # Too Many Requests
                 print(f"API rate limit exceeded. Retrying in {retry_delay} seconds...")
                 await asyncio.sleep(retry_delay)
                 retry_delay *= 2  # Double the delay time for each retry
@@ -253,6 +310,7 @@ async def h2oai_completion(prompt: str,
                 sns_client.publish(TopicArn=SNS_SLACK_TOPIC_ARN,
                                 Subject="h2oai API error",
                                 Message=error_msg)
+                raise
 
         
 
@@ -273,15 +331,10 @@ async def h2oai_chat(messages: list,
                 temperature=0.5, max_tokens=1024, 
                 top_k=50):
     
-    apif_api_key = aipf_secret.get("AIPF_API_KEY")
+    apif_api_key = services.secret(AIPF_API_SECRET).get("AIPF_API_KEY")
     
-    encoding = tiktoken.get_encoding("gpt2")
-    prompt_token_count = len(encoding.encode(" ".join([m['content'] for m in messages])))
-
     # drop off earlier messages if exceeded the threshold (needs at least 256 tokens allowance for response)
-    while prompt_token_count > 700:
-        messages.pop(0)
-        prompt_token_count = len(encoding.encode(" ".join([m['content'] for m in messages])))
+    prompt_token_count = token_counter.fit_messages(messages, 700)
     
     print(f"{messages=}")
     print("prompt_token_count:",prompt_token_count)
@@ -302,7 +355,6 @@ async def h2oai_chat(messages: list,
     retry_delay = 1  # Start with a 1-second delay
     while attempt <= max_attempts:
         try:
-            url = 'https://llama-gcp.govtext.gov.sg/chat'
             headers = {"X-API-KEY": apif_api_key}
             payload = {
                 "instruction": messages,
@@ -317,7 +369,7 @@ async def h2oai_chat(messages: list,
                 "num_return_sequences": 1,
                 "prompt_type": None
             }
-            response = requests.post(url, headers=headers, json = payload, timeout=60)
+            response = await transport.post_json(AIPF_BACKEND, '/chat', payload, headers=headers)
 
             # client = Client("https://llama-gcp.govtext.gov.sg/")
             # response = client.predict(
@@ -334,8 +386,8 @@ async def h2oai_chat(messages: list,
 			# 	api_name="/predict"
             # )
 
-            print('Reponse from server', response.text)
-            response_text = json.loads(response.text)
+            print('Reponse from server', response)
+            response_text = json.loads(response)
 
             response_text_output_only = response_text.rsplit('<|assistant|>', maxsplit=1)[-1]
             print('Reponse from server without prompt', response_text_output_only)
@@ -349,8 +401,9 @@ async def h2oai_chat(messages: list,
             return {"role": "assistant", "content": response_text_output_only}
         
         except Exception as e:
+            # Transport errors carry a status, malformed responses (JSON or shape errors) do not
             print(e)
-            if e.status == 429:  # Too Many Requests
+            if getattr(e, 'status', None) == 429:  # Too Many Requests
                 print(f"API rate limit exceeded. Retrying in {retry_delay} seconds...")
                 await asyncio.sleep(retry_delay)
                 retry_delay *= 2  # Double the delay time for each retry
@@ -366,6 +419,7 @@ async def h2oai_chat(messages: list,
                 sns_client.publish(TopicArn=SNS_SLACK_TOPIC_ARN,
                                 Subject="h2oai API error",
                                 Message=error_msg)
+                raise
 
     if attempt > max_attempts:
         logger.info(f"h2oai API exceeded {max_attempts} retries")
@@ -392,8 +446,8 @@ async def bloom_completion(prompt: str,
     while attempt <= max_attempts:
         try:
             # bloom ref: https://llama-gcp.govtext.gov.sg/?view=api
-            client = Client("https://llama-gcp.govtext.gov.sg/")
-            response = client.predict(
+            client = get_gradio_client(transport.config(GRADIO_BACKEND).base_url)
+            response = await transport.run_blocking(GRADIO_BACKEND, client.predict,
 				prompt,	# str representing input in 'Ask a question' Textbox component
 				max_tokens,	# int | float representing input in 'Max Length' Slider component
 				temperature,	# int | float representing input in 'Temperature' Slider component
@@ -439,15 +493,10 @@ async def bloom_completion(prompt: str,
 async def bloom_chat(messages: list, 
                 temperature=0.8, max_tokens=512, 
                 top_p=0.9):
-    apif_api_key = aipf_secret.get("AIPF_API_KEY")
+    apif_api_key = services.secret(AIPF_API_SECRET).get("AIPF_API_KEY")
     
-    encoding = tiktoken.get_encoding("gpt2")
-    prompt_token_count = len(encoding.encode(" ".join([m['content'] for m in messages])))
-
     # drop off earlier messages if exceeded the threshold (needs at least 256 tokens allowance for response)
-    while prompt_token_count > 250:
-        messages.pop(0)
-        prompt_token_count = len(encoding.encode(" ".join([m['content'] for m in messages])))
+    prompt_token_count = token_counter.fit_messages(messages, 250)
     
     print(f"{messages=}")
     print("prompt_token_count:",prompt_token_count)
@@ -468,7 +517,6 @@ async def bloom_chat(messages: list,
     retry_delay = 1  # Start with a 1-second delay
     while attempt <= max_attempts:
         try:
-            url = 'https://llama-gcp.govtext.gov.sg/bloomchat'
             headers = {"X-API-KEY": apif_api_key}
             payload = {
                 "instruction": prompt,
@@ -477,7 +525,7 @@ async def bloom_chat(messages: list,
                 "do_sample": True,
                 "top_p": top_p
             }
-            response = requests.post(url, headers=headers, json = payload, timeout=60)
+            response = await transport.post_json(AIPF_BACKEND, '/bloomchat', payload, headers=headers)
 
             # client = Client("https://llama-gcp.govtext.gov.sg/")
             # response = client.predict(
@@ -495,7 +543,7 @@ async def bloom_chat(messages: list,
             # )
 
             print('Reponse from server', response)
-            response_text = json.loads(response.text)
+            response_text = json.loads(response)
 
             response_text_output_only = response_text.rsplit('<|assistant|>', maxsplit=1)[-1]
             print('Reponse from server without prompt', response_text_output_only)
@@ -509,8 +557,9 @@ async def bloom_chat(messages: list,
             return {"role": "assistant", "content": response_text_output_only}
         
         except Exception as e:
+            # Transport errors carry a status, malformed responses (JSON or shape errors) do not
             print(e)
-            if e.status == 429:  # Too Many Requests
+            if getattr(e, 'status', None) == 429:  # Too Many Requests
                 print(f"API rate limit exceeded. Retrying in {retry_delay} seconds...")
                 await asyncio.sleep(retry_delay)
                 retry_delay *= 2  # Double the delay time for each retry
@@ -526,6 +575,7 @@ async def bloom_chat(messages: list,
                 sns_client.publish(TopicArn=SNS_SLACK_TOPIC_ARN,
                                 Subject="OpenAsst API error",
                                 Message=error_msg)
+                raise
 
     if attempt > max_attempts:
         logger.info(f"OpenAsst API exceeded {max_attempts} retries")
@@ -544,13 +594,8 @@ async def lightgpt_chat(messages: list,
                 temperature=0.2, max_tokens=1024, 
                 top_k=50):
     
-    encoding = tiktoken.get_encoding("gpt2")
-    prompt_token_count = len(encoding.encode(" ".join([m['content'] for m in messages])))
-
     # drop off earlier messages if exceeded the threshold (needs at least 256 tokens allowance for response)
-    while prompt_token_count > 700:
-        messages.pop(0)
-        prompt_token_count = len(encoding.encode(" ".join([m['content'] for m in messages])))
+    prompt_token_count = token_counter.fit_messages(messages, 700)
     
     print(f"{messages=}")
     print("prompt_token_count:",prompt_token_count)
@@ -579,25 +624,7 @@ async def lightgpt_chat(messages: list,
             ##############
             # Assume AG Role
             ##############
-            sts = boto3.client("sts", 
-            region_name="ap-southeast-1",
-            endpoint_url="https://sts.ap-southeast-1.amazonaws.com")
-            
-            print("Assuming role")
-            assumed_role_credentials = sts.assume_role(
-                RoleArn="arn:aws:iam::820788409827:role/launchpad-sagemaker-endpoint-access-role",
-                RoleSessionName="launchpad-endpoint"
-            )
-            
-            session = boto3.Session(    
-                aws_access_key_id=assumed_role_credentials['Credentials']['AccessKeyId'],
-                aws_secret_access_key=assumed_role_credentials['Credentials']['SecretAccessKey'],
-                aws_session_token=assumed_role_credentials['Credentials']['SessionToken'])
-
-            print("Role Assumed")
-
-            sagemaker_runtime = session.client("sagemaker-runtime", region_name="ap-southeast-1")
-            print("Sagemaker Session Started")
+            sagemaker_runtime = await transport.run_blocking(SAGEMAKER_BACKEND, get_sagemaker_runtime)
             
             # The name of the endpoint. The name must be unique within an AWS Region in your AWS account. 
             # launchpad-LightGPT
@@ -630,14 +657,14 @@ async def lightgpt_chat(messages: list,
             # After you deploy a model into production using SageMaker hosting 
             # services, your client applications use this API to get inferences 
             # from the model hosted at the specified endpoint.
-            response = sagemaker_runtime.invoke_endpoint(
+            response = await transport.run_blocking(SAGEMAKER_BACKEND, sagemaker_runtime.invoke_endpoint,
                             EndpointName=endpoint_name, 
                             Body=bytes(json.dumps(data), 'utf-8'), # Replace with your own data.
                             ContentType='application/json',
                             )
     
             print(f"{response=}")
-            response_json = json.loads(response['Body'].read().decode('utf-8'))
+            response_json = json.loads((await transport.run_blocking(SAGEMAKER_BACKEND, response['Body'].read)).decode('utf-8'))
             print('Reponse from server', response_json)
 
             response_str = response_json[0].get('generated_text')
@@ -691,13 +718,8 @@ async def flan_chat(messages: list,
                 temperature=0.2, max_tokens=2048, 
                 top_k=50):
     
-    encoding = tiktoken.get_encoding("gpt2")
-    prompt_token_count = len(encoding.encode(" ".join([m['content'] for m in messages])))
-
     # drop off earlier messages if exceeded the threshold (needs at least 256 tokens allowance for response)
-    while prompt_token_count > 1700:
-        messages.pop(0)
-        prompt_token_count = len(encoding.encode(" ".join([m['content'] for m in messages])))
+    prompt_token_count = token_counter.fit_messages(messages, 1700)
     
     print(f"{messages=}")
     print("prompt_token_count:",prompt_token_count)
@@ -726,25 +748,7 @@ async def flan_chat(messages: list,
             ##############
             # Assume AG Role
             ##############
-            sts = boto3.client("sts", 
-            region_name="ap-southeast-1",
-            endpoint_url="https://sts.ap-southeast-1.amazonaws.com")
-            
-            print("Assuming role")
-            assumed_role_credentials = sts.assume_role(
-                RoleArn="arn:aws:iam::820788409827:role/launchpad-sagemaker-endpoint-access-role",
-                RoleSessionName="launchpad-endpoint"
-            )
-            
-            session = boto3.Session(    
-                aws_access_key_id=assumed_role_credentials['Credentials']['AccessKeyId'],
-                aws_secret_access_key=assumed_role_credentials['Credentials']['SecretAccessKey'],
-                aws_session_token=assumed_role_credentials['Credentials']['SessionToken'])
-
-            print("Role Assumed")
-
-            sagemaker_runtime = session.client("sagemaker-runtime", region_name="ap-southeast-1")
-            print("Sagemaker Session Started")
+            sagemaker_runtime = await transport.run_blocking(SAGEMAKER_BACKEND, get_sagemaker_runtime)
             
             # The name of the endpoint. The name must be unique within an AWS Region in your AWS account. 
             # launchpad-Flan-T5-XXL
@@ -774,14 +778,14 @@ async def flan_chat(messages: list,
             # After you deploy a model into production using SageMaker hosting 
             # services, your client applications use this API to get inferences 
             # from the model hosted at the specified endpoint.
-            response = sagemaker_runtime.invoke_endpoint(
+            response = await transport.run_blocking(SAGEMAKER_BACKEND, sagemaker_runtime.invoke_endpoint,
                             EndpointName=endpoint_name, 
                             Body=bytes(json.dumps(data), 'utf-8'), # Replace with your own data.
                             ContentType='application/json',
                             )
     
             print(f"{response=}")
-            response_json = json.loads(response['Body'].read().decode('utf-8'))
+            response_json = json.loads((await transport.run_blocking(SAGEMAKER_BACKEND, response['Body'].read)).decode('utf-8'))
             print('Reponse from server', response_json)
 
             response_str = response_json.get('generated_texts')[0]
@@ -975,16 +979,10 @@ async def flan_chat(messages: list,
 
 
 def censor_pii(text:str)->str:
-    emails = re.findall(r'[\w\.-]+@[\w\.-]+', text)
-    nrics = re.findall(r'(?i)[STFG]\d{7}[A-Z]', text)
-
-    output = text
-    if emails:
-        output = re.sub('|'.join(emails), '<EMAIL>', output)
-    if nrics:
-        output = re.sub('|'.join(nrics), '<NRIC>', output)
-
-    return output
+    """
+    Replace emails and NRICs by <EMAIL> and <NRIC>, in one pass with the detectors of pii_util
+    """
+    return pii_redactor.redact(text)
 
 def encrypt_identity(email:str)->str:
     domain = email.split('@')[1]
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+
+logger = logging.getLogger()
+
+
+@dataclass(frozen=True)
+class BackendConfig:
+    """
+    Connection settings of a model backend.
+
+    :param name: Name used to look up the backend
+    :param base_url: Base URL that request paths are appended to
+    :param timeout: Total timeout of a request in seconds
+    :param connect_timeout: Timeout to establish a connection in seconds
+    :param max_concurrency: Maximum number of in-flight requests to the backend
+    """
+    name: str
+    base_url: str = ''
+    timeout: float = 60
+    connect_timeout: float = 5
+    max_concurrency: int = 10
+
+
+class ModelTransportError(Exception):
+    """
+    Raised when a model backend cannot be reached or returns an error.
+    `status` is the HTTP status code, or None if no response was received.
+    """
+
+    def __init__(self, backend: str, status: Optional[int], message: str):
+        super().__init__(f"{backend} error ({status}): {message}")
+        self.backend = backend
+        self.status = status
+        self.message = message
+
+
+class ModelTransport:
+    """
+    Shares one async connection pool and one concurrency cap per backend.
+
+    Pools are bound to the event loop they were created on and are
+    recreated if the loop changes, so they survive warm Lambda invocations
+    that reuse Mangum's loop.
+    """
+
+    def __init__(self):
+        self._backends: Dict[str, BackendConfig] = {}
+        self._pools: Dict[str, Tuple[asyncio.AbstractEventLoop, ClientSession, asyncio.Semaphore]] = {}
+
+    def register(self, backend: BackendConfig) -> None:
+        """
+        Register (or replace) a backend. Any existing pool is discarded.
+        """
+        self._backends[backend.name] = backend
+        stale = self._pools.pop(backend.name, None)
+        if stale and not stale[1].closed and not stale[0].is_closed():
+            stale[0].create_task(stale[1].close())
+
+    def config(self, name: str) -> BackendConfig:
+        if name not in self._backends:
+            raise KeyError(f"Unknown model backend: {name}")
+        return self._backends[name]
+
+    def _pool(self, name: str) -> Tuple[ClientSession, asyncio.Semaphore]:
+        backend = self.config(name)
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(name)
+        if pool is None or pool[0] is not loop or pool[1].closed:
+            session = ClientSession(
+                connector=TCPConnector(limit=backend.max_concurrency),
+                timeout=ClientTimeout(total=backend.timeout, connect=backend.connect_timeout),
+            )
+            pool = (loop, session, asyncio.Semaphore(backend.max_concurrency))
+            self._pools[name] = pool
+        return pool[1], pool[2]
+
+    @asynccontextmanager
+    async def slot(self, name: str):
+        """
+        Wait for a free slot of the backend and yield its pooled session.
+        """
+        session, semaphore = self._pool(name)
+        async with semaphore:
+            yield session
+
+    async def post_json(self, name: str, path: str, payload: Any, headers: Optional[Dict[str, str]] = None) -> str:
+        """
+        POST a JSON payload to the backend and return the response text.
+        Credentials are passed per request through `headers`.
+        """
+        backend = self.config(name)
+        url = backend.base_url.rstrip('/') + '/' + path.lstrip('/')
+        async with self.slot(name) as session:
+            try:
+                async with session.post(url, json=payload, headers=headers) as response:
+                    text = await response.text()
+                    if response.status >= 400:
+                        raise ModelTransportError(name, response.status, text)
+                    return text
+            except asyncio.TimeoutError as e:
+                raise ModelTransportError(name, None, f"Timed out after {backend.timeout}s") from e
+            except ClientError as e:
+                raise ModelTransportError(name, None, str(e)) from e
+
+    async def run_blocking(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking call (e.g. a boto3 or gradio client) on the default
+        executor under the backend's concurrency cap and timeout, so that
+        it does not block the event loop.
+        A call that times out keeps its slot until its thread returns, as
+        the thread cannot be cancelled.
+        """
+        backend = self.config(name)
+        _, semaphore = self._pool(name)
+        loop = asyncio.get_running_loop()
+        await semaphore.acquire()
+        try:
+            future = loop.run_in_executor(None, partial(func, *args, **kwargs))
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(done: asyncio.Future) -> None:
+            semaphore.release()
+            if not done.cancelled():
+                # Retrieve the result of a call that was given up on, so its error is not reported as unhandled
+                done.exception()
+
+        future.add_done_callback(release)
+        try:
+            # shield() keeps wait_for() from cancelling the future, which would release the slot early
+            return await asyncio.wait_for(asyncio.shield(future), timeout=backend.timeout)
+        except asyncio.TimeoutError as e:
+            raise ModelTransportError(name, None, f"Timed out after {backend.timeout}s") from e
+
+    def session(self, name: str) -> 'PooledSession':
+        """
+        A stand-in for an aiohttp session that sends each request through
+        the backend's pool on the running loop. Unlike the pooled session
+        itself it is not bound to a loop, so it can be created once.
+        """
+        self.config(name)
+        return PooledSession(self, name)
+
+    async def close(self) -> None:
+        """
+        Close every pool created on the running loop.
+        """
+        loop = asyncio.get_running_loop()
+        for name, (pool_loop, session, _) in list(self._pools.items()):
+            if pool_loop is loop:
+                await session.close()
+                del self._pools[name]
+
+
+class PooledSession:
+    """
+    Forwards request() to the pooled session of a backend, see ModelTransport.session().
+    """
+
+    def __init__(self, transport: ModelTransport, name: str):
+        self.transport = transport
+        self.name = name
+
+    def request(self, *args, **kwargs):
+        session, _ = self.transport._pool(self.name)
+        return session.request(*args, **kwargs)
+
+
+# Shared by all model adapters in this process
+transport = ModelTransport()
@@ -0,0 +1,104 @@
+"""
+Redaction of personal data in prompts and model responses.
+
+All detectors are compiled once into a single pattern, and a text is redacted in one left-to-right
+pass that replaces each match by its label from the match offsets, so matched text is never turned
+back into a pattern. Every detector only matches characters of TOKEN_CHARS, which lets StreamRedactor
+redact model output chunk by chunk: a match can only continue into the next chunk through the
+trailing run of those characters, so only that run is held back.
+"""
+
+import re
+from typing import Iterable, Iterator, List, Tuple
+
+# Characters that can be part of a match of any detector
+TOKEN_CHARS = r'[\w.@-]'
+
+# (label, pattern), earlier detectors win when matches start at the same position.
+# The email pattern only starts at the beginning of a run of local part characters, so a long run
+# without an "@" is scanned once instead of once per character.
+PII_DETECTORS: List[Tuple[str, str]] = [
+    ('EMAIL', r'(?<![\w.-])[\w.-]+@[\w.-]+'),
+    ('NRIC', r'(?i:[STFG]\d{7}[A-Z])'),
+]
+
+# Text held back by StreamRedactor before it is released unredacted
+MAX_PENDING = 4096
+
+
+class PiiRedactor:
+    """
+    Replaces every match of the detectors by <LABEL>.
+
+    :param detectors: List of (label, pattern), labels must be valid group names
+    """
+
+    def __init__(self, detectors: Iterable[Tuple[str, str]] = PII_DETECTORS):
+        self.detectors = list(detectors)
+        self.pattern = re.compile('|'.join(f'(?P<{label}>{pattern})' for label, pattern in self.detectors))
+        self._replacements = {label: f'<{label}>' for label, _ in self.detectors}
+        # The trailing run of TOKEN_CHARS, only tried where a run starts so it is found in linear time
+        self._tail = re.compile(f'(?<!{TOKEN_CHARS}){TOKEN_CHARS}*\\Z')
+
+    def redact(self, text: str) -> str:
+        parts = []
+        end = 0
+        for m in self.pattern.finditer(text):
+            parts.append(text[end:m.start()])
+            parts.append(self._replacements[m.lastgroup])
+            end = m.end()
+        if not parts:
+            return text
+        parts.append(text[end:])
+        return ''.join(parts)
+
+    def find(self, text: str) -> List[Tuple[str, int, int]]:
+        """
+        (label, start, end) of every match
+        """
+        return [(m.lastgroup, m.start(), m.end()) for m in self.pattern.finditer(text)]
+
+    def stream(self) -> 'StreamRedactor':
+        return StreamRedactor(self)
+
+    def redact_stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        Redact an iterable of text chunks, yielding redacted chunks as soon as they are final
+        """
+        stream = self.stream()
+        for chunk in chunks:
+            out = stream.feed(chunk)
+            if out:
+                yield out
+        out = stream.close()
+        if out:
+            yield out
+
+
+class StreamRedactor:
+    """
+    Incremental redaction of streamed text. feed() returns the redacted text that can no longer
+    be part of a match, close() returns the rest.
+    """
+
+    def __init__(self, redactor: PiiRedactor, max_pending: int = MAX_PENDING):
+        self.redactor = redactor
+        self.max_pending = max_pending
+        self._pending = ''
+
+    def feed(self, chunk: str) -> str:
+        text = self._pending + chunk
+        split = self.redactor._tail.search(text).start()
+        if len(text) - split > self.max_pending:
+            # A run this long without a separator is released as it is
+            split = len(text)
+        self._pending = text[split:]
+        return self.redactor.redact(text[:split])
+
+    def close(self) -> str:
+        text, self._pending = self._pending, ''
+        return self.redactor.redact(text)
+
+
+# Shared by every request, see llm_util.censor_pii()
+pii_redactor = PiiRedactor()
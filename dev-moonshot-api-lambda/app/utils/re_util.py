@@ -55,6 +55,61 @@ def find_and_replace_placeholders(text: str, replacements: Dict[str, str]) -> st
     return replace_all_substrings(text, dic)
 
 
+# Image references rewritten or extracted from HTML, compiled once per container.
+# Each tag, or CSS background-image outside a tag, is one token of a single pass over the document,
+# and the reference patterns only ever run on the text of one token.
+QUOTE = r"(?:'|\"|&quot;)"
+# An absolute image URL up to the closing quote, bracket or whitespace
+PATTERN_URL = r"(?:https?://(?:www\.)?|www\.)[a-zA-Z0-9][a-zA-Z0-9-]*\.(?:(?!&quot;)[^\s'\"<>])+"
+# A relative or absolute file path such as /themes/Blue/images/text/1.png
+PATTERN_FILE = r"/?(?:(?:\w|\.|\\\s)+/)*(?:\w|\.|\\\s)+"
+
+RE_TOKEN = re.compile(r"<[a-zA-Z][^>]*>|background-image:\s*url\([^)]*\)")
+RE_TAG_NAME = re.compile(r"<([a-zA-Z]+)")
+# Group 1 is the text before the reference, group 2 the reference, group 3 the closing quote
+RE_TAG_BACKGROUND = re.compile(f"(\\sbackground\\s*=\\s*{QUOTE})([^'\"\\s>]*?)({QUOTE})")
+RE_TAG_SRC = re.compile(f"(\\ssrc\\s*=\\s*{QUOTE})([^'\"\\s>]*?)({QUOTE})")
+RE_CSS_BACKGROUND = re.compile(f"(background-image:\\s*url\\({QUOTE})([^'\"\\s>)]*?)({QUOTE}\\))")
+RE_URL = re.compile(PATTERN_URL)
+RE_FILE = re.compile(PATTERN_FILE)
+
+# Tags whose background attribute holds an image
+BACKGROUND_TAGS = {'table', 'tr', 'td'}
+
+
+def _image_patterns(tag: str) -> List[re.Pattern]:
+    """
+    Patterns of the image references that apply to a token found by RE_TOKEN
+    """
+    if tag.startswith('background-image'):
+        return [RE_CSS_BACKGROUND]
+    name = RE_TAG_NAME.match(tag)[1].lower()
+    if name in BACKGROUND_TAGS:
+        return [RE_TAG_BACKGROUND, RE_CSS_BACKGROUND]
+    if name == 'img':
+        return [RE_TAG_SRC, RE_CSS_BACKGROUND]
+    return [RE_CSS_BACKGROUND]
+
+
+def rewrite_image_references(html_code: str, replace) -> str:
+    """
+    Rewrite every image reference in one pass over the document.
+    replace(reference) returns the new reference, or None to keep it.
+    """
+
+    def rewrite(match: re.Match) -> str:
+        def rewrite_reference(m: re.Match) -> str:
+            new = replace(m[2])
+            return m[0] if new is None else f"{m[1]}{new}{m[3]}"
+
+        token = match[0]
+        for pattern in _image_patterns(token):
+            token = pattern.sub(rewrite_reference, token)
+        return token
+
+    return RE_TOKEN.sub(rewrite, html_code)
+
+
 def replace_image_urls_with_cid_in_html(html_code: str) -> Tuple[Dict, str]:
     """
     Extract image urls in a HTML file, and replace the url with "cid: <md5 of url>".
@@ -64,26 +119,19 @@ def replace_image_urls_with_cid_in_html(html_code: str) -> Tuple[Dict, str]:
     - <td width="50%" style="background-image: url('https://api.capdev.link/v1/moonshot/download_file/dGhhbmcua2lldUAyMzU5bWVkaWEuY29tL2ltYWdlcy8yMDIxMTEwODAwNTIxM19pbWFnZTAwMi5qcGVn'); margin: 0px; padding: 0px; vertical-align: top; box-sizing: content-box;">
     Returns: dictionary of md5 to image urls, and the updated_html
     """
-    PATTERN_URL = r"(https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9]+\.[^\s]{2,}|www\.[a-zA-Z0-9]+\.[^\s]{2,})"
-
-    PATTERN_BG_URL = f"(<(?:table|tr|td)\s[^>]*?background\s*=\s*(?:'|\"|&quot;)){PATTERN_URL}((?:'|\"|&quot;)[^>]*?>)"
-    PATTERN_IMG_URL = f"(<img\s[^>]*?src\s*=\s*(?:'|\"|&quot;)){PATTERN_URL}((?:'|\"|&quot;)[^>]*?>)"
-    PATTERN_BGIMG_URL = f"(background-image:\s*url\((?:&quot;|')){PATTERN_URL}((?:&quot;|')\))"
-
     image_urls = {}
-    patterns = [PATTERN_BG_URL, PATTERN_IMG_URL, PATTERN_BGIMG_URL]
-    for pattern in patterns:
-        while re.search(pattern, html_code):
-            m = re.search(pattern, html_code)
-            url = m[2]
-            image_cid = hash_by_md5(url)
-            image_urls[image_cid] = url
-            position = m.start()
-            html_code = html_code[:position] + \
-                        re.sub(pattern, f"\\1cid:{image_cid}\\3",
-                               html_code[position:], count=1)
-
-    # Remove empty string
+    cids = {}
+
+    def to_cid(reference: str):
+        if not RE_URL.fullmatch(reference):
+            return None
+        # Each distinct URL is hashed once and embedded once, however often it is used
+        if reference not in cids:
+            cids[reference] = hash_by_md5(reference)
+            image_urls[cids[reference]] = reference
+        return f"cid:{cids[reference]}"
+
+    html_code = rewrite_image_references(html_code, to_cid)
     return image_urls, html_code
 
 
@@ -96,34 +144,17 @@ def extract_images_in_html(html_code: str):
     - <td width="50%" style="background-image: url('/themes/Blue/images/text/1.png'); margin: 0px; padding: 0px; vertical-align: top; box-sizing: content-box;">
     Returns: list of url, list of file_path
     """
-    PATTERN_URL = "(https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9]+\.[^\s]{2,}|www\.[a-zA-Z0-9]+\.[^\s]{2,})"
-    PATTERN_FILE = "(\/{0,1}(((\w)|(\.)|(\\\s))+\/)*((\w)|(\.)|(\\\s))+)"
-
-    PATTERN_BG_URL = f"<td\s[^>]*?background\s*=\s*['\"]{PATTERN_URL}['\"][^>]*?>"
-    PATTERN_BG_FILE = f"<td\s[^>]*?background\s*=\s*['\"]{PATTERN_FILE}['\"][^>]*?>"
-
-    PATTERN_IMG_URL = f"<img\s[^>]*?src\s*=\s*['\"]{PATTERN_URL}['\"][^>]*?>"
-    PATTERN_IMG_FILE = f"<img\s[^>]*?src\s*=\s*['\"]{PATTERN_FILE}['\"][^>]*?>"
-
-    PATTERN_BGIMG_URL = f"background-image:\s*url\(['\"]{PATTERN_URL}['\"]\)"
-    PATTERN_BGIMG_FILE = f"<td\s[^>]*?\s*background-image:\s*url\(['\"]{PATTERN_FILE}['\"]\)"
-
     result_urls = []
-    patterns = [PATTERN_BG_URL, PATTERN_IMG_URL, PATTERN_BGIMG_URL]
-    for pattern in patterns:
-        result_urls.extend(re.findall(pattern, html_code))
-
     result_files = []
-    patterns = [PATTERN_BG_FILE, PATTERN_IMG_FILE, PATTERN_BGIMG_FILE]
-    for pattern in patterns:
-        for item in re.findall(pattern, html_code):
-            if len(item) > 0:
-                # Only take first group in each match
-                result_files.append(item[0])
-
-    # Remove empty string
-    result_urls = [item for item in result_urls if item]
-    result_files = [item for item in result_files if item]
+
+    def collect(reference: str):
+        if RE_URL.fullmatch(reference):
+            result_urls.append(reference)
+        elif RE_FILE.fullmatch(reference):
+            result_files.append(reference)
+        return None
+
+    rewrite_image_references(html_code, collect)
     return result_urls, result_files
 
 
@@ -0,0 +1,89 @@
+"""
+DynamoDB writes made by routes, run off the event loop with bounded retries.
+
+A route awaits write() before it returns. On Lambda, Mangum runs a response's background tasks
+before the invocation returns, so a write deferred to one would still hold up the caller. Running
+it on a worker thread keeps the event loop free for other requests while it is in flight.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+WRITE_MAX_WORKERS = 4
+WRITE_MAX_ATTEMPTS = 3
+WRITE_RETRY_DELAY = 0.2
+
+
+def is_retryable(ex: Exception) -> bool:
+    """
+    A failed condition is not retried, on a retry it means an earlier attempt went through
+    """
+    if isinstance(ex, ClientError):
+        return ex.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException'
+    return True
+
+
+class RecordWriter:
+    """
+    Runs writes on worker threads, each retried up to max_attempts times.
+
+    :param max_workers: Writes in flight at once
+    :param max_attempts: Attempts of a write before it is logged as lost
+    :param retry_delay: Seconds before the first retry, doubled for each following one
+    :param on_failure: Called with the write and its last exception when it is given up
+    """
+
+    def __init__(self, max_workers: int = WRITE_MAX_WORKERS, max_attempts: int = WRITE_MAX_ATTEMPTS,
+                 retry_delay: float = WRITE_RETRY_DELAY,
+                 on_failure: Optional[Callable[[Callable, Exception], None]] = None):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.on_failure = on_failure
+        self.written = 0
+        self.retries = 0
+        self.failed = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='record-writer')
+
+    async def write(self, write: Callable, *args, **kwargs) -> bool:
+        """
+        Run write(*args, **kwargs) on a worker thread, retrying it if it fails.
+        Returns whether it was written, a write that is given up is logged instead of raised.
+        """
+        loop = asyncio.get_running_loop()
+        name = getattr(write, '__qualname__', repr(write))
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await loop.run_in_executor(self._executor, lambda: write(*args, **kwargs))
+                self.written += 1
+                return True
+            except Exception as ex:
+                error = ex
+                if not is_retryable(ex):
+                    if attempt > 1:
+                        # The previous attempt was written, only its response was lost
+                        logger.info(f'{name} already written: {ex}')
+                        self.written += 1
+                        return True
+                    break
+                logger.warning(f'{name} failed, attempt {attempt}: {ex}')
+            if attempt < self.max_attempts:
+                self.retries += 1
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+        self.failed += 1
+        logger.error(f'{name} failed after {attempt} attempts: {error}')
+        if self.on_failure is not None:
+            try:
+                self.on_failure(write, error)
+            except Exception as ex:
+                logger.exception(f'on_failure of {name} failed: {ex}')
+        return False
+
+    def stats(self) -> dict:
+        return {'written': self.written, 'retries': self.retries, 'failed': self.failed}
@@ -1,25 +1,97 @@
 import io
 import logging
+import struct
+import threading
 import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import PurePosixPath
+from typing import List, Optional
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+# Maximum number of blocks fetched by a single ranged GET while reading sequentially
+DEFAULT_READ_AHEAD = 8
+DEFAULT_CACHE_BLOCKS = 64
+DEFAULT_MAX_WORKERS = 8
+
+# Local file header of a zip member, see section 4.3.7 of the zip APPNOTE
+LOCAL_FILE_HEADER = struct.Struct("<4s5H3L2H")
+LOCAL_FILE_HEADER_SIGNATURE = b"PK\003\004"
+# General purpose flag bits of a zip member, as checked by ZipFile.open
+FLAG_ENCRYPTED = 0x1
+FLAG_COMPRESSED_PATCH = 0x20
+FLAG_STRONG_ENCRYPTION = 0x40
+FLAG_UTF8_NAME = 0x800
+
+
+class BlockCache:
+    """
+    Thread safe LRU cache of fixed size blocks of one S3 object, shared by the readers of that object.
+
+    :param capacity: Maximum number of blocks kept in memory
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CACHE_BLOCKS):
+        self.capacity = capacity
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, index: int) -> Optional[bytes]:
+        with self._lock:
+            block = self._blocks.get(index)
+            if block is not None:
+                self._blocks.move_to_end(index)
+            return block
+
+    def put(self, index: int, block: bytes) -> None:
+        with self._lock:
+            self._blocks[index] = block
+            self._blocks.move_to_end(index)
+            while len(self._blocks) > self.capacity:
+                self._blocks.popitem(last=False)
+
 
 class S3File(io.RawIOBase):
-    def __init__(self, s3_object):
+    """
+    Seekable read-only stream over an S3 object.
+
+    Reads are served from block aligned ranges. A miss fetches the block with a ranged GET,
+    and while the stream is read sequentially each GET fetches twice as many blocks as the
+    previous one, up to max_read_ahead.
+
+    :param s3_object: boto3 s3.Object, or any object with get(Range=...) and content_length
+    :param block_size: Size of a cached block in bytes
+    :param max_read_ahead: Maximum number of blocks fetched by one GET
+    :param cache: Block cache, pass the same cache to readers of the same object to share it
+    :param size: Size of the object if known, saves the HEAD request behind content_length
+    """
+
+    def __init__(self, s3_object, block_size: int = DEFAULT_BLOCK_SIZE, max_read_ahead: int = DEFAULT_READ_AHEAD,
+                 cache: BlockCache = None, size: int = None):
         self.s3_object = s3_object
+        self.block_size = block_size
+        self.max_read_ahead = max_read_ahead
+        self.cache = cache if cache is not None else BlockCache()
+        self._size = size
         self.position = 0
+        self.requests = 0
+        self._read_ahead = 1
+        self._next_block = None
 
     def __repr__(self):
         return "<%s s3_object=%r>" % (type(self).__name__, self.s3_object)
 
     @property
     def size(self):
-        return self.s3_object.content_length
+        if self._size is None:
+            self._size = self.s3_object.content_length
+        return self._size
 
     def tell(self):
         return self.position
@@ -41,49 +113,106 @@ class S3File(io.RawIOBase):
     def seekable(self):
         return True
 
-    def read(self, size=-1):
-        if size == -1:
-            # Read to the end of the file
-            range_header = "bytes=%d-" % self.position
-            self.seek(offset=0, whence=io.SEEK_END)
-        else:
-            new_position = self.position + size
-
-            # If we're going to read beyond the end of the object, return
-            # the entire object.
-            if new_position >= self.size:
-                return self.read()
-
-            range_header = "bytes=%d-%d" % (self.position, new_position - 1)
-            self.seek(offset=size, whence=io.SEEK_CUR)
-
-        return self.s3_object.get(Range=range_header)["Body"].read()
-
     def readable(self):
         return True
 
-
-def extract_s3_zip_file(src_bucket: str, src_key: str, target_folder: str, target_bucket: str = None):
+    def read(self, size=-1):
+        end = self.size if size is None or size < 0 else min(self.position + size, self.size)
+        if end <= self.position:
+            return b""
+
+        chunks = []
+        while self.position < end:
+            index, offset = divmod(self.position, self.block_size)
+            block = self._block(index)
+            chunk = block[offset:offset + end - self.position]
+            chunks.append(chunk)
+            self.position += len(chunk)
+        return b"".join(chunks)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def _block(self, index: int) -> bytes:
+        block = self.cache.get(index)
+        if block is None:
+            # Grow the read-ahead window while blocks are consumed in order, start over after a jump
+            if index == self._next_block:
+                self._read_ahead = min(self._read_ahead * 2, self.max_read_ahead)
+            else:
+                self._read_ahead = 1
+            block = self._fetch(index, self._read_ahead)
+        self._next_block = index + 1
+        return block
+
+    def _fetch(self, index: int, count: int) -> bytes:
+        start = index * self.block_size
+        end = min(start + count * self.block_size, self.size) - 1
+        data = self.s3_object.get(Range="bytes=%d-%d" % (start, end))["Body"].read()
+        self.requests += 1
+        for i in range(0, len(data), self.block_size):
+            self.cache.put(index + i // self.block_size, data[i:i + self.block_size])
+        return data[:self.block_size]
+
+
+def open_zip_member(s3_file: S3File, file_info: zipfile.ZipInfo) -> zipfile.ZipExtFile:
     """
-    Extract a s3 zip file to a folder
+    Open a member of a zip archive on its own S3File, so members can be read concurrently
+    without the lock zipfile.ZipFile puts around its shared file object.
+    The checks ZipFile.open makes before reading a member are made here too.
+    """
+    s3_file.seek(file_info.header_offset)
+    header = LOCAL_FILE_HEADER.unpack(s3_file.read(LOCAL_FILE_HEADER.size))
+    if header[0] != LOCAL_FILE_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f"Bad magic number for file header of {file_info.filename}")
+    flag_bits, name_length, extra_length = header[2], header[9], header[10]
+    name = s3_file.read(name_length)
+    s3_file.seek(extra_length, io.SEEK_CUR)
+
+    if file_info.flag_bits & FLAG_COMPRESSED_PATCH:
+        raise NotImplementedError("compressed patched data (flag bit 5)")
+    if file_info.flag_bits & FLAG_STRONG_ENCRYPTION:
+        raise NotImplementedError("strong encryption (flag bit 6)")
+    name = name.decode("utf-8" if flag_bits & FLAG_UTF8_NAME else "cp437")
+    if name != file_info.orig_filename:
+        raise zipfile.BadZipFile(f"File name in directory {file_info.orig_filename!r} and header {name!r} differ.")
+    if file_info.flag_bits & FLAG_ENCRYPTED:
+        raise RuntimeError(f"File {file_info.filename!r} is encrypted, password required for extraction")
+    return zipfile.ZipExtFile(s3_file, "r", file_info)
+
+
+def extract_s3_zip_file(src_bucket: str, src_key: str, target_folder: str, target_bucket: str = None,
+                        max_workers: int = DEFAULT_MAX_WORKERS, s3_resource=None) -> List[str]:
+    """
+    Extract a s3 zip file to a folder.
+
+    The central directory is read once, then members are streamed to S3 by a pool of
+    max_workers threads, each reading through its own S3File over a shared block cache.
     """
-    s3_resource = boto3.resource("s3")
+    if s3_resource is None:
+        s3_resource = boto3.resource("s3")
     if target_bucket is None:
         target_bucket = src_bucket
     s3_object = s3_resource.Object(bucket_name=src_bucket, key=src_key)
-    s3_file = S3File(s3_object)
-
-    with zipfile.ZipFile(s3_file) as z:
-        p = PurePosixPath(target_folder)
-        result = []
-        for filename in z.namelist():
-            file_info = z.getinfo(filename)
-            logger.info(file_info)
-            dest_key = str(p.joinpath(filename))
-            result.append(dest_key)
-            s3_resource.meta.client.upload_fileobj(
-                z.open(filename),
-                Bucket=target_bucket,
-                Key=dest_key
-            )
-        return result
+    size = s3_object.content_length
+    cache = BlockCache()
+    # Uploads run on our pool, parts of a large member are sent one after another
+    config = TransferConfig(use_threads=False)
+
+    with zipfile.ZipFile(S3File(s3_object, cache=cache, size=size)) as z:
+        file_infos = z.infolist()
+    p = PurePosixPath(target_folder)
+
+    def extract(file_info: zipfile.ZipInfo) -> str:
+        logger.info(file_info)
+        dest_key = str(p.joinpath(file_info.filename))
+        # boto3 resources are not thread safe, give each worker its own Object
+        member_object = s3_resource.Object(bucket_name=src_bucket, key=src_key)
+        with open_zip_member(S3File(member_object, cache=cache, size=size), file_info) as member:
+            s3_resource.meta.client.upload_fileobj(member, Bucket=target_bucket, Key=dest_key, Config=config)
+        return dest_key
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(extract, file_infos))
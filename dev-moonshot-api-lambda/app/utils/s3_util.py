@@ -1,10 +1,13 @@
+import hashlib
 import logging
 import os
 import traceback
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from io import BytesIO
 from pathlib import Path, PurePosixPath
-from typing import Dict, List, Tuple, Union
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 import boto3
 from boto3.s3.transfer import TransferConfig
@@ -16,6 +19,171 @@ from app.utils.file_util import recursive_glob
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
+TRANSFER_MAX_WORKERS = 10
+# Largest object copied with a single CopyObject request
+MAX_COPY_OBJECT_SIZE = 5 * 1024 * 1024 * 1024
+# Transfers run on our own pool, so each one sends its parts sequentially
+TRANSFER_CONFIG = TransferConfig(multipart_threshold=8 * 1024 * 1024,
+                                 multipart_chunksize=8 * 1024 * 1024,
+                                 use_threads=False)
+
+
+@dataclass
+class TransferResult:
+    """
+    Outcome of copying, downloading or uploading one object.
+
+    :param source: Source key or local path
+    :param target: Destination key or local path
+    :param status: 'copied', 'downloaded', 'uploaded', 'skipped' or 'failed'
+    :param error: Error message if the transfer failed
+    """
+    source: str
+    target: str
+    status: str
+    error: Optional[str] = None
+
+
+def list_prefix(s3_client, bucket_name: str, prefix: str) -> Dict[str, Dict]:
+    """
+    List every object under prefix in one flat list_objects_v2 pass, nested prefixes included.
+    Returns a dictionary of key to {'size', 'etag'}.
+    """
+    result = {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            result[obj['Key']] = {'size': obj['Size'], 'etag': obj['ETag'].strip('"')}
+    return result
+
+
+def head_object_info(s3_client, bucket_name: str, key: str) -> Optional[Dict]:
+    """
+    {'size', 'etag'} of one object, as in list_prefix, or None if it does not exist.
+    """
+    try:
+        response = s3_client.head_object(Bucket=bucket_name, Key=key)
+    except ClientError as ex:
+        if ex.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+    return {'size': response['ContentLength'], 'etag': response['ETag'].strip('"')}
+
+
+def compute_etag(file_path: str, config: TransferConfig = TRANSFER_CONFIG) -> str:
+    """
+    ETag S3 assigns to the file when uploaded with config: the MD5 of the content,
+    or for multipart uploads the MD5 of the part MD5s followed by the part count.
+    """
+    digests = []
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(config.multipart_chunksize), b''):
+            digests.append(hashlib.md5(chunk))
+    if os.path.getsize(file_path) < config.multipart_threshold:
+        return digests[0].hexdigest() if digests else hashlib.md5().hexdigest()
+    return f"{hashlib.md5(b''.join(d.digest() for d in digests)).hexdigest()}-{len(digests)}"
+
+
+def run_transfers(jobs: Iterable[Tuple[str, str, Callable[[], str]]],
+                  max_workers: int = TRANSFER_MAX_WORKERS) -> List[TransferResult]:
+    """
+    Run (source, target, transfer) jobs on a bounded pool. Each transfer returns its status,
+    failures are logged and reported instead of stopping the other transfers.
+    """
+
+    def run(job):
+        source, target, transfer = job
+        try:
+            return TransferResult(source, target, transfer())
+        except Exception as ex:
+            logger.error(f"Failed to transfer {source} to {target}: {ex}")
+            return TransferResult(source, target, 'failed', str(ex))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run, jobs))
+
+
+def copy_prefix(s3_client, src_bucket: str, src_prefix: str, dest_bucket: str, dest_prefix: str,
+                max_workers: int = TRANSFER_MAX_WORKERS) -> List[TransferResult]:
+    """
+    Copy every object under src_prefix to dest_prefix, skipping objects already copied.
+    """
+    sources = list_prefix(s3_client, src_bucket, src_prefix)
+    existing = list_prefix(s3_client, dest_bucket, dest_prefix)
+
+    def job(key, obj):
+        dest_key = dest_prefix + key[len(src_prefix):]
+
+        def transfer():
+            if existing.get(dest_key) == obj:
+                return 'skipped'
+            copy_source = {'Bucket': src_bucket, 'Key': key}
+            if obj['size'] <= MAX_COPY_OBJECT_SIZE:
+                # One request, and the copy keeps the ETag of a single part source
+                s3_client.copy_object(CopySource=copy_source, Bucket=dest_bucket, Key=dest_key)
+            else:
+                s3_client.copy(copy_source, dest_bucket, dest_key, Config=TRANSFER_CONFIG)
+            return 'copied'
+
+        return key, dest_key, transfer
+
+    return run_transfers([job(key, obj) for key, obj in sources.items()], max_workers)
+
+
+def download_prefix(s3_client, bucket_name: str, prefix: str, local: str,
+                    max_workers: int = TRANSFER_MAX_WORKERS) -> List[TransferResult]:
+    """
+    Download every object under prefix to local/<key>, skipping files that already match.
+    """
+    sources = list_prefix(s3_client, bucket_name, prefix)
+
+    def job(key, obj):
+        dest_pathname = os.path.join(local, key)
+
+        def transfer():
+            if os.path.isfile(dest_pathname) and os.path.getsize(dest_pathname) == obj['size'] \
+                    and compute_etag(dest_pathname) == obj['etag']:
+                return 'skipped'
+            os.makedirs(os.path.dirname(dest_pathname), exist_ok=True)
+            s3_client.download_file(bucket_name, key, dest_pathname, Config=TRANSFER_CONFIG)
+            return 'downloaded'
+
+        return key, dest_pathname, transfer
+
+    # Keys ending with / are folder placeholders
+    return run_transfers([job(key, obj) for key, obj in sources.items() if not key.endswith('/')], max_workers)
+
+
+def upload_folder(s3_client, local_folder: str, bucket_name: str, s3_path: str = '',
+                  max_workers: int = TRANSFER_MAX_WORKERS) -> List[TransferResult]:
+    """
+    Upload every file under local_folder to s3_path/<relative path>, skipping files already uploaded.
+    The objects under s3_path are listed once; without s3_path each file is checked on its own
+    instead, so that the whole bucket is never listed.
+    """
+    existing = None
+    if s3_path:
+        existing = list_prefix(s3_client, bucket_name, str(PurePosixPath(Path(s3_path))) + '/')
+
+    def job(file_path):
+        object_key = str(PurePosixPath(Path(s3_path)).joinpath(Path(file_path).as_posix()))
+        local_path = os.path.join(local_folder, file_path)
+
+        def transfer():
+            if existing is None:
+                target = head_object_info(s3_client, bucket_name, object_key)
+            else:
+                target = existing.get(object_key)
+            if target is not None and target['size'] == os.path.getsize(local_path) \
+                    and target['etag'] == compute_etag(local_path):
+                return 'skipped'
+            s3_client.upload_file(Filename=local_path, Bucket=bucket_name, Key=object_key, Config=TRANSFER_CONFIG)
+            return 'uploaded'
+
+        return local_path, object_key, transfer
+
+    return run_transfers([job(file_path) for file_path in recursive_glob(local_folder)], max_workers)
+
 
 def extract_file_from_s3_zip_file(s3_client, bucket_name, key_path, target_file_name):
     """
@@ -167,22 +335,13 @@ def download_folder_from_bucket(s3_client, s3_resource, prefix, bucket_name='you
         s3_client = boto3.client('s3')
         s3_resource = boto3.resource('s3')
         s3_download_folder(s3_client, s3_resource, 'newsletter/2021-01-01/', 'my-bucket', '/tmp')
+    s3_resource is no longer used and kept for compatibility.
     """
-    paginator = s3_client.get_paginator('list_objects')
-    for page in paginator.paginate(Bucket=bucket_name, Delimiter='/', Prefix=prefix):
-        if page.get('CommonPrefixes') is not None:
-            for subdir in page.get('CommonPrefixes'):
-                download_folder_from_bucket(s3_client, s3_resource, subdir.get(
-                    'Prefix'), bucket_name, local)
-        for file in page.get('Contents', []):
-            dest_pathname = os.path.join(local, file.get('Key'))
-            if not os.path.exists(os.path.dirname(dest_pathname)):
-                os.makedirs(os.path.dirname(dest_pathname))
-            try:
-                s3_resource.meta.client.download_file(
-                    bucket_name, file.get('Key'), dest_pathname)
-            except Exception as ex:
-                logger.info(ex)
+    results = download_prefix(s3_client, bucket_name, prefix, local)
+    for result in results:
+        if result.status == 'failed':
+            logger.info(result.error)
+    return results
 
 
 def upload_file_to_bucket(s3_client, file_path: str, bucket_name: str, object_key: str = None,
@@ -214,26 +373,9 @@ def upload_folder_content_to_bucket(s3_client, local_folder: str, bucket_name: s
     """
     Upload content in a local folder to S3 bucket
     """
-    file_paths = recursive_glob(local_folder)
-    logger.info(file_paths)
-    config = TransferConfig(multipart_threshold=1024 * 25,
-                            max_concurrency=10,
-                            multipart_chunksize=1024 * 25,
-                            use_threads=True)
-
-    success = []
-    failed = []
-    for file_path in file_paths:
-        logger.info('Uploading {}'.format(file_path))
-        object_key = PurePosixPath(Path(s3_path)).joinpath(
-            Path(file_path).as_posix())
-        status = upload_file_to_bucket(s3_client, os.path.join(local_folder, file_path), bucket_name,
-                                       object_key=str(object_key), config=config)
-        if status:
-            success.append(str(object_key))
-        else:
-            failed.append(str(object_key))
-
+    results = upload_folder(s3_client, local_folder, bucket_name, s3_path)
+    success = [r.target for r in results if r.status != 'failed']
+    failed = [r.target for r in results if r.status == 'failed']
     return success, failed
 
 
@@ -318,7 +460,7 @@ def delete_file_from_bucket(s3_client, bucket_name: str, key: str):
     s3_client.delete_object(Bucket=bucket_name, Key=key)
 
     
-def copy_s3_folder(old_prefix, new_prefix, old_bucket_name, new_bucket_name=None):
+def copy_s3_folder(old_prefix, new_prefix, old_bucket_name, new_bucket_name=None, s3_client=None):
     """
     Copy objects matching one prefix to another location in s3 buckets.
     if new_bucket_name is None, copy to the same
@@ -329,17 +471,9 @@ def copy_s3_folder(old_prefix, new_prefix, old_bucket_name, new_bucket_name=None
         # Same location, no copy required
         return None
 
-    s3 = boto3.resource('s3')
-    old_bucket = s3.Bucket(old_bucket_name)
-    new_bucket = s3.Bucket(new_bucket_name)
-
-    for obj in old_bucket.objects.filter(Prefix=old_prefix):
-        old_source = {'Bucket': old_bucket_name,
-                      'Key': obj.key}
-        # replace the prefix
-        new_key = new_prefix + obj.key[len(old_prefix):]
-        new_obj = new_bucket.Object(new_key)
-        new_obj.copy(old_source)
+    if s3_client is None:
+        s3_client = boto3.client('s3')
+    return copy_prefix(s3_client, old_bucket_name, old_prefix, new_bucket_name, new_prefix)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,155 @@
+"""
+Lazily created AWS clients and secrets, shared by every router of the app.
+
+Nothing here talks to AWS until a client is first used, so importing the app on a cold
+start costs no network round-trips, and routes that never touch a service never pay for it.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import boto3
+
+logger = logging.getLogger()
+
+SECRET_TTL = 300
+
+
+class LazyService:
+    """
+    Stand-in for a client or resource that is created on first attribute access.
+
+    :param factory: Creates the object
+    :param deferred: Methods whose result is itself wrapped in a LazyService, e.g. 'Table' of the
+        dynamodb resource, so `dynamodb.Table(name)` at import time does not create the resource
+    """
+
+    def __init__(self, factory: Callable[[], Any], deferred: Tuple[str, ...] = ()):
+        self._factory = factory
+        self._deferred = deferred
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name in self._deferred and self._instance is None:
+            return lambda *args, **kwargs: LazyService(lambda: getattr(self._get(), name)(*args, **kwargs))
+        return getattr(self._get(), name)
+
+    def __repr__(self):
+        return f"<LazyService {self._instance if self._instance is not None else 'not created'}>"
+
+
+class ServiceRegistry:
+    """
+    Creates one boto3 client or resource per service and settings on first use, and caches secrets.
+
+    :param secret_ttl: Seconds a secret is served from the cache before it is fetched again,
+        so rotated secrets are picked up without a cold start
+    :param secrets_settings: Settings of the secretsmanager client, e.g. endpoint_url and config
+    :param session_factory: Creates the boto3 session, replaced in tests
+    """
+
+    def __init__(self, secret_ttl: float = SECRET_TTL, secrets_settings: Optional[Dict] = None,
+                 session_factory: Callable[[], Any] = boto3.session.Session):
+        self.secret_ttl = secret_ttl
+        self.secrets_settings = secrets_settings or {}
+        self._session_factory = session_factory
+        self._session = None
+        self._services: Dict[Tuple, Any] = {}
+        self._secrets: Dict[str, Tuple[float, Dict, Optional[str]]] = {}
+        self._account_id = None
+        # boto3 sessions are not thread safe, creation of clients is serialised
+        self._lock = threading.RLock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = self._session_factory()
+            return self._session
+
+    def _service(self, kind: str, service_name: str, settings: Dict):
+        key = (kind, service_name, tuple(sorted((k, repr(v)) for k, v in settings.items())))
+        service = self._services.get(key)
+        if service is None:
+            with self._lock:
+                service = self._services.get(key)
+                if service is None:
+                    logger.info(f'Creating {service_name} {kind}')
+                    service = getattr(self.session, kind)(service_name, **settings)
+                    self._services[key] = service
+        return service
+
+    def client(self, service_name: str, **settings):
+        """
+        The shared client of a service, created on first call
+        """
+        return self._service('client', service_name, settings)
+
+    def resource(self, service_name: str, **settings):
+        """
+        The shared resource of a service, created on first call
+        """
+        return self._service('resource', service_name, settings)
+
+    def lazy_client(self, service_name: str, **settings) -> LazyService:
+        """
+        A module level stand-in for client(service_name), created when first used
+        """
+        return LazyService(lambda: self.client(service_name, **settings))
+
+    def lazy_resource(self, service_name: str, deferred: Tuple[str, ...] = ('Table',), **settings) -> LazyService:
+        """
+        A module level stand-in for resource(service_name), created when first used
+        """
+        return LazyService(lambda: self.resource(service_name, **settings), deferred)
+
+    def secret(self, secret_name: str) -> Dict:
+        """
+        A JSON secret from Secrets Manager as a dictionary, fetched on first use and again after secret_ttl.
+        If the refresh fails the cached value keeps being served.
+        """
+        cached = self._secrets.get(secret_name)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        try:
+            response = self.client('secretsmanager', **self.secrets_settings).get_secret_value(SecretId=secret_name)
+        except Exception as e:
+            if cached is None:
+                raise
+            logger.warning(f'Failed to refresh secret {secret_name}, using cached value: {e}')
+            self._secrets[secret_name] = (time.monotonic() + self.secret_ttl, cached[1], cached[2])
+            return cached[1]
+        version_id = response.get('VersionId')
+        if cached is not None and cached[2] != version_id:
+            logger.info(f'Secret {secret_name} was rotated')
+        value = json.loads(response['SecretString'])
+        self._secrets[secret_name] = (time.monotonic() + self.secret_ttl, value, version_id)
+        return value
+
+    def invalidate_secret(self, secret_name: str) -> None:
+        """
+        Fetch the secret again on next use, e.g. after a call failed because the key was rotated
+        """
+        self._secrets.pop(secret_name, None)
+
+    @property
+    def account_id(self) -> str:
+        """
+        AWS account id of the caller, one STS call on first use
+        """
+        if self._account_id is None:
+            self._account_id = self.client('sts').get_caller_identity().get('Account')
+        return self._account_id
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import os
@@ -6,10 +7,9 @@ from email.mime.multipart import MIMEMultipart
 from email.utils import formataddr
 from typing import List, Dict
 
-import boto3
-
+from app import config
+from app.common.aws import ses_client as shared_ses_client, sqs_client
 from app.common.mail_task_type import MailTaskType
-from app.config import QUEUE_URL_EMAIL_JOBS, AWS_REGION_NAME
 
 logging.basicConfig(level=logging.INFO, force=True)
 logger = logging.getLogger()
@@ -18,8 +18,6 @@ CHARSET = 'utf8'
 ADMIN_EMAIL = os.environ.get('EMAIL_ADMIN', 'data@tech.gov.sg')
 ADMIN_NAME = os.environ.get('ADMIN_NAME', 'CapDev DSAID')
 
-sqs_client = boto3.client(service_name='sqs', region_name=AWS_REGION_NAME)
-
 
 def send_raw_email(ses_client, msg: MIMEMultipart, from_email: str, to_emails: List[str], configSetName=None):
     logger.info(
@@ -97,8 +95,7 @@ def send_otp_email(otp, email_address, name='welcome', duration='5 minutes', fro
     if from_address is None:
         from_address = formataddr((ADMIN_NAME, ADMIN_EMAIL))
 
-    ses_client = boto3.client('ses')
-    send_emails(ses_client, [email_address], subject,
+    send_emails(shared_ses_client, [email_address], subject,
                 from_address, body_text, body_html)
 
 
@@ -138,8 +135,7 @@ def send_an_email(mail: MailTaskType):
     """
     Send an email using SES directly.
     """
-    ses_client = boto3.client('ses')
-    send_emails(ses_client, mail.to_emails, mail.subject,
+    send_emails(shared_ses_client, mail.to_emails, mail.subject,
                 mail.from_email, mail.message_text, mail.message_html)
 
 
@@ -154,8 +150,16 @@ def queue_an_email(job: MailTaskType) -> Dict:
         job.task_id = uuid.uuid1().hex
 
     logger.info(f'Add email job to queue: {job.dict()}')
-    sqs_client.send_message(QueueUrl=QUEUE_URL_EMAIL_JOBS,
+    sqs_client.send_message(QueueUrl=config.QUEUE_URL_EMAIL_JOBS,
                             MessageBody=json.dumps(job.dict()),
                             MessageGroupId=uuid.uuid1().hex)
 
     return job.dict(include={'task_group', 'task_id'})
+
+
+async def queue_an_email_async(job: MailTaskType) -> Dict:
+    """
+    queue_an_email on a worker thread, so an async route only waits for the SQS send.
+    Mail Postman fills the placeholders and sends the email out of process.
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, queue_an_email, job)
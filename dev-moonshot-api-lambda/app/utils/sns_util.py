@@ -1,14 +1,11 @@
 import logging
 
-import boto3
-
 from app import config
+from app.common.aws import sns_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
-sns_client = boto3.client('sns', region_name=config.AWS_REGION_NAME)
-
 
 def send_sms(phones, subject, message, sender_id='WhoAmI'):
     """
@@ -42,7 +39,7 @@ def slack_developer(subject: str, message: str, sns_client=None, topic_arn: str
         if topic_arn is None:
             topic_arn = config.SNS_SLACK_TOPIC_ARN
         if sns_client is None:
-            sns_client = boto3.client(service_name='sns')
+            sns_client = config.services.client('sns')
         sns_client.publish(TopicArn=topic_arn,
                            Subject=subject,
                            Message=message)
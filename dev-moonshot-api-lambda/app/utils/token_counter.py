@@ -0,0 +1,124 @@
+"""
+Token accounting of model calls, shared by the invocations of a warm container.
+
+Encodings are loaded once per process, and the token count of each message is cached by a digest
+of its text, so a chat history that is sent again with every turn is only encoded once. Trimming a
+conversation to the context limit subtracts the counts of the dropped messages instead of encoding
+the remaining conversation again after each drop. estimate() counts without encoding at all, for checks made
+before a request is admitted.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger()
+
+DEFAULT_ENCODING = 'gpt2'
+# Messages whose token count is kept, keyed by a digest of their text
+COUNT_CACHE_SIZE = 4096
+# Average length of a gpt2 token in English text
+CHARS_PER_TOKEN = 4
+
+
+def load_tiktoken_encoding(name: str):
+    # tiktoken is imported on first use, so a cold start that never counts tokens does not load it
+    import tiktoken
+    return tiktoken.get_encoding(name)
+
+
+class TokenCounter:
+    """
+    Counts tokens with encodings held for the process lifetime.
+
+    :param encoding_name: Encoding used when none is given
+    :param load_encoding: Loads an encoding by name, anything with an encode(text) method
+    :param cache_size: Texts whose count is kept
+    """
+
+    def __init__(self, encoding_name: str = DEFAULT_ENCODING,
+                 load_encoding: Callable[[str], Any] = load_tiktoken_encoding,
+                 cache_size: int = COUNT_CACHE_SIZE):
+        self.encoding_name = encoding_name
+        self.load_encoding = load_encoding
+        self._encodings = {}
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        # (digest of the text, encoding name) -> token count, least recently used first
+        self._counts = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def encoding(self, name: Optional[str] = None):
+        name = name or self.encoding_name
+        encoding = self._encodings.get(name)
+        if encoding is None:
+            with self._lock:
+                encoding = self._encodings.get(name)
+                if encoding is None:
+                    logger.info(f'Loading token encoding {name}')
+                    encoding = self._encodings[name] = self.load_encoding(name)
+        return encoding
+
+    def count(self, text: str, encoding_name: Optional[str] = None) -> int:
+        """
+        Exact number of tokens of text
+        """
+        if not text:
+            return 0
+        name = encoding_name or self.encoding_name
+        # A digest keeps the cache small however long the messages are
+        key = (hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest(), name)
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                self._hits += 1
+                return count
+        count = len(self.encoding(name).encode(text))
+        with self._lock:
+            self._misses += 1
+            self._counts[key] = count
+            if len(self._counts) > self.cache_size:
+                self._counts.popitem(last=False)
+        return count
+
+    def estimate(self, text: str) -> int:
+        """
+        Approximate number of tokens of text, without encoding it
+        """
+        return -(-len(text) // CHARS_PER_TOKEN)
+
+    def count_messages(self, messages: List[Dict], encoding_name: Optional[str] = None) -> int:
+        """
+        Tokens of the contents of chat messages
+        """
+        return sum(self.count(m['content'], encoding_name) for m in messages)
+
+    def estimate_messages(self, messages: List[Dict]) -> int:
+        return sum(self.estimate(m['content']) for m in messages)
+
+    def fit_messages(self, messages: List[Dict], limit: int, keep: int = 0,
+                     encoding_name: Optional[str] = None) -> int:
+        """
+        Drop the earliest messages after the first `keep` ones until the contents are at most
+        `limit` tokens, or no message is left to drop. Changes messages in place.
+        Returns the tokens of the remaining messages.
+        """
+        counts = [self.count(m['content'], encoding_name) for m in messages]
+        prompt_tokens = sum(counts)
+        while prompt_tokens > limit and len(messages) > keep:
+            messages.pop(keep)
+            prompt_tokens -= counts.pop(keep)
+        return prompt_tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'encodings': sorted(self._encodings), 'cached_counts': len(self._counts),
+                    'hits': self._hits, 'misses': self._misses}
+
+
+# Shared by every request, see llm_util
+token_counter = TokenCounter()
@@ -0,0 +1,76 @@
+"""
+Latency benchmark of the first message of a GPT chat: time until the route handler returns.
+
+Compares the sequential flow (completion, then title, then a blocking DynamoDB put) with
+complete_chat() and the put awaited on RecordWriter's threads, against the fake model backend over
+HTTP. On Lambda the handler returning is what the caller waits for, the put is included in both:
+    python -m test.bench_chat_pipeline [model_delay_seconds] [put_delay_seconds] [runs]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from app.utils.chat_pipeline import complete_chat, title_from_response, title_messages
+from app.utils.model_transport import BackendConfig, ModelTransport
+from app.utils.record_writer import RecordWriter
+from test.utils.fake_model_backend import FakeModelBackend
+
+PROMPT = 'Explain how the quarterly budget review process works for statutory boards in Singapore'
+
+
+def fake_completion(transport: ModelTransport):
+    """
+    A chat completion served by the fake backend, in the shape returned by llm_util.gpt_chat_completion
+    """
+
+    async def complete(messages, *args, temperature=0.5, **kwargs):
+        text = await transport.post_json('fake', '/chat', {'instruction': messages})
+        return {'id': 'resp', 'choices': [{'message': {'role': 'assistant', 'content': text}}]}
+
+    return complete
+
+
+def put_chat_response(delay: float):
+    time.sleep(delay)
+
+
+async def sequential(complete, put_delay: float) -> float:
+    start = time.perf_counter()
+    messages = [{'role': 'user', 'content': PROMPT}]
+    await complete(messages)
+    title_from_response(await complete(title_messages(PROMPT), temperature=0))
+    put_chat_response(put_delay)
+    return time.perf_counter() - start
+
+
+async def pipelined(complete, put_delay: float, record_writer: RecordWriter) -> float:
+    start = time.perf_counter()
+    messages = [{'role': 'user', 'content': PROMPT}]
+    await complete_chat(complete, messages, None)
+    await record_writer.write(put_chat_response, put_delay)
+    return time.perf_counter() - start
+
+
+async def main(model_delay: float, put_delay: float, runs: int):
+    backend = FakeModelBackend(delay=model_delay)
+    transport = ModelTransport()
+    transport.register(BackendConfig('fake', await backend.start()))
+    complete = fake_completion(transport)
+    record_writer = RecordWriter()
+    try:
+        for name, flow in (('sequential', lambda: sequential(complete, put_delay)),
+                           ('pipelined', lambda: pipelined(complete, put_delay, record_writer))):
+            times = [await flow() for _ in range(runs)]
+            print(f'{name:>10}: median {statistics.median(times) * 1000:.0f} ms until the handler returns over {runs} runs')
+    finally:
+        await transport.close()
+        await backend.stop()
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    asyncio.run(main(float(args[0]) if args else 0.5,
+                     float(args[1]) if len(args) > 1 else 0.03,
+                     int(args[2]) if len(args) > 2 else 5))
@@ -0,0 +1,56 @@
+"""
+Cold start benchmark: time to import app.main in a fresh interpreter and the AWS calls made while importing.
+
+Run from the project folder with the Lambda environment variables set (APP_CODE, QUEUE_EMAIL_JOBS, ...):
+    python -m test.bench_cold_start [runs]
+
+Every AWS API call is counted and answered with a canned response, so no credentials are
+needed and the count shows what a new container does before Mangum gets the first request.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import json, time
+from collections import Counter
+import botocore.client
+
+calls = Counter()
+# Typical round-trip of an AWS API call from Lambda
+LATENCY = 0.03
+
+def _make_api_call(self, operation_name, api_params):
+    calls[f'{self.meta.service_model.service_name}.{operation_name}'] += 1
+    time.sleep(LATENCY)
+    return {'Account': '000000000000', 'SecretString': '{}', 'Table': {'TableStatus': 'ACTIVE'}}
+
+botocore.client.BaseClient._make_api_call = _make_api_call
+
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'calls': calls}))
+"""
+
+
+def run_once() -> dict:
+    out = subprocess.run([sys.executable, '-c', CHILD], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(runs: int = 5):
+    results = [run_once() for _ in range(runs)]
+    seconds = [r['seconds'] for r in results]
+    print(f'import app.main: median {statistics.median(seconds) * 1000:.0f} ms, '
+          f'min {min(seconds) * 1000:.0f} ms over {runs} runs')
+    calls = results[0]['calls']
+    print(f'AWS calls during import: {sum(calls.values())}')
+    for name, count in sorted(calls.items()):
+        print(f'  {name}: {count}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,91 @@
+"""
+CPU time of token accounting for one GPT chat request, before and after TokenCounter.
+
+Before: the encoding is looked up per request and the whole conversation is encoded again after
+each message dropped to fit the context limit. After: TokenCounter with its encodings and counts kept
+across requests, as in a warm container, and estimate() for the pre-admission check.
+    python -m test.bench_token_counter [messages] [words_per_message] [runs]
+
+Uses the tiktoken gpt2 encoding; without it (e.g. no network to fetch its files) a regex word
+encoding of similar cost per character stands in, and the numbers only compare the two flows.
+"""
+
+import re
+import statistics
+import sys
+import time
+
+from app.utils.token_counter import TokenCounter, load_tiktoken_encoding
+
+
+class RegexEncoding:
+    def encode(self, text: str):
+        return re.findall(r" ?\w+| ?[^\w\s]+|\s+", text)
+
+
+def load_encoding(name: str):
+    try:
+        encoding = load_tiktoken_encoding(name)
+        print(f'encoding: tiktoken {name}')
+    except Exception as ex:
+        print(f'encoding: regex stand-in, tiktoken {name} unavailable ({type(ex).__name__})')
+        encoding = RegexEncoding()
+    return encoding
+
+
+def conversation(count: int, words: int):
+    text = ' '.join(f'word{i % 50}' for i in range(words))
+    return [{'role': 'system', 'content': 'You are an AI assistant.'}] + \
+           [{'role': 'user' if i % 2 else 'assistant', 'content': f'{i} {text}'} for i in range(count)]
+
+
+def before(messages, load):
+    encoding = load('gpt2')
+    prompt_token_count = len(encoding.encode(" ".join([m['content'] for m in messages])))
+    while prompt_token_count > 3000:
+        messages.pop(1)
+        prompt_token_count = len(encoding.encode(" ".join([m['content'] for m in messages])))
+    return prompt_token_count
+
+
+def after(messages, counter: TokenCounter):
+    counter.estimate_messages(messages)
+    return counter.fit_messages(messages, 3000, keep=1)
+
+
+def timed(flow, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        flow()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(count: int, words: int, runs: int):
+    encoding = load_encoding('gpt2')
+    counter = TokenCounter(load_encoding=lambda name: encoding)
+    messages = conversation(count, words)
+
+    results = {
+        # The lookup is cheap after the first call in tiktoken too, the cost is the re-encoding
+        'before': timed(lambda: before(list(messages), lambda name: encoding), runs),
+        # Every message new to the counter, e.g. the first request of a conversation
+        'after_new': timed(lambda: after(list(messages), TokenCounter(load_encoding=lambda name: encoding)), runs),
+        # The history counted by an earlier request of the conversation
+        'after': timed(lambda: after(list(messages), counter), runs),
+        'estimate': timed(lambda: counter.estimate_messages(messages), runs),
+    }
+    for name, seconds in results.items():
+        print(f'{name:>10}: median {seconds * 1000:.2f} ms per request over {runs} runs')
+    print(f'prompt tokens after trimming: before {before(list(messages), lambda name: encoding)}, '
+          f'after {after(list(messages), counter)}')
+    print(f'conversation tokens: counted {counter.count_messages(messages)}, '
+          f'estimated {counter.estimate_messages(messages)}')
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 40,
+         int(args[1]) if len(args) > 1 else 200,
+         int(args[2]) if len(args) > 2 else 20)
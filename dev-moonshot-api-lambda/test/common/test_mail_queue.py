@@ -0,0 +1,66 @@
+import asyncio
+import json
+import time
+
+from app import config
+from app.common.mail_task_type import MailTaskType
+from app.common.mail_util import compose_ai_response_email
+from app.utils import ses_util
+
+
+class RecordingSqsClient:
+    """
+    Records the messages sent to the Mail Postman queue, taking `delay` seconds per send
+    """
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.messages = []
+
+    def send_message(self, QueueUrl: str, MessageBody: str, **kwargs):
+        time.sleep(self.delay)
+        self.messages.append((QueueUrl, json.loads(MessageBody)))
+        return {'MessageId': str(len(self.messages))}
+
+
+def test_ai_response_email_is_queued_for_mail_postman(monkeypatch):
+    sqs = RecordingSqsClient()
+    monkeypatch.setattr(ses_util, 'sqs_client', sqs)
+    # Set in the module dict, reading the attribute would look up the account id
+    monkeypatch.setitem(vars(config), 'QUEUE_URL_EMAIL_JOBS', 'queue-url')
+    messages = [{'role': 'user', 'content': 'Hi'}, {'role': 'assistant', 'content': 'Hello'}]
+    job = compose_ai_response_email('a@b.sg', {'prompt': 'You:\nHi', 'messages': messages,
+                                               'response': 'Hello', 'created': '2023-06-01 10:00'})
+
+    result = asyncio.run(ses_util.queue_an_email_async(job))
+
+    queue_url, body = sqs.messages[0]
+    assert queue_url == 'queue-url'
+    assert result == {'task_group': body['task_group'], 'task_id': body['task_id']}
+    # Mail Postman fills the placeholders, which must be strings, the messages are already rendered
+    assert body['placeholders'] == {'prompt': 'You:\nHi', 'response': 'Hello', 'created': '2023-06-01 10:00'}
+    assert body['to_emails'] == ['a@b.sg']
+    assert 'Hello' in body['message_html']
+
+
+def test_queueing_does_not_block_the_event_loop(monkeypatch):
+    monkeypatch.setattr(ses_util, 'sqs_client', RecordingSqsClient(delay=0.2))
+    # Set in the module dict, reading the attribute would look up the account id
+    monkeypatch.setitem(vars(config), 'QUEUE_URL_EMAIL_JOBS', 'queue-url')
+    job = MailTaskType(to_emails=['a@b.sg'], from_email='c@d.sg', subject='OTP for {{event}}',
+                       placeholders={'event': 'Login'})
+
+    async def main():
+        start = time.perf_counter()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while time.perf_counter() - start < 0.2:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(ses_util.queue_an_email_async(job), ticker())
+        return ticks
+
+    assert asyncio.run(main()) >= 10
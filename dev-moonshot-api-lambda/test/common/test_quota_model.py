@@ -0,0 +1,67 @@
+from app.common.quota_model import BUCKET_SECONDS, InMemoryQuotaCounterModel, QuotaCounterModel
+
+NOW = 1_700_000_000
+
+
+class FakeTable:
+    """
+    Minimal DynamoDB table supporting the ADD update and BETWEEN query used by QuotaCounterModel
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.queries = 0
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues):
+        item = self.items.setdefault((Key['llm_task'], Key['id']), dict(Key))
+        item['tokens_used'] = item.get('tokens_used', 0) + ExpressionAttributeValues[':tokens']
+        item.setdefault('expires_at', ExpressionAttributeValues[':expires_at'])
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues, ProjectionExpression, **kwargs):
+        self.queries += 1
+        values = ExpressionAttributeValues
+        items = [{'tokens_used': i['tokens_used']} for (pk, sk), i in self.items.items()
+                 if pk == values[':llm_task'] and values[':start'] <= sk <= values[':end']]
+        return {'Items': items}
+
+
+class FakeDynamoDB:
+    def __init__(self):
+        self.table = FakeTable()
+
+    def Table(self, name):
+        return self.table
+
+
+def test_in_memory_counter_rolls_over_window():
+    counter = InMemoryQuotaCounterModel()
+    counter.add_tokens('alice', 100, timestamp=NOW - 30 * 3600)
+    counter.add_tokens('alice', 200, timestamp=NOW - 2 * 3600)
+    counter.add_tokens('alice', 300, timestamp=NOW)
+    counter.add_tokens('bob', 999, timestamp=NOW)
+
+    assert counter.get_tokens_used('alice', timestamp=NOW) == 500
+    assert counter.get_tokens_used('alice', past_hours=1, timestamp=NOW) == 300
+    assert counter.get_tokens_used('carol', timestamp=NOW) == 0
+
+
+def test_dynamodb_counter_uses_one_item_per_bucket():
+    dynamodb = FakeDynamoDB()
+    counter = QuotaCounterModel(dynamodb, 'table')
+    for i in range(50):
+        counter.add_tokens('alice', 10, timestamp=NOW + i)
+    counter.add_tokens('alice', 5, timestamp=NOW + BUCKET_SECONDS)
+
+    assert len(dynamodb.table.items) == 2
+    assert counter.get_tokens_used('alice', timestamp=NOW + BUCKET_SECONDS) == 505
+    assert dynamodb.table.queries == 1
+
+
+def test_dynamodb_counter_matches_in_memory_stand_in():
+    dynamodb_counter = QuotaCounterModel(FakeDynamoDB(), 'table')
+    memory_counter = InMemoryQuotaCounterModel()
+    for hours_ago, tokens in [(40, 7), (25, 11), (24, 13), (3, 17), (0, 19)]:
+        for counter in (dynamodb_counter, memory_counter):
+            counter.add_tokens('alice', tokens, timestamp=NOW - hours_ago * 3600)
+
+    assert dynamodb_counter.get_tokens_used('alice', timestamp=NOW) == memory_counter.get_tokens_used('alice', timestamp=NOW) == 49
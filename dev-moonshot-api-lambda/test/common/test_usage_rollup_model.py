@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+
+from app.common.usage_rollup_model import NO_MODEL, InMemoryUsageRollupModel, UsageRollupModel
+
+
+class FakeTable:
+    """
+    Minimal DynamoDB table supporting the ADD update, batch put and BETWEEN query used by UsageRollupModel
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.queries = 0
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues):
+        item = self.items.setdefault((Key['session_hash'], Key['session_datetime']), dict(Key))
+        item['requests'] = item.get('requests', 0) + ExpressionAttributeValues[':count']
+
+    @contextmanager
+    def batch_writer(self):
+        yield self
+
+    def put_item(self, Item):
+        self.items[(Item['session_hash'], Item['session_datetime'])] = dict(Item)
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues, **kwargs):
+        self.queries += 1
+        values = ExpressionAttributeValues
+        items = [dict(i) for (pk, sk), i in sorted(self.items.items())
+                 if pk == values[':site'] and values[':start'] <= sk <= values[':end']]
+        return {'Items': items}
+
+
+class FakeDynamoDB:
+    def __init__(self):
+        self.table = FakeTable()
+
+    def Table(self, name):
+        return self.table
+
+
+def audit_items():
+    for day, model_name, count in [('2023-06-01', 'gpt-3.5-turbo', 3), ('2023-06-01', None, 2),
+                                   ('2023-06-02', 'gpt-4', 4), ('2023-06-03', 'gpt-3.5-turbo', 1)]:
+        for _ in range(count):
+            yield {'site_name': 'zorua', 'usage_date': day, 'model_name': model_name}
+    yield {'site_name': 'other', 'usage_date': '2023-06-01', 'model_name': 'gpt-4'}
+
+
+def test_counters_are_pre_aggregated():
+    dynamodb = FakeDynamoDB()
+    rollup = UsageRollupModel(dynamodb, 'table')
+    for item in audit_items():
+        rollup.record(item)
+
+    usage = rollup.get_usage('zorua', '2023-06-01', '2023-06-02')
+
+    assert len(dynamodb.table.items) == 5
+    assert dynamodb.table.queries == 1
+    assert len(usage['Items']) == 3
+    assert usage['ByDate'] == {'2023-06-01': 5, '2023-06-02': 4}
+    assert usage['ByModel'] == {'gpt-3.5-turbo': 3, NO_MODEL: 2, 'gpt-4': 4}
+    assert usage['Total'] == 9
+
+
+def test_single_day_query():
+    rollup = UsageRollupModel(FakeDynamoDB(), 'table')
+    for item in audit_items():
+        rollup.record(item)
+
+    assert rollup.get_usage('zorua', '2023-06-03')['Total'] == 1
+    assert rollup.get_usage('zorua', '2023-07-01')['Items'] == []
+
+
+def test_backfill_replaces_counters_and_can_be_rerun():
+    rollup = UsageRollupModel(FakeDynamoDB(), 'table')
+    rollup.record({'site_name': 'zorua', 'usage_date': '2023-06-01', 'model_name': 'gpt-3.5-turbo'})
+
+    rollup.backfill(audit_items())
+    written = rollup.backfill(audit_items())
+
+    assert written == 5
+    assert rollup.get_usage('zorua', '2023-06-01', '2023-06-30')['Total'] == 10
+    assert rollup.get_usage('other', '2023-06-01')['ByModel'] == {'gpt-4': 1}
+
+
+def test_dynamodb_rollup_matches_in_memory_stand_in():
+    dynamodb_rollup = UsageRollupModel(FakeDynamoDB(), 'table')
+    memory_rollup = InMemoryUsageRollupModel()
+    for rollup in (dynamodb_rollup, memory_rollup):
+        rollup.backfill(list(audit_items())[:5])
+        for item in list(audit_items())[5:]:
+            rollup.record(item)
+
+    assert dynamodb_rollup.get_usage('zorua', '2023-06-01', '2023-06-03') == \
+        memory_rollup.get_usage('zorua', '2023-06-01', '2023-06-03')
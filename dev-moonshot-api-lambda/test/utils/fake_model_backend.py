@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+
+class FakeModelBackend:
+    """
+    Local stand-in for the h2oai / AIPF model servers.
+    Records every request and can be told to delay or fail responses.
+    """
+
+    def __init__(self, delay: float = 0, status: int = 200):
+        self.delay = delay
+        self.status = status
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._runner = None
+        self.base_url = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            payload = await request.json()
+            self.requests.append({"path": request.path, "headers": dict(request.headers), "payload": payload})
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.status >= 400:
+                return web.Response(status=self.status, text="fake error")
+            if request.path == '/generate':
+                return web.Response(text=f"echo: {payload['prompt']}<|endoftext|>")
+            # /chat and /bloomchat return a JSON encoded string
+            last = payload['instruction'][-1]['content'] if isinstance(payload['instruction'], list) else payload['instruction']
+            return web.Response(text=json.dumps(f"<|assistant|>echo: {last}<|endoftext|>"))
+        finally:
+            self.in_flight -= 1
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post('/{tail:.*}', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
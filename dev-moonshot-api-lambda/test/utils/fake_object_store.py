@@ -0,0 +1,137 @@
+import hashlib
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from io import BytesIO
+from types import SimpleNamespace
+
+from botocore.exceptions import ClientError
+
+
+class FakeObjectStore:
+    """
+    Local stand-in for S3, exposing the parts of boto3.resource("s3") and boto3.client("s3")
+    used by app.utils.s3_file and app.utils.s3_util.
+    Counts requests by operation and can add a fixed latency to each of them.
+    """
+
+    def __init__(self, latency: float = 0, page_size: int = 1000):
+        self.latency = latency
+        self.page_size = page_size
+        self.objects = {}
+        self.requests = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.client = FakeS3Client(self)
+        self.meta = SimpleNamespace(client=self.client)
+
+    @property
+    def gets(self) -> int:
+        return self.requests['get_object']
+
+    @property
+    def heads(self) -> int:
+        return self.requests['head_object']
+
+    @contextmanager
+    def request(self, operation: str):
+        with self._lock:
+            self.requests[operation] += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def Object(self, bucket_name: str, key: str):
+        return FakeS3Object(self, bucket_name, key)
+
+    def put(self, bucket: str, key: str, body: bytes) -> None:
+        self.objects[(bucket, key)] = bytes(body)
+
+    def etag(self, bucket: str, key: str) -> str:
+        return hashlib.md5(self.objects[(bucket, key)]).hexdigest()
+
+    def get_range(self, bucket: str, key: str, range_header: str = None) -> bytes:
+        with self.request('get_object'):
+            body = self.objects[(bucket, key)]
+            if range_header is None:
+                return body
+            start, end = re.fullmatch(r"bytes=(\d+)-(\d*)", range_header).groups()
+            return body[int(start):int(end) + 1 if end else None]
+
+
+class FakeS3Object:
+    def __init__(self, store: FakeObjectStore, bucket_name: str, key: str):
+        self.store = store
+        self.bucket_name = bucket_name
+        self.key = key
+
+    @property
+    def content_length(self) -> int:
+        with self.store.request('head_object'):
+            return len(self.store.objects[(self.bucket_name, self.key)])
+
+    def get(self, Range: str = None):
+        return {"Body": BytesIO(self.store.get_range(self.bucket_name, self.key, Range))}
+
+
+class FakePaginator:
+    def __init__(self, store: FakeObjectStore):
+        self.store = store
+
+    def paginate(self, Bucket: str, Prefix: str = ''):
+        keys = sorted(k for b, k in self.store.objects if b == Bucket and k.startswith(Prefix))
+        for start in range(0, max(len(keys), 1), self.store.page_size):
+            with self.store.request('list_objects_v2'):
+                page = keys[start:start + self.store.page_size]
+                contents = [{'Key': k, 'Size': len(self.store.objects[(Bucket, k)]),
+                             'ETag': f'"{self.store.etag(Bucket, k)}"'} for k in page]
+            yield {'Contents': contents} if contents else {}
+
+
+class FakeS3Client:
+    def __init__(self, store: FakeObjectStore):
+        self.store = store
+
+    def get_paginator(self, operation: str):
+        assert operation == 'list_objects_v2'
+        return FakePaginator(self.store)
+
+    def get_object(self, Bucket: str, Key: str, **kwargs):
+        if (Bucket, Key) not in self.store.objects:
+            with self.store.request('get_object'):
+                raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': Key}}, 'GetObject')
+        return {'Body': BytesIO(self.store.get_range(Bucket, Key)), 'ContentType': 'binary/octet-stream'}
+
+    def head_object(self, Bucket: str, Key: str, **kwargs):
+        with self.store.request('head_object'):
+            if (Bucket, Key) not in self.store.objects:
+                raise ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, 'HeadObject')
+            return {'ContentLength': len(self.store.objects[(Bucket, Key)]),
+                    'ETag': f'"{self.store.etag(Bucket, Key)}"'}
+
+    def upload_fileobj(self, Fileobj, Bucket: str, Key: str, Config=None, **kwargs):
+        with self.store.request('put_object'):
+            self.store.put(Bucket, Key, Fileobj.read())
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, Config=None, **kwargs):
+        with open(Filename, 'rb') as f:
+            self.upload_fileobj(f, Bucket, Key)
+
+    def download_file(self, Bucket: str, Key: str, Filename: str, Config=None, **kwargs):
+        body = self.store.get_range(Bucket, Key)
+        with open(Filename, 'wb') as f:
+            shutil.copyfileobj(BytesIO(body), f)
+
+    def copy_object(self, CopySource, Bucket: str, Key: str, **kwargs):
+        with self.store.request('copy_object'):
+            self.store.put(Bucket, Key, self.store.objects[(CopySource['Bucket'], CopySource['Key'])])
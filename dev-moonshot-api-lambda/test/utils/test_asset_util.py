@@ -0,0 +1,58 @@
+import time
+
+from app.utils.asset_util import AssetCache, fetch_assets, fetch_s3_assets
+from test.utils.fake_object_store import FakeObjectStore
+
+BUCKET = 'bucket'
+
+
+def test_fetch_s3_assets_concurrently_and_caches():
+    store = FakeObjectStore(latency=0.05)
+    for i in range(16):
+        store.put(BUCKET, f'images/{i}.png', bytes([i]) * 10)
+    cache = AssetCache()
+    keys = [f'images/{i}.png' for i in range(16)] + ['images/0.png', 'images/missing.png']
+
+    start = time.perf_counter()
+    assets = fetch_s3_assets(store.client, BUCKET, keys, cache=cache)
+    elapsed = time.perf_counter() - start
+    again = fetch_s3_assets(store.client, BUCKET, keys, cache=cache)
+
+    assert list(assets) == keys[:16] + ['images/missing.png']
+    assert assets['images/3.png'][1] == bytes([3]) * 10
+    assert assets['images/missing.png'] is None
+    assert elapsed < 16 * 0.05 / 2
+    assert store.heads == 0
+    # Only the missing key is requested again
+    assert store.gets == 17 + 1
+    assert again == assets
+
+
+def test_failures_are_reported_as_missing():
+    def fetch(key):
+        if key == 'bad':
+            raise ConnectionError('unreachable')
+        return 'image/png', key.encode()
+
+    assets = fetch_assets(['ok', 'bad'], fetch, cache=AssetCache())
+
+    assert assets == {'ok': ('image/png', b'ok'), 'bad': None}
+
+
+def test_cache_is_bounded_by_size_and_age():
+    cache = AssetCache(max_bytes=10, ttl=60)
+    cache.put('a', ('', b'12345'))
+    cache.put('b', ('', b'12345'))
+    cache.get('a')
+    cache.put('c', ('', b'123'))
+    cache.put('huge', ('', b'x' * 11))
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.get('huge') is None
+    assert cache.size == 8
+
+    expired = AssetCache(ttl=0)
+    expired.put('a', ('', b'1'))
+    time.sleep(0.001)
+    assert expired.get('a') is None
@@ -0,0 +1,103 @@
+import pytest
+
+from app.utils import auth_cache
+from app.utils.auth_cache import AuthCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(auth_cache.time, 'time', lambda: now[0])
+    return now
+
+
+class FakeApikeyModel:
+    def __init__(self):
+        self.owners = {'abc123.hash': {'email': 'a@b.sg', 'project': 'launchpad', 'agency': 'gt'}}
+        self.reads = 0
+
+    def get_key_owner(self, apihash):
+        self.reads += 1
+        return self.owners.get(apihash)
+
+
+def test_resolves_once_per_ttl(clock):
+    cache = AuthCache(ttl=60)
+    model = FakeApikeyModel()
+    resolve = lambda: model.get_key_owner('abc123.hash')
+
+    for _ in range(100):
+        assert cache.get_or_resolve('abc123.hash', resolve)['project'] == 'launchpad'
+    assert model.reads == 1
+    assert cache.hit_rate == pytest.approx(0.99)
+
+    clock[0] += 61
+    cache.get_or_resolve('abc123.hash', resolve)
+    assert model.reads == 2
+
+
+def test_unknown_keys_are_not_cached(clock):
+    cache = AuthCache(ttl=60)
+    model = FakeApikeyModel()
+
+    for _ in range(3):
+        assert cache.get_or_resolve('nope', lambda: model.get_key_owner('nope')) is None
+    assert model.reads == 3
+    assert cache.stats()['entries'] == 0
+
+
+def test_invalidate_revoked_key(clock):
+    cache = AuthCache(ttl=60)
+    model = FakeApikeyModel()
+    resolve = lambda: model.get_key_owner('abc123.hash')
+    cache.get_or_resolve('abc123.hash', resolve)
+
+    del model.owners['abc123.hash']
+    cache.invalidate('abc123.hash')
+
+    assert cache.get_or_resolve('abc123.hash', resolve) is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_expiry_is_bounded_by_token_exp(clock):
+    cache = AuthCache(ttl=300)
+    claims = {'sub': {'email': 'a@b.sg', 'permissions': []}, 'exp': clock[0] + 10}
+    decodes = []
+
+    def decode():
+        decodes.append(1)
+        return claims
+
+    cache.get_or_resolve('token', decode, expires_at=lambda c: c.get('exp'))
+    clock[0] += 9
+    cache.get_or_resolve('token', decode, expires_at=lambda c: c.get('exp'))
+    assert len(decodes) == 1
+
+    # Past "exp" the token is decoded again, which is where an expired token is rejected
+    clock[0] += 2
+    cache.get_or_resolve('token', decode, expires_at=lambda c: c.get('exp'))
+    assert len(decodes) == 2
+
+
+def test_errors_are_not_cached(clock):
+    cache = AuthCache(ttl=60)
+
+    def invalid():
+        raise ValueError('Invalid token')
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.get_or_resolve('bad', invalid)
+    assert cache.misses == 2
+
+
+def test_least_recently_used_is_evicted(clock):
+    cache = AuthCache(ttl=60, max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.evictions == 1
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from app.utils.chat_pipeline import complete_chat, title_from_response
+
+LONG_PROMPT = 'Explain how the quarterly budget review process works for statutory boards'
+
+
+class FakeCompletion:
+    """
+    Stand-in for llm_util.gpt_chat_completion answering after a delay, titles are quoted like the model does
+    """
+
+    def __init__(self, delay: float = 0.1, fail_titles: bool = False):
+        self.delay = delay
+        self.fail_titles = fail_titles
+        self.calls = []
+
+    async def __call__(self, messages, *args, temperature=0.5, **kwargs):
+        self.calls.append(messages)
+        await asyncio.sleep(self.delay)
+        if messages[0]['content'].startswith('Generate a short title'):
+            if self.fail_titles:
+                return None
+            return {"choices": [{"message": {"role": "assistant", "content": '"Budget Review"'}}]}
+        return {"id": "resp-1", "choices": [{"message": {"role": "assistant", "content": "echo"}}]}
+
+
+def test_title_is_generated_alongside_completion():
+    complete = FakeCompletion(delay=0.2)
+    start = time.perf_counter()
+    response, title = asyncio.run(complete_chat(complete, [{"role": "user", "content": LONG_PROMPT}], None))
+    elapsed = time.perf_counter() - start
+
+    assert response["id"] == "resp-1"
+    assert title == "Budget Review"
+    assert len(complete.calls) == 2
+    # Both calls overlap, sequential calls would take 0.4 s
+    assert elapsed < 0.35
+
+
+def test_title_is_skipped_for_existing_conversation_and_short_prompt():
+    complete = FakeCompletion(delay=0)
+    _, title = asyncio.run(complete_chat(complete, [{"role": "user", "content": LONG_PROMPT}], "Budget"))
+    assert title is None
+    _, title = asyncio.run(complete_chat(complete, [{"role": "user", "content": "Hello"}], None))
+    assert title is None
+    assert len(complete.calls) == 2
+
+
+def test_failed_title_falls_back_to_none():
+    complete = FakeCompletion(delay=0, fail_titles=True)
+    response, title = asyncio.run(complete_chat(complete, [{"role": "user", "content": LONG_PROMPT}], ""))
+    assert response["id"] == "resp-1"
+    assert title is None
+
+
+def test_title_without_quotes():
+    assert title_from_response({"choices": [{"message": {"content": 'Plain'}}]}) == 'Plain'
+    assert title_from_response(None) is None
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import pytest
+
+from app.utils.model_transport import BackendConfig, ModelTransport, ModelTransportError
+from test.utils.fake_model_backend import FakeModelBackend
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def with_backend(test, backend_kwargs=None, **config):
+    backend = FakeModelBackend(**(backend_kwargs or {}))
+    base_url = await backend.start()
+    transport = ModelTransport()
+    transport.register(BackendConfig('fake', base_url, **config))
+    try:
+        return await test(transport, backend)
+    finally:
+        await transport.close()
+        await backend.stop()
+
+
+def test_post_json_passes_credentials_per_request():
+    async def test(transport, backend):
+        first = await transport.post_json('fake', '/generate', {"prompt": "hi"}, headers={"X-API-KEY": "a"})
+        second = await transport.post_json('fake', 'generate', {"prompt": "yo"}, headers={"X-API-KEY": "b"})
+        return first, second, backend.requests
+
+    first, second, requests = run(with_backend(test))
+    assert first == "echo: hi<|endoftext|>"
+    assert second == "echo: yo<|endoftext|>"
+    assert [r["headers"]["X-API-KEY"] for r in requests] == ["a", "b"]
+
+
+def test_concurrency_cap_is_enforced():
+    async def test(transport, backend):
+        await asyncio.gather(*[
+            transport.post_json('fake', '/generate', {"prompt": str(i)}) for i in range(8)
+        ])
+        return backend.max_in_flight
+
+    assert run(with_backend(test, {"delay": 0.05}, max_concurrency=2)) == 2
+
+
+def test_slow_backend_does_not_block_event_loop():
+    async def test(transport, backend):
+        start = time.perf_counter()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while time.perf_counter() - start < 0.2:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(transport.post_json('fake', '/generate', {"prompt": "slow"}), ticker())
+        return ticks
+
+    assert run(with_backend(test, {"delay": 0.2})) >= 10
+
+
+def test_timeout_raises_transport_error():
+    async def test(transport, backend):
+        with pytest.raises(ModelTransportError) as exc_info:
+            await transport.post_json('fake', '/generate', {"prompt": "slow"})
+        return exc_info.value
+
+    error = run(with_backend(test, {"delay": 0.5}, timeout=0.1))
+    assert error.status is None
+
+
+def test_error_status_is_exposed():
+    async def test(transport, backend):
+        with pytest.raises(ModelTransportError) as exc_info:
+            await transport.post_json('fake', '/chat', {"instruction": []})
+        return exc_info.value
+
+    assert run(with_backend(test, {"status": 429})).status == 429
+
+
+def test_run_blocking_uses_executor():
+    async def test(transport, backend):
+        start = time.perf_counter()
+        await asyncio.gather(*[transport.run_blocking('fake', time.sleep, 0.1) for _ in range(4)])
+        return time.perf_counter() - start
+
+    assert run(with_backend(test, max_concurrency=4)) < 0.35
+
+
+def test_run_blocking_keeps_slot_until_timed_out_call_returns():
+    async def test(transport, backend):
+        with pytest.raises(ModelTransportError):
+            await transport.run_blocking('fake', time.sleep, 0.3)
+        start = time.perf_counter()
+        # The only slot is held by the sleeping thread until it returns
+        await transport.run_blocking('fake', lambda: None)
+        return time.perf_counter() - start
+
+    assert run(with_backend(test, timeout=0.1, max_concurrency=1)) >= 0.15
+
+
+def test_session_sends_requests_through_the_pool():
+    async def test(transport, backend):
+        # Created before the pool exists, as llm_util does at import
+        session = transport.session('fake')
+        async with await session.request(method='POST', url=f"{backend.base_url}/generate",
+                                         json={"prompt": "hi"}) as response:
+            text = await response.text()
+        pooled, _ = transport._pool('fake')
+        return text, pooled.closed
+
+    assert run(with_backend(test)) == ("echo: hi<|endoftext|>", False)
@@ -0,0 +1,77 @@
+import re
+import time
+
+from app.utils.pii_util import PiiRedactor, StreamRedactor, pii_redactor
+
+
+def censor_pii_by_matches(text: str) -> str:
+    """
+    The previous censor_pii, which turned the matched strings back into a pattern
+    """
+    emails = re.findall(r'[\w\.-]+@[\w\.-]+', text)
+    nrics = re.findall(r'(?i)[STFG]\d{7}[A-Z]', text)
+    output = text
+    if emails:
+        output = re.sub('|'.join(emails), '<EMAIL>', output)
+    if nrics:
+        output = re.sub('|'.join(nrics), '<NRIC>', output)
+    return output
+
+
+def test_redacts_emails_and_nrics():
+    text = 'Contact john.tan@agency.gov.sg or S1234567D, t0000000z is also an NRIC'
+    assert pii_redactor.redact(text) == 'Contact <EMAIL> or <NRIC>, <NRIC> is also an NRIC'
+    assert pii_redactor.find('S1234567D') == [('NRIC', 0, 9)]
+
+
+def test_text_without_pii_is_unchanged():
+    text = 'Nothing to see here.'
+    assert pii_redactor.redact(text) is text
+
+
+def test_same_output_as_substituting_the_matches():
+    text = 'a.b@c.d wrote to S1234567D, cc x-y@z.sg\nand t7654321a.'
+    assert pii_redactor.redact(text) == censor_pii_by_matches(text)
+
+
+def test_nric_inside_an_email_is_part_of_the_email():
+    assert pii_redactor.redact('S1234567D@mail.sg and S7654321A') == '<EMAIL> and <NRIC>'
+
+
+def test_stream_matches_whole_text_for_every_split():
+    text = 'Mail a.b@c.sg, NRIC S1234567D; then x@y.z and end'
+    expected = pii_redactor.redact(text)
+    for i in range(len(text) + 1):
+        for j in range(i, len(text) + 1):
+            chunks = [text[:i], text[i:j], text[j:]]
+            assert ''.join(pii_redactor.redact_stream(chunks)) == expected, chunks
+
+
+def test_stream_releases_text_after_a_separator():
+    stream = pii_redactor.stream()
+    assert stream.feed('write to john@') == 'write to '
+    assert stream.feed('mail.sg now') == '<EMAIL> '
+    assert stream.close() == 'now'
+
+
+def test_stream_bounds_pending_text():
+    stream = StreamRedactor(PiiRedactor(), max_pending=8)
+    assert stream.feed('abc') == ''
+    assert stream.feed('defghij') == 'abcdefghij'
+    assert stream.close() == ''
+
+
+def test_adversarial_input_is_linear():
+    text = 'a' * 200000
+    start = time.perf_counter()
+    assert pii_redactor.redact(text) == text
+    assert ''.join(pii_redactor.redact_stream(text[i:i + 100] for i in range(0, len(text), 100))) == text
+    assert time.perf_counter() - start < 1
+
+
+def test_many_matches_in_one_pass():
+    text = ' '.join(f'user{i}@mail.sg S{i:07d}D' for i in range(5000))
+    start = time.perf_counter()
+    redacted = pii_redactor.redact(text)
+    assert time.perf_counter() - start < 1
+    assert redacted == ' '.join(['<EMAIL> <NRIC>'] * 5000)
@@ -0,0 +1,61 @@
+import time
+
+from app.utils.file_util import hash_by_md5
+from app.utils.re_util import extract_images_in_html, replace_image_urls_with_cid_in_html
+
+HTML = '''<html><style>.a{background-image: url('https://cdn.example.com/bg.png')}</style>
+<table background="https://cdn.example.com/t.png"><tr>
+<td width="50%" style="background-image: url(&quot;https://api.example.com/v1/f?a=1&amp;b=2&quot;); margin: 0px;">
+<img alt="x" src="https://cdn.example.com/a.png"/> <img src='www.example.com/b.jpg' width=3>
+<img src="/themes/Blue/images/1.png"><img src="cid:abc"><img data-src="https://cdn.example.com/lazy.png">
+<td background="images/bg.gif"><img src="https://cdn.example.com/a.png"></td></tr></table></html>'''
+
+
+def newsletter(images: int, repeat: int = 200) -> str:
+    """
+    Table based newsletter template with a background and an image per section
+    """
+    sections = ''.join(
+        f'<table width="600"><tr><td background="https://cdn.example.com/bg{i % 10}.png">'
+        f'<p>{"Lorem ipsum dolor sit amet. " * repeat}</p>'
+        f'<img class="hero" src="https://cdn.example.com/newsletter/image_{i}.png" alt="{i}"/></td></tr></table>'
+        for i in range(images))
+    return f'<html><body>{sections}</body></html>'
+
+
+def test_replaces_every_image_url_with_cid():
+    urls, html = replace_image_urls_with_cid_in_html(HTML)
+
+    assert set(urls.values()) == {
+        'https://cdn.example.com/bg.png', 'https://cdn.example.com/t.png',
+        'https://api.example.com/v1/f?a=1&amp;b=2', 'https://cdn.example.com/a.png', 'www.example.com/b.jpg'}
+    assert all(cid == hash_by_md5(url) for cid, url in urls.items())
+    assert html.count(f'cid:{hash_by_md5("https://cdn.example.com/a.png")}') == 2
+    assert "url(&quot;cid:" in html and "url('cid:" in html
+    # Relative paths, existing cids and non image attributes are left alone
+    assert 'src="/themes/Blue/images/1.png"' in html
+    assert 'src="cid:abc"' in html
+    assert 'data-src="https://cdn.example.com/lazy.png"' in html
+    assert 'background="images/bg.gif"' in html
+
+
+def test_extract_images_in_html():
+    urls, files = extract_images_in_html(HTML)
+
+    assert urls.count('https://cdn.example.com/a.png') == 2
+    assert 'https://cdn.example.com/lazy.png' not in urls
+    assert files == ['/themes/Blue/images/1.png', 'images/bg.gif']
+
+
+def test_large_newsletter_benchmark():
+    html = newsletter(images=300)
+
+    start = time.perf_counter()
+    urls, html_cid = replace_image_urls_with_cid_in_html(html)
+    elapsed = time.perf_counter() - start
+
+    assert len(urls) == 310
+    assert 'https://' not in html_cid
+    # Linear in the document size: ~1.7 MB with 600 references
+    assert elapsed < 0.5
+    print(f'{len(html) / 1e6:.1f} MB, {len(urls)} distinct images rewritten in {elapsed:.3f}s')
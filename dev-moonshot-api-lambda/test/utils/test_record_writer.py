@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+from botocore.exceptions import ClientError
+
+from app.utils.record_writer import RecordWriter
+
+
+class FakeTable:
+    def __init__(self, delay: float = 0, failures: int = 0, condition_failures: int = 0):
+        self.delay = delay
+        self.failures = failures
+        self.condition_failures = condition_failures
+        self.items = []
+        self.attempts = 0
+
+    def put_item(self, item):
+        self.attempts += 1
+        time.sleep(self.delay)
+        if self.attempts <= self.failures:
+            raise ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'PutItem')
+        if self.attempts <= self.failures + self.condition_failures:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'PutItem')
+        self.items.append(item)
+
+
+def test_write_does_not_block_the_event_loop():
+    table = FakeTable(delay=0.2)
+    writer = RecordWriter()
+
+    async def main():
+        start = time.perf_counter()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while time.perf_counter() - start < 0.2:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        written, _ = await asyncio.gather(writer.write(table.put_item, {'id': 1}), ticker())
+        return written, ticks
+
+    written, ticks = asyncio.run(main())
+    assert written
+    assert ticks >= 10
+    # Done by the time write() returns
+    assert table.items == [{'id': 1}]
+
+
+def test_throttled_write_is_retried():
+    table = FakeTable(failures=2)
+    writer = RecordWriter(retry_delay=0.01)
+
+    assert asyncio.run(writer.write(table.put_item, {'id': 1}))
+    assert table.items == [{'id': 1}]
+    assert writer.stats() == {'written': 1, 'retries': 2, 'failed': 0}
+
+
+def test_retries_are_bounded():
+    table = FakeTable(failures=10)
+    failures = []
+    writer = RecordWriter(max_attempts=3, retry_delay=0.01, on_failure=lambda w, ex: failures.append(ex))
+
+    assert not asyncio.run(writer.write(table.put_item, {'id': 1}))
+    assert table.attempts == 3
+    assert writer.failed == 1
+    assert len(failures) == 1
+
+
+def test_condition_failure_after_retry_counts_as_written():
+    table = FakeTable(failures=1, condition_failures=1)
+    writer = RecordWriter(retry_delay=0.01)
+
+    assert asyncio.run(writer.write(table.put_item, {'id': 1}))
+    assert table.attempts == 2
+    assert writer.written == 1 and writer.failed == 0
+
+
+def test_condition_failure_on_first_attempt_is_not_retried():
+    table = FakeTable(condition_failures=1)
+    writer = RecordWriter(retry_delay=0.01)
+
+    assert not asyncio.run(writer.write(table.put_item, {'id': 1}))
+    assert table.attempts == 1
+    assert writer.failed == 1
+
+
+class FakeChatTable:
+    """
+    Conditional put that goes through, then a get_item that fails once, as when the read after the
+    put times out
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.get_failures = 1
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeValues=None):
+        if (Item['llm_task'], Item['id']) in self.items:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'PutItem')
+        self.items[(Item['llm_task'], Item['id'])] = Item
+
+    def get_item(self, Key):
+        if self.get_failures:
+            self.get_failures -= 1
+            raise ClientError({'Error': {'Code': 'InternalServerError'}}, 'GetItem')
+        return {'Item': self.items.get((Key['llm_task'], Key['id']))}
+
+
+def test_quota_is_counted_when_chat_record_retry_hits_condition():
+    from app.common.quota_model import InMemoryQuotaCounterModel
+    from app.models.gpt.gpt_model import GptChatModel
+
+    table = FakeChatTable()
+    model = GptChatModel(type('FakeDynamodb', (), {'Table': lambda self, name: table})(), 'table')
+    quota_counter = InMemoryQuotaCounterModel()
+    writer = RecordWriter(retry_delay=0.01)
+
+    async def main():
+        return await asyncio.gather(
+            writer.write(model.put_chat_response, 'r1', 'c1', 'title', [], 'gpt', 0.5, {}, 'alice', 42, False),
+            writer.write(quota_counter.add_tokens, 'alice', 42, timestamp=time.time()),
+        )
+
+    assert asyncio.run(main()) == [True, True]
+    assert len(table.items) == 1
+    assert quota_counter.get_tokens_used('alice') == 42
@@ -0,0 +1,143 @@
+import io
+import os
+import random
+import time
+import zipfile
+
+import pytest
+
+from app.utils.s3_file import BlockCache, S3File, extract_s3_zip_file
+from test.utils.fake_object_store import FakeObjectStore
+
+BUCKET = 'bucket'
+KEY = 'user@example.com/archive.zip'
+
+
+def make_archive(members, compression=zipfile.ZIP_DEFLATED) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=compression) as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+    return buffer.getvalue()
+
+
+def make_members(count, size):
+    rng = random.Random(count)
+    return {f'docs/file_{i:04d}.txt': bytes(rng.getrandbits(8) for _ in range(size)) for i in range(count)}
+
+
+def test_reads_match_object_at_any_position():
+    store = FakeObjectStore()
+    body = os.urandom(10_000)
+    store.put(BUCKET, KEY, body)
+    s3_file = S3File(store.Object(BUCKET, KEY), block_size=1024, max_read_ahead=4)
+
+    assert s3_file.read(10) == body[:10]
+    s3_file.seek(-100, io.SEEK_END)
+    assert s3_file.read() == body[-100:]
+    s3_file.seek(3000)
+    assert s3_file.read(5000) == body[3000:8000]
+    assert s3_file.read(0) == b''
+    s3_file.seek(20_000)
+    assert s3_file.read(10) == b''
+
+
+def test_sequential_reads_grow_read_ahead():
+    store = FakeObjectStore()
+    store.put(BUCKET, KEY, os.urandom(64 * 1024))
+    s3_file = S3File(store.Object(BUCKET, KEY), block_size=1024, max_read_ahead=8)
+
+    while s3_file.read(100):
+        pass
+
+    # windows of 1, 2, 4 blocks then 8 at a time: 7 blocks for the first three GETs, 57 remaining
+    assert s3_file.requests == 3 + 8
+    assert store.gets == s3_file.requests
+
+
+def test_shared_cache_avoids_refetching():
+    store = FakeObjectStore()
+    store.put(BUCKET, KEY, os.urandom(8 * 1024))
+    cache = BlockCache(capacity=16)
+    S3File(store.Object(BUCKET, KEY), block_size=1024, cache=cache).read()
+    gets = store.gets
+
+    assert S3File(store.Object(BUCKET, KEY), block_size=1024, cache=cache).read() is not None
+    assert store.gets == gets
+
+
+def test_block_cache_evicts_least_recently_used():
+    cache = BlockCache(capacity=2)
+    cache.put(0, b'a')
+    cache.put(1, b'b')
+    cache.get(0)
+    cache.put(2, b'c')
+
+    assert cache.get(1) is None
+    assert cache.get(0) == b'a'
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_extract_s3_zip_file_uploads_every_member(compression):
+    store = FakeObjectStore()
+    members = make_members(50, 3000)
+    members['docs/empty/'] = b''
+    store.put(BUCKET, KEY, make_archive(members, compression))
+
+    result = extract_s3_zip_file(BUCKET, KEY, 'user@example.com/out', 'target', s3_resource=store)
+
+    assert result == [f'user@example.com/out/{name}'.rstrip('/') for name in members]
+    for name, data in members.items():
+        assert store.objects[('target', f'user@example.com/out/{name}'.rstrip('/'))] == data
+
+
+def test_extract_s3_zip_file_detects_corruption():
+    store = FakeObjectStore()
+    archive = bytearray(make_archive({'a.txt': b'x' * 1000}, zipfile.ZIP_STORED))
+    archive[100] ^= 0xFF
+    store.put(BUCKET, KEY, bytes(archive))
+
+    with pytest.raises(zipfile.BadZipFile):
+        extract_s3_zip_file(BUCKET, KEY, 'out', s3_resource=store)
+
+
+
+def test_extract_s3_zip_file_rejects_encrypted_member():
+    store = FakeObjectStore()
+    archive = bytearray(make_archive({'secret.txt': b'x' * 100}, zipfile.ZIP_STORED))
+    # zipfile clears the flag bits it writes, set the encrypted bit in both headers
+    central = archive.index(b'PK\x01\x02')
+    archive[6] |= 0x1
+    archive[central + 8] |= 0x1
+    store.put(BUCKET, KEY, bytes(archive))
+
+    with pytest.raises(RuntimeError, match='encrypted'):
+        extract_s3_zip_file(BUCKET, KEY, 'out', s3_resource=store)
+    assert ('bucket', 'out/secret.txt') not in store.objects
+
+
+def test_extract_s3_zip_file_rejects_mismatched_header_name():
+    store = FakeObjectStore()
+    archive = make_archive({'a.txt': b'x' * 100}, zipfile.ZIP_STORED)
+    # The local header comes first, the central directory still names a.txt
+    store.put(BUCKET, KEY, archive.replace(b'a.txt', b'b.txt', 1))
+
+    with pytest.raises(zipfile.BadZipFile, match='differ'):
+        extract_s3_zip_file(BUCKET, KEY, 'out', s3_resource=store)
+
+def test_extract_request_count_benchmark():
+    """
+    500 members of 4 KB: the previous reader issued one GET per zipfile read, several per member
+    """
+    store = FakeObjectStore(latency=0.002)
+    members = make_members(500, 4096)
+    store.put(BUCKET, KEY, make_archive(members, zipfile.ZIP_STORED))
+
+    start = time.perf_counter()
+    extract_s3_zip_file(BUCKET, KEY, 'out', s3_resource=store, max_workers=8)
+    elapsed = time.perf_counter() - start
+
+    # a 2 MB archive fits in a few blocks, all members are served from the shared cache
+    assert store.gets <= 20
+    assert store.heads == 1
+    print(f'{len(members)} members extracted with {store.gets} GETs in {elapsed:.2f}s')
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import time
+
+from boto3.s3.transfer import TransferConfig
+
+from app.utils.s3_util import (compute_etag, copy_prefix, copy_s3_folder, download_prefix, list_prefix,
+                               upload_folder, upload_folder_content_to_bucket)
+from test.utils.fake_object_store import FakeObjectStore
+
+BUCKET = 'bucket'
+
+
+def fill(store, prefix, count, depth=3):
+    for i in range(count):
+        nested = '/'.join(f'level{d}' for d in range(i % depth))
+        key = f'{prefix}{nested}/file_{i}.txt' if nested else f'{prefix}file_{i}.txt'
+        store.put(BUCKET, key, f'content {i}'.encode())
+
+
+def test_list_prefix_is_one_flat_pass():
+    store = FakeObjectStore(page_size=10)
+    fill(store, 'newsletter/', 25)
+    store.put(BUCKET, 'other/file.txt', b'x')
+
+    objects = list_prefix(store.client, BUCKET, 'newsletter/')
+
+    assert len(objects) == 25
+    assert store.requests['list_objects_v2'] == 3
+    assert objects['newsletter/file_0.txt'] == {'size': 9, 'etag': hashlib.md5(b'content 0').hexdigest()}
+
+
+def test_copy_prefix_skips_objects_already_copied():
+    store = FakeObjectStore()
+    fill(store, 'old/', 10)
+    store.put(BUCKET, 'new/file_0.txt', b'content 0')
+    store.put(BUCKET, 'new/level0/file_1.txt', b'stale')
+
+    results = copy_prefix(store.client, BUCKET, 'old/', BUCKET, 'new/')
+
+    assert {r.source: r.status for r in results}['old/file_0.txt'] == 'skipped'
+    assert sum(r.status == 'copied' for r in results) == 9
+    assert store.objects[(BUCKET, 'new/level0/file_1.txt')] == b'content 1'
+    assert store.requests['copy_object'] == 9
+
+
+def test_copy_s3_folder_to_same_location_is_a_no_op():
+    store = FakeObjectStore()
+    fill(store, 'old/', 3)
+
+    assert copy_s3_folder('old/', 'old/', BUCKET, s3_client=store.client) is None
+    assert len(copy_s3_folder('old/', 'new/', BUCKET, s3_client=store.client)) == 3
+
+
+def test_download_prefix_skips_matching_files(tmp_path):
+    store = FakeObjectStore()
+    fill(store, 'user/', 12)
+    store.put(BUCKET, 'user/level0/', b'')
+
+    first = download_prefix(store.client, BUCKET, 'user/', str(tmp_path))
+    (tmp_path / 'user' / 'file_0.txt').write_bytes(b'changed 0')
+    second = download_prefix(store.client, BUCKET, 'user/', str(tmp_path))
+
+    assert [r.status for r in first] == ['downloaded'] * 12
+    assert sorted(r.target for r in second if r.status == 'downloaded') == [str(tmp_path / 'user' / 'file_0.txt')]
+    assert (tmp_path / 'user' / 'level0' / 'level1' / 'file_2.txt').read_bytes() == b'content 2'
+
+
+def test_upload_folder_reports_per_file(tmp_path):
+    store = FakeObjectStore()
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'a.txt').write_bytes(b'a')
+    (tmp_path / 'sub' / 'b.txt').write_bytes(b'b')
+
+    first = upload_folder(store.client, str(tmp_path), BUCKET, 'temp')
+    (tmp_path / 'a.txt').write_bytes(b'aa')
+    success, failed = upload_folder_content_to_bucket(store.client, str(tmp_path), BUCKET, 'temp')
+
+    assert sorted(r.target for r in first) == ['temp/a.txt', 'temp/sub/b.txt']
+    assert sorted(success) == ['temp/a.txt', 'temp/sub/b.txt'] and failed == []
+    assert store.requests['put_object'] == 3
+    assert store.objects[(BUCKET, 'temp/a.txt')] == b'aa'
+
+
+def test_upload_folder_to_bucket_root_does_not_list_the_bucket(tmp_path):
+    store = FakeObjectStore()
+    fill(store, 'unrelated/', 20)
+    (tmp_path / 'a.txt').write_bytes(b'a')
+    (tmp_path / 'b.txt').write_bytes(b'b')
+
+    first = upload_folder(store.client, str(tmp_path), BUCKET)
+    (tmp_path / 'a.txt').write_bytes(b'aa')
+    second = upload_folder(store.client, str(tmp_path), BUCKET)
+
+    assert sorted(r.target for r in first) == ['a.txt', 'b.txt']
+    assert {r.target: r.status for r in second} == {'a.txt': 'uploaded', 'b.txt': 'skipped'}
+    assert store.requests['list_objects_v2'] == 0
+    assert store.requests['head_object'] == 4
+    assert store.objects[(BUCKET, 'a.txt')] == b'aa'
+
+
+def test_failures_are_reported_without_stopping_other_transfers(tmp_path):
+    store = FakeObjectStore()
+    fill(store, 'user/', 4)
+    (tmp_path / 'user').write_bytes(b'a file where a folder is expected')
+
+    results = download_prefix(store.client, BUCKET, 'user/', str(tmp_path))
+
+    assert {r.status for r in results} == {'failed'}
+    assert all(r.error for r in results)
+
+
+def test_compute_etag_matches_multipart_layout(tmp_path):
+    path = tmp_path / 'big.bin'
+    path.write_bytes(os.urandom(2500))
+    config = TransferConfig(multipart_threshold=1000, multipart_chunksize=1000)
+    parts = [path.read_bytes()[i:i + 1000] for i in range(0, 2500, 1000)]
+    expected = hashlib.md5(b''.join(hashlib.md5(p).digest() for p in parts)).hexdigest() + '-3'
+
+    assert compute_etag(str(path), config) == expected
+    assert compute_etag(str(path)) == hashlib.md5(path.read_bytes()).hexdigest()
+
+
+def test_transfers_run_concurrently():
+    store = FakeObjectStore(latency=0.02)
+    fill(store, 'old/', 40)
+
+    start = time.perf_counter()
+    copy_prefix(store.client, BUCKET, 'old/', BUCKET, 'new/', max_workers=10)
+    elapsed = time.perf_counter() - start
+
+    assert store.max_in_flight == 10
+    assert elapsed < 40 * 0.02 / 2
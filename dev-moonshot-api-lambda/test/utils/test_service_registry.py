@@ -0,0 +1,133 @@
+import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import service_registry
+from app.utils.service_registry import LazyService, ServiceRegistry
+
+
+class FakeSecretsManager:
+    def __init__(self):
+        self.secrets = {}
+        self.calls = 0
+        self.fail = False
+
+    def put(self, name, value, version_id):
+        self.secrets[name] = (json.dumps(value), version_id)
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError('secretsmanager unavailable')
+        value, version_id = self.secrets[SecretId]
+        return {'SecretString': value, 'VersionId': version_id}
+
+
+class FakeSession:
+    """
+    Stand-in for boto3.session.Session counting the clients and resources created
+    """
+
+    def __init__(self):
+        self.created = Counter()
+        self.secrets_manager = FakeSecretsManager()
+        self.sts_calls = 0
+
+    def client(self, service_name, **settings):
+        self.created[('client', service_name)] += 1
+        if service_name == 'secretsmanager':
+            return self.secrets_manager
+        if service_name == 'sts':
+            return FakeSts(self)
+        return object()
+
+    def resource(self, service_name, **settings):
+        self.created[('resource', service_name)] += 1
+        return FakeDynamoDB()
+
+
+class FakeSts:
+    def __init__(self, session):
+        self.session = session
+
+    def get_caller_identity(self):
+        self.session.sts_calls += 1
+        return {'Account': '123456789012'}
+
+
+class FakeDynamoDB:
+    def Table(self, name):
+        return SimpleNamespace(name=name)
+
+
+@pytest.fixture
+def session():
+    return FakeSession()
+
+
+@pytest.fixture
+def registry(session):
+    return ServiceRegistry(secret_ttl=60, session_factory=lambda: session)
+
+
+def test_nothing_is_created_until_used(registry, session):
+    s3 = registry.lazy_client('s3', region_name='ap-southeast-1')
+    dynamodb = registry.lazy_resource('dynamodb', region_name='ap-southeast-1')
+    table = dynamodb.Table('llm')
+    assert not session.created
+
+    assert table.name == 'llm'
+    assert session.created == {('resource', 'dynamodb'): 1}
+    assert isinstance(s3, LazyService)
+
+
+def test_clients_are_shared_per_settings(registry, session):
+    clients = [registry.lazy_client('sns', region_name='ap-southeast-1') for _ in range(10)]
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        instances = list(executor.map(lambda c: c._get(), clients))
+
+    assert len({id(i) for i in instances}) == 1
+    assert registry.client('sns', region_name='us-east-1') is not instances[0]
+    assert session.created[('client', 'sns')] == 2
+
+
+def test_secret_is_cached_until_ttl(registry, session, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(service_registry.time, 'monotonic', lambda: now[0])
+    session.secrets_manager.put('openai', {'KEY': 'a'}, 'v1')
+
+    assert registry.secret('openai') == {'KEY': 'a'}
+    assert registry.secret('openai') == {'KEY': 'a'}
+    assert session.secrets_manager.calls == 1
+
+    session.secrets_manager.put('openai', {'KEY': 'b'}, 'v2')
+    now[0] += 61
+    assert registry.secret('openai') == {'KEY': 'b'}
+    assert session.secrets_manager.calls == 2
+
+
+def test_failed_refresh_serves_cached_secret(registry, session, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(service_registry.time, 'monotonic', lambda: now[0])
+    session.secrets_manager.put('openai', {'KEY': 'a'}, 'v1')
+    registry.secret('openai')
+
+    session.secrets_manager.fail = True
+    now[0] += 61
+    assert registry.secret('openai') == {'KEY': 'a'}
+    # The stale value is kept for another TTL instead of retrying on every call
+    assert registry.secret('openai') == {'KEY': 'a'}
+    assert session.secrets_manager.calls == 2
+
+    registry.invalidate_secret('openai')
+    with pytest.raises(ConnectionError):
+        registry.secret('openai')
+
+
+def test_account_id_is_fetched_once(registry, session):
+    assert registry.account_id == '123456789012'
+    assert registry.account_id == '123456789012'
+    assert session.sts_calls == 1
@@ -0,0 +1,88 @@
+import re
+
+from app.utils.token_counter import TokenCounter
+
+
+class WordEncoding:
+    """
+    One token per word or punctuation mark, counting the texts it encodes
+    """
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, text: str):
+        self.encoded += 1
+        return re.findall(r'\w+|[^\w\s]', text)
+
+
+def counter_with(encoding: WordEncoding, **kwargs) -> TokenCounter:
+    loads = []
+
+    def load(name):
+        loads.append(name)
+        return encoding
+
+    counter = TokenCounter(load_encoding=load, **kwargs)
+    counter.loads = loads
+    return counter
+
+
+def test_encoding_is_loaded_once():
+    encoding = WordEncoding()
+    counter = counter_with(encoding)
+    assert counter.count('Say this is a test') == 5
+    assert counter.count('Say this again') == 3
+    assert counter.count('') == 0
+    assert counter.loads == ['gpt2']
+
+
+def test_repeated_text_is_encoded_once():
+    encoding = WordEncoding()
+    counter = counter_with(encoding)
+    history = [{'role': 'user', 'content': 'Hello there'}, {'role': 'assistant', 'content': 'Hi, how can I help?'}]
+    assert counter.count_messages(history) == 9
+    assert counter.count_messages(history + [{'role': 'user', 'content': 'Tell me more'}]) == 12
+    assert encoding.encoded == 3
+    assert counter.stats()['hits'] == 2
+
+
+def test_fit_messages_drops_earliest_after_kept():
+    encoding = WordEncoding()
+    counter = counter_with(encoding)
+    messages = [{'role': 'system', 'content': 'one two'}] + \
+               [{'role': 'user', 'content': f'message {i} here'} for i in range(10)]
+    assert counter.fit_messages(messages, limit=10, keep=1) == 8
+    assert [m['content'] for m in messages] == ['one two', 'message 8 here', 'message 9 here']
+    # Each message is encoded once however many are dropped
+    assert encoding.encoded == 11
+
+
+def test_fit_messages_stops_when_nothing_is_left_to_drop():
+    counter = counter_with(WordEncoding())
+    messages = [{'role': 'system', 'content': 'a b c d e'}]
+    assert counter.fit_messages(messages, limit=2, keep=1) == 5
+    assert len(messages) == 1
+
+
+def test_estimate_does_not_encode():
+    encoding = WordEncoding()
+    counter = counter_with(encoding)
+    assert counter.estimate('x' * 4000) == 1000
+    assert counter.estimate('abc') == 1
+    assert counter.estimate_messages([{'content': 'abcd'}, {'content': 'abcde'}]) == 3
+    assert counter.loads == []
+
+
+def test_cache_is_keyed_by_digest_and_bounded():
+    encoding = WordEncoding()
+    counter = counter_with(encoding, cache_size=2)
+    long_text = 'word ' * 10000
+    assert counter.count(long_text) == 10000
+    assert all(len(key[0]) == 16 for key in counter._counts)
+    assert counter.count('one') == 1
+    assert counter.count('two words') == 2
+    # The long text was the least recently used
+    assert counter.count(long_text) == 10000
+    assert encoding.encoded == 4
+    assert counter.stats()['cached_counts'] == 2
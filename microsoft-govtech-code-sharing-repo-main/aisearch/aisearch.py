@@ -10,6 +10,7 @@ import openai
 from azure.identity import DefaultAzureCredential
 import dotenv
 import logging
+from ingestion import BlobUploader, IndexerMonitor
 
 dotenv.load_dotenv()
 
@@ -484,18 +485,20 @@ class AISearchIndexer:
             return None
         
     def log_indexer_status(self, interval=60, retry_count=10):
-        results = self.get_indexer_status()
-        status = results['status']
-        if status =="inProgress" and retry_count>0:
-            logging.info(f"Indexer status: {status}. Retrying in {interval} seconds.")  
-            time.sleep(interval)
-            self.log_indexer_status(retry_count=(retry_count - 1))
-        else:
-            time_taken = get_time_difference_in_minutes(results['startTime'], results['endTime'])
-            logging.info(f"Indexer status: {status}")
-            logging.info(f"Total documents: {results['itemsProcessed']}")
-            logging.info(f"Failed documents: {results['itemsFailed']}")
+        """
+        Waits for the indexer run to finish, polling faster while documents are processed
+        interval: longest wait between two polls
+        retry_count: the wait gives up after interval * retry_count seconds
+        """
+        monitor = IndexerMonitor(self.get_indexer_status, max_interval=interval, timeout=interval * retry_count)
+        progress = monitor.wait()
+        logging.info(f"Indexer status: {progress.status}")
+        logging.info(f"Total documents: {progress.items_processed}")
+        logging.info(f"Failed documents: {progress.items_failed}")
+        if progress.start_time and progress.end_time:
+            time_taken = get_time_difference_in_minutes(progress.start_time, progress.end_time)
             logging.info(f"Total time: {time_taken:.2f} minutes")
+        return progress
 
 
 
@@ -596,7 +599,7 @@ def most_common_extension(folder_path):
     return extensions.most_common(1)[0] if extensions else None
 
 
-def upload_files_to_blob(azure_credential, folder_path, save_path=""):
+def upload_files_to_blob(azure_credential, folder_path, save_path="", max_workers=8):
     blob_service = BlobServiceClient(
         account_url=f"https://{AZURE_STORAGE_ACCOUNT}.blob.core.windows.net",
         credential=azure_credential,
@@ -610,12 +613,9 @@ def upload_files_to_blob(azure_credential, folder_path, save_path=""):
         blob_container.create_container()
 
     logging.info(f"Uploading files to Blob container...")
-    for root, dirs, files in os.walk(folder_path):
-        for file in files:
-            blob_name = f"{save_path}/{file}" if save_path else file
-            with open(os.path.join(root, file), "rb") as data:
-                blob_container.upload_blob(name=blob_name, data=data, overwrite=True)
+    report = BlobUploader(blob_container, max_workers=max_workers).upload_folder(folder_path, save_path)
     logging.info(f"Files uploaded to Blob container {AZURE_STORAGE_CONTAINER}")
+    return report
 
 def parse_args():
     parser = argparse.ArgumentParser()
@@ -655,6 +655,12 @@ def parse_args():
         default=True,
         help="Flag to reset the indexer before running it",
     )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=8,
+        help="Number of files uploaded to the Blob container at the same time",
+    )
     return parser.parse_args()
 
 if __name__ == "__main__":
@@ -664,7 +670,7 @@ if __name__ == "__main__":
     )
     folder_path = args.folder_path
     extension, count = most_common_extension(folder_path)
-    upload_files_to_blob(azure_credential, folder_path=folder_path, save_path=args.save_path)
+    upload_files_to_blob(azure_credential, folder_path=folder_path, save_path=args.save_path, max_workers=args.max_workers)
     model_uri, model_api_key = get_aoai_service(azure_credential)
     model_name =AZURE_OPENAI_DEPLOYMENT_NAME
     logging.info(f"Model URI: {model_uri}, extension: {extension}")
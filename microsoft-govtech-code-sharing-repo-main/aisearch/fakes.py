@@ -0,0 +1,91 @@
+"""
+Local fakes of the blob container and search indexer status, to try the
+ingestion driver without an Azure subscription
+"""
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+
+class FakeBlobClient:
+    def __init__(self, container, name) -> None:
+        self.container = container
+        self.name = name
+        self.staged: Dict[str, bytes] = {}
+
+    def upload_blob(self, data, overwrite=False, metadata=None, **kwargs):
+        content = data.read() if hasattr(data, "read") else bytes(data)
+        self.container.put(self.name, content, metadata, overwrite)
+
+    def stage_block(self, block_id, data, **kwargs):
+        self.container.tick("stage_block")
+        self.staged[block_id] = bytes(data)
+
+    def commit_block_list(self, block_list, metadata=None, **kwargs):
+        content = b"".join(self.staged.pop(getattr(block, "id", block)) for block in block_list)
+        self.container.put(self.name, content, metadata, overwrite=True)
+
+    def download_blob(self):
+        return SimpleNamespace(readall=lambda: self.container.blobs[self.name][0])
+
+
+class FakeContainerClient:
+    def __init__(self, latency=0.0) -> None:
+        """
+        latency: seconds slept per request, to mimic the network round-trip
+        """
+        self.latency = latency
+        self.blobs: Dict[str, tuple] = {}
+        self.calls: Dict[str, int] = {}
+        self.created = False
+        self.lock = threading.Lock()
+
+    def tick(self, operation):
+        with self.lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def put(self, name, content, metadata, overwrite):
+        self.tick("upload")
+        with self.lock:
+            if name in self.blobs and not overwrite:
+                raise FileExistsError(name)
+            self.blobs[name] = (content, dict(metadata or {}))
+
+    def exists(self):
+        return self.created
+
+    def create_container(self):
+        self.created = True
+
+    def get_blob_client(self, blob):
+        return FakeBlobClient(self, blob)
+
+    def upload_blob(self, name, data, overwrite=False, metadata=None, **kwargs):
+        self.get_blob_client(name).upload_blob(data, overwrite=overwrite, metadata=metadata)
+
+    def list_blobs(self, name_starts_with=None, include=None):
+        self.tick("list_blobs")
+        with self.lock:
+            items = list(self.blobs.items())
+        return [
+            SimpleNamespace(name=name, size=len(content), metadata=metadata if include and "metadata" in include else None)
+            for name, (content, metadata) in items
+            if not name_starts_with or name.startswith(name_starts_with)
+        ]
+
+
+class FakeIndexerStatus:
+    def __init__(self, results: List[Optional[dict]]) -> None:
+        """
+        Returns the given lastResult values in turn, the last one repeats
+        """
+        self.results = list(results)
+        self.calls = 0
+
+    def __call__(self) -> Optional[dict]:
+        result = self.results[min(self.calls, len(self.results) - 1)]
+        self.calls += 1
+        return result
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+HASH_METADATA_KEY = "content_sha256"
+# Files above this size are uploaded as staged blocks
+CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024
+BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def file_sha256(path, block_size=BLOCK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class UploadReport:
+    uploaded: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+
+class BlobUploader:
+    def __init__(self,
+        container_client,
+        max_workers=8,
+        chunked_upload_threshold=CHUNKED_UPLOAD_THRESHOLD,
+        block_size=BLOCK_SIZE,
+        ) -> None:
+        """
+        Uploads a folder to a blob container concurrently
+        container_client: azure.storage.blob.ContainerClient, or a fake with the same methods
+        max_workers: number of files uploaded at the same time
+        chunked_upload_threshold: files larger than this are uploaded in blocks of block_size
+        """
+        self.container = container_client
+        self.max_workers = max_workers
+        self.chunked_upload_threshold = chunked_upload_threshold
+        self.block_size = block_size
+
+    def existing_hashes(self, prefix=""):
+        """
+        Content hashes of the blobs under prefix, from a single listing
+        """
+        blobs = self.container.list_blobs(name_starts_with=prefix or None, include=["metadata"])
+        return {blob.name: (blob.metadata or {}).get(HASH_METADATA_KEY) for blob in blobs}
+
+    def upload_file(self, path, blob_name, content_hash):
+        blob_client = self.container.get_blob_client(blob_name)
+        metadata = {HASH_METADATA_KEY: content_hash}
+        if os.path.getsize(path) <= self.chunked_upload_threshold:
+            with open(path, "rb") as data:
+                blob_client.upload_blob(data, overwrite=True, metadata=metadata)
+            return
+
+        # Stage fixed size blocks and commit them in order, only one block is held in memory
+        block_ids = []
+        with open(path, "rb") as data:
+            for index, block in enumerate(iter(lambda: data.read(self.block_size), b"")):
+                # block ids must all have the same length within a blob, the SDK base64 encodes them
+                block_id = f"{index:08d}"
+                blob_client.stage_block(block_id=block_id, data=block)
+                block_ids.append(block_id)
+        blob_client.commit_block_list(block_ids, metadata=metadata)
+
+    def upload_folder(self, folder_path, save_path="") -> UploadReport:
+        """
+        Uploads every file under folder_path to save_path/<file name>, skipping
+        files whose content hash matches the one stored on the existing blob
+        """
+        start = time.perf_counter()
+        report = UploadReport()
+        existing = self.existing_hashes(f"{save_path}/" if save_path else "")
+
+        files = {}
+        for root, dirs, names in os.walk(folder_path):
+            for name in names:
+                blob_name = f"{save_path}/{name}" if save_path else name
+                # same flat naming as before, a later file with the same name wins
+                files[blob_name] = os.path.join(root, name)
+
+        def upload(item):
+            blob_name, path = item
+            try:
+                content_hash = file_sha256(path)
+                if existing.get(blob_name) == content_hash:
+                    return blob_name, "skipped", None
+                self.upload_file(path, blob_name, content_hash)
+                return blob_name, "uploaded", None
+            except Exception as e:
+                return blob_name, "failed", str(e)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for blob_name, outcome, error in executor.map(upload, files.items()):
+                if outcome == "uploaded":
+                    report.uploaded.append(blob_name)
+                elif outcome == "skipped":
+                    report.skipped.append(blob_name)
+                else:
+                    logging.error(f"ERROR: uploading {blob_name}: {error}")
+                    report.failed[blob_name] = error
+
+        report.elapsed = time.perf_counter() - start
+        logging.info(
+            f"Uploaded {len(report.uploaded)}, skipped {len(report.skipped)} unchanged, "
+            f"failed {len(report.failed)} files in {report.elapsed:.2f} seconds"
+        )
+        return report
+
+
+@dataclass
+class IndexerProgress:
+    status: Optional[str]
+    items_processed: int = 0
+    items_failed: int = 0
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    error: Optional[str] = None
+    polls: int = 0
+    elapsed: float = 0.0
+    next_poll_in: float = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.status not in (None, "inProgress")
+
+
+class IndexerMonitor:
+    def __init__(self,
+        get_status: Callable[[], Optional[dict]],
+        min_interval=2.0,
+        max_interval=60.0,
+        backoff=2.0,
+        timeout=None,
+        sleep=time.sleep,
+        ) -> None:
+        """
+        Polls an indexer until its run finishes
+        get_status: returns the indexer lastResult, e.g. AISearchIndexer.get_indexer_status
+        min_interval: seconds between polls while documents are being processed
+        max_interval: upper bound of the interval while nothing changes
+        backoff: factor the interval grows by on every poll without progress
+        timeout: seconds after which wait gives up, None to wait for the run to finish
+        """
+        self.get_status = get_status
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self.sleep = sleep
+        self.interval = min_interval
+        self.started = time.monotonic()
+        self.last: Optional[IndexerProgress] = None
+
+    def poll(self) -> IndexerProgress:
+        """
+        Fetches the status once, without waiting, and works out when to poll next
+        """
+        result = self.get_status() or {}
+        progress = IndexerProgress(
+            status=result.get("status"),
+            items_processed=result.get("itemsProcessed") or 0,
+            items_failed=result.get("itemsFailed") or 0,
+            start_time=result.get("startTime"),
+            end_time=result.get("endTime"),
+            error=result.get("errorMessage"),
+            polls=(self.last.polls if self.last else 0) + 1,
+            elapsed=time.monotonic() - self.started,
+        )
+        moved = self.last is None or (progress.items_processed, progress.items_failed) != (
+            self.last.items_processed, self.last.items_failed
+        )
+        # poll quickly while documents flow, back off while the indexer is idle or queued
+        self.interval = self.min_interval if moved else min(self.interval * self.backoff, self.max_interval)
+        progress.next_poll_in = 0.0 if progress.done else self.interval
+        self.last = progress
+        return progress
+
+    def timed_out(self) -> bool:
+        return self.timeout is not None and time.monotonic() - self.started >= self.timeout
+
+    def progress(self) -> Iterator[IndexerProgress]:
+        """
+        Yields the progress after every poll until the run finishes or times out
+        """
+        while True:
+            progress = self.poll()
+            yield progress
+            if progress.done or self.timed_out():
+                return
+            self.sleep(progress.next_poll_in)
+
+    def wait(self) -> IndexerProgress:
+        for progress in self.progress():
+            logging.info(
+                f"Indexer status: {progress.status}, processed {progress.items_processed}, "
+                f"failed {progress.items_failed}"
+            )
+        return progress
+
+    async def wait_async(self) -> IndexerProgress:
+        """
+        Same as wait, without blocking the event loop
+        """
+        while True:
+            progress = await asyncio.to_thread(self.poll)
+            if progress.done or self.timed_out():
+                return progress
+            await asyncio.sleep(progress.next_poll_in)
@@ -0,0 +1,127 @@
+"""
+Tests of the ingestion driver against the local fakes, run with: python -m pytest test_ingestion.py
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import ingestion
+from fakes import FakeContainerClient, FakeIndexerStatus
+from ingestion import HASH_METADATA_KEY, BlobUploader, IndexerMonitor, file_sha256
+
+
+@pytest.fixture
+def folder(tmp_path):
+    (tmp_path / "a.txt").write_bytes(b"alpha")
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "b.txt").write_bytes(b"bravo")
+    return tmp_path
+
+
+def test_upload_folder_uploads_with_content_hash(folder):
+    container = FakeContainerClient()
+    report = BlobUploader(container).upload_folder(str(folder), "docs")
+
+    assert sorted(report.uploaded) == ["docs/a.txt", "docs/b.txt"]
+    assert report.skipped == [] and report.failed == {}
+    content, metadata = container.blobs["docs/a.txt"]
+    assert content == b"alpha"
+    assert metadata[HASH_METADATA_KEY] == file_sha256(str(folder / "a.txt"))
+
+
+def test_upload_folder_skips_unchanged_files(folder):
+    container = FakeContainerClient()
+    uploader = BlobUploader(container)
+    uploader.upload_folder(str(folder), "docs")
+    (folder / "a.txt").write_bytes(b"changed")
+
+    report = uploader.upload_folder(str(folder), "docs")
+
+    assert report.uploaded == ["docs/a.txt"]
+    assert report.skipped == ["docs/b.txt"]
+    assert container.blobs["docs/a.txt"][0] == b"changed"
+    # one listing per run, no per-file lookups
+    assert container.calls == {"list_blobs": 2, "upload": 3}
+
+
+def test_large_files_are_staged_in_blocks(tmp_path):
+    data = bytes(range(256)) * 40
+    (tmp_path / "big.bin").write_bytes(data)
+    (tmp_path / "small.bin").write_bytes(b"small")
+    container = FakeContainerClient()
+
+    report = BlobUploader(container, chunked_upload_threshold=1024, block_size=1000).upload_folder(str(tmp_path))
+
+    assert sorted(report.uploaded) == ["big.bin", "small.bin"]
+    # 10240 bytes in blocks of 1000, committed in order
+    assert container.calls["stage_block"] == 11
+    assert container.blobs["big.bin"][0] == data
+    assert container.blobs["big.bin"][1][HASH_METADATA_KEY] == file_sha256(str(tmp_path / "big.bin"))
+    assert container.blobs["small.bin"][0] == b"small"
+
+
+class FakeClock:
+    """
+    Stands in for time.monotonic and time.sleep, so that waits take no time
+    """
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # only the module's clock, asyncio keeps the real one
+    monkeypatch.setattr(ingestion, "time", SimpleNamespace(monotonic=clock.monotonic, perf_counter=time.perf_counter))
+    return clock
+
+
+def running(processed):
+    return {"status": "inProgress", "itemsProcessed": processed, "itemsFailed": 0}
+
+
+def test_monitor_backs_off_while_idle_and_resets_on_progress(clock):
+    status = FakeIndexerStatus([None, None, None, running(1), running(1), running(1), {"status": "success", "itemsProcessed": 2}])
+    monitor = IndexerMonitor(status, min_interval=1.0, max_interval=3.0, backoff=2.0, sleep=clock.sleep)
+
+    progress = monitor.wait()
+
+    assert progress.status == "success"
+    assert progress.items_processed == 2
+    assert progress.polls == status.calls == 7
+    assert clock.sleeps == [1.0, 2.0, 3.0, 1.0, 2.0, 3.0]
+
+
+def test_monitor_gives_up_after_timeout(clock):
+    status = FakeIndexerStatus([running(0)])
+    monitor = IndexerMonitor(status, min_interval=1.0, max_interval=4.0, timeout=10.0, sleep=clock.sleep)
+
+    progress = monitor.wait()
+
+    assert not progress.done
+    assert progress.elapsed >= 10.0
+    assert clock.sleeps == [1.0, 2.0, 4.0, 4.0]
+
+
+def test_monitor_wait_async_does_not_block(clock, monkeypatch):
+    async def fake_sleep(seconds):
+        clock.sleep(seconds)
+
+    monkeypatch.setattr(ingestion.asyncio, "sleep", fake_sleep)
+    status = FakeIndexerStatus([running(0), running(5), {"status": "transientFailure", "errorMessage": "quota"}])
+
+    progress = asyncio.run(IndexerMonitor(status, min_interval=1.0).wait_async())
+
+    assert progress.status == "transientFailure"
+    assert progress.error == "quota"
+    assert clock.sleeps == [1.0, 1.0]